@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from jose import JWTError
 from app.db.base import get_db
 from app.models.user import User
+from app.core.config import settings
 from app.core.security import decode_access_token
 from app.core import get_logger
 
@@ -45,4 +46,10 @@ def get_current_active_user(current_user: User = Depends(get_current_user)):
         logger.warning("Inactive user attempted to access protected resource", user_id=current_user.id)
         raise HTTPException(status_code=400, detail="Inactive user")
     logger.info("Active user granted access", user_id=current_user.id, username=current_user.username)
-    return current_user
\ No newline at end of file
+    return current_user
+
+def get_current_admin_user(current_user: User = Depends(get_current_active_user)):
+    if current_user.username not in settings.ADMIN_USERNAMES:
+        logger.warning("Non-admin user attempted to access admin resource", user_id=current_user.id)
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return current_user
@@ -1,9 +1,11 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, prediction, visualization, history
+from app.api.v1.endpoints import admin, auth, prediction, visualization, history, stream
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(prediction.router, prefix="/predict", tags=["prediction"])
 api_router.include_router(visualization.router, prefix="/ecg", tags=["visualization"])
-api_router.include_router(history.router, prefix="/history", tags=["history"])
\ No newline at end of file
+api_router.include_router(history.router, prefix="/history", tags=["history"])
+api_router.include_router(stream.router, prefix="/stream", tags=["stream"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Dict
+from app.api.deps import get_current_admin_user
+from app.models.user import User
+from app.services.model_registry import registries, wait_drained
+from app.core import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+@router.get("/models")
+async def get_model_versions(current_user: User = Depends(get_current_admin_user)) -> Dict[str, Any]:
+    """Model versions serving requests in this worker, and older versions still draining"""
+    return {name: registry.describe() for name, registry in registries.items()}
+
+@router.post("/models/reload")
+async def reload_models(
+    model: str = Query(None, description="Model to reload (tabular or ecg); all when omitted"),
+    force: bool = Query(True, description="Reload even if the model files are unchanged"),
+    current_user: User = Depends(get_current_admin_user)
+) -> Dict[str, Any]:
+    """
+    Load the model files on disk, warm them and swap them in without downtime.
+
+    Requests keep being served by the current version while the new one
+    loads; requests already running finish on the version they started
+    with. Only this worker process is reloaded - the file watcher picks up
+    changed files in every worker.
+    """
+    if model is not None and model not in registries:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown model: {model}")
+    logger.info("Model reload requested", user_id=current_user.id, model=model, force=force)
+    results = {}
+    for name in [model] if model is not None else list(registries):
+        registry = registries[name]
+        previous = registry.current
+        try:
+            version = await run_in_threadpool(registry.reload, force)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Reloading {name} failed, still serving {previous.version}: {str(e)}"
+            )
+        swapped = version is not previous
+        drained = await run_in_threadpool(wait_drained, previous) if swapped else True
+        results[name] = {
+            "version": version.version,
+            "previous_version": previous.version if previous is not None else None,
+            "swapped": swapped,
+            "drained": drained
+        }
+    logger.info("Model reload completed", user_id=current_user.id, results=results)
+    return results
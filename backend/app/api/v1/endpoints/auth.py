@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app.db.base import get_db
 from app.models.user import User as UserModel
 from app.schemas.user import UserCreate, User, Token
-from app.core.security import get_password_hash, verify_password, create_access_token
+from app.core.security import get_password_hash_async, verify_and_update_password_async, create_access_token
+from app.core.rate_limit import login_rate_limiter
 from datetime import timedelta
 from app.core.config import settings
 from app.core import get_logger
@@ -19,31 +21,44 @@ def get_user_by_username(db: Session, username: str):
 def get_user_by_email(db: Session, email: str):
     return db.query(UserModel).filter(UserModel.email == email).first()
 
-def authenticate_user(db: Session, username: str, password: str):
+def _save_user(db: Session, user: UserModel) -> None:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+async def authenticate_user(db: Session, username: str, password: str):
     logger.debug("Authenticating user",
                   username=username)
-    user = get_user_by_username(db, username)
+    # Blocking queries run in the threadpool so a login burst does not stall the event loop
+    user = await run_in_threadpool(get_user_by_username, db, username)
     if not user:
         logger.info("Authentication failed - user not found",
                      username=username)
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+    if not valid:
         logger.info("Authentication failed - invalid password",
                      user_id=user.id,
                      username=username)
         return False
+    if new_hash is not None:
+        # Stored hash uses an outdated cost factor; replace it transparently
+        user.hashed_password = new_hash
+        await run_in_threadpool(db.commit)
+        logger.info("Password rehashed with current cost factor",
+                     user_id=user.id)
     logger.info("Authentication successful",
                  user_id=user.id,
                  username=username)
     return user
 
 @router.post("/register", response_model=User)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     logger.info("User registration request received",
                  username=user.username,
                  email=user.email)
     # Check if user already exists
-    db_user = get_user_by_username(db, username=user.username)
+    db_user = await run_in_threadpool(get_user_by_username, db, user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -51,7 +66,7 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if email already exists
-    db_user = get_user_by_email(db, email=user.email)
+    db_user = await run_in_threadpool(get_user_by_email, db, user.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -66,31 +81,48 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = UserModel(
         username=user.username,
         email=user.email,
         hashed_password=hashed_password
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await run_in_threadpool(_save_user, db, db_user)
     logger.info("User registered successfully",
                  user_id=db_user.id,
                  username=db_user.username)
     return db_user
 
 @router.post("/login", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    client_ip = request.client.host if request.client else "unknown"
     logger.info("Login request received",
-                 username=form_data.username)
-    user = authenticate_user(db, form_data.username, form_data.password)
+                 username=form_data.username,
+                 client_ip=client_ip)
+    user_key, ip_key = f"user:{form_data.username.lower()}", f"ip:{client_ip}"
+    # Counted before the password is checked, so parallel guesses cannot all pass the limit
+    retry_after = login_rate_limiter.acquire([user_key, ip_key])
+    if retry_after > 0:
+        logger.warning("Login rate limit exceeded",
+                        username=form_data.username,
+                        client_ip=client_ip,
+                        retry_after=retry_after)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Only failures count, so users behind a shared proxy IP are not locked out by each other's logins.
+    # The IP keeps its other failures: logging into one's own account must not clear guesses at others
+    login_rate_limiter.refund([ip_key])
+    login_rate_limiter.reset([user_key])
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": str(user.id)}, expires_delta=access_token_expires
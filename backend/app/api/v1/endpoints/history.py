@@ -6,8 +6,11 @@ from app.db.base import get_db
 from app.api.deps import get_current_active_user
 from app.models.user import User
 from app.models.prediction import Prediction
+from app.models.ecg_data import EcgData
 from app.schemas.prediction import PredictionHistoryItem, PredictionHistoryResponse
 from app.core import get_logger
+from app.core.responses import ORJSONResponse, columns
+from app.services.ecg_storage import decode_processed
 
 logger = get_logger(__name__)
 
@@ -104,7 +107,17 @@ async def get_prediction_detail(
         logger.info("Prediction detail retrieved successfully",
                      user_id=current_user.id,
                      prediction_id=prediction_id)
-        return prediction
+        detail = columns(prediction)
+        if prediction.type in ("ecg", "combined"):
+            # Summary of the stored processed signal; the arrays are served by the signal endpoint
+            ecg_data = db.query(EcgData).filter(EcgData.prediction_id == prediction_id).first()
+            if ecg_data is not None and ecg_data.processed_data is not None:
+                detail["processed_signal"] = {
+                    **decode_processed(ecg_data.processed_data).describe(),
+                    "url": f"/api/v1/ecg/{prediction_id}/signal?source=processed"
+                }
+        # Column values straight to orjson: the stored JSON blobs are not walked by jsonable_encoder
+        return ORJSONResponse(detail)
         
     except HTTPException:
         raise
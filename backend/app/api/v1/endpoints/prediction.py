@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import asyncio
 import uuid
 import os
 from app.db.base import get_db
@@ -9,17 +13,90 @@ from app.models.user import User
 from app.models.prediction import Prediction
 from app.models.tabular_data import TabularData
 from app.models.ecg_data import EcgData
-from app.schemas.prediction import TabularDataInput, TabularPredictionResult, EcgPredictionResult
+from app.schemas.prediction import (
+    TabularDataInput, TabularPredictionResult, EcgPredictionResult, CombinedPredictionResult
+)
 from app.services.tabular_service import tabular_service
+from app.services.ecg_processing import BeatLog
 from app.services.ecg_service import ecg_service
+from app.services.ensemble_service import ensemble_service
 from app.services.visualization_service import visualization_service
 from app.core import get_logger
+from app.core.executors import run_in_executor, upload_inference_executor
+from app.core.metrics import stage_timer
 from app.core.file_utils import get_upload_directory
 
 logger = get_logger(__name__)
 
 router = APIRouter()
 
+
+class SavedEcgUpload(NamedTuple):
+    """An uploaded WFDB .dat/.hea pair stored in the upload directory"""
+    dat_file_name: str
+    hea_file_name: str
+    dat_file_path: str
+    hea_file_path: str
+    dat_file_size: int
+    hea_file_size: int
+
+    def describe(self) -> Dict[str, Any]:
+        """Upload metadata stored as a prediction's input data"""
+        return {
+            "dat_file_name": self.dat_file_name,
+            "dat_file_size": self.dat_file_size,
+            "hea_file_name": self.hea_file_name,
+            "hea_file_size": self.hea_file_size
+        }
+
+
+async def save_ecg_upload(files: List[UploadFile]) -> SavedEcgUpload:
+    """
+    Validate and store an uploaded record under a unique name.
+
+    Args:
+        files (List[UploadFile]): Exactly one .dat and one .hea file
+
+    Returns:
+        SavedEcgUpload: Original names, stored paths and sizes
+
+    Raises:
+        HTTPException: 400 unless exactly one .dat and one .hea file were uploaded
+    """
+    # Validate that we have both .dat and .hea files
+    dat_files = [f for f in files if f.filename.endswith('.dat')]
+    hea_files = [f for f in files if f.filename.endswith('.hea')]
+    
+    if len(dat_files) != 1 or len(hea_files) != 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Please upload exactly one .dat file and one .hea file."
+        )
+    
+    dat_file = dat_files[0]
+    hea_file = hea_files[0]
+    
+    # Save uploaded files; the .hea file must share the .dat file's stored name
+    upload_dir = get_upload_directory()
+    dat_filename = f"{uuid.uuid4()}_{dat_file.filename}"
+    dat_file_path = os.path.join(upload_dir, dat_filename)
+    hea_file_path = os.path.join(upload_dir, dat_filename.replace('.dat', '.hea'))
+    try:
+        with open(dat_file_path, "wb") as buffer:
+            dat_content = await dat_file.read()
+            buffer.write(dat_content)
+        with open(hea_file_path, "wb") as buffer:
+            hea_content = await hea_file.read()
+            buffer.write(hea_content)
+    except Exception:
+        for path in (dat_file_path, hea_file_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    return SavedEcgUpload(dat_file.filename, hea_file.filename, dat_file_path, hea_file_path,
+                          len(dat_content), len(hea_content))
+
+
 @router.post("/tabular", response_model=TabularPredictionResult)
 async def predict_tabular(
     input_data: TabularDataInput,
@@ -28,17 +105,15 @@ async def predict_tabular(
 ):
     """Submit patient data for cardiovascular disease prediction"""
     logger.info("Tabular prediction request received",
-                 user_id=current_user.id,
-                 input_data=input_data.dict())
+                 user_id=current_user.id)
     try:
-        # Make prediction
-        prediction_result = tabular_service.predict(input_data.dict())
+        # Make prediction and explanation; identical feature vectors are served from the result cache
+        prediction_result, explanation = await run_in_threadpool(
+            tabular_service.predict_with_explanation, input_data.dict()
+        )
         logger.info("Tabular prediction completed",
                      user_id=current_user.id,
-                     prediction_result=prediction_result)
-        
-        # Generate explanation
-        explanation = tabular_service.explain_prediction(input_data.dict())
+                     risk_level=prediction_result["risk_level"])
         prediction_result["explanation"] = explanation
         logger.info("Explanation generated for tabular prediction",
                      user_id=current_user.id)
@@ -51,7 +126,8 @@ async def predict_tabular(
             type="tabular",
             input_data=input_data.dict(),
             result_data=prediction_result,
-            confidence_score=prediction_result["confidence"]
+            confidence_score=prediction_result["confidence"],
+            model_version=prediction_result.get("model_version")
         )
         db.add(db_prediction)
         logger.info("Prediction saved to database",
@@ -78,8 +154,9 @@ async def predict_tabular(
                      user_id=current_user.id,
                      prediction_id=prediction_id)
         
-        db.commit()
-        db.refresh(db_prediction)
+        with stage_timer("tabular", "db_commit"):
+            db.commit()
+            db.refresh(db_prediction)
         logger.info("Database transaction committed",
                      user_id=current_user.id,
                      prediction_id=prediction_id)
@@ -118,42 +195,15 @@ async def predict_ecg(
                  user_id=current_user.id,
                  filenames=[f.filename for f in files])
     try:
-        # Validate that we have both .dat and .hea files
-        dat_files = [f for f in files if f.filename.endswith('.dat')]
-        hea_files = [f for f in files if f.filename.endswith('.hea')]
-        
-        if len(dat_files) != 1 or len(hea_files) != 1:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Please upload exactly one .dat file and one .hea file."
-            )
-        
-        dat_file = dat_files[0]
-        hea_file = hea_files[0]
-        
-        # Save uploaded files
-        upload_dir = get_upload_directory()
-        
-        # Save .dat file
-        dat_filename = f"{uuid.uuid4()}_{dat_file.filename}"
-        dat_file_path = os.path.join(upload_dir, dat_filename)
-        with open(dat_file_path, "wb") as buffer:
-            dat_content = await dat_file.read()
-            buffer.write(dat_content)
-        
-        # Save .hea file
-        hea_filename = dat_filename.replace('.dat', '.hea')
-        hea_file_path = os.path.join(upload_dir, hea_filename)
-        with open(hea_file_path, "wb") as buffer:
-            hea_content = await hea_file.read()
-            buffer.write(hea_content)
+        upload = await save_ecg_upload(files)
+        dat_file_path, hea_file_path = upload.dat_file_path, upload.hea_file_path
         
         logger.info("ECG files saved",
                      user_id=current_user.id,
                      dat_file_path=dat_file_path,
                      hea_file_path=hea_file_path,
-                     dat_file_size=len(dat_content),
-                     hea_file_size=len(hea_content))
+                     dat_file_size=upload.dat_file_size,
+                     hea_file_size=upload.hea_file_size)
         
         # Log absolute paths for debugging
         abs_dat_file_path = os.path.abspath(dat_file_path)
@@ -165,47 +215,35 @@ async def predict_ecg(
         # Use the .dat file path for processing
         file_path = dat_file_path
         
-        # Make prediction
+        # Make prediction; scoring runs on the upload executor and rendering in the threadpool, so live streams keep flowing
+        beats = BeatLog()
         try:
-            prediction_result = ecg_service.predict(file_path)
+            prediction_result = await run_in_executor(upload_inference_executor, ecg_service.predict, file_path, beats)
             logger.info("ECG prediction completed",
                          user_id=current_user.id,
-                         prediction_result=prediction_result)
+                         classification=prediction_result["classification"])
         except FileNotFoundError as e:
             logger.error("Missing ECG header file", error=str(e))
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=str(e)
             )
+        except ValueError as e:
+            # Nothing analysable in the record (artefact only, no beats found)
+            logger.warning("ECG record rejected", user_id=current_user.id, error=str(e))
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
         
-        # Detect abnormalities
-        abnormalities = ecg_service.detect_abnormalities(file_path)
-        
-        # Generate explanation
-        explanation = ecg_service.explain_prediction(prediction_result)
+        # Detect abnormalities, explain, render the visualization and encode the processed signal
+        abnormalities, explanation, viz_path, processed_data = await run_in_threadpool(
+            _ecg_findings, file_path, prediction_result, beats
+        )
         prediction_result["explanation"] = explanation
-        logger.info("Explanation generated for ECG prediction",
-                     user_id=current_user.id)
         
-        # Generate visualization
-        # Generate prediction ID first to use in visualization URL
+        # Generate prediction ID to use in visualization URL
         prediction_id = str(uuid.uuid4())
-        logger.info("Generated prediction ID for ECG analysis",
-                     user_id=current_user.id,
-                     prediction_id=prediction_id)
-        try:
-            viz_path = visualization_service.generate_visualization(file_path, abnormalities)
-            logger.info("Visualization generated",
-                         user_id=current_user.id,
-                         prediction_id=prediction_id,
-                         viz_path=viz_path)
-        except FileNotFoundError as e:
-            logger.error("Missing ECG header file for visualization",
-                         user_id=current_user.id,
-                         prediction_id=prediction_id,
-                         error=str(e))
-            # Continue without visualization if header file is missing
-            viz_path = None
         visualization_url = f"/api/v1/ecg/{prediction_id}/visualization" if viz_path else ""
         logger.info("Visualization URL constructed",
                      user_id=current_user.id,
@@ -221,14 +259,10 @@ async def predict_ecg(
             id=prediction_id,
             user_id=current_user.id,
             type="ecg",
-            input_data={
-                "dat_file_name": dat_file.filename,
-                "dat_file_size": len(dat_content),
-                "hea_file_name": hea_file.filename,
-                "hea_file_size": len(hea_content)
-            },
+            input_data=upload.describe(),
             result_data=result_data,
-            confidence_score=prediction_result["confidence"]
+            confidence_score=prediction_result["confidence"],
+            model_version=prediction_result.get("model_version")
         )
         db.add(db_prediction)
         logger.info("ECG prediction saved to database",
@@ -239,9 +273,10 @@ async def predict_ecg(
         db_ecg = EcgData(
             prediction_id=prediction_id,
             file_path=file_path,
-            file_name=dat_file.filename,
-            file_size=len(dat_content),
-            processed_signal=None,  # Would be populated in a real implementation
+            file_name=upload.dat_file_name,
+            file_size=upload.dat_file_size,
+            processed_signal=None,
+            processed_data=processed_data,
             abnormalities=abnormalities
         )
         db.add(db_ecg)
@@ -249,8 +284,9 @@ async def predict_ecg(
                      user_id=current_user.id,
                      prediction_id=prediction_id)
         
-        db.commit()
-        db.refresh(db_prediction)
+        with stage_timer("ecg", "db_commit"):
+            db.commit()
+            db.refresh(db_prediction)
         logger.info("Database transaction committed",
                      user_id=current_user.id,
                      prediction_id=prediction_id)
@@ -264,8 +300,13 @@ async def predict_ecg(
             "confidence": prediction_result["confidence"],
             "explanation": explanation,
             "visualization_url": visualization_url,
+            "model_version": prediction_result.get("model_version"),
             "created_at": db_prediction.created_at
         }
+        # Result version, beat counts, signal quality and attribution, when the model produced them
+        for key in ("result_version", "beat_count", "abnormal_beat_count", "signal_quality", "attribution"):
+            if key in prediction_result:
+                response_data[key] = prediction_result[key]
         
         logger.info("ECG prediction completed successfully",
                      user_id=current_user.id,
@@ -285,7 +326,159 @@ async def predict_ecg(
             os.remove(dat_file_path)
         if 'hea_file_path' in locals() and os.path.exists(hea_file_path):
             os.remove(hea_file_path)
+        if isinstance(e, HTTPException):
+            raise
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing ECG prediction: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+def _encode_processed_signal(file_path: str, beats: BeatLog) -> Optional[bytes]:
+    """Compact display trace and beat scores stored with the prediction (None if the record cannot be read)"""
+    try:
+        with stage_timer("ecg", "encode"):
+            return visualization_service.encode_processed_signal(file_path, beats)
+    except FileNotFoundError as e:
+        logger.error("Missing ECG file for processed signal", file_path=file_path, error=str(e))
+        return None
+
+
+def _ecg_findings(file_path: str, prediction_result: Dict[str, Any],
+                  beats: BeatLog) -> Tuple[List[Dict[str, Any]], Dict[str, Any], str, Optional[bytes]]:
+    """
+    Abnormalities, explanation, rendered visualization path (None if it cannot be rendered)
+    and encoded processed signal of an analysed record
+    """
+    with stage_timer("ecg", "detect"):
+        abnormalities = ecg_service.detect_abnormalities(prediction_result)
+    with stage_timer("ecg", "explain"):
+        explanation = ecg_service.explain_prediction(prediction_result)
+    try:
+        with stage_timer("ecg", "render"):
+            viz_path = visualization_service.generate_visualization(file_path, abnormalities)
+    except FileNotFoundError as e:
+        logger.error("Missing ECG header file for visualization", file_path=file_path, error=str(e))
+        viz_path = None
+    return abnormalities, explanation, viz_path, _encode_processed_signal(file_path, beats)
+
+
+async def _ecg_branch(file_path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Dict[str, Any], str, Optional[bytes]]:
+    """Score a record on the upload executor, then derive its findings on the default threadpool"""
+    beats = BeatLog()
+    prediction_result = await run_in_executor(upload_inference_executor, ecg_service.predict, file_path, beats)
+    findings = await run_in_threadpool(_ecg_findings, file_path, prediction_result, beats)
+    return (prediction_result,) + findings
+
+
+@router.post("/combined", response_model=CombinedPredictionResult)
+async def predict_combined(
+    features: str = Form(..., description="Patient features (TabularDataInput) as a JSON object"),
+    files: list[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Predict cardiovascular risk from patient features and an ECG recording together.
+
+    The tabular branch (in the threadpool, as for /tabular) and the ECG branch
+    (on the upload executor) run concurrently, so the request takes as long
+    as the slower branch rather than both.
+    Their probabilities are fused with the ensemble weights and stored as
+    one prediction.
+    """
+    logger.info("Combined prediction request received",
+                 user_id=current_user.id,
+                 file_count=len(files))
+    try:
+        input_data = TabularDataInput.model_validate_json(features)
+    except ValidationError as e:
+        # Invalid JSON, not an object, or failed validation: reported like any other invalid form field
+        raise RequestValidationError([
+            {**error, "loc": ("body", "features", *error["loc"])}
+            for error in e.errors(include_url=False, include_context=False)
+        ])
+    
+    upload = await save_ecg_upload(files)
+    try:
+        try:
+            with stage_timer("combined", "branches"):
+                (tabular_result, tabular_explanation), (ecg_result, abnormalities, ecg_explanation, viz_path, processed_data) = \
+                    await asyncio.gather(
+                        run_in_threadpool(tabular_service.predict_with_explanation, input_data.dict()),
+                        _ecg_branch(upload.dat_file_path)
+                    )
+        except (FileNotFoundError, ValueError) as e:
+            # Missing header, or nothing analysable in the record
+            logger.warning("ECG record rejected", user_id=current_user.id, error=str(e))
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        
+        fused = ensemble_service.combine(tabular_result, ecg_result)
+        prediction_id = str(uuid.uuid4())
+        visualization_url = f"/api/v1/ecg/{prediction_id}/visualization" if viz_path else ""
+        tabular_result["explanation"] = tabular_explanation
+        ecg_result["explanation"] = ecg_explanation
+        ecg_result["abnormalities"] = abnormalities
+        result_data = {
+            **fused,
+            "tabular": tabular_result,
+            "ecg": ecg_result,
+            "visualization_url": visualization_url
+        }
+        model_version = f"{tabular_result.get('model_version')}+{ecg_result.get('model_version')}"
+        
+        # One prediction row plus both inputs, committed together
+        db_prediction = Prediction(
+            id=prediction_id,
+            user_id=current_user.id,
+            type="combined",
+            input_data={"features": input_data.dict(), **upload.describe()},
+            result_data=result_data,
+            confidence_score=fused["confidence"],
+            model_version=model_version
+        )
+        db.add(db_prediction)
+        db.add(TabularData(prediction_id=prediction_id, **input_data.dict()))
+        db.add(EcgData(
+            prediction_id=prediction_id,
+            file_path=upload.dat_file_path,
+            file_name=upload.dat_file_name,
+            file_size=upload.dat_file_size,
+            processed_signal=None,
+            processed_data=processed_data,
+            abnormalities=abnormalities
+        ))
+        with stage_timer("combined", "db_commit"):
+            db.commit()
+            db.refresh(db_prediction)
+        
+        logger.info("Combined prediction completed successfully",
+                     user_id=current_user.id,
+                     prediction_id=prediction_id,
+                     risk_level=fused["risk_level"],
+                     probability=fused["probability"])
+        return {
+            "prediction_id": prediction_id,
+            **result_data,
+            "model_version": model_version,
+            "created_at": db_prediction.created_at
+        }
+        
+    except Exception as e:
+        logger.error("Error processing combined prediction",
+                      user_id=current_user.id,
+                      error=str(e),
+                      exc_info=not isinstance(e, HTTPException))
+        db.rollback()
+        for path in (upload.dat_file_path, upload.hea_file_path):
+            if os.path.exists(path):
+                os.remove(path)
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing combined prediction: {str(e)}"
+        )
@@ -0,0 +1,138 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+
+from app.db.base import SessionLocal
+from app.models.user import User
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.core import get_logger
+from app.services.ecg_processing import MODEL_SAMPLING_RATE
+from app.services.ecg_service import ecg_service
+from app.services.ecg_realtime import StreamSession, active_sessions, stream_batcher
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+# Accepted input sampling rates; everything is resampled to MODEL_SAMPLING_RATE
+MIN_STREAM_SAMPLING_RATE = 100.0
+MAX_STREAM_SAMPLING_RATE = 2000.0
+
+
+# Subprotocol the client offers next to its access token, and the one the server accepts
+AUTH_SUBPROTOCOL = "bearer"
+
+
+def _offered_token(websocket: WebSocket):
+    """
+    Access token from the ``Sec-WebSocket-Protocol`` header.
+
+    Browsers cannot set an Authorization header on a WebSocket, but they can
+    offer subprotocols: ``new WebSocket(url, ["bearer", token])``. Unlike a
+    query parameter, the header does not end up in access logs.
+    """
+    offered = websocket.scope.get("subprotocols") or []
+    if AUTH_SUBPROTOCOL not in offered:
+        return None
+    tokens = [protocol for protocol in offered if protocol != AUTH_SUBPROTOCOL]
+    return tokens[0] if len(tokens) == 1 else None
+
+
+def _authenticate(token: str):
+    """Resolve a bearer token to an active user, or None"""
+    payload = decode_access_token(token) if token else None
+    if not payload or payload.get("sub") is None:
+        return None
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == int(payload["sub"])).first()
+        return user if user is not None and user.is_active else None
+    finally:
+        db.close()
+
+
+@router.websocket("/ecg")
+async def stream_ecg(
+    websocket: WebSocket,
+    fs: float = MODEL_SAMPLING_RATE,
+    gain: float = 200.0,
+    baseline: float = 0.0
+):
+    """
+    Classify a live single-lead ECG beat by beat.
+
+    The client sends binary frames of little-endian int16 samples (physical
+    value = (sample - baseline) / gain, in mV) at the declared sampling rate
+    (resampled to the model rate server-side) and receives JSON events: "beats" with a label per completed beat,
+    "episode" when a run of abnormal beats starts or ends, and a final
+    "summary" after sending the text message "end". The access token is
+    offered as a subprotocol next to "bearer" (see ``_offered_token``).
+    Windows that fail the signal-quality check yield no beats, as for uploads.
+    """
+    user = await run_in_threadpool(_authenticate, _offered_token(websocket))
+    if user is None:
+        logger.warning("Stream rejected: invalid credentials")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if ecg_service.model is None:
+        logger.warning("Stream rejected: ECG model not loaded", user_id=user.id)
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        return
+    if len(active_sessions) >= settings.ECG_STREAM_MAX_SESSIONS:
+        logger.warning("Stream rejected: session limit reached", user_id=user.id, sessions=len(active_sessions))
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    if not MIN_STREAM_SAMPLING_RATE <= fs <= MAX_STREAM_SAMPLING_RATE:
+        logger.warning("Stream rejected: unsupported sampling rate", user_id=user.id, fs=fs)
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+        return
+
+    # Only the fixed subprotocol is echoed back, never the token
+    await websocket.accept(subprotocol=AUTH_SUBPROTOCOL)
+    session = StreamSession(fs, gain=gain, baseline=baseline)
+    active_sessions[session.session_id] = session
+    logger.info("ECG stream opened", user_id=user.id, session_id=session.session_id, fs=fs)
+    await websocket.send_json({"type": "ready", "session_id": session.session_id, "fs": fs, "window": session.window})
+
+    # Bounds the resampling done on the event loop per frame
+    max_frame_bytes = 2 * max(1, int(settings.ECG_STREAM_MAX_FRAME_SECONDS * fs))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text") is not None:
+                if message["text"].strip() == "end":
+                    await websocket.send_json(session.summary())
+                    await websocket.close()
+                    break
+                continue
+            frame = message.get("bytes") or b""
+            if len(frame) % 2:
+                await websocket.send_json({"type": "error", "detail": "Frames must hold whole int16 samples"})
+                continue
+            if len(frame) > max_frame_bytes:
+                await websocket.send_json({"type": "error", "detail": f"Frames must not exceed {max_frame_bytes} bytes"})
+                continue
+
+            session.append(frame)
+            if not session.due:
+                continue
+            # Filtering and peak detection run off the event loop shared by all sessions
+            beats, peaks = await run_in_threadpool(session.poll_beats)
+            if peaks.size == 0:
+                continue
+            scores = await stream_batcher.score(beats)
+            for event in session.record_scores(peaks, scores):
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error("ECG stream failed", session_id=session.session_id, error=str(e), exc_info=True)
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+    finally:
+        active_sessions.pop(session.session_id, None)
+        summary = session.summary()
+        logger.info("ECG stream closed", user_id=user.id, session_id=session.session_id,
+                    duration_seconds=summary["duration_seconds"], beat_count=summary["beat_count"],
+                    abnormal_beat_count=summary["abnormal_beat_count"])
@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 import os
+import numpy as np
 from app.db.base import get_db
 from app.api.deps import get_current_active_user
 from app.models.user import User
 from app.models.prediction import Prediction
+from app.models.ecg_data import EcgData
 from app.core import get_logger
+from app.core.config import settings
+from app.core.file_utils import get_visualization_directory
+from app.core.responses import signal_response, wants_binary
+from app.services.ecg_storage import decode_processed
+from app.services.ecg_stream import read_record, record_data_path
+from app.services.visualization_service import visualization_service
 
 logger = get_logger(__name__)
 
@@ -35,28 +44,32 @@ async def get_ecg_visualization(
                 detail="Prediction not found"
             )
         
-        if prediction.type != "ecg":
+        if prediction.type not in ("ecg", "combined"):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Visualization only available for ECG predictions"
             )
         
-        # In a real implementation, we would retrieve the actual visualization file
-        # For now, we'll return a placeholder
-        # The actual file path would be stored in the visualizations table
-        viz_dir = os.path.join("uploads", "visualizations")
-        viz_files = os.listdir(viz_dir) if os.path.exists(viz_dir) else []
-        
-        if viz_files:
-            # Return the first available visualization as a placeholder
-            viz_path = os.path.join(viz_dir, viz_files[0])
-            if os.path.exists(viz_path):
+        # Rendered from the stored processed signal: the record is not decoded again
+        ecg_data = db.query(EcgData).filter(EcgData.prediction_id == prediction_id).first()
+        if ecg_data is not None and ecg_data.processed_data is not None:
+            viz_path = os.path.join(get_visualization_directory(), f"ecg_viz_{prediction_id}.png")
+            if not os.path.exists(viz_path):
+                viz_path = await run_in_threadpool(
+                    visualization_service.generate_visualization, ecg_data.file_path, ecg_data.abnormalities,
+                    processed=decode_processed(ecg_data.processed_data), output_path=viz_path
+                )
+            if viz_path and os.path.exists(viz_path):
+                logger.info("ECG visualization returned successfully",
+                             user_id=current_user.id,
+                             prediction_id=prediction_id)
                 return FileResponse(viz_path, media_type='image/png', filename='ecg_visualization.png')
         
-        logger.info("ECG visualization returned successfully",
+        # No processed signal stored with the prediction, or it could not be rendered;
+        # never substitute another prediction's plot
+        logger.info("No visualization for prediction",
                      user_id=current_user.id,
                      prediction_id=prediction_id)
-        # If no visualization exists, return a placeholder
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Visualization not found"
@@ -73,4 +86,98 @@ async def get_ecg_visualization(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error retrieving visualization: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/{prediction_id}/signal")
+async def get_ecg_signal(
+    prediction_id: str,
+    start: float = Query(0.0, ge=0, description="Start time in seconds"),
+    end: float = Query(None, gt=0, description="End time in seconds; for source=raw at most ECG_SIGNAL_MAX_SECONDS "
+                                                "after start, which is also the default"),
+    source: str = Query("raw", pattern="^(raw|processed)$",
+                        description="raw: the uploaded record; processed: the display trace and beat scores "
+                                    "stored with the prediction (also used when the upload is gone)"),
+    format: str = Query(None, pattern="^(json|binary)$",
+                        description="json, or binary for raw little-endian float32; defaults to the Accept header"),
+    accept: str = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Retrieve the signal (mV, all leads) of an analysed ECG record as JSON or raw float32"""
+    logger.info("ECG signal request received",
+                 user_id=current_user.id,
+                 prediction_id=prediction_id,
+                 start=start,
+                 end=end,
+                 source=source)
+    prediction = db.query(Prediction).filter(
+        Prediction.id == prediction_id,
+        Prediction.user_id == current_user.id
+    ).first()
+    if not prediction:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Prediction not found"
+        )
+    if end is not None and end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be after start"
+        )
+    ecg_data = db.query(EcgData).filter(EcgData.prediction_id == prediction_id).first()
+    base_path = os.path.splitext(ecg_data.file_path)[0] if ecg_data else None
+    has_record = (base_path is not None and record_data_path(base_path) is not None
+                  and os.path.exists(base_path + ".hea"))
+    has_processed = ecg_data is not None and ecg_data.processed_data is not None
+    binary = wants_binary(format, accept)
+    
+    if has_processed and (source == "processed" or not has_record):
+        processed = decode_processed(ecg_data.processed_data)
+        time_points = processed.time_points
+        first = int(np.searchsorted(time_points, start, side="left"))
+        last = int(np.searchsorted(time_points, end, side="left")) if end is not None else time_points.shape[0]
+        if processed.bucket > 1:
+            # Keep whole (min, max) pairs
+            first -= first % 2
+            last += last % 2
+        beat_times = processed.beat_times
+        beats = (beat_times >= start) & (beat_times < end if end is not None else True)
+        logger.info("Processed ECG signal returned",
+                     user_id=current_user.id,
+                     prediction_id=prediction_id,
+                     points=last - first,
+                     binary=binary)
+        return signal_response(
+            processed.signal[first:last], processed.fs, processed.lead_names,
+            start_time=float(time_points[first]) if first < time_points.shape[0] else start,
+            binary=binary, bucket=processed.bucket,
+            extra={"beats": {"times": beat_times[beats], "scores": processed.scores[beats].astype(np.float32)}}
+        )
+    if not has_record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="ECG record not found"
+        )
+
+    # A raw record can be hours long; bound the window so one request cannot return all of it
+    max_seconds = settings.ECG_SIGNAL_MAX_SECONDS
+    if max_seconds > 0:
+        if end is None:
+            end = start + max_seconds
+        elif end - start > max_seconds:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Raw signal windows are limited to {max_seconds:g} seconds"
+            )
+
+    # Decoding is blocking; repeat requests are served from the record cache
+    record = await run_in_threadpool(read_record, base_path)
+    first = int(start * record.fs)
+    last = int(end * record.fs) if end is not None else record.signal.shape[0]
+    signal = record.signal[first:last]
+    logger.info("ECG signal returned",
+                 user_id=current_user.id,
+                 prediction_id=prediction_id,
+                 samples=signal.shape[0],
+                 binary=binary)
+    return signal_response(signal, record.fs, record.sig_name, start_time=first / record.fs, binary=binary)
@@ -0,0 +1,199 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import CACHE_BYTES, CACHE_EVICTIONS, CACHE_REQUESTS
+
+
+def file_fingerprint(*paths: str) -> str:
+    """
+    Digest identifying the current version of one or more files.
+
+    Built from each file's absolute path, size and modification time, so a
+    rewritten file gets a new fingerprint while computing one costs a
+    ``stat`` per file and never reads the data.
+
+    Args:
+        *paths (str): Files to fingerprint together
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+    return digest.hexdigest()
+
+
+def nbytes(value: Any) -> int:
+    """Approximate memory held by a value: array buffers, recursing into tuples, lists and dicts"""
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(nbytes(item) for item in value.values())
+    return 64
+
+
+class _Flight:
+    """A computation in progress that concurrent callers for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by the total size of its values.
+
+    Each entry is stored with its size in bytes; inserting past ``max_bytes``
+    evicts the least recently used entries first. Values larger than the
+    whole budget are not stored. ``max_entries`` additionally bounds the
+    number of entries and ``ttl`` expires entries that many seconds after
+    they were stored. Lookups, evictions and the bytes held are reported
+    under ``name``.
+    """
+
+    def __init__(self, name: str, max_bytes: int, max_entries: int = None, ttl: float = None):
+        self.name = name
+        self.max_bytes = int(max_bytes)
+        self.max_entries = int(max_entries) if max_entries else None
+        self.ttl = float(ttl) if ttl else None
+        # key -> (value, size, expiry on the monotonic clock or None)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        CACHE_BYTES.set_function(lambda: self._bytes, cache=name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def current_bytes(self) -> int:
+        return self._bytes
+
+    def _lookup(self, key: Hashable) -> Optional[tuple]:
+        """Live entry for ``key`` marked most recently used, dropping it if expired; call under the lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] is not None and entry[2] <= time.monotonic():
+            del self._entries[key]
+            self._bytes -= entry[1]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value and mark it most recently used, or None"""
+        with self._lock:
+            entry = self._lookup(key)
+        CACHE_REQUESTS.inc(cache=self.name, result="hit" if entry is not None else "miss")
+        return entry[0] if entry is not None else None
+
+    def put(self, key: Hashable, value: Any, size: int = None) -> bool:
+        """
+        Store a value, evicting least recently used entries to stay within budget.
+
+        Args:
+            key (Hashable): Cache key
+            value (Any): Value to store; shared between callers, so treat it as read-only
+            size (int): Bytes held by ``value``, estimated with ``nbytes`` when omitted
+
+        Returns:
+            bool: False if the value is larger than the whole budget and was not stored
+        """
+        size = nbytes(value) if size is None else int(size)
+        if size > self.max_bytes:
+            return False
+        expiry = time.monotonic() + self.ttl if self.ttl is not None else None
+        evicted = 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size, expiry)
+            self._bytes += size
+            while self._bytes > self.max_bytes or \
+                    (self.max_entries is not None and len(self._entries) > self.max_entries):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                evicted += 1
+        if evicted:
+            CACHE_EVICTIONS.inc(evicted, cache=self.name)
+        return True
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], size: int = None) -> Any:
+        """
+        Return the cached value for ``key``, computing and storing it on a miss.
+
+        Concurrent misses for the same key are coalesced: the first caller
+        computes (outside the lock) while the others wait for its result, so
+        a burst of identical requests costs one computation. If the
+        computation raises, every waiting caller gets the same exception and
+        nothing is stored.
+
+        Args:
+            key (Hashable): Cache key
+            compute (Callable[[], Any]): Produces the value on a miss
+            size (int): Bytes held by the value, estimated with ``nbytes`` when omitted
+
+        Returns:
+            Any: The cached or freshly computed value (shared; treat it as read-only)
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            flight = None
+            if entry is None:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+        if entry is not None:
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return entry[0]
+        CACHE_REQUESTS.inc(cache=self.name, result="miss" if leader else "coalesced")
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            self.put(key, flight.value, size)
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.value
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# Decoded ECG records and derived arrays, shared by the prediction and visualization services
+record_cache = LRUCache("ecg_records", settings.ECG_RECORD_CACHE_MB * 1024 * 1024)
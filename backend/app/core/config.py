@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 import secrets
 
 class Settings(BaseSettings):
@@ -9,10 +9,165 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
     
+    # Password hashing
+    # bcrypt cost factor; raising it rehashes existing passwords on next login
+    BCRYPT_ROUNDS: int = 12
+    # Upper bound on concurrent bcrypt operations so a login burst cannot
+    # take over the threadpool used by prediction requests
+    PASSWORD_HASH_WORKERS: int = 2
+    
+    # Login rate limiting (failed attempts per window, per username and per client IP)
+    LOGIN_RATE_LIMIT_ATTEMPTS: int = 10
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: int = 60
+    # Usernames/IPs tracked at most; the oldest are forgotten first
+    LOGIN_RATE_LIMIT_MAX_KEYS: int = 100000
+    
     # BACKEND_CORS_ORIGINS is a JSON-formatted list of origins
     # e.g: '["http://localhost", "http://localhost:4200", "http://localhost:3000"]'
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
     
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    # "text" for human-readable console output, "json" for JSON lines
+    LOG_CONSOLE_FORMAT: str = "text"
+    LOG_FILE: str = "logs/application.log"
+    # Fraction of DEBUG events kept per logger name prefix,
+    # e.g. '{"app.services.ecg_service": 0.01}'
+    LOG_DEBUG_SAMPLE_RATES: Dict[str, float] = {}
+    
+    # Metrics
+    # When set, GET /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_TOKEN: Optional[str] = None
+    
+    # Request tracing
+    # Requests carrying this header with TRACE_TOKEN as its value get a Server-Timing breakdown
+    # of their spans (the header is ignored while TRACE_TOKEN is unset)
+    TRACE_HEADER: str = "X-Debug-Trace"
+    TRACE_TOKEN: Optional[str] = None
+    TRACE_ALL_REQUESTS: bool = False
+    # Sampling profiler for slow requests; collapsed stacks are written to PROFILER_OUTPUT_DIR
+    PROFILER_ENABLED: bool = False
+    PROFILER_THRESHOLD_MS: int = 2000
+    PROFILER_INTERVAL_MS: int = 5
+    PROFILER_OUTPUT_DIR: str = "logs/profiles"
+    
+    # Response compression
+    # Responses of at least this many bytes are brotli (if installed) or gzip compressed; 0 disables
+    COMPRESSION_MIN_BYTES: int = 1024
+    # gzip level 1 gets ~75% of level 6's savings on JSON at a fifth of the CPU
+    COMPRESSION_GZIP_LEVEL: int = 1
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    # Media types worth compressing (comma-separated, "type/*" wildcards)
+    COMPRESSION_MEDIA_TYPES: str = "application/json,text/*,application/octet-stream"
+    
+    # ECG inference
+    # "keras" loads the .h5 model with TensorFlow; "numpy" runs the exported
+    # weights (see export_ecg_model.py) without importing TensorFlow at all;
+    # "tflite" runs a quantised flatbuffer through per-thread interpreters
+    ECG_INFERENCE_BACKEND: str = "keras"
+    ECG_KERAS_MODEL_PATH: str = "models/best_ecg_model.h5"
+    ECG_NUMPY_MODEL_PATH: str = "models/best_ecg_model.npz"
+    # NumPy backend weights are memory-mapped from .npy files here so worker processes share them (empty: heap)
+    ECG_NUMPY_MMAP_DIR: str = "models/mmap"
+    # XLA-compile the Keras forward pass; batches are padded to powers of two up to ECG_MAX_BATCH_SIZE
+    ECG_KERAS_JIT_COMPILE: bool = False
+    ECG_MAX_BATCH_SIZE: int = 1024
+    ECG_TFLITE_MODEL_PATH: str = "models/best_ecg_model_int8.tflite"
+    ECG_TFLITE_THREADS: int = 1
+    # "full" scores every beat with the CNN; "cascade" screens beats on RR timing
+    # and template correlation first and only sends ambiguous beats to the CNN
+    ECG_INFERENCE_MODE: str = "full"
+    ECG_CASCADE_MIN_CORRELATION: float = 0.9
+    ECG_CASCADE_RR_TOLERANCE: float = 0.1
+    # Minimum share of beats (the most suspicious ones) always sent to the CNN
+    ECG_CASCADE_PASS_FRACTION: float = 0.05
+    # "cluster" scores one medoid per morphology cluster plus outliers
+    ECG_CLUSTER_MIN_CORRELATION: float = 0.95
+    ECG_CLUSTER_DOWNSAMPLE: int = 4
+    ECG_CLUSTER_MIN_SIZE: int = 3
+    # Records longer than this are decoded and scored in chunks of this many seconds
+    ECG_CHUNK_SECONDS: float = 300.0
+    # A record is classified abnormal once this fraction of its beats is abnormal
+    ECG_ABNORMAL_BEAT_FRACTION: float = 0.25
+    # Leads analysed: comma-separated channel indices or "all". The CNN was trained on MLII (channel 0 of
+    # MIT-BIH); other leads are out of its training distribution, so multi-lead fusion is opt-in
+    ECG_LEADS: str = "0"
+    # How per-lead beat scores are combined: mean | max
+    ECG_LEAD_AGGREGATION: str = "mean"
+    # Band-pass applied at the model rate before segmentation (0 disables an edge)
+    ECG_BANDPASS_LOW_HZ: float = 0.5
+    ECG_BANDPASS_HIGH_HZ: float = 45.0
+    ECG_BANDPASS_ORDER: int = 2
+    # Signal-quality gating: 2 s windows that are flat, clipped or noisy are skipped
+    ECG_SQI_ENABLED: bool = True
+    # Band-passed peak-to-peak below this (mV) is a flat line (disconnected lead)
+    ECG_SQI_MIN_AMPLITUDE_MV: float = 0.05
+    # Fraction of samples at an ADC rail at or above which a window is saturated
+    ECG_SQI_MAX_SATURATION: float = 0.1
+    # Power above 40 Hz over power above 0.5 Hz at or above which a window is noise
+    ECG_SQI_MAX_NOISE_RATIO: float = 0.4
+    # Kurtosis below which a moderately noisy window has no QRS complexes standing out
+    ECG_SQI_MIN_KURTOSIS: float = 4.0
+    # Grad-CAM attributions of abnormal beats in ECG results (Keras and NumPy backends)
+    ECG_EXPLAIN_ENABLED: bool = True
+    # Abnormal segments returned in the explanation, most important first
+    ECG_EXPLAIN_MAX_SEGMENTS: int = 10
+    # Flagged beats closer than this are reported as one segment
+    ECG_EXPLAIN_SEGMENT_GAP_SECONDS: float = 2.0
+    # Memory for decoded ECG records and their beats, shared by prediction and visualization (LRU)
+    ECG_RECORD_CACHE_MB: int = 256
+    # Memory-mapped tabular model artifact (export_tabular_model.py), preferred over the pickles; empty disables
+    TABULAR_ARTIFACT_DIR: str = "models/tabular_artifact"
+    # Tabular prediction results kept per feature vector and model version (LRU, 0 disables)
+    TABULAR_CACHE_SIZE: int = 4096
+    # Seconds a cached tabular result stays valid
+    TABULAR_CACHE_TTL_SECONDS: float = 3600.0
+    # Threads running the micro-batched model inference of streaming sessions
+    INFERENCE_WORKERS: int = 2
+    # Threads scoring uploaded ECG records (/predict/ecg and /predict/combined); uploads beyond it queue
+    UPLOAD_INFERENCE_WORKERS: int = 2
+    # Combined prediction: weights of the tabular and ECG probabilities (the notebook's validation
+    # ROC-AUC of LightGBM and the 1D CNN; equal weights give a plain average)
+    ENSEMBLE_TABULAR_WEIGHT: float = 0.7998
+    ENSEMBLE_ECG_WEIGHT: float = 0.8328
+    
+    # Real-time ECG streaming over WebSocket
+    ECG_STREAM_MAX_SESSIONS: int = 500
+    # Detector context and how often it re-runs per session
+    ECG_STREAM_CONTEXT_SECONDS: float = 8.0
+    ECG_STREAM_HOP_SECONDS: float = 0.25
+    # Longest signal a single frame may carry; larger frames are rejected with an error event
+    ECG_STREAM_MAX_FRAME_SECONDS: float = 2.0
+    # Beats from all sessions are batched up to this size / delay per model call
+    ECG_STREAM_MAX_BATCH: int = 256
+    ECG_STREAM_MAX_DELAY_MS: float = 10.0
+    # An episode opens when this fraction of the last N beats is abnormal and closes at half of it
+    ECG_STREAM_EPISODE_BEATS: int = 8
+    ECG_STREAM_EPISODE_FRACTION: float = 0.5
+    
+    # Longer signals are min/max-decimated to this many points for plotting
+    ECG_PLOT_MAX_POINTS: int = 20000
+    # Longest raw window /ecg/{id}/signal returns (and its default span when end is omitted); 0 lifts the limit
+    ECG_SIGNAL_MAX_SECONDS: float = 60.0
+    
+    # Upload archiving
+    # Uploaded records untouched for this many days have their .dat file replaced by a lossless archive (0 disables)
+    ECG_ARCHIVE_AFTER_DAYS: float = 30.0
+    # Seconds between compaction passes over the upload directory
+    ECG_ARCHIVE_INTERVAL_SECONDS: float = 3600.0
+    # Samples per independently decodable archive block (the random-access granularity)
+    ECG_ARCHIVE_BLOCK_SAMPLES: int = 4096
+    
+    # Model rollout
+    # Seconds between checks of the model files for changes (0 disables hot reload by polling)
+    MODEL_RELOAD_POLL_SECONDS: float = 10.0
+    # Samples run through a newly loaded model before it serves requests
+    MODEL_WARMUP_BATCH: int = 32
+    # How long an admin reload waits for requests on the previous version to finish
+    MODEL_DRAIN_TIMEOUT_SECONDS: float = 30.0
+    # Users allowed to call the /admin endpoints
+    ADMIN_USERNAMES: List[str] = []
+    
     # Database
     POSTGRES_SERVER: str = "localhost"
     POSTGRES_USER: str = "postgres"
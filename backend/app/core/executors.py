@@ -0,0 +1,96 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.core.config import settings
+from app.core.metrics import EXECUTOR_QUEUE_DEPTH
+
+
+class QueueDepthExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor that counts the tasks submitted but not yet started.
+
+    The count is kept around ``submit`` rather than read from the
+    executor's private work queue, whose name and type are not part of the
+    public API. A task cancelled before it started is uncounted by its done
+    callback.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._queued = 0
+        self._queued_lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def _adjust(self, delta: int) -> None:
+        with self._queued_lock:
+            self._queued += delta
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        def run():
+            self._adjust(-1)
+            return fn(*args, **kwargs)
+
+        self._adjust(1)
+        try:
+            future = super().submit(run)
+        except BaseException:
+            self._adjust(-1)
+            raise
+        # A cancelled future never ran, so it never left the queue through ``run``
+        future.add_done_callback(lambda done: self._adjust(-1) if done.cancelled() else None)
+        return future
+
+
+def create_bounded_executor(max_workers: int, thread_name_prefix: str) -> QueueDepthExecutor:
+    """
+    Create a dedicated thread pool with a fixed number of workers.
+
+    Work submitted beyond ``max_workers`` queues inside the executor instead of
+    spilling into the event loop's default threadpool.
+
+    Args:
+        max_workers (int): Maximum number of concurrently running tasks
+        thread_name_prefix (str): Prefix used for worker thread names
+
+    Returns:
+        QueueDepthExecutor: The executor
+    """
+    executor = QueueDepthExecutor(max_workers=max(1, max_workers), thread_name_prefix=thread_name_prefix)
+    EXECUTOR_QUEUE_DEPTH.set_function(lambda: executor.queue_depth, executor=thread_name_prefix)
+    return executor
+
+
+async def run_in_executor(executor: ThreadPoolExecutor, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking callable on the given executor and await its result.
+
+    The caller's context variables (e.g. the active request trace) are carried
+    over to the worker thread.
+
+    Args:
+        executor (ThreadPoolExecutor): Executor to run the callable on
+        func (Callable): Blocking callable
+
+    Returns:
+        Any: The callable's return value
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+# bcrypt is CPU bound and intentionally slow, so it gets its own small pool
+password_hash_executor = create_bounded_executor(settings.PASSWORD_HASH_WORKERS, "password-hash")
+
+# Micro-batched model inference for streaming sessions, kept off the event loop and the default threadpool
+inference_executor = create_bounded_executor(settings.INFERENCE_WORKERS, "inference")
+
+# Whole-record ECG scoring of uploads; separate so a burst of uploads cannot delay live stream beats
+upload_inference_executor = create_bounded_executor(settings.UPLOAD_INFERENCE_WORKERS, "upload-inference")
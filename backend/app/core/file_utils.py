@@ -1,5 +1,8 @@
 import os
 from pathlib import Path
+from app.core import get_logger
+
+logger = get_logger(__name__)
 
 def get_absolute_file_path(file_path: str) -> str:
     """
@@ -48,4 +51,58 @@ def get_visualization_directory() -> str:
     """
     viz_dir = os.path.join("uploads", "visualizations")
     ensure_directory_exists(viz_dir)
-    return viz_dir
\ No newline at end of file
+    return viz_dir
+
+def fix_record_header(base_path: str) -> None:
+    """
+    Rewrite a WFDB header so its record name matches the file's base name.
+
+    Uploaded files are saved under a UUID-prefixed name, but the header still
+    references the original record name, which makes wfdb look for the wrong
+    .dat file.
+    
+    Args:
+        base_path (str): Absolute record path without extension
+    """
+    hea_file = base_path + ".hea"
+    try:
+        expected_name = os.path.basename(base_path)
+        
+        # Read the entire header file
+        with open(hea_file, "r", encoding="utf-8") as f:
+            header_lines = f.readlines()
+        
+        if not header_lines:
+            raise ValueError("Header file is empty")
+        
+        logger.debug("Original header first line", header_line=header_lines[0].strip())
+        
+        # Parse the first line
+        first_line_parts = header_lines[0].strip().split()
+        old_record_name = first_line_parts[0]
+        
+        # If the record name doesn't match, update the entire header
+        if old_record_name != expected_name:
+            logger.info("Fixing header record name", old_record_name=old_record_name, expected_name=expected_name)
+            
+            # Update first line
+            first_line_parts[0] = expected_name
+            header_lines[0] = " ".join(first_line_parts) + "\n"
+            
+            # Update any other lines that reference the old filename
+            for i in range(1, len(header_lines)):
+                if old_record_name in header_lines[i]:
+                    header_lines[i] = header_lines[i].replace(old_record_name, expected_name)
+                    logger.debug("Updated header line", line_number=i + 1, header_line=header_lines[i].strip())
+            
+            # Write the corrected header back
+            with open(hea_file, "w", encoding="utf-8") as f:
+                f.writelines(header_lines)
+            
+            logger.info("Header file updated successfully")
+        else:
+            logger.debug("Header already correct", record_name=expected_name)
+            
+    except Exception as e:
+        logger.error("Error fixing header file", error=str(e), exc_info=True)
+        raise
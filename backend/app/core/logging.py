@@ -1,9 +1,22 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
+import threading
 from typing import Optional
 from pathlib import Path
 import json
 from datetime import datetime
+from app.core.config import settings
+
+
+def _record_context(record: logging.LogRecord) -> dict:
+    """Return the structured context attached to a record by StructuredLogger"""
+    return getattr(record, "context", None) or {}
+
 
 class CustomFormatter(logging.Formatter):
     """Custom formatter with color coding for different log levels"""
@@ -21,75 +34,181 @@ class CustomFormatter(logging.Formatter):
         logging.ERROR: red + "%(asctime)s - %(name)s - %(levelname)s - %(message)s" + reset,
         logging.CRITICAL: bold_red + "%(asctime)s - %(name)s - %(levelname)s - %(message)s" + reset
     }
+    
+    def __init__(self):
+        super().__init__()
+        self._formatters = {level: logging.Formatter(fmt) for level, fmt in self.FORMATS.items()}
+
+    def format(self, record):
+        formatter = self._formatters.get(record.levelno, self._formatters[logging.INFO])
+        message = formatter.format(record)
+        context = _record_context(record)
+        if context:
+            message = f"{message} | Context: {json.dumps(context, default=str)}"
+        return message
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats each record as a single JSON object per line.
+
+    The structured context is nested under ``context``, so a kwarg named
+    like one of the line's own fields (``message``, ``level``,
+    ``timestamp``...) can never overwrite it.
+    """
 
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
-        return formatter.format(record)
+        payload = {
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        context = _record_context(record)
+        if context:
+            payload["context"] = context
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock QueueHandler formats every record on the calling thread before
+    enqueueing it; here only the traceback is rendered eagerly (tracebacks pin
+    stack frames), everything else is serialised by the listener.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_traceback_formatter = logging.Formatter()
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_queue_handler = DeferredQueueHandler(_log_queue)
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def _start_listener() -> None:
+    """Create the console/file handlers once and start the background listener"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        console_handler = logging.StreamHandler(sys.stdout)
+        if settings.LOG_CONSOLE_FORMAT.lower() == "json":
+            console_handler.setFormatter(JSONFormatter())
+        else:
+            console_handler.setFormatter(CustomFormatter())
+        
+        # Also add a file handler for persistent logging
+        log_file = Path(settings.LOG_FILE)
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setFormatter(JSONFormatter())
+        
+        _listener = logging.handlers.QueueListener(
+            _log_queue, console_handler, file_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def _restart_listener_in_child() -> None:
+    """
+    Give a forked child its own queue and listener.
+
+    The listener thread does not survive fork(), so without this every record
+    logged in the child would pile up in the queue and never be written.
+    Records the parent had not written yet stay the parent's to write.
+    """
+    global _log_queue, _listener, _listener_lock
+    _listener_lock = threading.Lock()
+    _log_queue = queue.SimpleQueue()
+    _queue_handler.queue = _log_queue
+    if _listener is None:
+        return
+    _listener = logging.handlers.QueueListener(_log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+if hasattr(os, "register_at_fork"):  # Not on Windows, which has no fork()
+    os.register_at_fork(after_in_child=_restart_listener_in_child)
+
+
+def _debug_sample_rate(name: str) -> float:
+    """Resolve the DEBUG sampling rate for a logger from the longest matching prefix"""
+    rate = 1.0
+    matched = -1
+    for prefix, prefix_rate in settings.LOG_DEBUG_SAMPLE_RATES.items():
+        if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > matched:
+            rate, matched = prefix_rate, len(prefix)
+    return rate
 
 
 class StructuredLogger:
     """Structured logger for consistent logging across the application"""
     
-    def __init__(self, name: str, level: int = logging.INFO):
+    def __init__(self, name: str, level: Optional[int] = None):
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(level)
+        self.logger.setLevel(level if level is not None else logging.getLevelName(settings.LOG_LEVEL.upper()))
+        self._debug_sample_rate = _debug_sample_rate(name)
         
         # Prevent adding multiple handlers if logger already exists
         if not self.logger.handlers:
             self._setup_handlers()
     
     def _setup_handlers(self):
-        """Setup console handler with custom formatting"""
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(CustomFormatter())
-        self.logger.addHandler(console_handler)
-        
-        # Also add a file handler for persistent logging
-        log_dir = Path("logs")
-        log_dir.mkdir(exist_ok=True)
-        file_handler = logging.FileHandler(log_dir / "application.log")
-        file_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        file_handler.setFormatter(file_formatter)
-        self.logger.addHandler(file_handler)
+        """Route records through the shared queue so I/O happens off the request thread"""
+        _start_listener()
+        self.logger.addHandler(_queue_handler)
+        self.logger.propagate = False
+    
+    def _log(self, level: int, message: str, kwargs: dict, exc_info=None):
+        # Check the level before doing any work; context is serialised lazily by the listener
+        if not self.logger.isEnabledFor(level):
+            return
+        if level == logging.DEBUG and self._debug_sample_rate < 1.0 and random.random() >= self._debug_sample_rate:
+            return
+        exc_info = kwargs.pop("exc_info", exc_info)
+        self.logger.log(level, message, exc_info=exc_info, extra={"context": kwargs}, stacklevel=3)
+    
+    def is_enabled_for(self, level: int) -> bool:
+        """Whether a record at this level would be emitted; use to guard costly context"""
+        return self.logger.isEnabledFor(level)
     
     def debug(self, message: str, **kwargs):
         """Log debug message with optional structured data"""
-        if kwargs:
-            message = f"{message} | Context: {json.dumps(kwargs, default=str)}"
-        self.logger.debug(message)
+        self._log(logging.DEBUG, message, kwargs)
     
     def info(self, message: str, **kwargs):
         """Log info message with optional structured data"""
-        if kwargs:
-            message = f"{message} | Context: {json.dumps(kwargs, default=str)}"
-        self.logger.info(message)
+        self._log(logging.INFO, message, kwargs)
     
     def warning(self, message: str, **kwargs):
         """Log warning message with optional structured data"""
-        if kwargs:
-            message = f"{message} | Context: {json.dumps(kwargs, default=str)}"
-        self.logger.warning(message)
+        self._log(logging.WARNING, message, kwargs)
     
     def error(self, message: str, **kwargs):
         """Log error message with optional structured data"""
-        if kwargs:
-            message = f"{message} | Context: {json.dumps(kwargs, default=str)}"
-        self.logger.error(message)
+        self._log(logging.ERROR, message, kwargs)
     
     def critical(self, message: str, **kwargs):
         """Log critical message with optional structured data"""
-        if kwargs:
-            message = f"{message} | Context: {json.dumps(kwargs, default=str)}"
-        self.logger.critical(message)
+        self._log(logging.CRITICAL, message, kwargs)
     
     def exception(self, message: str, **kwargs):
         """Log exception with traceback"""
-        if kwargs:
-            message = f"{message} | Context: {json.dumps(kwargs, default=str)}"
-        self.logger.exception(message)
+        self._log(logging.ERROR, message, kwargs, exc_info=True)
 
 
 def get_logger(name: str) -> StructuredLogger:
@@ -129,24 +248,31 @@ def performance_monitor(logger: StructuredLogger):
     def decorator(func):
         import functools
         import time
+        from app.core.metrics import FUNCTION_DURATION
+        
+        func_name = f"{func.__module__}.{func.__name__}"
+        start_message = f"Starting execution of {func_name}"
+        completed_message = f"Completed execution of {func_name}"
+        failed_message = f"Failed execution of {func_name}"
         
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            start_time = time.time()
-            func_name = f"{func.__module__}.{func.__name__}"
-            logger.debug(f"Starting execution of {func_name}")
+            start_ns = time.perf_counter_ns()
+            logger.debug(start_message)
             
             try:
                 result = func(*args, **kwargs)
-                execution_time = time.time() - start_time
-                logger.debug(f"Completed execution of {func_name}", execution_time_seconds=execution_time)
+                execution_time = (time.perf_counter_ns() - start_ns) / 1e9
+                FUNCTION_DURATION.observe(execution_time, function=func_name)
+                logger.debug(completed_message, execution_time_seconds=execution_time)
                 return result
             except Exception as e:
-                execution_time = time.time() - start_time
-                logger.error(f"Failed execution of {func_name}",
+                execution_time = (time.perf_counter_ns() - start_ns) / 1e9
+                FUNCTION_DURATION.observe(execution_time, function=func_name)
+                logger.error(failed_message,
                            execution_time_seconds=execution_time,
                            error_type=type(e).__name__,
                            error_message=str(e))
                 raise
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
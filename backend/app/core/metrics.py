@@ -0,0 +1,290 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.tracing import span
+
+# Latency buckets in seconds, from sub-millisecond model calls up to slow renders
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+# Powers of two for batch sizes
+BATCH_SIZE_BUCKETS = tuple(float(2 ** i) for i in range(13))
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names: Sequence[str], label_values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(label_names, label_values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for labelled metrics stored in a MetricsRegistry"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, optionally read from a callback at scrape time"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels: str) -> None:
+        """Report the return value of ``function`` whenever the metric is scraped"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, function in functions:
+            try:
+                values[key] = float(function())
+            except Exception:
+                continue
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed bucket upper bounds"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket counts (last slot is +Inf), sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def quantile(self, q: float, **labels: str) -> Optional[float]:
+        """Estimate a quantile by linear interpolation within buckets (as histogram_quantile does)"""
+        key = self._key(labels)
+        with self._lock:
+            counts = list(self._counts.get(key, ()))
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count > 0:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        lines = []
+        for key, counts, total_sum in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_cls, name: str, *args, **kwargs):
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if not isinstance(existing, metric_cls):
+                    raise ValueError(f"Metric {name} already registered as {existing.metric_type}")
+                return existing
+            metric = metric_cls(name, *args, **kwargs)
+            self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, label_names)
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, label_names)
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, label_names, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+FUNCTION_DURATION = registry.histogram(
+    "function_duration_seconds", "Execution time of instrumented functions", ("function",)
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+STAGE_DURATION = registry.histogram(
+    "pipeline_stage_duration_seconds", "Latency of individual prediction pipeline stages", ("pipeline", "stage")
+)
+MODEL_BATCH_SIZE = registry.histogram(
+    "model_batch_size", "Number of samples per model inference call", ("model",), buckets=BATCH_SIZE_BUCKETS
+)
+MODEL_TRACES = registry.counter(
+    "model_function_traces_total", "Graph traces of compiled model functions (should stay flat after warm-up)", ("model",)
+)
+ECG_BEATS = registry.counter(
+    "ecg_beats_total", "ECG beats by how they were scored (model, screened or clustered)", ("path",)
+)
+STREAM_SESSIONS = registry.gauge(
+    "ecg_stream_sessions", "Live ECG WebSocket stream sessions", ()
+)
+STREAM_BEAT_LATENCY = registry.histogram(
+    "ecg_stream_beat_latency_seconds", "Time from a beat window's last sample arriving to its label being ready", ()
+)
+EXECUTOR_QUEUE_DEPTH = registry.gauge(
+    "executor_queue_depth", "Tasks waiting for a worker in dedicated executors", ("executor",)
+)
+ECG_EXCLUDED_SECONDS = registry.counter(
+    "ecg_excluded_seconds_total", "ECG signal time skipped by the signal-quality check", ()
+)
+DECODED_BYTES = registry.counter(
+    "ecg_decoded_bytes_total", "Bytes of raw ECG data decoded", ()
+)
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total", "Cache lookups by cache and result", ("cache", "result")
+)
+CACHE_EVICTIONS = registry.counter(
+    "cache_evictions_total", "Entries evicted to stay within a cache's budget", ("cache",)
+)
+CACHE_BYTES = registry.gauge(
+    "cache_bytes", "Bytes held by a cache", ("cache",)
+)
+MODEL_RELOADS = registry.counter(
+    "model_reloads_total", "Model hot reloads by model and result (swapped or failed)", ("model", "result")
+)
+MODEL_IN_FLIGHT = registry.gauge(
+    "model_in_flight_requests", "Requests using any loaded version of a model, including ones being drained", ("model",)
+)
+ECG_ARCHIVED_RECORDS = registry.counter(
+    "ecg_archived_records_total", "Uploaded records compacted to a lossless archive, by result", ("result",)
+)
+ECG_ARCHIVE_SAVED_BYTES = registry.counter(
+    "ecg_archive_saved_bytes_total", "Disk space freed by archiving uploaded records", ()
+)
+
+
+@contextmanager
+def stage_timer(pipeline: str, stage: str) -> Iterator[None]:
+    """Record the wall time of a pipeline stage with nanosecond resolution (and as a trace span)"""
+    start_ns = time.perf_counter_ns()
+    try:
+        with span(stage):
+            yield
+    finally:
+        STAGE_DURATION.observe((time.perf_counter_ns() - start_ns) / 1e9, pipeline=pipeline, stage=stage)
@@ -0,0 +1,261 @@
+import secrets
+import time
+import zlib
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core import get_logger
+from app.core.config import settings
+from app.core.metrics import HTTP_REQUEST_DURATION
+from app.core.tracing import dump_collapsed_stacks, stack_sampler, start_trace
+
+logger = get_logger(__name__)
+
+# Bodies at least this large are compressed in a worker thread (zlib and brotli release the GIL)
+_THREAD_COMPRESSION_BYTES = 256 * 1024
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording per-route HTTP latency into the metrics registry"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_ns = time.perf_counter_ns()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Label by route template rather than raw path to keep cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(
+                (time.perf_counter_ns() - start_ns) / 1e9,
+                method=scope["method"],
+                route=route_path,
+                status=str(status_code)
+            )
+
+
+class RequestTracingMiddleware:
+    """
+    ASGI middleware that traces opted-in requests.
+
+    Requests carrying ``settings.TRACE_HEADER`` set to ``TRACE_TOKEN`` (or
+    all requests when ``TRACE_ALL_REQUESTS`` is set) get a ``Server-Timing`` response header
+    built from their span tree. When the profiler is enabled every request is
+    sampled and the collapsed stacks of those slower than
+    ``PROFILER_THRESHOLD_MS`` are written to disk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.trace_header = settings.TRACE_HEADER.lower().encode("latin-1")
+        self.trace_token = (settings.TRACE_TOKEN or "").encode("latin-1")
+
+    def _trace_requested(self, scope) -> bool:
+        """Whether the request carries the trace header with the configured token"""
+        if not self.trace_token:
+            return False
+        return any(
+            name == self.trace_header and secrets.compare_digest(value, self.trace_token)
+            for name, value in scope.get("headers", ())
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        emit_header = settings.TRACE_ALL_REQUESTS or self._trace_requested(scope)
+        if not emit_header and not settings.PROFILER_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        trace = start_trace(f"{scope['method']} {scope['path']}")
+        if settings.PROFILER_ENABLED:
+            stack_sampler.register(trace)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and emit_header:
+                trace.finish()
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            trace.finish()
+            if settings.PROFILER_ENABLED:
+                stack_sampler.unregister(trace)
+                if trace.root.duration_ms >= settings.PROFILER_THRESHOLD_MS:
+                    route = getattr(scope.get("route"), "path", None) or scope["path"]
+                    profile_path = dump_collapsed_stacks(trace, route)
+                    logger.warning("Slow request profiled",
+                                   route=route,
+                                   duration_ms=round(trace.root.duration_ms, 1),
+                                   profile_path=profile_path,
+                                   spans=trace.root.to_dict())
+
+
+def _load_brotli():
+    """The optional ``brotli`` package, or None when it is not installed"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _accepted_encodings(headers) -> set:
+    """Content codings in Accept-Encoding with a non-zero q-value ("gzip;q=0.0" is a refusal too)"""
+    for name, value in headers:
+        if name == b"accept-encoding":
+            accepted = set()
+            for part in value.decode("latin-1").split(","):
+                coding, *parameters = [item.strip() for item in part.split(";")]
+                quality = 1.0
+                for parameter in parameters:
+                    key, _, number = parameter.partition("=")
+                    if key.strip().lower() == "q":
+                        try:
+                            quality = float(number)
+                        except ValueError:
+                            # A malformed q-value is not an acceptance
+                            quality = 0.0
+                if coding and quality > 0:
+                    accepted.add(coding.lower())
+            return accepted
+    return set()
+
+
+class _Compressor:
+    """Incremental gzip or brotli encoder"""
+
+    def __init__(self, encoding: str, brotli=None):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            # wbits 31: gzip container
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish() if self.encoding == "br" else self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip.
+
+    Brotli is used when the client accepts it and the ``brotli`` package is
+    installed, gzip otherwise. Bodies smaller than
+    ``COMPRESSION_MIN_BYTES``, already-encoded responses and media types not
+    listed in ``COMPRESSION_MEDIA_TYPES`` (e.g. PNG) pass through untouched.
+    Single-message bodies are compressed in one go with an exact
+    Content-Length; streamed bodies are compressed chunk by chunk. Large
+    bodies are compressed in a worker thread so the event loop keeps serving.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.brotli = _load_brotli()
+        self.media_types = tuple(media_type.strip().lower()
+                                 for media_type in settings.COMPRESSION_MEDIA_TYPES.split(",") if media_type.strip())
+
+    def _encoding(self, scope) -> str:
+        accepted = _accepted_encodings(scope.get("headers", ()))
+        if "br" in accepted and self.brotli is not None:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _compressible(self, headers) -> bool:
+        content_type = b""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        media_type = content_type.split(b";")[0].strip().decode("latin-1").lower()
+        return any(media_type == allowed or (allowed.endswith("/*") and media_type.startswith(allowed[:-1]))
+                   for allowed in self.media_types)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or settings.COMPRESSION_MIN_BYTES <= 0:
+            await self.app(scope, receive, send)
+            return
+        encoding = self._encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                passthrough = not self._compressible(message.get("headers", ()))
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < settings.COMPRESSION_MIN_BYTES:
+                    # Not worth the CPU and the extra headers
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.brotli)
+                headers = [(name, value) for name, value in start_message.get("headers", ())
+                           if name != b"content-length"]
+                headers += [(b"content-encoding", encoding.encode("latin-1")), (b"vary", b"Accept-Encoding")]
+                if not more_body:
+                    if len(body) >= _THREAD_COMPRESSION_BYTES:
+                        compressed = await run_in_threadpool(lambda: compressor.compress(body) + compressor.finish())
+                    else:
+                        compressed = compressor.compress(body) + compressor.finish()
+                    headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                    await send({**start_message, "headers": headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send({**start_message, "headers": headers})
+            if len(body) >= _THREAD_COMPRESSION_BYTES:
+                chunk = await run_in_threadpool(compressor.compress, body)
+            else:
+                chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
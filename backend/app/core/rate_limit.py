@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable
+
+from app.core.config import settings
+
+
+class SlidingWindowRateLimiter:
+    """
+    In-process sliding window rate limiter keyed by arbitrary strings.
+
+    Keys whose attempts have all left the window are swept once per window,
+    and at most ``max_keys`` keys are tracked (the oldest are dropped first),
+    so a flood of distinct keys cannot grow memory without bound.
+    """
+
+    def __init__(self, max_attempts: int, window_seconds: float, max_keys: int = 100000):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._attempts: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def _prune(self, key: str, now: float) -> Deque[float]:
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            return deque()
+        cutoff = now - self.window_seconds
+        while attempts and attempts[0] <= cutoff:
+            attempts.popleft()
+        if not attempts:
+            del self._attempts[key]
+        return attempts
+
+    def acquire(self, keys: Iterable[str]) -> float:
+        """
+        Check every key and, if all are under their limit, record an attempt against them.
+
+        Checking and recording happen under one lock, so concurrent callers
+        cannot all pass the check before any of them is counted. An attempt
+        that turns out not to count (e.g. a successful login) is given back
+        with ``refund``.
+
+        Args:
+            keys (Iterable[str]): Keys that must all be under their limit
+
+        Returns:
+            float: 0.0 if the attempt was allowed and recorded, otherwise seconds until one is allowed
+        """
+        keys = list(keys)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep >= self.window_seconds:
+                self._sweep(now)
+            wait = 0.0
+            for key in keys:
+                attempts = self._prune(key, now)
+                if len(attempts) >= self.max_attempts:
+                    wait = max(wait, attempts[0] + self.window_seconds - now)
+            if wait > 0:
+                return wait
+            for key in keys:
+                self._attempts.setdefault(key, deque()).append(now)
+            # Insertion order: the first keys are the ones tracked longest
+            while len(self._attempts) > self.max_keys:
+                del self._attempts[next(iter(self._attempts))]
+        return 0.0
+
+    def refund(self, keys: Iterable[str]) -> None:
+        """Give back one attempt recorded by ``acquire`` against every key"""
+        with self._lock:
+            for key in keys:
+                attempts = self._attempts.get(key)
+                if attempts:
+                    attempts.pop()
+                    if not attempts:
+                        del self._attempts[key]
+
+    def _sweep(self, now: float) -> None:
+        """Drop every key with no attempt left in the window"""
+        for key in list(self._attempts):
+            self._prune(key, now)
+        self._last_sweep = now
+
+    def reset(self, keys: Iterable[str]) -> None:
+        """Forget all recorded attempts for the given keys"""
+        with self._lock:
+            for key in keys:
+                self._attempts.pop(key, None)
+
+
+login_rate_limiter = SlidingWindowRateLimiter(
+    max_attempts=settings.LOGIN_RATE_LIMIT_ATTEMPTS,
+    window_seconds=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+    max_keys=settings.LOGIN_RATE_LIMIT_MAX_KEYS
+)
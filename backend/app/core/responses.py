@@ -0,0 +1,102 @@
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+# Dict keys may be ints (e.g. per-worker maps); NumPy arrays and scalars are written natively
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+# Media type of raw little-endian float32 signals
+FLOAT32_MEDIA_TYPE = "application/octet-stream"
+
+
+def _default(obj: Any) -> Any:
+    """Types orjson does not serialise itself"""
+    if isinstance(obj, np.ndarray):
+        # Non-contiguous or float16 arrays are not handled natively
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialise to JSON bytes with orjson"""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered by orjson.
+
+    Several times faster than the standard library encoder, and NumPy arrays
+    go straight to JSON without a ``tolist()`` copy. Endpoints returning plain
+    dicts should return this response directly: FastAPI then skips
+    ``jsonable_encoder``, which walks every value of the payload in Python.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def columns(obj: Any) -> Dict[str, Any]:
+    """Column values of a SQLAlchemy model instance, for returning it without ``jsonable_encoder``"""
+    return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+
+def wants_binary(format: Optional[str], accept: Optional[str]) -> bool:
+    """Whether a signal endpoint should answer with raw float32 rather than JSON"""
+    if format:
+        return format.lower() == "binary"
+    return FLOAT32_MEDIA_TYPE in (accept or "")
+
+
+def signal_response(signal: np.ndarray, fs: float, leads: List[str], start_time: float = 0.0,
+                    binary: bool = False, bucket: int = 1, extra: Dict[str, Any] = None) -> Response:
+    """
+    A (samples, leads) signal as JSON or as raw float32.
+
+    The binary form is the row-major little-endian float32 samples
+    (interleaved leads) with the shape and timing in ``X-Signal-*`` headers;
+    a client reads it with ``np.frombuffer(body, "<f4").reshape(-1, leads)``
+    or a ``Float32Array``. It is 4 bytes per value against 8-12 as JSON text
+    and needs no parsing.
+
+    Args:
+        signal (np.ndarray): Samples of shape (n_samples, n_leads)
+        fs (float): Sampling rate in Hz
+        leads (List[str]): Lead names
+        start_time (float): Time of the first sample in seconds
+        binary (bool): Return ``application/octet-stream`` float32
+        bucket (int): 1 for every sample; otherwise interleaved (min, max) pairs of
+            ``bucket`` samples each (a display envelope)
+        extra (Dict[str, Any]): Further JSON fields (ignored for binary)
+
+    Returns:
+        Response: ``ORJSONResponse`` or raw float32 response
+    """
+    signal = np.ascontiguousarray(signal, dtype="<f4")
+    if binary:
+        headers = {
+            "X-Signal-Sampling-Rate": f"{fs:g}",
+            "X-Signal-Leads": ",".join(leads),
+            "X-Signal-Samples": str(signal.shape[0]),
+            "X-Signal-Start-Time": f"{start_time:g}",
+            "X-Signal-Bucket": str(bucket),
+            "X-Signal-Dtype": "float32-le"
+        }
+        return Response(content=signal.tobytes(), media_type=FLOAT32_MEDIA_TYPE, headers=headers)
+    content = {"fs": fs, "leads": leads, "start_time": start_time, "samples": int(signal.shape[0]),
+               "bucket": bucket, "signal": signal}
+    if extra:
+        content.update(extra)
+    return ORJSONResponse(content)
+
@@ -1,35 +1,53 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 import jwt
 from jwt.exceptions import InvalidTokenError
 from app.core.config import settings
 from app.core import get_logger
+from app.core.executors import password_hash_executor, run_in_executor
 
 logger = get_logger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
-def get_password_hash(password: str) -> str:
-    logger.debug("Hashing password", password_length=len(password))
+def _truncate_password(password: str) -> str:
     # Truncate password to 72 bytes to avoid bcrypt limitation
     # Using encode/decode to handle multi-byte characters properly
     if len(password.encode('utf-8')) > 72:
         # Truncate at character boundary to avoid cutting multi-byte characters
         truncated = password.encode('utf-8')[:72].decode('utf-8', errors='ignore')
         logger.debug("Password truncated due to bcrypt limitation", original_length=len(password), truncated_length=len(truncated))
-        hashed = pwd_context.hash(truncated)
-    else:
-        hashed = pwd_context.hash(password)
+        return truncated
+    return password
+
+def get_password_hash(password: str) -> str:
+    logger.debug("Hashing password", password_length=len(password))
+    hashed = pwd_context.hash(_truncate_password(password))
     logger.debug("Password hashed successfully")
     return hashed
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     logger.debug("Verifying password", plain_password_length=len(plain_password))
-    result = pwd_context.verify(plain_password, hashed_password)
+    result = pwd_context.verify(_truncate_password(plain_password), hashed_password)
     logger.debug("Password verification completed", result=result)
     return result
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a replacement hash if the stored one uses outdated settings"""
+    logger.debug("Verifying password with rehash check", plain_password_length=len(plain_password))
+    valid, new_hash = pwd_context.verify_and_update(_truncate_password(plain_password), hashed_password)
+    logger.debug("Password verification completed", result=valid, needs_rehash=new_hash is not None)
+    return valid, new_hash
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the bounded password executor"""
+    return await run_in_executor(password_hash_executor, get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password (and compute a rehash if needed) on the bounded password executor"""
+    return await run_in_executor(password_hash_executor, verify_and_update_password, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     logger.debug("Creating access token", data_keys=list(data.keys()))
     to_encode = data.copy()
@@ -0,0 +1,210 @@
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from app.core.config import settings
+
+
+class Span:
+    """A timed section of a request; spans nest to form a tree"""
+
+    __slots__ = ("name", "start_ns", "end_ns", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.children: List["Span"] = []
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "duration_ms": round(self.duration_ms, 3),
+            "children": [child.to_dict() for child in self.children]
+        }
+
+
+class Trace:
+    """
+    Span tree for a single request plus the threads currently working on it.
+
+    A thread counts as working on the request only while one of the
+    request's spans is open on it, so the profiler does not charge the
+    request with whatever a shared thread (the event loop, a pool worker)
+    runs for other requests before or after.
+    """
+
+    def __init__(self, name: str):
+        self.root = Span(name)
+        self.samples: Optional[StackCounter] = None
+        # Open spans per thread id
+        self._active: Dict[int, int] = {}
+        self._active_lock = threading.Lock()
+
+    @property
+    def thread_ids(self) -> List[int]:
+        """Threads with at least one of this trace's spans open"""
+        with self._active_lock:
+            return list(self._active)
+
+    def enter_thread(self) -> int:
+        thread_id = threading.get_ident()
+        with self._active_lock:
+            self._active[thread_id] = self._active.get(thread_id, 0) + 1
+        return thread_id
+
+    def exit_thread(self, thread_id: int) -> None:
+        with self._active_lock:
+            remaining = self._active.get(thread_id, 0) - 1
+            if remaining > 0:
+                self._active[thread_id] = remaining
+            else:
+                self._active.pop(thread_id, None)
+
+    def finish(self) -> None:
+        self.root.end_ns = time.perf_counter_ns()
+
+    def server_timing(self) -> str:
+        """Flatten the span tree into a Server-Timing header value (nested names joined with '.')"""
+        entries = []
+
+        def walk(span: Span, prefix: str) -> None:
+            for child in span.children:
+                name = f"{prefix}{_metric_token(child.name)}"
+                entries.append(f"{name};dur={child.duration_ms:.3f}")
+                walk(child, f"{name}.")
+
+        entries.append(f"total;dur={self.root.duration_ms:.3f}")
+        walk(self.root, "")
+        return ", ".join(entries)
+
+
+def _metric_token(name: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in name)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def start_trace(name: str) -> Trace:
+    """Begin a trace for the current request context"""
+    trace = Trace(name)
+    _current_trace.set(trace)
+    _current_span.set(trace.root)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block as a child of the current span; a no-op outside traced requests"""
+    parent = _current_span.get()
+    if parent is None:
+        yield
+        return
+    trace = _current_trace.get()
+    thread_id = trace.enter_thread() if trace is not None else None
+    child = Span(name)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield
+    finally:
+        child.end_ns = time.perf_counter_ns()
+        _current_span.reset(token)
+        if thread_id is not None:
+            trace.exit_thread(thread_id)
+
+
+class StackSampler:
+    """
+    Statistical profiler sampling the stacks of threads serving traced requests.
+
+    A single daemon thread wakes every ``interval`` seconds and records the
+    collapsed stack of each thread that has a span of a registered trace
+    open, so the cost is independent of how much Python code the request
+    itself runs. Time outside any span is not sampled.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._traces: Dict[int, Trace] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, trace: Trace) -> None:
+        trace.samples = StackCounter()
+        with self._lock:
+            self._traces[id(trace)] = trace
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def unregister(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces.pop(id(trace), None)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                traces = list(self._traces.values())
+            if not traces:
+                continue
+            frames = sys._current_frames()
+            for trace in traces:
+                for thread_id in trace.thread_ids:
+                    frame = frames.get(thread_id)
+                    if frame is None or thread_id == own_id:
+                        continue
+                    trace.samples[_collapse_stack(frame)] += 1
+
+
+def _collapse_stack(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+def dump_collapsed_stacks(trace: Trace, label: str) -> Optional[str]:
+    """
+    Write a trace's samples in the collapsed-stack format used by flamegraph tools.
+
+    Args:
+        trace (Trace): Trace with collected samples
+        label (str): Short label (e.g. the route) included in the file name
+
+    Returns:
+        Optional[str]: Path of the written file, or None if there were no samples
+    """
+    if not trace.samples:
+        return None
+    output_dir = Path(settings.PROFILER_OUTPUT_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = time.strftime("%Y%m%dT%H%M%S")
+    output_path = output_dir / f"{timestamp}_{_metric_token(label)}_{int(trace.root.duration_ms)}ms.folded"
+    with open(output_path, "w", encoding="utf-8") as f:
+        for stack, count in trace.samples.most_common():
+            f.write(f"{stack} {count}\n")
+    return str(output_path)
+
+
+stack_sampler = StackSampler(interval=settings.PROFILER_INTERVAL_MS / 1000.0)
@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import LargeBinary, create_engine, inspect, text
 from app.db.base import Base
 from app.core.config import settings
 from app.core import get_logger
 from app.models.user import User
+from app.models.prediction import Prediction
+from app.models.ecg_data import EcgData
 
 logger = get_logger(__name__)
 
@@ -27,6 +29,24 @@ def init_db():
                 conn.commit()
             logger.info("Added is_active column to users table")
         
+        # Predictions made before model versioning have no model_version
+        existing_columns = [col['name'] for col in inspector.get_columns('predictions')]
+        if 'model_version' not in existing_columns:
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE predictions ADD COLUMN model_version VARCHAR(64)"))
+                conn.commit()
+            logger.info("Added model_version column to predictions table")
+        
+        # ECG uploads analysed before processed signals were stored have none
+        existing_columns = [col['name'] for col in inspector.get_columns('ecg_data')]
+        if 'processed_data' not in existing_columns:
+            # BLOB on SQLite, BYTEA on PostgreSQL
+            column_type = LargeBinary().compile(dialect=engine.dialect)
+            with engine.connect() as conn:
+                conn.execute(text(f"ALTER TABLE ecg_data ADD COLUMN processed_data {column_type}"))
+                conn.commit()
+            logger.info("Added processed_data column to ecg_data table")
+        
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error("Error initializing database", error=str(e), exc_info=True)
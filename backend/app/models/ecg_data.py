@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, LargeBinary, String, Text, ForeignKey
 from sqlalchemy.dialects.postgresql import JSON
 from app.db.base import Base
 
@@ -9,5 +9,6 @@ class EcgData(Base):
     file_path = Column(Text, nullable=False)
     file_name = Column(String(100), nullable=False)
     file_size = Column(Integer, nullable=False)
-    processed_signal = Column(JSON)
+    processed_signal = Column(JSON)  # unused; superseded by processed_data
+    processed_data = Column(LargeBinary)  # display trace and per-beat scores, see app.services.ecg_storage
     abnormalities = Column(JSON)
\ No newline at end of file
@@ -9,8 +9,9 @@ class Prediction(Base):
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    type = Column(String(20), nullable=False)  # 'tabular' or 'ecg'
+    type = Column(String(20), nullable=False)  # 'tabular', 'ecg' or 'combined'
     input_data = Column(JSON, nullable=False)
     result_data = Column(JSON, nullable=False)
     confidence_score = Column(Float, nullable=False)
+    model_version = Column(String(64), nullable=True)  # registry version of the model that made the prediction
     created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
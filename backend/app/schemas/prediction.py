@@ -22,6 +22,7 @@ class TabularPredictionResult(BaseModel):
     probability: float
     confidence: float
     explanation: Dict
+    model_version: Optional[str] = None
     created_at: datetime
 
 class EcgPredictionResult(BaseModel):
@@ -32,6 +33,28 @@ class EcgPredictionResult(BaseModel):
     confidence: float
     explanation: Dict
     visualization_url: str = ""
+    model_version: Optional[str] = None
+    created_at: datetime
+    # 2: beat-level result ("normal"/"abnormal", probabilities are beat fractions);
+    # 1: class names of the placeholder model and of predictions stored before beat scoring
+    result_version: int = 1
+    beat_count: Optional[int] = None
+    abnormal_beat_count: Optional[int] = None
+    # excluded_seconds and excluded_fraction of signal that failed the quality check
+    signal_quality: Optional[Dict[str, float]] = None
+    # Grad-CAM saliency of the flagged beats, when the backend computes it
+    attribution: Optional[Dict] = None
+
+class CombinedPredictionResult(BaseModel):
+    prediction_id: str
+    risk_level: str
+    probability: float
+    confidence: float
+    weights: Dict[str, float]
+    tabular: Dict
+    ecg: Dict
+    visualization_url: str = ""
+    model_version: Optional[str] = None
     created_at: datetime
 
 class PredictionHistoryItem(BaseModel):
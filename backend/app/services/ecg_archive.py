@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from app.core import get_logger
+from app.core.config import settings
+from app.core.file_utils import fix_record_header, get_upload_directory
+from app.core.metrics import ECG_ARCHIVE_SAVED_BYTES, ECG_ARCHIVED_RECORDS
+from app.services.ecg_codec import archive_record
+
+try:
+    import fcntl
+except ImportError:  # Windows: compaction passes are not serialised across processes
+    fcntl = None
+
+logger = get_logger(__name__)
+
+# Held during a pass, so of several workers only one compacts at a time
+LOCK_NAME = ".archive.lock"
+
+
+class UploadCompactor:
+    """
+    Periodically replaces old uploaded .dat files with lossless archives.
+
+    A record qualifies once its .dat file has not been modified for
+    ``after_days``; recent uploads keep their .dat file and are read exactly
+    as before. The loaders in ``ecg_stream`` read an archived record
+    transparently, so predictions, plots and the signal endpoint keep
+    working on it.
+    """
+
+    def __init__(self, interval: float, after_days: float, block_samples: int):
+        self.interval = float(interval)
+        self.after_days = float(after_days)
+        self.block_samples = int(block_samples)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self.after_days <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="upload-compactor", daemon=True)
+        self._thread.start()
+        logger.info("Upload compactor started", interval=self.interval, after_days=self.after_days)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            # A pass in progress finishes its current record first
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def compact(self, directory: str = None, after_days: float = None, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Archive every qualifying record in the upload directory once.
+
+        Args:
+            directory (str): Directory to scan; the upload directory by default
+            after_days (float): Minimum age of a .dat file; ``after_days`` of the compactor by default
+            dry_run (bool): Only count the records that would be archived
+
+        Returns:
+            Dict[str, Any]: Records archived, skipped and failed, and bytes before and after
+        """
+        directory = directory or get_upload_directory()
+        after_days = self.after_days if after_days is None else float(after_days)
+        cutoff = time.time() - after_days * 86400
+        stats = {"archived": 0, "skipped": 0, "failed": 0, "original_bytes": 0, "archived_bytes": 0}
+        with _pass_lock(directory) as locked:
+            if not locked:
+                logger.debug("Compaction pass already running in another process", directory=directory)
+                return stats
+            for name in sorted(os.listdir(directory)):
+                if self._stop.is_set():
+                    break
+                if not name.endswith(".dat"):
+                    continue
+                base_path = os.path.join(directory, name[:-len(".dat")])
+                try:
+                    if os.path.getmtime(base_path + ".dat") > cutoff or not os.path.exists(base_path + ".hea"):
+                        stats["skipped"] += 1
+                        continue
+                    if dry_run:
+                        stats["archived"] += 1
+                        stats["original_bytes"] += os.path.getsize(base_path + ".dat")
+                        continue
+                    fix_record_header(base_path)
+                    result = archive_record(base_path, self.block_samples)
+                except FileNotFoundError:
+                    # Deleted, or archived by another process, since the listing
+                    stats["skipped"] += 1
+                    continue
+                except Exception as e:
+                    stats["failed"] += 1
+                    ECG_ARCHIVED_RECORDS.inc(result="failed")
+                    logger.error("Failed to archive ECG record", base_path=base_path, error=str(e))
+                    continue
+                stats["archived"] += 1
+                stats["original_bytes"] += result["original_bytes"]
+                stats["archived_bytes"] += result["archived_bytes"]
+                ECG_ARCHIVED_RECORDS.inc(result="archived")
+                ECG_ARCHIVE_SAVED_BYTES.inc(result["original_bytes"] - result["archived_bytes"])
+        if stats["archived"] or stats["failed"]:
+            logger.info("Upload compaction pass finished", directory=directory, dry_run=dry_run, **stats)
+        return stats
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error("Upload compaction pass failed", error=str(e))
+
+
+@contextmanager
+def _pass_lock(directory: str) -> Iterator[bool]:
+    """Non-blocking exclusive lock file in the scanned directory; yields whether it was acquired"""
+    if fcntl is None:
+        yield True
+        return
+    with open(os.path.join(directory, LOCK_NAME), "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# Started with the application when ECG_ARCHIVE_AFTER_DAYS and ECG_ARCHIVE_INTERVAL_SECONDS are > 0
+upload_compactor = UploadCompactor(settings.ECG_ARCHIVE_INTERVAL_SECONDS, settings.ECG_ARCHIVE_AFTER_DAYS,
+                                   settings.ECG_ARCHIVE_BLOCK_SAMPLES)
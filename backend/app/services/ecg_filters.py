@@ -0,0 +1,159 @@
+import math
+from fractions import Fraction
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+from scipy import signal as scipy_signal
+
+# Kaiser window used by scipy.signal.resample_poly's default anti-aliasing filter
+RESAMPLE_KAISER_BETA = 5.0
+# Taps on each side of the anti-aliasing filter, per unit of max(up, down)
+RESAMPLE_HALF_LENGTH = 10
+
+
+def resample_ratio(fs_in: float, fs_out: float) -> Tuple[int, int]:
+    """
+    Smallest integer (up, down) pair with ``fs_in * up / down == fs_out``.
+
+    Args:
+        fs_in (float): Input sampling frequency in Hz
+        fs_out (float): Output sampling frequency in Hz
+
+    Returns:
+        Tuple[int, int]: Upsampling and downsampling factors
+    """
+    ratio = Fraction(fs_out / fs_in).limit_denominator(1000)
+    return ratio.numerator, ratio.denominator
+
+
+@lru_cache(maxsize=32)
+def resample_taps(up: int, down: int) -> np.ndarray:
+    """
+    Polyphase anti-aliasing filter for an up/down pair, designed once.
+
+    Same design as ``resample_poly``'s default, so passing these taps as its
+    ``window`` gives identical output without redesigning the filter per call.
+    """
+    max_rate = max(up, down)
+    half_length = RESAMPLE_HALF_LENGTH * max_rate
+    # resample_poly applies the gain of ``up`` itself
+    taps = scipy_signal.firwin(2 * half_length + 1, 1.0 / max_rate, window=("kaiser", RESAMPLE_KAISER_BETA))
+    taps.setflags(write=False)
+    return taps
+
+
+@lru_cache(maxsize=32)
+def bandpass_sos(fs: float, low_hz: float, high_hz: float, order: int) -> np.ndarray:
+    """
+    Butterworth band-pass (or high/low-pass when one edge is 0) as second-order sections.
+
+    The high edge is clipped below Nyquist so the same setting works at any
+    sampling rate. Returns an empty array when both edges are disabled.
+    """
+    high_hz = min(high_hz, 0.45 * fs) if high_hz > 0 else 0.0
+    if low_hz > 0 and high_hz > 0:
+        sos = scipy_signal.butter(order, [low_hz, high_hz], btype="bandpass", fs=fs, output="sos")
+    elif low_hz > 0:
+        sos = scipy_signal.butter(order, low_hz, btype="highpass", fs=fs, output="sos")
+    elif high_hz > 0:
+        sos = scipy_signal.butter(order, high_hz, btype="lowpass", fs=fs, output="sos")
+    else:
+        sos = np.empty((0, 6))
+    return sos
+
+
+def resample(signal: np.ndarray, fs_in: float, fs_out: float) -> np.ndarray:
+    """
+    Polyphase resampling along the time axis.
+
+    Args:
+        signal (np.ndarray): Samples of shape (n_samples,) or (n_samples, n_leads)
+        fs_in (float): Input sampling frequency in Hz
+        fs_out (float): Output sampling frequency in Hz
+
+    Returns:
+        np.ndarray: float32 signal at ``fs_out``; all leads are resampled in one call
+    """
+    up, down = resample_ratio(fs_in, fs_out)
+    if up == down:
+        return np.asarray(signal, dtype=np.float32)
+    resampled = scipy_signal.resample_poly(signal, up, down, axis=0, window=resample_taps(up, down))
+    return resampled.astype(np.float32, copy=False)
+
+
+def bandpass(signal: np.ndarray, fs: float, low_hz: float, high_hz: float, order: int = 2) -> np.ndarray:
+    """
+    Zero-phase band-pass filter (baseline wander and high-frequency noise removal).
+
+    Args:
+        signal (np.ndarray): Samples of shape (n_samples,) or (n_samples, n_leads)
+        fs (float): Sampling frequency in Hz
+        low_hz (float): High-pass edge, 0 to disable
+        high_hz (float): Low-pass edge, 0 to disable
+        order (int): Butterworth order (doubled by the forward-backward pass)
+
+    Returns:
+        np.ndarray: Filtered float32 signal
+    """
+    sos = bandpass_sos(float(fs), float(low_hz), float(high_hz), int(order))
+    signal = np.asarray(signal, dtype=np.float32)
+    # sosfiltfilt needs more samples than its edge padding
+    if sos.shape[0] == 0 or signal.shape[0] <= 3 * (2 * sos.shape[0] + 1):
+        return signal
+    return scipy_signal.sosfiltfilt(sos, signal, axis=0).astype(np.float32, copy=False)
+
+
+class StreamingResampler:
+    """
+    Polyphase resampling of a signal that arrives in consecutive chunks.
+
+    Each push resamples the new samples together with enough carried-over
+    input on both sides to cover the filter, and only emits the output
+    samples whose filter support has fully arrived. The concatenated output
+    equals resampling the whole signal at once.
+    """
+
+    def __init__(self, fs_in: float, fs_out: float):
+        self.up, self.down = resample_ratio(fs_in, fs_out)
+        self.taps = resample_taps(self.up, self.down) if self.up != self.down else None
+        # Input samples each output depends on, either side, rounded to whole output periods
+        reach = math.ceil(RESAMPLE_HALF_LENGTH * max(self.up, self.down) / self.up) + 1
+        self.context = -(-reach // self.down) * self.down
+        self._buffer = None
+        self._buffer_start = 0
+        self._emitted = 0
+
+    def push(self, samples: np.ndarray, final: bool = False) -> np.ndarray:
+        """
+        Add the next samples and return the output that is now final.
+
+        Args:
+            samples (np.ndarray): Next samples, shape (n,) or (n, n_leads)
+            final (bool): No more samples will follow; flush everything
+
+        Returns:
+            np.ndarray: Next float32 output samples at the target rate
+        """
+        samples = np.asarray(samples, dtype=np.float32)
+        if self.up == self.down:
+            return samples
+        buffer = samples if self._buffer is None else np.concatenate((self._buffer, samples))
+        end = self._buffer_start + buffer.shape[0]
+        if final:
+            stop = -(-end * self.up // self.down)
+        else:
+            # Outputs whose right-hand filter support is still missing wait for the next chunk
+            stop = max(self._emitted, (end - self.context) // self.down * self.up)
+        output = np.empty((0,) + buffer.shape[1:], dtype=np.float32)
+        if stop > self._emitted:
+            resampled = scipy_signal.resample_poly(buffer, self.up, self.down, axis=0, window=self.taps)
+            offset = self._buffer_start // self.down * self.up
+            output = resampled[self._emitted - offset:stop - offset].astype(np.float32, copy=False)
+            self._emitted = stop
+
+        # Keep the left context of the next output, starting on a whole output period
+        keep_from = max(self._buffer_start, (self._emitted * self.down // self.up - self.context) // self.down * self.down)
+        self._buffer = buffer[keep_from - self._buffer_start:]
+        self._buffer_start = keep_from
+        return output
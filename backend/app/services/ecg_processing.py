@@ -0,0 +1,469 @@
+import warnings
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# The CNN was trained on 0.6 s windows centred on the R peak (216 samples at 360 Hz)
+BEAT_WINDOW_SECONDS = 0.6
+# MIT-BIH sampling rate; other recordings are resampled to it before segmentation
+MODEL_SAMPLING_RATE = 360.0
+# No two beats closer than this (physiological refractory period)
+REFRACTORY_SECONDS = 0.2
+# Block length of the adaptive detection threshold
+THRESHOLD_BLOCK_SECONDS = 2.0
+
+# Parts of a beat window that attributions are reported for, as (start, end) seconds relative
+# to the R peak; QRS complexes last about 0.1 s
+BEAT_REGIONS = (
+    ("P wave / PR segment", -BEAT_WINDOW_SECONDS / 2, -0.05),
+    ("QRS complex", -0.05, 0.05),
+    ("ST segment / T wave", 0.05, BEAT_WINDOW_SECONDS / 2)
+)
+
+# MIT-BIH beat annotation symbols, split the way the notebook labelled them
+NORMAL_BEAT_SYMBOLS = frozenset({"N", "L", "R"})
+BEAT_SYMBOLS = NORMAL_BEAT_SYMBOLS | {"V", "A", "/", "f", "!", "E", "j", "S", "F", "e", "Q", "a", "J"}
+# Record results aggregated from beats ("normal"/"abnormal", beat fractions); version 1 was per-class softmax
+BEAT_RESULT_VERSION = 2
+
+
+class SegmentedECG(NamedTuple):
+    """Beat windows of one record plus where they came from"""
+    beats: np.ndarray  # (n_beats * leads, window, 1), beat-major, z-scored per window
+    peaks: np.ndarray  # R-peak sample index of each beat
+    fs: float
+    leads: int = 1
+    # (n_beats, leads) True where the lead passed the signal-quality check over the whole window
+    lead_mask: Optional[np.ndarray] = None
+    # Signal time skipped because no lead was usable
+    excluded_seconds: float = 0.0
+
+    @property
+    def beat_count(self) -> int:
+        return int(self.peaks.shape[0])
+
+
+def _moving_average(x: np.ndarray, width: int) -> np.ndarray:
+    """Centred moving average along the last axis via a cumulative sum (O(n) regardless of width)"""
+    width = max(1, int(width))
+    pad = [(0, 0)] * (x.ndim - 1) + [(width // 2, width - 1 - width // 2)]
+    padded = np.pad(x, pad, mode="edge")
+    cumsum = np.cumsum(padded, axis=-1, dtype=np.float64)
+    cumsum = np.concatenate((np.zeros(cumsum.shape[:-1] + (1,)), cumsum), axis=-1)
+    return ((cumsum[..., width:] - cumsum[..., :-width]) / width).astype(np.float32, copy=False)
+
+
+def _enforce_refractory(peaks: np.ndarray, strength: np.ndarray, distance: int) -> np.ndarray:
+    """Keep the strongest peak of every cluster closer than ``distance`` samples"""
+    if len(peaks) < 2:
+        return peaks
+    keep = np.ones(len(peaks), dtype=bool)
+    # Greedy by strength; candidates are sparse (one per QRS) so this loop is short
+    for index in np.argsort(-strength, kind="stable"):
+        if not keep[index]:
+            continue
+        left = np.searchsorted(peaks, peaks[index] - distance + 1, side="left")
+        right = np.searchsorted(peaks, peaks[index] + distance, side="left")
+        keep[left:index] = False
+        keep[index + 1:right] = False
+    return peaks[keep]
+
+
+def _block_view(x: np.ndarray, block: int) -> np.ndarray:
+    """Reshape the last axis into (n_blocks, block), padding the last block with its edge value"""
+    n_blocks = -(-x.shape[-1] // block)
+    pad = [(0, 0)] * (x.ndim - 1) + [(0, n_blocks * block - x.shape[-1])]
+    return np.pad(x, pad, mode="edge").reshape(x.shape[:-1] + (n_blocks, block))
+
+
+def _local_level(blocks: np.ndarray, valid: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Median of each block value and its neighbours (up to 9 blocks), along the last axis.
+
+    Blocks where ``valid`` is False are left out of their neighbours' medians
+    and get NaN themselves.
+    """
+    neighbours = min(9, blocks.shape[-1]) | 1
+    half = neighbours // 2
+    pad = [(0, 0)] * (blocks.ndim - 1) + [(half, half)]
+    if valid is None:
+        return np.median(sliding_window_view(np.pad(blocks, pad, mode="edge"), neighbours, axis=-1), axis=-1)
+    blocks = np.where(valid, blocks, np.nan)
+    with warnings.catch_warnings():
+        # Stretches of unusable blocks are all-NaN by design
+        warnings.simplefilter("ignore", RuntimeWarning)
+        level = np.nanmedian(sliding_window_view(np.pad(blocks, pad, mode="edge"), neighbours, axis=-1), axis=-1)
+    return np.where(valid, level, np.nan)
+
+
+def _adaptive_threshold(energy: np.ndarray, fs: float, fraction: float = 0.3,
+                        valid: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Per-sample detection threshold following the local QRS energy.
+
+    Takes the maximum of each ``THRESHOLD_BLOCK_SECONDS`` block (one or more beats), then the median
+    of neighbouring block maxima, so a few very large ectopic beats or
+    artefacts do not mask the normal beats around them. Blocks that are not
+    ``valid`` get a NaN threshold, so no peak is ever found there.
+    """
+    block = max(1, int(THRESHOLD_BLOCK_SECONDS * fs))
+    local = _local_level(_block_view(energy, block).max(axis=-1), valid)
+    return fraction * np.repeat(local, block)[:energy.size]
+
+
+def _fuse_leads(energy: np.ndarray, detrended: np.ndarray, fs: float,
+                valid: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Combine per-lead QRS energy and deflection (both (n_leads, n_samples)) into one detection lead.
+
+    Within each threshold block every lead is scaled to its local QRS level
+    (as in ``_adaptive_threshold``), so amplitude and polarity differences
+    between leads do not matter, and weighted by the square of its local
+    peakiness (QRS level over median energy). Clean leads dominate, and a
+    lead that is noisy, flat or disconnected for part of the recording only
+    loses weight there. Being block-local, the fused lead of a chunk matches
+    the fused lead of the whole record away from the chunk edges. Blocks of
+    a lead that are not ``valid`` (n_leads, n_blocks) get no weight.
+    """
+    block = max(1, int(THRESHOLD_BLOCK_SECONDS * fs))
+    samples = energy.shape[1]
+    energy_blocks = _block_view(energy, block)
+    deflection_blocks = _block_view(np.abs(detrended), block)
+
+    level = _local_level(energy_blocks.max(axis=-1), valid)
+    noise = _local_level(np.median(energy_blocks, axis=-1), valid)
+    amplitude = _local_level(deflection_blocks.max(axis=-1), valid)
+    weights = np.square(np.divide(level, noise, out=np.zeros_like(level), where=noise > 0))
+    total = weights.sum(axis=0, keepdims=True)
+    weights = np.where(total > 0, weights / np.where(total > 0, total, 1.0), 1.0 / weights.shape[0])
+
+    # Per-block scaling folded into the weights, applied to each block of samples
+    energy_scale = np.divide(weights, level, out=np.zeros_like(weights), where=level > 0)
+    deflection_scale = np.divide(weights, amplitude, out=np.zeros_like(weights), where=amplitude > 0)
+    fused_energy = np.einsum("lbs,lb->bs", energy_blocks, energy_scale.astype(np.float32)).reshape(-1)[:samples]
+    fused_deflection = np.einsum("lbs,lb->bs", deflection_blocks, deflection_scale.astype(np.float32)).reshape(-1)[:samples]
+    return fused_energy, fused_deflection
+
+
+def detect_r_peaks(signal: np.ndarray, fs: float, usable: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Locate R peaks with a vectorised Pan-Tompkins style detector.
+
+    Baseline wander is removed with a moving average, the squared derivative
+    is integrated over a QRS-length window, and local maxima above an
+    adaptive threshold are snapped back to the largest deflection of the
+    original signal. Multi-lead input is reduced to one fused detection lead
+    (see ``_fuse_leads``), so all leads share one set of peaks. Samples that
+    are not ``usable`` contribute nothing and do not affect the threshold
+    elsewhere, so no peaks are found in artefact.
+
+    Args:
+        signal (np.ndarray): ECG of shape (n_samples,) or (n_samples, n_leads)
+        fs (float): Sampling frequency in Hz
+        usable (Optional[np.ndarray]): Boolean mask shaped like ``signal`` from the
+            signal-quality check, constant over each threshold block
+
+    Returns:
+        np.ndarray: Sorted R-peak sample indices
+    """
+    signal = np.asarray(signal, dtype=np.float32)
+    # Lead-major so every filter runs along contiguous memory, all leads in one pass
+    leads = np.ascontiguousarray(signal.T) if signal.ndim == 2 else signal[np.newaxis]
+    if leads.shape[1] < int(fs):
+        return np.empty(0, dtype=np.int64)
+
+    detrended = leads - _moving_average(leads, 0.2 * fs)
+    slope = np.diff(detrended, axis=1, prepend=detrended[:, :1])
+    energy = _moving_average(slope * slope, 0.15 * fs)
+    valid = None
+    if usable is not None and not np.all(usable):
+        usable = np.asarray(usable, dtype=bool)
+        mask = np.ascontiguousarray(usable.T) if usable.ndim == 2 else usable[np.newaxis]
+        energy = np.where(mask, energy, np.float32(0))
+        detrended = np.where(mask, detrended, np.float32(0))
+        valid = _block_view(mask, max(1, int(THRESHOLD_BLOCK_SECONDS * fs))).all(axis=-1)
+    if leads.shape[0] > 1:
+        energy, deflection = _fuse_leads(energy, detrended, fs, valid)
+        valid = valid.any(axis=0) if valid is not None else None
+    else:
+        energy, deflection = energy[0], np.abs(detrended[0])
+        valid = valid[0] if valid is not None else None
+
+    threshold = _adaptive_threshold(energy, fs, valid=valid)
+    is_peak = (energy[1:-1] > energy[:-2]) & (energy[1:-1] >= energy[2:]) & (energy[1:-1] > threshold[1:-1])
+    candidates = np.flatnonzero(is_peak) + 1
+    if candidates.size == 0:
+        return candidates.astype(np.int64)
+
+    # Snap each candidate to the largest absolute deflection around it
+    half_search = max(1, int(0.1 * fs))
+    padded = np.pad(deflection, half_search)
+    windows = sliding_window_view(padded, 2 * half_search + 1)[candidates]
+    peaks = candidates + np.argmax(windows, axis=1) - half_search
+    strength = deflection[peaks]
+
+    peaks, unique_index = np.unique(peaks, return_index=True)
+    return _enforce_refractory(peaks, strength[unique_index], int(REFRACTORY_SECONDS * fs)).astype(np.int64)
+
+
+def extract_beat_windows(signal: np.ndarray, peaks: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cut fixed-length, individually z-scored windows centred on each R peak.
+
+    Beats whose window would run past either end of the signal are dropped,
+    exactly as in training. For multi-lead input every lead is cut at the same
+    peaks and the windows are laid out beat-major (beat 0 lead 0, beat 0
+    lead 1, ...), so all leads go through the model in one batch.
+
+    Args:
+        signal (np.ndarray): ECG of shape (n_samples,) or (n_samples, n_leads)
+        peaks (np.ndarray): R-peak sample indices
+        window (int): Window length in samples
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (beats of shape (n_beats * n_leads, window, 1), the peaks that were kept)
+    """
+    signal = np.asarray(signal, dtype=np.float32)
+    if signal.ndim == 1:
+        signal = signal[:, np.newaxis]
+    peaks = np.asarray(peaks, dtype=np.int64)
+    half = window // 2
+    peaks = peaks[(peaks - half >= 0) & (peaks + half <= signal.shape[0])]
+    if peaks.size == 0:
+        return np.empty((0, window, 1), dtype=np.float32), peaks
+    # Strided view indexed by window start: one gather for all leads, no Python loop
+    beats = sliding_window_view(signal, window, axis=0)[peaks - half]
+    mean = beats.mean(axis=-1, keepdims=True)
+    std = beats.std(axis=-1, keepdims=True)
+    beats = (beats - mean) / (std + 1e-8)
+    return beats.reshape(-1, window, 1).astype(np.float32, copy=False), peaks
+
+
+def beat_lead_mask(usable: np.ndarray, peaks: np.ndarray, window: int) -> np.ndarray:
+    """
+    Which leads of each beat are usable over the whole beat window.
+
+    The mask is constant over threshold blocks, which are longer than a beat
+    window, so checking the first and last sample of each window is enough.
+
+    Args:
+        usable (np.ndarray): Per-sample mask of shape (n_samples,) or (n_samples, n_leads)
+        peaks (np.ndarray): R-peak sample indices whose windows lie inside the signal
+        window (int): Window length in samples
+
+    Returns:
+        np.ndarray: Boolean (n_beats, n_leads)
+    """
+    usable = np.asarray(usable, dtype=bool)
+    if usable.ndim == 1:
+        usable = usable[:, np.newaxis]
+    half = window // 2
+    return usable[peaks - half] & usable[peaks + half - 1]
+
+
+def combine_lead_scores(scores: np.ndarray, leads: int, method: str = "mean") -> np.ndarray:
+    """
+    Reduce per-window scores of a beat-major multi-lead batch to one score per beat.
+
+    Args:
+        scores (np.ndarray): One score per window, ``n_beats * leads`` values; NaN
+            marks a lead that was not scored and is left out
+        leads (int): Leads per beat
+        method (str): "mean" or "max" across leads
+
+    Returns:
+        np.ndarray: One score per beat
+    """
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1, leads)
+    if method == "mean":
+        return np.nanmean(scores, axis=1)
+    if method == "max":
+        return np.nanmax(scores, axis=1)
+    raise ValueError(f"Unknown lead aggregation: {method}")
+
+
+class BeatScoreAccumulator:
+    """
+    Running reduction of per-beat abnormality probabilities.
+
+    Keeps counts and sums only, so records scored chunk by chunk aggregate in
+    constant memory and give the same result as scoring them in one go.
+    """
+
+    def __init__(self):
+        self.beat_count = 0
+        self.abnormal_beat_count = 0
+        self.abnormal_score_sum = 0.0
+        self.normal_margin_sum = 0.0
+
+    def update(self, scores: np.ndarray) -> None:
+        scores = np.asarray(scores, dtype=np.float32).ravel()
+        abnormal = scores > 0.5
+        self.beat_count += int(scores.size)
+        self.abnormal_beat_count += int(abnormal.sum())
+        self.abnormal_score_sum += float(scores[abnormal].sum(dtype=np.float64))
+        self.normal_margin_sum += float((1.0 - scores[~abnormal]).sum(dtype=np.float64))
+
+    def result(self, abnormal_fraction_threshold: float) -> Dict[str, Any]:
+        """
+        Record-level result for the beats seen so far.
+
+        Args:
+            abnormal_fraction_threshold (float): Fraction of abnormal beats at or
+                above which the record is classified as abnormal
+
+        Returns:
+            Dict[str, Any]: result version, classification, per-class beat fractions, confidence and beat counts
+        """
+        normal_beat_count = self.beat_count - self.abnormal_beat_count
+        abnormal_fraction = self.abnormal_beat_count / self.beat_count if self.beat_count else 0.0
+        is_abnormal = self.beat_count > 0 and abnormal_fraction >= abnormal_fraction_threshold
+        if is_abnormal:
+            # How sure the model is about the beats that drove the decision
+            confidence = self.abnormal_score_sum / self.abnormal_beat_count
+        else:
+            confidence = self.normal_margin_sum / normal_beat_count if normal_beat_count else 0.0
+        return {
+            "result_version": BEAT_RESULT_VERSION,
+            "classification": "abnormal" if is_abnormal else "normal",
+            "probabilities": {"normal": 1.0 - abnormal_fraction, "abnormal": abnormal_fraction},
+            "confidence": float(confidence),
+            "beat_count": self.beat_count,
+            "abnormal_beat_count": self.abnormal_beat_count
+        }
+
+
+class BeatLog:
+    """Per-beat R-peak positions and scores of a record, collected chunk by chunk"""
+
+    def __init__(self):
+        self._peaks: List[np.ndarray] = []
+        self._scores: List[np.ndarray] = []
+
+    def update(self, peaks: np.ndarray, scores: np.ndarray) -> None:
+        if len(peaks):
+            self._peaks.append(np.asarray(peaks))
+            self._scores.append(np.asarray(scores, dtype=np.float32).ravel())
+
+    @property
+    def peaks(self) -> np.ndarray:
+        return np.concatenate(self._peaks) if self._peaks else np.empty(0, dtype=np.int64)
+
+    @property
+    def scores(self) -> np.ndarray:
+        return np.concatenate(self._scores) if self._scores else np.empty(0, dtype=np.float32)
+
+
+class SaliencyAccumulator:
+    """
+    Running reduction of per-beat saliency maps to segments of the recording.
+
+    Only beats scored abnormal contribute. Each beat's map is normalised to
+    unit mass and split over ``BEAT_REGIONS``; consecutive flagged beats
+    closer than ``gap_seconds`` are merged into one segment whose importance
+    is the summed abnormality score of its beats. Memory grows with the
+    number of segments, not beats, so chunked records can be fed chunk by
+    chunk.
+    """
+
+    def __init__(self, fs: float, window: int, gap_seconds: float):
+        self.fs = float(fs)
+        self.window = int(window)
+        self.gap_seconds = float(gap_seconds)
+        centre = self.window // 2
+        edges = [(int(round(centre + start * self.fs)), int(round(centre + end * self.fs)))
+                 for _, start, end in BEAT_REGIONS]
+        # (window, regions) indicator, so region masses of a batch are one matmul
+        self._regions = np.zeros((self.window, len(BEAT_REGIONS)), dtype=np.float32)
+        for index, (start, end) in enumerate(edges):
+            self._regions[max(start, 0):min(end, self.window), index] = 1.0
+        self.region_mass = np.zeros(len(BEAT_REGIONS), dtype=np.float64)
+        self.beat_count = 0
+        self.segments: List[Dict[str, Any]] = []
+
+    def update(self, peaks: np.ndarray, scores: np.ndarray, saliency: np.ndarray) -> None:
+        """
+        Add scored beats in time order.
+
+        Args:
+            peaks (np.ndarray): R-peak sample index of each beat
+            scores (np.ndarray): Abnormality probability of each beat
+            saliency (np.ndarray): Non-negative map of shape (n_beats, window)
+        """
+        scores = np.asarray(scores, dtype=np.float32).ravel()
+        flagged = scores > 0.5
+        if not flagged.any():
+            return
+        peaks = np.asarray(peaks)[flagged]
+        scores = scores[flagged]
+        saliency = np.asarray(saliency, dtype=np.float32)[flagged]
+        mass = saliency.sum(axis=1, keepdims=True)
+        # A flat map (no positive evidence) counts as uniform
+        saliency = np.where(mass > 0, saliency / np.where(mass > 0, mass, 1), np.float32(1.0 / self.window))
+        regions = saliency @ self._regions
+        self.region_mass += regions.sum(axis=0, dtype=np.float64)
+        self.beat_count += int(peaks.size)
+
+        half = self.window / 2 / self.fs
+        times = peaks / self.fs
+        for time, score, beat_regions in zip(times.tolist(), scores.tolist(), regions):
+            segment = self.segments[-1] if self.segments else None
+            if segment is None or time - half - segment["end_time"] > self.gap_seconds:
+                segment = {"start_time": time - half, "end_time": time + half, "beat_count": 0,
+                           "score_sum": 0.0, "regions": np.zeros(len(BEAT_REGIONS), dtype=np.float64)}
+                self.segments.append(segment)
+            segment["end_time"] = time + half
+            segment["beat_count"] += 1
+            segment["score_sum"] += score
+            segment["regions"] += beat_regions
+
+    def result(self, max_segments: int) -> Dict[str, Any]:
+        """
+        Attribution summary for the beats seen so far.
+
+        Args:
+            max_segments (int): Most important segments to return
+
+        Returns:
+            Dict[str, Any]: Share of saliency per beat region over all flagged beats, and the
+            top segments in time order with their importance (fraction of the total), beat
+            count, mean score and dominant region
+        """
+        names = [name for name, _, _ in BEAT_REGIONS]
+        total_mass = self.region_mass.sum()
+        beat_regions = {name: float(mass / total_mass) if total_mass else 0.0
+                        for name, mass in zip(names, self.region_mass)}
+        total_score = sum(segment["score_sum"] for segment in self.segments)
+        ranked = sorted(self.segments, key=lambda segment: segment["score_sum"], reverse=True)[:max_segments]
+        segments = []
+        for segment in sorted(ranked, key=lambda segment: segment["start_time"]):
+            regions = segment["regions"] / segment["beat_count"]
+            segments.append({
+                "start_time": round(max(segment["start_time"], 0.0), 3),
+                "end_time": round(segment["end_time"], 3),
+                "importance": round(segment["score_sum"] / total_score, 4) if total_score else 0.0,
+                "beat_count": segment["beat_count"],
+                "mean_score": round(segment["score_sum"] / segment["beat_count"], 4),
+                "focus": names[int(np.argmax(regions))],
+                "regions": {name: round(float(value), 4) for name, value in zip(names, regions)}
+            })
+        return {"beat_count": self.beat_count, "beat_regions": beat_regions,
+                "segment_count": len(self.segments), "segments": segments}
+
+
+def aggregate_beat_scores(scores: np.ndarray, abnormal_fraction_threshold: float) -> Dict[str, Any]:
+    """
+    Reduce per-beat abnormality probabilities to a record-level result.
+
+    Args:
+        scores (np.ndarray): Sigmoid outputs, one per beat
+        abnormal_fraction_threshold (float): Fraction of abnormal beats at or
+            above which the record is classified as abnormal
+
+    Returns:
+        Dict[str, Any]: classification, per-class beat fractions, confidence and beat counts
+    """
+    accumulator = BeatScoreAccumulator()
+    accumulator.update(scores)
+    return accumulator.result(abnormal_fraction_threshold)
@@ -0,0 +1,130 @@
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.services.ecg_processing import THRESHOLD_BLOCK_SECONDS, _block_view
+
+# Quality is judged on the detector's threshold block grid, so chunked and whole-record masks agree
+QUALITY_WINDOW_SECONDS = THRESHOLD_BLOCK_SECONDS
+# Power above this counts as high-frequency noise (EMG, mains), relative to power above BASELINE_HZ
+NOISE_BAND_HZ = 40.0
+BASELINE_HZ = 0.5
+# Raw samples within this fraction of the ADC range from a rail count as clipped
+RAIL_TOLERANCE = 0.01
+# A window whose noise ratio exceeds this fraction of the limit is also rejected when its kurtosis is low
+KURTOSIS_NOISE_FRACTION = 0.25
+
+# ADC resolution implied by the WFDB storage format when the header does not give one
+_FORMAT_RESOLUTION = {"8": 8, "80": 8, "16": 16, "160": 16, "212": 12, "310": 10, "311": 10, "24": 24, "32": 32}
+
+
+class SignalQuality(NamedTuple):
+    """Signal-quality features of each lead and window, all of shape (n_leads, n_windows)"""
+    amplitude: np.ndarray  # peak-to-peak of the band-passed signal (flat-line check)
+    saturation: np.ndarray  # fraction of raw samples at an ADC rail
+    noise_ratio: np.ndarray  # power above NOISE_BAND_HZ over power above BASELINE_HZ
+    kurtosis: np.ndarray  # of the band-passed signal; QRS complexes make a clean ECG heavy-tailed
+
+
+def adc_rails(header, channels) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Physical values of the lowest and highest ADC code of each selected lead.
+
+    Args:
+        header: ``wfdb.rdheader`` result
+        channels: Selected channel indices
+
+    Returns:
+        Optional[Tuple[np.ndarray, np.ndarray]]: (low, high) rails per lead, or None if the
+        header does not describe the ADC
+    """
+    try:
+        low, high = [], []
+        for channel in channels:
+            resolution = int((header.adc_res or [0] * header.n_sig)[channel]) or \
+                _FORMAT_RESOLUTION[str(header.fmt[channel])]
+            gain = float(header.adc_gain[channel]) or 200.0
+            baseline = float(header.baseline[channel])
+            # The ADC range is centred on its zero code, which need not be 0
+            zero = float((header.adc_zero or [0] * header.n_sig)[channel] or 0)
+            low.append((zero - 2 ** (resolution - 1) - baseline) / gain)
+            high.append((zero + 2 ** (resolution - 1) - 1 - baseline) / gain)
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return None
+    return np.asarray(low, dtype=np.float32), np.asarray(high, dtype=np.float32)
+
+
+def signal_quality(raw: np.ndarray, filtered: np.ndarray, fs: float,
+                   rails: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> SignalQuality:
+    """
+    Compute signal-quality features per ``QUALITY_WINDOW_SECONDS`` window, all leads at once.
+
+    Args:
+        raw (np.ndarray): Unfiltered signal at ``fs``, shape (n_samples,) or (n_samples, n_leads)
+        filtered (np.ndarray): The same signal band-passed
+        fs (float): Sampling frequency in Hz
+        rails (Optional[Tuple[np.ndarray, np.ndarray]]): ADC rails per lead (see ``adc_rails``);
+            saturation is reported as 0 without them
+
+    Returns:
+        SignalQuality: Feature arrays of shape (n_leads, n_windows)
+    """
+    window = max(1, int(QUALITY_WINDOW_SECONDS * fs))
+    raw = np.asarray(raw, dtype=np.float32)
+    # Lead-major windows: (n_leads, n_windows, window)
+    raw_windows = _block_view(raw.T if raw.ndim == 2 else raw[np.newaxis], window)
+    filtered = np.asarray(filtered, dtype=np.float32)
+    windows = _block_view(filtered.T if filtered.ndim == 2 else filtered[np.newaxis], window)
+
+    amplitude = np.ptp(windows, axis=-1)
+
+    if rails is not None:
+        low = np.asarray(rails[0], dtype=np.float32)[:, np.newaxis, np.newaxis]
+        high = np.asarray(rails[1], dtype=np.float32)[:, np.newaxis, np.newaxis]
+        tolerance = RAIL_TOLERANCE * (high - low)
+        clipped = (raw_windows <= low + tolerance) | (raw_windows >= high - tolerance)
+        saturation = clipped.mean(axis=-1)
+    else:
+        saturation = np.zeros(amplitude.shape, dtype=np.float32)
+
+    # The DC bin is below BASELINE_HZ, so the window mean never needs removing
+    spectrum = np.fft.rfft(raw_windows, axis=-1)
+    power = np.square(spectrum.real) + np.square(spectrum.imag)
+    frequencies = np.fft.rfftfreq(window, 1.0 / fs)
+    total = power[..., frequencies >= BASELINE_HZ].sum(axis=-1)
+    noise = power[..., frequencies >= NOISE_BAND_HZ].sum(axis=-1)
+    noise_ratio = np.divide(noise, total, out=np.zeros_like(total), where=total > 0)
+
+    centred = windows - windows.mean(axis=-1, keepdims=True)
+    variance_squared = np.square(np.square(centred).mean(axis=-1))
+    fourth = np.square(np.square(centred)).mean(axis=-1)
+    kurtosis = np.divide(fourth, variance_squared, out=np.zeros_like(fourth), where=variance_squared > 0)
+    return SignalQuality(amplitude, saturation, noise_ratio.astype(np.float32), kurtosis)
+
+
+def usable_windows(quality: SignalQuality, min_amplitude: float, max_saturation: float,
+                   max_noise_ratio: float, min_kurtosis: float) -> np.ndarray:
+    """
+    Decide which lead windows are fit for beat detection and classification.
+
+    A window is rejected when it is flat, clipped, dominated by
+    high-frequency noise, or moderately noisy with no QRS complexes standing
+    out (low kurtosis). Low kurtosis alone is not enough: ventricular
+    flutter and fibrillation are near-sinusoidal and must still be analysed.
+
+    Returns:
+        np.ndarray: Boolean (n_leads, n_windows), True where the lead is usable
+    """
+    flat = quality.amplitude < min_amplitude
+    saturated = quality.saturation >= max_saturation
+    noisy = quality.noise_ratio >= max_noise_ratio
+    noise_like = (quality.kurtosis < min_kurtosis) & (quality.noise_ratio >= KURTOSIS_NOISE_FRACTION * max_noise_ratio)
+    return ~(flat | saturated | noisy | noise_like)
+
+
+def usable_samples(usable: np.ndarray, n_samples: int, fs: float) -> np.ndarray:
+    """
+    Expand a (n_leads, n_windows) window mask to a per-sample mask of shape (n_samples, n_leads).
+    """
+    window = max(1, int(QUALITY_WINDOW_SECONDS * fs))
+    return np.repeat(usable, window, axis=1)[:, :n_samples].T
@@ -0,0 +1,310 @@
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from app.core import get_logger
+from app.core.config import settings
+from app.core.executors import inference_executor, run_in_executor
+from app.core.metrics import MODEL_BATCH_SIZE, STREAM_BEAT_LATENCY, STREAM_SESSIONS
+from app.services.ecg_filters import StreamingResampler
+from app.services.ecg_processing import (
+    BEAT_WINDOW_SECONDS, MODEL_SAMPLING_RATE, REFRACTORY_SECONDS, THRESHOLD_BLOCK_SECONDS, beat_lead_mask,
+    detect_r_peaks, extract_beat_windows
+)
+from app.services.ecg_service import ecg_service
+
+logger = get_logger(__name__)
+
+
+class RingBuffer:
+    """Fixed-capacity float32 ring holding the most recent samples, addressed by absolute sample index"""
+
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self._data = np.zeros(self.capacity, dtype=np.float32)
+        # Samples ever written; the buffer holds [total - capacity, total)
+        self.total = 0
+
+    @property
+    def start(self) -> int:
+        return max(0, self.total - self.capacity)
+
+    def append(self, samples: np.ndarray) -> None:
+        count = samples.size
+        if count > self.capacity:
+            self.total += count - self.capacity
+            samples = samples[-self.capacity:]
+            count = self.capacity
+        position = self.total % self.capacity
+        first = min(count, self.capacity - position)
+        self._data[position:position + first] = samples[:first]
+        self._data[:count - first] = samples[first:]
+        self.total += count
+
+    def get(self, start: int, stop: int) -> np.ndarray:
+        """Contiguous copy of absolute samples [start, stop)"""
+        if start < self.start or stop > self.total:
+            raise IndexError(f"Samples [{start}, {stop}) are not in the buffer [{self.start}, {self.total})")
+        count = stop - start
+        position = start % self.capacity
+        first = min(count, self.capacity - position)
+        return np.concatenate((self._data[position:position + first], self._data[:count - first]))
+
+
+class StreamSession:
+    """
+    State of one live ECG stream.
+
+    Incoming int16 frames are scaled to physical units, resampled to the
+    model rate and appended to a ring buffer. Every ``ECG_STREAM_HOP_SECONDS``
+    the last ``ECG_STREAM_CONTEXT_SECONDS`` are band-passed and re-run
+    through the R-peak detector; peaks whose full beat window has
+    arrived (plus a small look-ahead for the detector) and that were not
+    emitted before become beats. With ``ECG_SQI_ENABLED`` the context goes
+    through the same signal-quality check as uploads: unusable windows are
+    invisible to the detector, beats overlapping them are dropped and the
+    excluded time is reported in the summary. Scored beats feed a sliding
+    window that opens and closes abnormality episodes with hysteresis.
+    """
+
+    def __init__(self, fs: float, gain: float = 200.0, baseline: float = 0.0, session_id: str = None):
+        self.session_id = session_id or str(uuid.uuid4())
+        self.input_fs = float(fs)
+        # Everything after the resampler runs at the model rate
+        self.fs = MODEL_SAMPLING_RATE
+        self.gain = float(gain)
+        self.baseline = float(baseline)
+        self.resampler = StreamingResampler(self.input_fs, self.fs)
+        fs = self.fs
+        self.window = int(BEAT_WINDOW_SECONDS * fs)
+        self.context = max(int(settings.ECG_STREAM_CONTEXT_SECONDS * fs), 4 * self.window)
+        self.hop = max(1, int(settings.ECG_STREAM_HOP_SECONDS * fs))
+        # Right half of the window plus the detector's peak search radius
+        self.lookahead = self.window // 2 + int(0.1 * fs)
+        self.refractory = int(REFRACTORY_SECONDS * fs)
+        # Detection and quality windows start on this grid, so a sample is judged the same way on every run
+        self.block = max(1, int(THRESHOLD_BLOCK_SECONDS * fs))
+        self.ring = RingBuffer(self.context + self.block + 4 * self.hop)
+        # Physical values of the int16 extremes, for the saturation check
+        self.rails = (np.array([(-32768 - self.baseline) / self.gain], dtype=np.float32),
+                      np.array([(32767 - self.baseline) / self.gain], dtype=np.float32))
+        self.excluded_samples = 0
+
+        self._pending = 0
+        self._accepted_upto = 0
+        self._last_peak = None
+        # (absolute sample index after the frame, arrival time) for latency accounting
+        self._arrivals: deque = deque()
+
+        self.beat_count = 0
+        self.abnormal_beat_count = 0
+        self._recent = deque(maxlen=settings.ECG_STREAM_EPISODE_BEATS)
+        self._episode_start = None
+
+    def append(self, frame: bytes) -> None:
+        """Add a frame of little-endian int16 samples"""
+        samples = (np.frombuffer(frame, dtype="<i2").astype(np.float32) - self.baseline) / self.gain
+        samples = self.resampler.push(samples)
+        self.ring.append(samples)
+        self._pending += samples.size
+        self._arrivals.append((self.ring.total, time.monotonic()))
+
+    @property
+    def due(self) -> bool:
+        """Whether enough samples arrived since the last detector run for ``poll_beats`` to run again"""
+        return self._pending >= self.hop
+
+    def poll_beats(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return beats that completed since the last call.
+
+        Band-passes and re-runs the detector over the context, so the stream
+        handler calls it in the threadpool once ``due``, not on the event loop.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (beat windows of shape (n, window, 1), absolute R-peak indices)
+        """
+        empty = (np.empty((0, self.window, 1), dtype=np.float32), np.empty(0, dtype=np.int64))
+        if not self.due:
+            return empty
+        self._pending = 0
+
+        end = self.ring.total
+        start = -(-max(self.ring.start, end - self.context) // self.block) * self.block
+        raw = self.ring.get(start, end)
+        signal = ecg_service.filter_signal(raw)
+        limit = end - self.lookahead
+        usable = None
+        if settings.ECG_SQI_ENABLED:
+            usable = ecg_service.quality_mask(raw[:, np.newaxis], signal[:, np.newaxis], self.rails)[:, 0]
+            tail = (end - start) % self.block
+            if tail and end - start > self.block:
+                # The last block is still arriving: a fragment of it must also pass as part of the latest full block
+                recent = ecg_service.quality_mask(raw[-self.block:, np.newaxis], signal[-self.block:, np.newaxis],
+                                                  self.rails)[:, 0]
+                usable[-tail:] &= recent[-tail:]
+
+        peaks = detect_r_peaks(signal, self.fs, usable=usable) + start
+        keep = (peaks >= self._accepted_upto) & (peaks < limit)
+        if self._last_peak is not None:
+            keep &= peaks - self._last_peak >= self.refractory
+        beats, local_peaks = extract_beat_windows(signal, peaks[keep] - start, self.window)
+        if usable is not None:
+            complete = beat_lead_mask(usable, local_peaks, self.window)[:, 0]
+            beats, local_peaks = beats[complete], local_peaks[complete]
+            self.excluded_samples += int((~usable[max(0, self._accepted_upto - start):max(0, limit - start)]).sum())
+        peaks = local_peaks + start
+
+        self._accepted_upto = max(self._accepted_upto, limit)
+        if peaks.size:
+            self._last_peak = int(peaks[-1])
+        return beats, peaks
+
+    def _completed_at(self, sample_index: int) -> float:
+        """Arrival time of the frame that delivered ``sample_index``"""
+        for frame_end, arrived in self._arrivals:
+            if frame_end > sample_index:
+                return arrived
+        return time.monotonic()
+
+    def record_scores(self, peaks: np.ndarray, scores: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Turn scored beats into events for the client.
+
+        Args:
+            peaks (np.ndarray): Absolute R-peak sample indices
+            scores (np.ndarray): Abnormality probability per beat
+
+        Returns:
+            List[Dict[str, Any]]: A "beats" event followed by any episode start/end events
+        """
+        now = time.monotonic()
+        beats, episodes = [], []
+        for peak, score in zip(peaks.tolist(), np.asarray(scores, dtype=np.float32).ravel().tolist()):
+            abnormal = score > 0.5
+            beat_time = peak / self.fs
+            latency = now - self._completed_at(peak + self.window // 2)
+            STREAM_BEAT_LATENCY.observe(latency)
+            beats.append({
+                "time": round(beat_time, 3),
+                "score": round(score, 4),
+                "label": "abnormal" if abnormal else "normal",
+                "latency_ms": round(latency * 1000.0, 1)
+            })
+            self.beat_count += 1
+            self.abnormal_beat_count += int(abnormal)
+            episodes.extend(self._update_episode(abnormal, beat_time))
+
+        # Frames older than the oldest beat that can still be emitted are no longer needed
+        horizon = self._accepted_upto
+        while len(self._arrivals) > 1 and self._arrivals[1][0] <= horizon:
+            self._arrivals.popleft()
+        return [{"type": "beats", "beats": beats}] + episodes
+
+    def _update_episode(self, abnormal: bool, beat_time: float) -> List[Dict[str, Any]]:
+        self._recent.append(abnormal)
+        if len(self._recent) < self._recent.maxlen:
+            return []
+        fraction = sum(self._recent) / len(self._recent)
+        if self._episode_start is None and fraction >= settings.ECG_STREAM_EPISODE_FRACTION:
+            self._episode_start = beat_time
+            return [{"type": "episode", "state": "start", "start_time": round(beat_time, 3), "abnormal_fraction": fraction}]
+        if self._episode_start is not None and fraction <= settings.ECG_STREAM_EPISODE_FRACTION / 2:
+            start_time, self._episode_start = self._episode_start, None
+            return [{"type": "episode", "state": "end", "start_time": round(start_time, 3),
+                     "end_time": round(beat_time, 3), "abnormal_fraction": fraction}]
+        return []
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "type": "summary",
+            "duration_seconds": round(self.ring.total / self.fs, 3),
+            "excluded_seconds": round(self.excluded_samples / self.fs, 3),
+            "beat_count": self.beat_count,
+            "abnormal_beat_count": self.abnormal_beat_count,
+            "episode_open": self._episode_start is not None
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesces beat windows from many stream sessions into shared model calls.
+
+    Sessions await ``score``; a single collector task drains the queue,
+    waits up to ``max_delay`` for more work when the batch is small, and
+    dispatches each batch to the inference executor without blocking the
+    collection of the next one.
+    """
+
+    def __init__(self, predict: Callable[[np.ndarray], np.ndarray], max_batch: int, max_delay: float, name: str):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.name = name
+        self._queue = None
+        self._task = None
+
+    async def score(self, beats: np.ndarray) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._collect())
+        future = loop.create_future()
+        self._queue.put_nowait((beats, future))
+        return await future
+
+    def _drain(self, items: List[Tuple[np.ndarray, asyncio.Future]], count: int) -> int:
+        while count < self.max_batch and not self._queue.empty():
+            item = self._queue.get_nowait()
+            items.append(item)
+            count += item[0].shape[0]
+        return count
+
+    async def _collect(self) -> None:
+        while True:
+            first = await self._queue.get()
+            items = [first]
+            count = self._drain(items, first[0].shape[0])
+            if count < self.max_batch and self.max_delay > 0:
+                await asyncio.sleep(self.max_delay)
+                count = self._drain(items, count)
+            asyncio.get_running_loop().create_task(self._dispatch(items))
+
+    async def _dispatch(self, items: List[Tuple[np.ndarray, asyncio.Future]]) -> None:
+        batch = np.concatenate([beats for beats, _ in items])
+        MODEL_BATCH_SIZE.observe(batch.shape[0], model=self.name)
+        try:
+            scores = np.asarray(await run_in_executor(inference_executor, self.predict, batch)).ravel()
+        except Exception as e:
+            logger.error("Stream batch inference failed", error=str(e), batch_size=batch.shape[0], exc_info=True)
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        offset = 0
+        for beats, future in items:
+            if not future.done():
+                future.set_result(scores[offset:offset + beats.shape[0]])
+            offset += beats.shape[0]
+
+
+def _predict_beats(batch: np.ndarray) -> np.ndarray:
+    # Resolved per call so a reloaded model is picked up; the batch holds its version until it is scored
+    with ecg_service.models.acquire() as version:
+        return version.artifacts.predict(batch, verbose=0)
+
+
+# Live sessions in this process, by session id
+active_sessions: Dict[str, StreamSession] = {}
+STREAM_SESSIONS.set_function(lambda: len(active_sessions))
+
+stream_batcher = MicroBatcher(
+    _predict_beats,
+    max_batch=settings.ECG_STREAM_MAX_BATCH,
+    max_delay=settings.ECG_STREAM_MAX_DELAY_MS / 1000.0,
+    name="ecg_stream"
+)
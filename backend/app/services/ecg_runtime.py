@@ -0,0 +1,721 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.core import get_logger
+from app.core.cache import file_fingerprint
+from app.core.metrics import MODEL_TRACES
+
+logger = get_logger(__name__)
+
+# Layers that are identity at inference time
+_PASSTHROUGH_LAYERS = {"InputLayer", "Dropout", "SpatialDropout1D", "GaussianNoise", "GaussianDropout"}
+SUPPORTED_LAYERS = {
+    "Conv1D", "MaxPooling1D", "AveragePooling1D", "GlobalAveragePooling1D", "GlobalMaxPooling1D",
+    "Dense", "Flatten", "BatchNormalization", "Activation"
+} | _PASSTHROUGH_LAYERS
+# Layers after the last convolution that Grad-CAM can differentiate
+_HEAD_LAYERS = {"GlobalAveragePooling1D", "GlobalMaxPooling1D", "Flatten", "Dense", "BatchNormalization",
+                "Activation"} | _PASSTHROUGH_LAYERS
+# Layers whose output can be a view of their input
+_VIEW_LAYERS = {"Flatten"} | _PASSTHROUGH_LAYERS
+_CONFIG_KEY = "__layers__"
+# Layer config next to the memory-mapped .npy weights
+_MAPPED_CONFIG = "layers.json"
+# Upper bound on im2col scratch size (float32 elements, ~64 MB)
+_IM2COL_BLOCK_ELEMENTS = 16 * 1024 * 1024
+
+
+def _activation(x: np.ndarray, name: str) -> np.ndarray:
+    if name in (None, "linear"):
+        return x
+    if name == "relu":
+        return np.maximum(x, 0, out=x)
+    if name == "sigmoid":
+        # Numerically stable logistic
+        decay = np.exp(-np.abs(x))
+        return np.where(x >= 0, 1.0 / (1.0 + decay), decay / (1.0 + decay)).astype(x.dtype, copy=False)
+    if name == "tanh":
+        return np.tanh(x, out=x)
+    if name == "softmax":
+        shifted = x - x.max(axis=-1, keepdims=True)
+        np.exp(shifted, out=shifted)
+        return shifted / shifted.sum(axis=-1, keepdims=True)
+    raise ValueError(f"Unsupported activation: {name}")
+
+
+def _same_padding(x: np.ndarray, kernel_size: int, stride: int, value: float = 0.0) -> np.ndarray:
+    length = x.shape[1]
+    out_length = -(-length // stride)
+    total = max((out_length - 1) * stride + kernel_size - length, 0)
+    if total == 0:
+        return x
+    return np.pad(x, ((0, 0), (total // 2, total - total // 2), (0, 0)), constant_values=value)
+
+
+def _conv1d(x: np.ndarray, layer: Dict[str, Any]) -> np.ndarray:
+    kernel = layer["kernel"]  # (K, C_in, C_out)
+    kernel_size, channels_in, channels_out = kernel.shape
+    stride = layer["strides"]
+    dilation = layer["dilation_rate"]
+    if layer["padding"] == "same":
+        x = _same_padding(x, (kernel_size - 1) * dilation + 1, stride)
+    elif layer["padding"] == "causal":
+        x = np.pad(x, ((0, 0), ((kernel_size - 1) * dilation, 0), (0, 0)))
+
+    span = (kernel_size - 1) * dilation + 1
+    # (N, L_out, C_in, span) view without copying, then pick taps / strides
+    windows = sliding_window_view(x, span, axis=1)[:, ::stride, :, ::dilation]
+    batch, out_length = windows.shape[:2]
+    out = np.empty((batch, out_length, channels_out), dtype=np.float32)
+    # im2col: contiguous (N * steps, K * C_in) blocks, so each block is a single BLAS matmul;
+    # blocking along time bounds the scratch memory for long inputs
+    steps = max(1, _IM2COL_BLOCK_ELEMENTS // max(1, batch * kernel_size * channels_in))
+    for start in range(0, out_length, steps):
+        block = windows[:, start:start + steps]
+        columns = np.ascontiguousarray(block.transpose(0, 1, 3, 2)).reshape(-1, kernel_size * channels_in)
+        result = columns @ layer["kernel_matrix"]
+        if layer["bias"] is not None:
+            result += layer["bias"]
+        out[:, start:start + steps] = result.reshape(batch, block.shape[1], channels_out)
+    return _activation(out, layer["activation"])
+
+
+def _pool1d(x: np.ndarray, layer: Dict[str, Any], reducer) -> np.ndarray:
+    pool = layer["pool_size"]
+    stride = layer["strides"]
+    if layer["padding"] == "same":
+        # As in Keras, padding never wins a max and is left out of an average
+        if reducer is np.max:
+            return _pool_windows(_same_padding(x, pool, stride, -np.inf), pool, stride, np.max)
+        valid = _same_padding(np.ones((1, x.shape[1], 1), dtype=x.dtype), pool, stride)
+        return (_pool_windows(_same_padding(x, pool, stride), pool, stride, np.sum) /
+                _pool_windows(valid, pool, stride, np.sum))
+    return _pool_windows(x, pool, stride, reducer)
+
+
+def _pool_windows(x: np.ndarray, pool: int, stride: int, reducer) -> np.ndarray:
+    if stride == pool:
+        # Non-overlapping pools reduce over a reshaped view
+        length = (x.shape[1] // pool) * pool
+        return reducer(x[:, :length].reshape(x.shape[0], length // pool, pool, x.shape[2]), axis=2)
+    windows = sliding_window_view(x, pool, axis=1)[:, ::stride]
+    return reducer(windows, axis=-1)
+
+
+def _dense(x: np.ndarray, layer: Dict[str, Any]) -> np.ndarray:
+    out = x @ layer["kernel"]
+    if layer["bias"] is not None:
+        out += layer["bias"]
+    return _activation(out, layer["activation"])
+
+
+def _batch_norm(x: np.ndarray, layer: Dict[str, Any]) -> np.ndarray:
+    return x * layer["scale"] + layer["offset"]
+
+
+def _activation_derivative(y: np.ndarray, name: str) -> np.ndarray:
+    """Derivative of an activation expressed through its output ``y``"""
+    if name in (None, "linear"):
+        return np.ones_like(y)
+    if name == "relu":
+        return (y > 0).astype(y.dtype)
+    if name == "sigmoid":
+        return y * (1 - y)
+    if name == "tanh":
+        return 1 - y * y
+    raise ValueError(f"Unsupported activation for Grad-CAM: {name}")
+
+
+def grad_cam(activations: np.ndarray, grad: np.ndarray, length: int) -> np.ndarray:
+    """
+    Grad-CAM map from a conv layer's activations and the output gradient w.r.t. them.
+
+    Channels are weighted by their time-averaged gradient, summed, rectified
+    and linearly resized to the input length.
+
+    Args:
+        activations (np.ndarray): (N, steps, channels)
+        grad (np.ndarray): Same shape, d(logit)/d(activations)
+        length (int): Input length to resize to
+
+    Returns:
+        np.ndarray: float32 (N, length), non-negative
+    """
+    weights = grad.mean(axis=1)
+    return _resize_cam(np.maximum(np.einsum("nsc,nc->ns", activations, weights), 0), length)
+
+
+def _resize_cam(cam: np.ndarray, length: int) -> np.ndarray:
+    """Linearly resize (N, steps) saliency maps to (N, length)"""
+    steps = cam.shape[1]
+    if steps == length:
+        return cam.astype(np.float32, copy=False)
+    # Sample centres of the coarse map in input coordinates
+    positions = (np.arange(length) + 0.5) * steps / length - 0.5
+    lower = np.clip(np.floor(positions).astype(np.int64), 0, steps - 1)
+    upper = np.minimum(lower + 1, steps - 1)
+    fraction = np.clip(positions - lower, 0, 1).astype(np.float32)
+    return (cam[:, lower] * (1 - fraction) + cam[:, upper] * fraction).astype(np.float32, copy=False)
+
+
+class NumpyECGModel:
+    """
+    TensorFlow-free runtime for the sequential ECG CNN.
+
+    Executes Conv1D / pooling / Dense stacks exported by
+    ``export_keras_model`` using im2col convolutions and BLAS matmuls.
+    Exposes ``predict`` with the same contract as ``keras.Model.predict``.
+    """
+
+    def __init__(self, layers: List[Dict[str, Any]]):
+        self.layers = layers
+
+    @classmethod
+    def load(cls, path: str, mmap_dir: str = None) -> "NumpyECGModel":
+        """
+        Load a model exported to ``.npz``.
+
+        With ``mmap_dir`` the prepared weights are written once as ``.npy``
+        files under a directory named after the archive's fingerprint and
+        memory-mapped read-only from there. The pages are then backed by the
+        file, so every worker process on the host shares one physical copy
+        (including workers that reloaded the model after forking).
+
+        Args:
+            path (str): ``.npz`` written by ``export_keras_model``
+            mmap_dir (str): Directory for the memory-mapped weights; weights are loaded onto the heap without it
+
+        Returns:
+            NumpyECGModel: The model
+        """
+        if mmap_dir:
+            mapped_dir = os.path.join(mmap_dir, file_fingerprint(path)[:16])
+            if not os.path.exists(os.path.join(mapped_dir, _MAPPED_CONFIG)):
+                cls._load_archive(path).save_mapped(mapped_dir)
+            model = cls.load_mapped(mapped_dir)
+        else:
+            model = cls._load_archive(path)
+        logger.info("NumPy ECG model loaded", model_path=path, layer_count=len(model.layers),
+                    memory_mapped=bool(mmap_dir))
+        return model
+
+    @classmethod
+    def _load_archive(cls, path: str) -> "NumpyECGModel":
+        with np.load(path, allow_pickle=False) as archive:
+            config = json.loads(str(archive[_CONFIG_KEY]))
+            arrays = {key: archive[key] for key in archive.files if key != _CONFIG_KEY}
+        layers = []
+        for index, layer_config in enumerate(config):
+            layer = dict(layer_config)
+            for name in layer.pop("weights", []):
+                layer[name] = arrays[f"{index}/{name}"].astype(np.float32, copy=False)
+            layers.append(cls._prepare_layer(layer))
+        return cls(layers)
+
+    def save_mapped(self, directory: str) -> None:
+        """Write the prepared layers as ``.npy`` files plus a JSON config, atomically replacing ``directory``"""
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=parent, prefix=".staging-")
+        try:
+            config = []
+            for index, layer in enumerate(self.layers):
+                entry = {key: value for key, value in layer.items() if not isinstance(value, np.ndarray)}
+                entry["arrays"] = [key for key, value in layer.items() if isinstance(value, np.ndarray)]
+                for name in entry["arrays"]:
+                    np.save(os.path.join(staging, f"{index}_{name}.npy"), layer[name])
+                config.append(entry)
+            with open(os.path.join(staging, _MAPPED_CONFIG), "w") as f:
+                json.dump(config, f)
+            try:
+                os.rename(staging, directory)
+            except OSError:
+                # Another process mapped the same archive first; its copy is identical
+                if not os.path.exists(os.path.join(directory, _MAPPED_CONFIG)):
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    @classmethod
+    def load_mapped(cls, directory: str) -> "NumpyECGModel":
+        """Memory-map layers written by ``save_mapped`` (read-only)"""
+        with open(os.path.join(directory, _MAPPED_CONFIG)) as f:
+            config = json.load(f)
+        layers = []
+        for index, entry in enumerate(config):
+            layer = {key: value for key, value in entry.items() if key != "arrays"}
+            for name in entry["arrays"]:
+                layer[name] = np.load(os.path.join(directory, f"{index}_{name}.npy"), mmap_mode="r")
+            layers.append(layer)
+        return cls(layers)
+
+    @staticmethod
+    def _prepare_layer(layer: Dict[str, Any]) -> Dict[str, Any]:
+        layer_type = layer["type"]
+        if layer_type not in SUPPORTED_LAYERS:
+            raise ValueError(f"Unsupported layer type for NumPy runtime: {layer_type}")
+        if layer_type in ("Conv1D", "Dense"):
+            layer.setdefault("bias", None)
+        if layer_type == "Conv1D":
+            kernel = layer["kernel"]
+            layer["kernel_matrix"] = np.ascontiguousarray(kernel.reshape(-1, kernel.shape[2]))
+        if layer_type == "BatchNormalization":
+            # Fold inference-time normalisation into one multiply-add
+            scale = layer.get("gamma", 1.0) / np.sqrt(layer["moving_variance"] + layer["epsilon"])
+            layer["scale"] = scale.astype(np.float32)
+            layer["offset"] = (layer.get("beta", 0.0) - layer["moving_mean"] * scale).astype(np.float32)
+        return layer
+
+    @staticmethod
+    def _apply(x: np.ndarray, layer: Dict[str, Any]) -> np.ndarray:
+        layer_type = layer["type"]
+        if layer_type in _PASSTHROUGH_LAYERS:
+            return x
+        if layer_type == "Conv1D":
+            return _conv1d(x, layer)
+        if layer_type == "MaxPooling1D":
+            return _pool1d(x, layer, np.max)
+        if layer_type == "AveragePooling1D":
+            return _pool1d(x, layer, np.mean)
+        if layer_type == "GlobalAveragePooling1D":
+            return x.mean(axis=1)
+        if layer_type == "GlobalMaxPooling1D":
+            return x.max(axis=1)
+        if layer_type == "Flatten":
+            return x.reshape(x.shape[0], -1)
+        if layer_type == "Dense":
+            return _dense(x, layer)
+        if layer_type == "BatchNormalization":
+            return _batch_norm(x, layer)
+        if layer_type == "Activation":
+            return _activation(x, layer["activation"])
+        return x
+
+    def _forward(self, x: np.ndarray, layers: List[Dict[str, Any]] = None) -> np.ndarray:
+        # Activations work in place; copy first while x may still be a view of the caller's input
+        shared = True
+        for layer in self.layers if layers is None else layers:
+            if shared and layer["type"] == "Activation":
+                x, shared = x.copy(), False
+            x = self._apply(x, layer)
+            shared = shared and layer["type"] in _VIEW_LAYERS
+        return x
+
+    @property
+    def cam_layer_index(self) -> Optional[int]:
+        """
+        Index of the last Conv1D layer, or None when Grad-CAM is not supported.
+
+        The layers after it (the head) must all be differentiable here:
+        global pooling, Flatten, Dense, BatchNormalization, Activation and
+        pass-through layers, ending in a single sigmoid or linear unit.
+        """
+        conv = [index for index, layer in enumerate(self.layers) if layer["type"] == "Conv1D"]
+        if not conv:
+            return None
+        head = self.layers[conv[-1] + 1:]
+        if not all(layer["type"] in _HEAD_LAYERS for layer in head):
+            return None
+        last = next((layer for layer in reversed(head) if layer["type"] == "Dense"), None)
+        if last is None or last["kernel"].shape[1] != 1 or last["activation"] not in (None, "linear", "sigmoid"):
+            return None
+        return conv[-1]
+
+    def _head_gradient(self, activations: np.ndarray, head: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Outputs of the head and the gradient of the output logit w.r.t. its input.
+
+        The head is a handful of small dense layers, so the backward pass is
+        a few batched matmuls; the convolutions are never differentiated.
+        The final sigmoid is left out of the gradient (the logit is used), so
+        confidently classified beats do not get vanishing attributions.
+        """
+        inputs, x = [], activations
+        for layer in head:
+            inputs.append(x)
+            # Activations work in place; keep the cached input intact
+            x = self._apply(x.copy() if layer["type"] == "Activation" else x, layer)
+        outputs = x
+        last_dense = max(index for index, layer in enumerate(head) if layer["type"] == "Dense")
+        grad = np.ones_like(outputs)
+        for index in range(len(head) - 1, -1, -1):
+            layer, layer_input = head[index], inputs[index]
+            layer_type = layer["type"]
+            # Activations at or after the last Dense map the logit to the output; skip them
+            output_activation = index >= last_dense
+            layer_output = inputs[index + 1] if index + 1 < len(head) else outputs
+            if layer_type in ("Activation", "Dense") and not output_activation:
+                grad = grad * _activation_derivative(layer_output, layer["activation"])
+            if layer_type == "Dense":
+                grad = grad @ layer["kernel"].T
+            elif layer_type == "BatchNormalization":
+                grad = grad * layer["scale"]
+            elif layer_type == "Flatten":
+                grad = grad.reshape(layer_input.shape)
+            elif layer_type == "GlobalAveragePooling1D":
+                grad = np.broadcast_to(grad[:, np.newaxis, :] / layer_input.shape[1], layer_input.shape)
+            elif layer_type == "GlobalMaxPooling1D":
+                winners = layer_input == layer_input.max(axis=1, keepdims=True)
+                grad = winners * (grad[:, np.newaxis, :] / winners.sum(axis=1, keepdims=True))
+        return outputs, grad
+
+    def predict_with_cam(self, x: np.ndarray, batch_size: int = 256) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Outputs plus a Grad-CAM saliency map per input, from one forward pass.
+
+        The activations of the last Conv1D layer come from the same forward
+        pass that produces the outputs; only the head is differentiated.
+
+        Args:
+            x (np.ndarray): Input of shape (N, length, channels)
+            batch_size (int): Samples per forward pass
+
+        Returns:
+            Tuple[np.ndarray, Optional[np.ndarray]]: (outputs of shape (N, 1), non-negative saliency
+            of shape (N, length) or None if the architecture is not supported)
+        """
+        split = self.cam_layer_index
+        if split is None:
+            return self.predict(x, batch_size=batch_size), None
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[..., np.newaxis]
+        outputs, cams = [], []
+        for start in range(0, x.shape[0], batch_size):
+            activations = self._forward(x[start:start + batch_size], self.layers[:split + 1])
+            out, grad = self._head_gradient(activations, self.layers[split + 1:])
+            outputs.append(out)
+            cams.append(grad_cam(activations, grad, x.shape[1]))
+        if not outputs:
+            return np.empty((0, 1), dtype=np.float32), np.empty((0, x.shape[1]), dtype=np.float32)
+        return np.concatenate(outputs, axis=0), np.concatenate(cams, axis=0)
+
+    def predict(self, x: np.ndarray, batch_size: int = 256, verbose: int = 0) -> np.ndarray:
+        """
+        Run inference on a batch of inputs.
+
+        Args:
+            x (np.ndarray): Input of shape (N, length, channels)
+            batch_size (int): Samples per forward pass; bounds im2col memory
+
+        Returns:
+            np.ndarray: Model outputs of shape (N, units)
+        """
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[..., np.newaxis]
+        outputs = [self._forward(x[start:start + batch_size]) for start in range(0, x.shape[0], batch_size)]
+        return np.concatenate(outputs, axis=0) if outputs else np.empty((0, 1), dtype=np.float32)
+
+
+def _batch_bucket(size: int) -> int:
+    """Round a batch size up to the next power of two"""
+    return 1 << max(0, int(size) - 1).bit_length()
+
+
+class KerasECGModel:
+    """
+    Keras model behind a single compiled ``tf.function``.
+
+    ``Model.predict`` rebuilds its data pipeline on every call and retraces
+    for new input shapes. Here the forward pass is traced once against a
+    fixed ``(None, window, 1)`` signature and called directly. Batches are
+    zero-padded up to a power of two so an XLA-compiled function only ever
+    sees ``log2(max_batch_size) + 1`` distinct shapes.
+    """
+
+    def __init__(self, model, jit_compile: bool = False, max_batch_size: int = 1024, name: str = "ecg"):
+        import tensorflow as tf
+
+        self.model = model
+        self.window = int(model.input_shape[1])
+        self.channels = int(model.input_shape[2] or 1)
+        self.max_batch_size = _batch_bucket(max_batch_size)
+        self.name = name
+
+        def forward(x):
+            # Python side effects only run while tracing, so this counts graph builds
+            MODEL_TRACES.inc(model=name)
+            return model(x, training=False)
+
+        self._forward = tf.function(
+            forward,
+            input_signature=[tf.TensorSpec([None, self.window, self.channels], tf.float32)],
+            jit_compile=jit_compile
+        )
+        # Trace (and compile) now rather than on the first request
+        self._run(np.zeros((1, self.window, self.channels), dtype=np.float32))
+        # Grad-CAM function, built on first use (False: not built yet)
+        self._cam_function = False
+        self._cam_lock = threading.Lock()
+
+    def _run(self, x: np.ndarray) -> np.ndarray:
+        count = x.shape[0]
+        bucket = _batch_bucket(count)
+        if bucket != count:
+            padded = np.zeros((bucket,) + x.shape[1:], dtype=np.float32)
+            padded[:count] = x
+            x = padded
+        return self._forward(x).numpy()[:count]
+
+    def _build_cam_function(self):
+        """
+        ``tf.function`` returning outputs and Grad-CAM maps, or None if unsupported.
+
+        The model is split at its last Conv1D layer: the body runs once and
+        its activations feed both the head (for the outputs) and one
+        ``GradientTape`` over the head for the whole batch.
+        """
+        import tensorflow as tf
+
+        layers = [layer for layer in self.model.layers if type(layer).__name__ != "InputLayer"]
+        conv = [index for index, layer in enumerate(layers) if type(layer).__name__ == "Conv1D"]
+        if not conv:
+            return None
+        head = layers[conv[-1] + 1:]
+        if not all(type(layer).__name__ in _HEAD_LAYERS for layer in head) or not head:
+            return None
+        last = head[-1]
+        if type(last).__name__ != "Dense" or int(last.units) != 1:
+            return None
+        activation = getattr(last.activation, "__name__", "")
+        if activation not in ("sigmoid", "linear"):
+            return None
+        body = tf.keras.Model(self.model.inputs, layers[conv[-1]].output)
+        window, name = self.window, self.name
+
+        def explain(x):
+            MODEL_TRACES.inc(model=f"{name}-cam")
+            activations = body(x, training=False)
+            with tf.GradientTape() as tape:
+                tape.watch(activations)
+                hidden = activations
+                for layer in head[:-1]:
+                    hidden = layer(hidden, training=False)
+                # Differentiate the logit, not the sigmoid
+                logit = tf.matmul(hidden, last.kernel)
+                if last.use_bias:
+                    logit = logit + last.bias
+                # Beats are independent, so one backward pass over the sum gives every beat's gradient
+                target = tf.reduce_sum(logit)
+            grads = tape.gradient(target, activations)
+            outputs = last.activation(logit)
+            weights = tf.reduce_mean(grads, axis=1)
+            cam = tf.nn.relu(tf.einsum("nsc,nc->ns", activations, weights))
+            return outputs, cam
+
+        return tf.function(
+            explain,
+            input_signature=[tf.TensorSpec([None, window, self.channels], tf.float32)]
+        )
+
+    def predict_with_cam(self, x: np.ndarray, batch_size: int = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Outputs plus a Grad-CAM saliency map per input.
+
+        Args:
+            x (np.ndarray): Input of shape (N, window, channels)
+            batch_size (int): Samples per call, capped at ``max_batch_size``
+
+        Returns:
+            Tuple[np.ndarray, Optional[np.ndarray]]: (outputs of shape (N, 1), non-negative saliency
+            of shape (N, window) or None if the architecture is not supported)
+        """
+        if self._cam_function is False:
+            with self._cam_lock:
+                if self._cam_function is False:
+                    self._cam_function = self._build_cam_function()
+        if self._cam_function is None:
+            return self.predict(x, batch_size=batch_size), None
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[..., np.newaxis]
+        step = min(batch_size or self.max_batch_size, self.max_batch_size)
+        outputs, cams = [], []
+        for start in range(0, x.shape[0], step):
+            batch = x[start:start + step]
+            count = batch.shape[0]
+            bucket = _batch_bucket(count)
+            if bucket != count:
+                padded = np.zeros((bucket,) + batch.shape[1:], dtype=np.float32)
+                padded[:count] = batch
+                batch = padded
+            out, cam = self._cam_function(batch)
+            outputs.append(out.numpy()[:count])
+            cams.append(cam.numpy()[:count])
+        if not outputs:
+            return np.empty((0, 1), dtype=np.float32), np.empty((0, self.window), dtype=np.float32)
+        return np.concatenate(outputs, axis=0), _resize_cam(np.concatenate(cams, axis=0), self.window)
+
+    def predict(self, x: np.ndarray, batch_size: int = None, verbose: int = 0) -> np.ndarray:
+        """
+        Run inference on a batch of inputs.
+
+        Args:
+            x (np.ndarray): Input of shape (N, window, channels)
+            batch_size (int): Samples per call, capped at ``max_batch_size``
+
+        Returns:
+            np.ndarray: Model outputs of shape (N, units)
+        """
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[..., np.newaxis]
+        if x.shape[1:] != (self.window, self.channels):
+            raise ValueError(f"ECG model expects inputs of shape (N, {self.window}, {self.channels}), got {x.shape}")
+        step = min(batch_size or self.max_batch_size, self.max_batch_size)
+        outputs = [self._run(x[start:start + step]) for start in range(0, x.shape[0], step)]
+        return np.concatenate(outputs, axis=0) if outputs else np.empty((0, 1), dtype=np.float32)
+
+
+def _load_tflite_interpreter_class():
+    """Prefer the standalone tflite-runtime wheel, fall back to TensorFlow's bundled interpreter"""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteECGModel:
+    """
+    TFLite runtime for the ECG CNN (float, dynamic-range or full-integer models).
+
+    ``tf.lite.Interpreter`` is not thread safe, so each worker thread lazily
+    builds its own interpreter from the shared model bytes and keeps it for
+    the life of the thread. The input tensor is only resized (and tensors
+    re-allocated) when the batch shape changes.
+    """
+
+    def __init__(self, model_content: bytes, num_threads: Optional[int] = None, model_path: str = None):
+        self.model_content = model_content
+        self.num_threads = num_threads
+        self.model_path = model_path
+        self._interpreter_class = _load_tflite_interpreter_class()
+        self._local = threading.local()
+        # Build one interpreter eagerly so a broken model fails at load time
+        self._interpreter()
+
+    @classmethod
+    def load(cls, path: str, num_threads: Optional[int] = None) -> "TFLiteECGModel":
+        """Load a ``.tflite`` flatbuffer"""
+        with open(path, "rb") as f:
+            model_content = f.read()
+        model = cls(model_content, num_threads=num_threads, model_path=path)
+        logger.info("TFLite ECG model loaded",
+                    model_path=path,
+                    model_bytes=len(model_content),
+                    input_dtype=np.dtype(model._interpreter()[1]["dtype"]).name)
+        return model
+
+    def _interpreter(self) -> Tuple[Any, Dict[str, Any], Dict[str, Any]]:
+        state = getattr(self._local, "state", None)
+        if state is None:
+            interpreter = self._interpreter_class(model_content=self.model_content, num_threads=self.num_threads)
+            interpreter.allocate_tensors()
+            state = (interpreter, interpreter.get_input_details()[0], interpreter.get_output_details()[0])
+            self._local.state = state
+            self._local.input_shape = tuple(state[1]["shape"])
+        return state
+
+    def _invoke(self, x: np.ndarray) -> np.ndarray:
+        interpreter, input_details, output_details = self._interpreter()
+        if self._local.input_shape != x.shape:
+            interpreter.resize_tensor_input(input_details["index"], x.shape, strict=False)
+            interpreter.allocate_tensors()
+            self._local.input_shape = x.shape
+            # Indices are stable across resizes, quantisation parameters too
+            input_details = interpreter.get_input_details()[0]
+            output_details = interpreter.get_output_details()[0]
+            self._local.state = (interpreter, input_details, output_details)
+
+        input_dtype = input_details["dtype"]
+        if input_dtype != np.float32:
+            scale, zero_point = input_details["quantization"]
+            info = np.iinfo(input_dtype)
+            x = np.clip(np.round(x / scale + zero_point), info.min, info.max).astype(input_dtype)
+        interpreter.set_tensor(input_details["index"], x)
+        interpreter.invoke()
+        out = interpreter.get_tensor(output_details["index"])
+        if output_details["dtype"] != np.float32:
+            scale, zero_point = output_details["quantization"]
+            out = (out.astype(np.float32) - zero_point) * scale
+        return out
+
+    def predict(self, x: np.ndarray, batch_size: int = 256, verbose: int = 0) -> np.ndarray:
+        """
+        Run inference on a batch of inputs.
+
+        Args:
+            x (np.ndarray): Input of shape (N, length, channels)
+            batch_size (int): Samples per interpreter invocation
+
+        Returns:
+            np.ndarray: Model outputs of shape (N, units)
+        """
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[..., np.newaxis]
+        outputs = [self._invoke(x[start:start + batch_size]) for start in range(0, x.shape[0], batch_size)]
+        return np.concatenate(outputs, axis=0) if outputs else np.empty((0, 1), dtype=np.float32)
+
+
+def export_keras_model(model, output_path: str) -> None:
+    """
+    Export a sequential Keras model's inference graph and weights to ``.npz``.
+
+    Args:
+        model: Loaded ``tf.keras`` Sequential model
+        output_path (str): Destination ``.npz`` path
+    """
+    config = []
+    arrays = {}
+    for index, keras_layer in enumerate(model.layers):
+        layer_type = type(keras_layer).__name__
+        if layer_type not in SUPPORTED_LAYERS:
+            raise ValueError(f"Layer {keras_layer.name} ({layer_type}) is not supported by the NumPy runtime")
+        layer_config = keras_layer.get_config()
+        entry: Dict[str, Any] = {"type": layer_type, "name": keras_layer.name}
+        weight_names: List[str] = []
+
+        if layer_type in ("Conv1D", "Dense"):
+            entry["activation"] = layer_config.get("activation", "linear")
+            weights = keras_layer.get_weights()
+            weight_names = ["kernel", "bias"][:len(weights)]
+            if layer_type == "Conv1D":
+                if layer_config.get("data_format", "channels_last") != "channels_last":
+                    raise ValueError("Only channels_last Conv1D layers are supported")
+                entry["strides"] = int(layer_config["strides"][0])
+                entry["dilation_rate"] = int(layer_config["dilation_rate"][0])
+                entry["padding"] = layer_config["padding"]
+        elif layer_type in ("MaxPooling1D", "AveragePooling1D"):
+            pool_size = layer_config["pool_size"]
+            strides = layer_config.get("strides") or pool_size
+            entry["pool_size"] = int(pool_size[0] if isinstance(pool_size, (list, tuple)) else pool_size)
+            entry["strides"] = int(strides[0] if isinstance(strides, (list, tuple)) else strides)
+            entry["padding"] = layer_config.get("padding", "valid")
+        elif layer_type == "BatchNormalization":
+            entry["epsilon"] = float(layer_config["epsilon"])
+            weights = keras_layer.get_weights()
+            weight_names = (["gamma"] if layer_config.get("scale", True) else []) + \
+                           (["beta"] if layer_config.get("center", True) else []) + \
+                           ["moving_mean", "moving_variance"]
+        elif layer_type == "Activation":
+            entry["activation"] = layer_config["activation"]
+
+        if weight_names:
+            for name, value in zip(weight_names, keras_layer.get_weights()):
+                arrays[f"{index}/{name}"] = np.asarray(value, dtype=np.float32)
+        entry["weights"] = weight_names
+        config.append(entry)
+
+    np.savez(output_path, **{_CONFIG_KEY: np.array(json.dumps(config))}, **arrays)
+    logger.info("Keras model exported for NumPy runtime", output_path=output_path, layer_count=len(config))
@@ -0,0 +1,201 @@
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Beats on either side used for the local RR reference
+RR_CONTEXT_BEATS = 4
+
+
+def _running_median(values: np.ndarray, half_width: int) -> np.ndarray:
+    """Median over a centred window of ``2 * half_width + 1`` values (edges padded)"""
+    padded = np.pad(values, half_width, mode="edge")
+    return np.median(sliding_window_view(padded, 2 * half_width + 1), axis=1)
+
+
+def rr_deviation(peaks: np.ndarray, fs: float) -> np.ndarray:
+    """
+    Relative deviation of each beat's preceding RR interval from the local rhythm.
+
+    Premature beats (short RR) and beats after a pause (long RR) both score high;
+    the local reference is the running median RR over the surrounding beats.
+
+    Args:
+        peaks (np.ndarray): R-peak sample indices, sorted
+        fs (float): Sampling frequency in Hz
+
+    Returns:
+        np.ndarray: ``|RR_prev / RR_local - 1|`` per beat
+    """
+    if len(peaks) < 3:
+        return np.zeros(len(peaks), dtype=np.float32)
+    rr = np.diff(peaks).astype(np.float32) / fs
+    # The first beat has no predecessor; borrow the following interval
+    rr_prev = np.concatenate((rr[:1], rr))
+    local = _running_median(rr_prev, RR_CONTEXT_BEATS)
+    return np.abs(rr_prev / local - 1.0)
+
+
+def template_correlation(beats: np.ndarray) -> np.ndarray:
+    """
+    Pearson correlation of every beat with the record's median beat.
+
+    Beats are already z-scored, so the correlation is a single matrix-vector
+    product against the z-scored template.
+
+    Args:
+        beats (np.ndarray): Beat windows of shape (n_beats, window, 1)
+
+    Returns:
+        np.ndarray: Correlation per beat in [-1, 1]
+    """
+    flat = beats.reshape(beats.shape[0], -1)
+    if flat.shape[0] == 0:
+        return np.empty(0, dtype=np.float32)
+    template = np.median(flat, axis=0)
+    template = (template - template.mean()) / (template.std() + 1e-8)
+    return (flat @ template.astype(np.float32)) / flat.shape[1]
+
+
+def screen_beats(beats: np.ndarray, peaks: np.ndarray, fs: float, min_correlation: float,
+                 rr_tolerance: float, pass_fraction: float) -> np.ndarray:
+    """
+    First stage of the cascade: decide which beats need the CNN.
+
+    A beat is unremarkable when it arrives on time (RR within ``rr_tolerance``
+    of the local rhythm) and looks like the record's dominant beat
+    (correlation at least ``min_correlation``). Everything else is ambiguous.
+    The ``pass_fraction`` most suspicious beats are always forwarded, which
+    trades CNN calls for sensitivity.
+
+    Args:
+        beats (np.ndarray): Beat windows of shape (n_beats, window, 1)
+        peaks (np.ndarray): R-peak sample indices matching ``beats``
+        fs (float): Sampling frequency in Hz
+        min_correlation (float): Template correlation below which a beat is ambiguous
+        rr_tolerance (float): Relative RR deviation above which a beat is ambiguous
+        pass_fraction (float): Minimum fraction of beats forwarded to the CNN
+
+    Returns:
+        np.ndarray: Boolean mask, True for beats that must be scored by the CNN
+    """
+    count = beats.shape[0]
+    if count < 3:
+        return np.ones(count, dtype=bool)
+
+    # Each test normalised so 1.0 is its threshold; the worse of the two decides
+    suspicion = np.maximum(
+        rr_deviation(peaks, fs) / max(rr_tolerance, 1e-6),
+        (1.0 - template_correlation(beats)) / max(1.0 - min_correlation, 1e-6)
+    )
+    forward = suspicion >= 1.0
+
+    minimum = min(count, math.ceil(pass_fraction * count))
+    if forward.sum() < minimum:
+        forward[np.argpartition(-suspicion, minimum - 1)[:minimum]] = True
+    return forward
+
+
+def _unit_rows(x: np.ndarray) -> np.ndarray:
+    """Centre and scale rows to unit norm so a dot product is the Pearson correlation"""
+    x = x - x.mean(axis=1, keepdims=True)
+    return x / (np.linalg.norm(x, axis=1, keepdims=True) + 1e-8)
+
+
+def _morphology_features(beats: np.ndarray, downsample: int) -> np.ndarray:
+    return _unit_rows(beats.reshape(beats.shape[0], -1)[:, ::max(1, downsample)].astype(np.float32))
+
+
+def cluster_beats(beats: np.ndarray, min_correlation: float, downsample: int = 4,
+                  block_size: int = 1024) -> np.ndarray:
+    """
+    Group beats by morphology with leader clustering on normalised cross-correlation.
+
+    Beats are downsampled and unit-normalised, so the correlation of a block
+    of beats against every cluster leader is one matrix product. Beats that
+    match no leader are handled one at a time and start new clusters, which
+    only happens once per distinct morphology.
+
+    Args:
+        beats (np.ndarray): Beat windows of shape (n_beats, window, 1)
+        min_correlation (float): Correlation with a leader needed to join its cluster
+        downsample (int): Keep every n-th sample before correlating
+        block_size (int): Beats correlated per matrix product
+
+    Returns:
+        np.ndarray: Cluster index per beat
+    """
+    return _leader_clusters(_morphology_features(beats, downsample), min_correlation, block_size)
+
+
+def _leader_clusters(features: np.ndarray, min_correlation: float, block_size: int = 1024) -> np.ndarray:
+    count = features.shape[0]
+    labels = np.full(count, -1, dtype=np.int64)
+    leaders = np.empty((0, features.shape[1]), dtype=np.float32)
+
+    for start in range(0, count, block_size):
+        block = features[start:start + block_size]
+        block_labels = labels[start:start + block_size]
+        if leaders.shape[0]:
+            correlation = block @ leaders.T
+            best = correlation.argmax(axis=1)
+            matched = correlation[np.arange(block.shape[0]), best] >= min_correlation
+            block_labels[matched] = best[matched]
+        for offset in np.flatnonzero(block_labels < 0):
+            beat = block[offset]
+            if leaders.shape[0]:
+                # Leaders created earlier in this block may already match
+                correlation = leaders @ beat
+                best = int(correlation.argmax())
+                if correlation[best] >= min_correlation:
+                    block_labels[offset] = best
+                    continue
+            block_labels[offset] = leaders.shape[0]
+            leaders = np.vstack((leaders, beat[np.newaxis]))
+    return labels
+
+
+def cluster_representatives(beats: np.ndarray, min_correlation: float, downsample: int = 4,
+                            min_cluster_size: int = 3):
+    """
+    Choose which beats the CNN must score when labels are shared within clusters.
+
+    Each cluster is represented by its medoid (the member closest to the
+    cluster mean). Members that correlate with their medoid below
+    ``min_correlation`` and all members of clusters smaller than
+    ``min_cluster_size`` are outliers and are scored individually.
+
+    Args:
+        beats (np.ndarray): Beat windows of shape (n_beats, window, 1)
+        min_correlation (float): Clustering and outlier correlation threshold
+        downsample (int): Keep every n-th sample before correlating
+        min_cluster_size (int): Smaller clusters are scored beat by beat
+
+    Returns:
+        tuple: (mask of beats to score with the CNN, index of the beat whose score each beat takes)
+    """
+    count = beats.shape[0]
+    if count == 0:
+        return np.zeros(0, dtype=bool), np.zeros(0, dtype=np.int64)
+    features = _morphology_features(beats, downsample)
+    labels = _leader_clusters(features, min_correlation)
+
+    cluster_count = int(labels.max()) + 1
+    sizes = np.bincount(labels, minlength=cluster_count)
+    means = np.zeros((cluster_count, features.shape[1]), dtype=np.float32)
+    np.add.at(means, labels, features)
+    means = _unit_rows(means)
+
+    # Medoid: member with the highest correlation to its cluster mean
+    to_mean = np.einsum("ij,ij->i", features, means[labels])
+    order = np.lexsort((-to_mean, labels))
+    medoids = order[np.concatenate(([0], np.cumsum(sizes)[:-1]))]
+
+    source = medoids[labels]
+    to_medoid = np.einsum("ij,ij->i", features, features[source])
+    outlier = (to_medoid < min_correlation) | (sizes[labels] < min_cluster_size)
+    source[outlier] = np.flatnonzero(outlier)
+
+    forward = np.zeros(count, dtype=bool)
+    forward[source] = True
+    return forward, source
@@ -1,158 +1,429 @@
-import tensorflow as tf
 import numpy as np
-import wfdb
 import os
-from typing import Dict, Any, List
-import uuid
+from typing import Dict, Any, Iterator, List
+from functools import partial
 from app.core import get_logger
+from app.core.config import settings
 from app.core.logging import performance_monitor
+from app.core.cache import record_cache
+from app.core.file_utils import fix_record_header
+from app.core.metrics import ECG_BEATS, ECG_EXCLUDED_SECONDS, MODEL_BATCH_SIZE, stage_timer
+from app.core.tracing import span
+from app.services.ecg_processing import (
+    BEAT_WINDOW_SECONDS, MODEL_SAMPLING_RATE, BeatLog, BeatScoreAccumulator, SaliencyAccumulator, SegmentedECG,
+    combine_lead_scores
+)
+from app.services.ecg_filters import StreamingResampler, bandpass, resample
+from app.services.ecg_quality import adc_rails, signal_quality, usable_samples, usable_windows
+from app.services.ecg_screening import cluster_representatives, screen_beats
+from app.services.ecg_stream import (
+    RunningStats, StreamingBeatSegmenter, iter_record_chunks, read_header, read_record, record_data_path,
+    record_fingerprint
+)
+from app.services.ecg_runtime import KerasECGModel, NumpyECGModel, TFLiteECGModel
+from app.services.model_registry import ModelRegistry, ModelVersion
 
 logger = get_logger(__name__)
 
 class ECGPredictionService:
     def __init__(self):
-        self.model = None
+        self._requested_backend = settings.ECG_INFERENCE_BACKEND
+        self.models = ModelRegistry("ecg", self._load_artifacts, self._model_paths, warm=self._warm)
         self.load_model()
     
-    def load_model(self):
-        """Load the trained ECG model"""
-        logger.info("Loading ECG prediction model")
-        try:
-            model_path = os.path.join("models", "best_ecg_model.h5")
-            if os.path.exists(model_path):
-                self.model = tf.keras.models.load_model(model_path)
-                # Compile the model after loading to resolve metrics warning
-                self.model.compile(
-                    optimizer='adam',
-                    loss='binary_crossentropy',
-                    metrics=['accuracy']
-                )
-                logger.info("ECG model loaded and compiled successfully", model_path=model_path)
+    @property
+    def model(self):
+        """Inference model of the current version (None when running the dummy model)"""
+        return self.models.current.artifacts
+    
+    @property
+    def backend(self):
+        return self.models.current.details.get("backend")
+    
+    def load_model(self, backend: str = None) -> ModelVersion:
+        """Load the trained ECG model with the configured inference backend and swap it in for new requests"""
+        self._requested_backend = backend or settings.ECG_INFERENCE_BACKEND
+        return self.models.reload(force=True)
+    
+    def _model_paths(self) -> List[str]:
+        backend = self._requested_backend.lower()
+        return [{
+            "numpy": settings.ECG_NUMPY_MODEL_PATH,
+            "tflite": settings.ECG_TFLITE_MODEL_PATH,
+            "keras": settings.ECG_KERAS_MODEL_PATH
+        }.get(backend, settings.ECG_KERAS_MODEL_PATH)]
+    
+    def _load_artifacts(self):
+        """Load the model file of the requested backend (None when it does not exist)"""
+        backend = self._requested_backend.lower()
+        logger.info("Loading ECG prediction model", backend=backend)
+        if backend == "numpy":
+            model = self._load_numpy_model()
+        elif backend == "tflite":
+            model = self._load_tflite_model()
+        elif backend == "keras":
+            model = self._load_keras_model()
+        else:
+            raise ValueError(f"Unknown ECG inference backend: {backend}")
+        return model, {"backend": backend} if model is not None else {}
+    
+    def _warm(self, model) -> None:
+        """Run a batch of flat beats through a new model (traces and allocates before it serves requests)"""
+        window = int(BEAT_WINDOW_SECONDS * MODEL_SAMPLING_RATE)
+        model.predict(np.zeros((max(1, settings.MODEL_WARMUP_BATCH), window, 1), dtype=np.float32), verbose=0)
+    
+    def _load_keras_model(self):
+        model_path = settings.ECG_KERAS_MODEL_PATH
+        if not os.path.exists(model_path):
+            logger.warning("ECG model file not found, using dummy model", model_path=model_path)
+            return None
+        # Imported here so the NumPy backend never pulls TensorFlow into the process
+        import tensorflow as tf
+        # Inference only: no optimizer/metrics needed, predictions go through a compiled tf.function
+        model = KerasECGModel(
+            tf.keras.models.load_model(model_path, compile=False),
+            jit_compile=settings.ECG_KERAS_JIT_COMPILE,
+            max_batch_size=settings.ECG_MAX_BATCH_SIZE
+        )
+        logger.info("ECG model loaded", model_path=model_path, jit_compile=settings.ECG_KERAS_JIT_COMPILE)
+        return model
+    
+    def _load_numpy_model(self):
+        model_path = settings.ECG_NUMPY_MODEL_PATH
+        if not os.path.exists(model_path):
+            logger.warning("Exported ECG weights not found, run export_ecg_model.py npz; using dummy model",
+                           model_path=model_path)
+            return None
+        return NumpyECGModel.load(model_path, mmap_dir=settings.ECG_NUMPY_MMAP_DIR or None)
+    
+    def _load_tflite_model(self):
+        model_path = settings.ECG_TFLITE_MODEL_PATH
+        if not os.path.exists(model_path):
+            logger.warning("TFLite ECG model not found, run export_ecg_model.py tflite; using dummy model",
+                           model_path=model_path)
+            return None
+        return TFLiteECGModel.load(model_path, num_threads=settings.ECG_TFLITE_THREADS)
+    
+    def _resolve_record(self, file_path: str) -> str:
+        """Check an uploaded record is complete and return its wfdb base path"""
+        # Get the absolute base path (without extension)
+        base_path = os.path.splitext(os.path.abspath(file_path))[0]
+        logger.debug("Base path for wfdb", base_path=base_path)
+        
+        # Safety check to ensure files exist before calling wfdb
+        dat_file = record_data_path(base_path)
+        hea_file = base_path + ".hea"
+        if dat_file is None:
+            raise FileNotFoundError(f"ECG data file not found: {base_path}.dat")
+        if not os.path.exists(hea_file):
+            raise FileNotFoundError(f"ECG header file not found: {hea_file}")
+        
+        # Make sure the header's record name matches the uploaded file name
+        with span("header_fix"):
+            fix_record_header(base_path)
+        return base_path
+    
+    def select_leads(self, signal_count: int) -> List[int]:
+        """Channel indices to analyse according to ``settings.ECG_LEADS`` ("all" or e.g. "0,1")"""
+        if settings.ECG_LEADS.strip().lower() == "all":
+            return list(range(signal_count))
+        channels = [int(value) for value in settings.ECG_LEADS.split(",") if value.strip()]
+        channels = [channel for channel in channels if 0 <= channel < signal_count]
+        if not channels:
+            raise ValueError(f"None of the configured ECG leads ({settings.ECG_LEADS}) exist in a {signal_count}-lead record")
+        return channels
+    
+    def filter_signal(self, signal: np.ndarray) -> np.ndarray:
+        """Band-pass a signal already at ``MODEL_SAMPLING_RATE`` with the configured edges"""
+        return bandpass(
+            signal, MODEL_SAMPLING_RATE,
+            low_hz=settings.ECG_BANDPASS_LOW_HZ,
+            high_hz=settings.ECG_BANDPASS_HIGH_HZ,
+            order=settings.ECG_BANDPASS_ORDER
+        )
+    
+    def quality_mask(self, raw: np.ndarray, filtered: np.ndarray, rails=None) -> np.ndarray:
+        """
+        Per-sample mask of the signal fit for analysis, from the ``ECG_SQI_*`` thresholds.
+
+        Args:
+            raw (np.ndarray): Unfiltered signal at ``MODEL_SAMPLING_RATE``, (n_samples, n_leads)
+            filtered (np.ndarray): The same signal band-passed
+            rails: ADC rails of the leads (see ``adc_rails``), used for the saturation check
+
+        Returns:
+            np.ndarray: Boolean (n_samples, n_leads), True where the lead is usable
+        """
+        with span("quality"):
+            quality = signal_quality(raw, filtered, MODEL_SAMPLING_RATE, rails)
+            usable = usable_windows(
+                quality,
+                min_amplitude=settings.ECG_SQI_MIN_AMPLITUDE_MV,
+                max_saturation=settings.ECG_SQI_MAX_SATURATION,
+                max_noise_ratio=settings.ECG_SQI_MAX_NOISE_RATIO,
+                min_kurtosis=settings.ECG_SQI_MIN_KURTOSIS
+            )
+            return usable_samples(usable, raw.shape[0], MODEL_SAMPLING_RATE)
+    
+    def _analysis_settings(self) -> tuple:
+        """Settings that change the segmented beats of a record, part of their cache key"""
+        return (
+            settings.ECG_LEADS, settings.ECG_BANDPASS_LOW_HZ, settings.ECG_BANDPASS_HIGH_HZ,
+            settings.ECG_BANDPASS_ORDER, settings.ECG_SQI_ENABLED, settings.ECG_SQI_MIN_AMPLITUDE_MV,
+            settings.ECG_SQI_MAX_SATURATION, settings.ECG_SQI_MAX_NOISE_RATIO, settings.ECG_SQI_MIN_KURTOSIS
+        )
+    
+    def _segmenter(self, rails=None) -> StreamingBeatSegmenter:
+        """Beat segmenter at the model rate: band-pass, quality gating, fused detection, windowing"""
+        return StreamingBeatSegmenter(
+            MODEL_SAMPLING_RATE, int(BEAT_WINDOW_SECONDS * MODEL_SAMPLING_RATE),
+            preprocess=self.filter_signal,
+            quality=partial(self.quality_mask, rails=rails) if settings.ECG_SQI_ENABLED else None
+        )
+    
+    def iter_chunk_predictions(self, file_path: str, chunk_seconds: float = None, model=None,
+                               saliency: SaliencyAccumulator = None) -> Iterator[Dict[str, Any]]:
+        """
+        Score a record chunk by chunk without loading it into memory.
+
+        The selected leads are decoded ``chunk_seconds`` at a time, resampled
+        to the model rate and band-passed, unusable stretches are masked,
+        beats are segmented on the fused lead with carry-over across chunk
+        boundaries and scored as soon as they are complete. Peak memory is
+        bounded by the chunk size, not the recording length.
+
+        Args:
+            file_path (str): Path to the uploaded .dat/.hea record
+            chunk_seconds (float): Overrides ``settings.ECG_CHUNK_SECONDS``
+            model: Inference model to score with, the current version's by default
+            saliency (SaliencyAccumulator): Collects attributions of the flagged beats, see ``score_beats``
+
+        Yields:
+            Dict[str, Any]: Per-chunk start/end time, beat peaks (at the model
+            rate) and scores, signal time excluded by the quality check and
+            the running signal mean/std
+        """
+        base_path = self._resolve_record(file_path)
+        header = read_header(base_path)
+        fs = float(header.fs)
+        channels = self.select_leads(header.n_sig)
+        chunk_samples = int((chunk_seconds or settings.ECG_CHUNK_SECONDS) * fs)
+        resampler = StreamingResampler(fs, MODEL_SAMPLING_RATE)
+        segmenter = self._segmenter(adc_rails(header, channels))
+        stats = RunningStats()
+        
+        chunks = iter_record_chunks(base_path, chunk_samples, channels=channels)
+        while True:
+            with stage_timer("ecg", "decode"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            start, samples, is_last = chunk
+            stats.update(samples)
+            with span("resample"):
+                resampled = resampler.push(samples, final=is_last)
+            with span("segment"):
+                segmented = segmenter.push(resampled, final=is_last)
+            if segmented.beats.shape[0]:
+                scores = self.score_beats(segmented, model=model, saliency=saliency)
             else:
-                logger.warning("ECG model file not found, using dummy model", model_path=model_path)
-        except Exception as e:
-            logger.error("Error loading ECG model", error=str(e), exc_info=True)
-            self.model = None
+                scores = np.empty(0, dtype=np.float32)
+            ECG_EXCLUDED_SECONDS.inc(segmented.excluded_seconds)
+            yield {
+                "start_time": start / fs,
+                "end_time": (start + samples.shape[0]) / fs,
+                "peaks": segmented.peaks,
+                "scores": scores,
+                "excluded_seconds": segmented.excluded_seconds,
+                "signal_mean": stats.mean,
+                "signal_std": stats.std
+            }
     
     @performance_monitor(logger)
-    def preprocess_ecg_file(self, file_path: str) -> np.ndarray:
-        """Preprocess ECG file for prediction"""
+    def preprocess_ecg_file(self, file_path: str) -> SegmentedECG:
+        """
+        Decode, condition and segment a record for prediction.
+
+        Raises instead of falling back to placeholder data: FileNotFoundError
+        for an incomplete upload, ValueError when no usable beats remain.
+        The decoded record and its segmented beats are kept in the shared
+        record cache, so repeat requests for the same files skip decoding and
+        segmentation.
+        """
         logger.info("Preprocessing ECG file", file_path=file_path)
-        try:
-            # Get the absolute base path (without extension)
-            logger.info(f"🧩 DEBUG: file_path received -> {file_path}")
-            abs_file_path = os.path.abspath(file_path)
-            logger.info(f"🧩 DEBUG: absolute path -> {abs_file_path}")
-            base_path = os.path.splitext(abs_file_path)[0]
-            logger.debug("Base path for wfdb", base_path=base_path)
-            
-            # Safety check to ensure files exist before calling wfdb
-            dat_file = base_path + ".dat"
-            hea_file = base_path + ".hea"
-            
-            if not os.path.exists(dat_file):
-                raise FileNotFoundError(f"ECG data file not found: {dat_file}")
-            if not os.path.exists(hea_file):
-                raise FileNotFoundError(f"ECG header file not found: {hea_file}")
-            
-            # --- COMPREHENSIVE HEADER FIX ---
-            try:
-                expected_name = os.path.basename(base_path)
-                
-                # Read the entire header file
-                with open(hea_file, "r", encoding="utf-8") as f:
-                    header_lines = f.readlines()
-                
-                if not header_lines:
-                    raise ValueError("Header file is empty")
-                
-                logger.info(f"📄 Original header first line: {header_lines[0].strip()}")
-                
-                # Parse the first line
-                first_line_parts = header_lines[0].strip().split()
-                old_record_name = first_line_parts[0]
-                
-                # If the record name doesn't match, update the entire header
-                if old_record_name != expected_name:
-                    logger.info(f"🔧 Fixing header: '{old_record_name}' → '{expected_name}'")
-                    
-                    # Update first line
-                    first_line_parts[0] = expected_name
-                    header_lines[0] = " ".join(first_line_parts) + "\n"
-                    
-                    # Update any other lines that reference the old filename
-                    for i in range(1, len(header_lines)):
-                        if old_record_name in header_lines[i]:
-                            header_lines[i] = header_lines[i].replace(old_record_name, expected_name)
-                            logger.info(f"📝 Updated line {i+1}: {header_lines[i].strip()}")
-                    
-                    # Write the corrected header back
-                    with open(hea_file, "w", encoding="utf-8") as f:
-                        f.writelines(header_lines)
-                    
-                    logger.info(f"✅ Header file updated successfully")
-                    
-                    # Verify the fix
-                    with open(hea_file, "r", encoding="utf-8") as f:
-                        verify_line = f.readline().strip()
-                    logger.info(f"📄 Verified header first line: {verify_line}")
+        base_path = self._resolve_record(file_path)
+        fingerprint = record_fingerprint(base_path)
+        key = (fingerprint, "beats", self._analysis_settings())
+        ecg_data = record_cache.get(key)
+        if ecg_data is not None:
+            logger.debug("ECG beats served from cache", beat_count=ecg_data.beat_count)
+            return ecg_data
+        
+        # wfdb.rdrecord with just the base path (no pn_dir to avoid PhysioNet downloads), all leads in one
+        # pass and shared with the visualization service through the record cache
+        header = read_header(base_path, fingerprint)
+        channels = self.select_leads(header.n_sig)
+        with stage_timer("ecg", "decode"):
+            record = read_record(base_path, fingerprint)
+        
+        signal = record.signal[:, channels]
+        logger.debug("ECG signal extracted", signal_shape=signal.shape, fs=record.fs)
+        
+        # The CNN expects MIT-BIH's time scale
+        if record.fs != MODEL_SAMPLING_RATE:
+            with span("resample"):
+                signal = resample(signal, record.fs, MODEL_SAMPLING_RATE)
+        
+        # Same segmenter as the chunked path, fed the whole record: band-pass, quality
+        # gating, peaks from the fused lead, every lead cut at the same peaks
+        with span("segment"):
+            ecg_data = self._segmenter(adc_rails(header, channels)).push(signal, final=True)
+        ECG_EXCLUDED_SECONDS.inc(ecg_data.excluded_seconds)
+        logger.debug("ECG beats segmented", beat_count=ecg_data.beat_count, lead_count=ecg_data.leads,
+                     excluded_seconds=ecg_data.excluded_seconds)
+        if ecg_data.beat_count == 0:
+            if ecg_data.excluded_seconds > 0:
+                raise ValueError(f"No usable ECG signal: {ecg_data.excluded_seconds:.1f} s of "
+                                 f"{signal.shape[0] / MODEL_SAMPLING_RATE:.1f} s failed the signal-quality check")
+            raise ValueError("No heartbeats detected in ECG record")
+        # Shared by every later request for this record
+        for array in (ecg_data.beats, ecg_data.peaks, ecg_data.lead_mask):
+            if array is not None:
+                array.setflags(write=False)
+        record_cache.put(key, ecg_data)
+        return ecg_data
+    
+    def score_beats(self, ecg_data: SegmentedECG, mode: str = None, model=None,
+                    saliency: SaliencyAccumulator = None) -> np.ndarray:
+        """
+        Score every beat of a record with the configured inference mode.
+
+        "full" runs the CNN on every beat. "cascade" first screens beats on
+        RR timing and template correlation and only sends the ambiguous ones to
+        the CNN; screened-out beats are scored as normal (0.0). "cluster" groups
+        beats by morphology and only scores cluster medoids and outliers, so
+        cost follows morphological diversity rather than recording length.
+
+        Multi-lead records are screened and clustered on all leads of a beat
+        together; every usable lead of the beats that need the CNN goes into
+        one batch and the per-lead scores are combined per beat
+        (``ECG_LEAD_AGGREGATION``). Leads that failed the signal-quality check
+        are zeroed for screening and never sent to the CNN.
+
+        With a ``saliency`` accumulator and a model that supports it, the same
+        batch also yields a Grad-CAM map per window (one batched backward pass
+        through the classifier head, reusing the forward activations). Lead
+        maps are averaged per beat and cluster members take their medoid's map.
+
+        Args:
+            ecg_data (SegmentedECG): Segmented record
+            mode (str): Overrides ``settings.ECG_INFERENCE_MODE``
+            model: Inference model to score with, the current version's by default
+            saliency (SaliencyAccumulator): Receives the beats' scores and attribution maps
+
+        Returns:
+            np.ndarray: Abnormality probability per beat
+        """
+        mode = (mode or settings.ECG_INFERENCE_MODE).lower()
+        model = model if model is not None else self.model
+        leads = ecg_data.leads
+        window = ecg_data.beats.shape[1]
+        lead_mask = ecg_data.lead_mask
+        if lead_mask is not None and lead_mask.all():
+            lead_mask = None
+        beats = ecg_data.beats
+        if lead_mask is not None:
+            beats = np.where(lead_mask.reshape(-1, 1, 1), beats, np.float32(0))
+        # One row per beat with its leads side by side
+        beats = beats.reshape(ecg_data.beat_count, leads * window, 1)
+        if mode == "full":
+            forward = np.ones(beats.shape[0], dtype=bool)
+        elif mode == "cascade":
+            with span("screen"):
+                forward = screen_beats(
+                    beats, ecg_data.peaks, ecg_data.fs,
+                    min_correlation=settings.ECG_CASCADE_MIN_CORRELATION,
+                    rr_tolerance=settings.ECG_CASCADE_RR_TOLERANCE,
+                    pass_fraction=settings.ECG_CASCADE_PASS_FRACTION
+                )
+        elif mode == "cluster":
+            with span("cluster"):
+                forward, source = cluster_representatives(
+                    beats,
+                    min_correlation=settings.ECG_CLUSTER_MIN_CORRELATION,
+                    downsample=settings.ECG_CLUSTER_DOWNSAMPLE,
+                    min_cluster_size=settings.ECG_CLUSTER_MIN_SIZE
+                )
+        else:
+            raise ValueError(f"Unknown ECG inference mode: {mode}")
+        
+        model_beats = int(forward.sum())
+        ECG_BEATS.inc(beats.shape[0] - model_beats, path="clustered" if mode == "cluster" else "screened")
+        ECG_BEATS.inc(model_beats, path="model")
+        logger.debug("Scoring ECG beats", mode=mode, beat_count=beats.shape[0], model_beat_count=model_beats)
+        
+        explain = saliency is not None and hasattr(model, "predict_with_cam")
+        scores = np.zeros(beats.shape[0], dtype=np.float32)
+        cams = np.zeros((beats.shape[0], window), dtype=np.float32) if explain else None
+        if model_beats:
+            batch = beats[forward].reshape(model_beats * leads, window, 1)
+            scored = lead_mask[forward].ravel() if lead_mask is not None else slice(None)
+            batch = batch[scored]
+            MODEL_BATCH_SIZE.observe(batch.shape[0], model="ecg")
+            lead_scores = np.full(model_beats * leads, np.nan, dtype=np.float32)
+            if explain:
+                with stage_timer("ecg", "infer"):
+                    outputs, batch_cams = model.predict_with_cam(batch)
+                lead_scores[scored] = outputs.ravel()
+                if batch_cams is None:
+                    explain = False
                 else:
-                    logger.info(f"✅ Header already correct: {expected_name}")
-                    
-            except Exception as e:
-                logger.error("Error fixing header file", error=str(e), exc_info=True)
-                raise
-            # --- END COMPREHENSIVE HEADER FIX ---
-            
-            # Now read with wfdb
-            logger.info(f"🔍 Calling wfdb.rdrecord with base_path: {base_path}")
-            logger.info(f"🔍 Directory contents: {os.listdir(os.path.dirname(base_path))}")
-            
-            # Use wfdb.rdrecord with just the base path (no pn_dir to avoid PhysioNet downloads)
-            record = wfdb.rdrecord(base_path)
-            
-            logger.info(f"✅ Successfully loaded record with {len(record.sig_name)} signals")
-            
-            # Extract signal data
-            signal = record.p_signal
-            logger.debug("ECG signal extracted", signal_shape=signal.shape)
-            
-            # Normalize signal
-            signal = (signal - np.mean(signal)) / np.std(signal)
-            logger.debug("ECG signal normalized")
-            
-            # Reshape for model input
-            if len(signal.shape) == 1:
-                signal = signal.reshape(1, -1, 1)
-            elif len(signal.shape) == 2 and signal.shape[1] == 1:
-                signal = signal.reshape(1, -1, 1)
-            elif len(signal.shape) == 2 and signal.shape[1] > 1:
-                # Multi-channel ECG: select first channel for single-channel model
-                logger.info(f"Multi-channel ECG detected with {signal.shape[1]} channels, selecting first channel")
-                signal = signal[:, 0]  # Select first channel
-                signal = signal.reshape(1, -1, 1)
+                    lead_cams = np.full((model_beats * leads, window), np.nan, dtype=np.float32)
+                    lead_cams[scored] = batch_cams
+                    cams[forward] = np.nan_to_num(np.nanmean(lead_cams.reshape(model_beats, leads, window), axis=1))
             else:
-                # Unexpected shape, try to handle gracefully
-                logger.warning(f"Unexpected signal shape: {signal.shape}, attempting to reshape")
-                signal = signal.reshape(1, signal.shape[0], 1)
-                
-            logger.debug("ECG signal reshaped", final_shape=signal.shape)
-            return signal
-            
-        except Exception as e:
-            logger.error("Error preprocessing ECG file", error=str(e), exc_info=True)
-            # Return dummy data for testing
-            logger.warning("Using dummy ECG data for testing")
-            return np.random.rand(1, 1000, 1).astype(np.float32)
+                with stage_timer("ecg", "infer"):
+                    lead_scores[scored] = model.predict(batch, verbose=0).ravel()
+            scores[forward] = combine_lead_scores(lead_scores, leads, settings.ECG_LEAD_AGGREGATION)
+        if mode == "cluster":
+            # Cluster members take their medoid's score
+            scores = scores[source]
+            if explain:
+                cams = cams[source]
+        if explain:
+            saliency.update(ecg_data.peaks, scores, cams)
+        return scores
+    
+    def _record_duration(self, file_path: str) -> float:
+        """Recording length in seconds from the header alone (0 if it cannot be read)"""
+        try:
+            header = read_header(os.path.splitext(os.path.abspath(file_path))[0])
+            return float(header.sig_len) / float(header.fs)
+        except Exception:
+            # Let the regular path report the problem
+            return 0.0
     
     @performance_monitor(logger)
-    def predict(self, file_path: str) -> Dict[str, Any]:
-        """Make prediction using the loaded ECG model"""
+    def predict(self, file_path: str, beats: BeatLog = None) -> Dict[str, Any]:
+        """
+        Make prediction using the loaded ECG model; the whole record is scored by one model version.
+
+        Args:
+            file_path (str): Path to the uploaded .dat/.hea record
+            beats (BeatLog): Receives every scored beat's R peak (at the model rate) and score
+        """
+        with self.models.acquire() as version:
+            result = self._predict(file_path, version.artifacts, beats)
+        result["model_version"] = version.version
+        return result
+    
+    def _predict(self, file_path: str, model, beats: BeatLog = None) -> Dict[str, Any]:
         logger.info("Making ECG prediction", file_path=file_path)
-        if self.model is None:
+        if model is None:
             # Return dummy prediction for testing
             logger.warning("Using dummy model for ECG prediction")
             result = {
+                "result_version": 1,
                 "classification": "Arrhythmia Detected",
                 "probabilities": {
                     "normal": 0.1,
@@ -162,88 +433,126 @@ class ECGPredictionService:
                 },
                 "confidence": 0.85
             }
-            logger.info("Dummy ECG prediction completed", result=result)
+            logger.info("Dummy ECG prediction completed", classification=result["classification"])
             return result
         
-        # Preprocess ECG file
-        logger.debug("Preprocessing ECG file for prediction")
-        ecg_data = self.preprocess_ecg_file(file_path)
-        
-        # Make prediction
-        logger.debug("Making prediction with ECG model")
-        probabilities = self.model.predict(ecg_data)[0]
-        
-        # Map to class names (this would need to be adjusted based on actual model)
-        class_names = ["normal", "afib", "pvc", "other"]
-        prob_dict = {class_name: float(prob) for class_name, prob in zip(class_names, probabilities)}
-        
-        # Get the highest probability class
-        predicted_class = class_names[np.argmax(probabilities)]
-        
-        # Confidence is the highest probability
-        confidence = float(np.max(probabilities))
+        accumulator = BeatScoreAccumulator()
+        saliency = None
+        if settings.ECG_EXPLAIN_ENABLED and hasattr(model, "predict_with_cam"):
+            saliency = SaliencyAccumulator(MODEL_SAMPLING_RATE, int(BEAT_WINDOW_SECONDS * MODEL_SAMPLING_RATE),
+                                           settings.ECG_EXPLAIN_SEGMENT_GAP_SECONDS)
+        duration = self._record_duration(file_path)
+        excluded_seconds = 0.0
+        if duration > settings.ECG_CHUNK_SECONDS:
+            # Long (e.g. Holter) recordings are decoded and scored chunk by chunk
+            logger.debug("Scoring ECG record in chunks", chunk_seconds=settings.ECG_CHUNK_SECONDS)
+            for chunk in self.iter_chunk_predictions(file_path, model=model, saliency=saliency):
+                accumulator.update(chunk["scores"])
+                if beats is not None:
+                    beats.update(chunk["peaks"], chunk["scores"])
+                excluded_seconds += chunk["excluded_seconds"]
+            if accumulator.beat_count == 0:
+                raise ValueError(f"No usable ECG signal: {excluded_seconds:.1f} s of {duration:.1f} s "
+                                 "failed the signal-quality check")
+        else:
+            logger.debug("Preprocessing ECG file for prediction")
+            ecg_data = self.preprocess_ecg_file(file_path)
+            scores = self.score_beats(ecg_data, model=model, saliency=saliency)
+            accumulator.update(scores)
+            if beats is not None:
+                beats.update(ecg_data.peaks, scores)
+            excluded_seconds = ecg_data.excluded_seconds
         
-        result = {
-            "classification": predicted_class,
-            "probabilities": prob_dict,
-            "confidence": confidence
+        result = accumulator.result(settings.ECG_ABNORMAL_BEAT_FRACTION)
+        result["signal_quality"] = {
+            "excluded_seconds": round(excluded_seconds, 3),
+            "excluded_fraction": round(excluded_seconds / duration, 4) if duration else 0.0
         }
-        logger.info("ECG prediction completed", result=result)
+        if saliency is not None:
+            result["attribution"] = {"method": "grad-cam", **saliency.result(settings.ECG_EXPLAIN_MAX_SEGMENTS)}
+        logger.info("ECG prediction completed",
+                    classification=result["classification"],
+                    confidence=result["confidence"],
+                    beat_count=result["beat_count"],
+                    abnormal_beat_count=result["abnormal_beat_count"],
+                    excluded_seconds=excluded_seconds)
         return result
     
     @performance_monitor(logger)
-    def detect_abnormalities(self, file_path: str) -> List[Dict[str, Any]]:
-        """Detect abnormalities in ECG signal"""
-        logger.info("Detecting abnormalities in ECG signal", file_path=file_path)
-        # For now, return static abnormalities
-        # In a real implementation, this would use the model's attention mechanisms
-        # or other techniques to identify abnormal segments
-        abnormalities = [
-            {
-                "id": str(uuid.uuid4()),
-                "type": "PVC",
-                "start_time": 15.2,
-                "end_time": 15.8,
-                "confidence": 0.92,
-                "description": "Premature Ventricular Contraction detected"
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "type": "AFIB",
-                "start_time": 120.5,
-                "end_time": 135.7,
-                "confidence": 0.87,
-                "description": "Atrial Fibrillation episode"
-            }
-        ]
+    def detect_abnormalities(self, prediction_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Abnormal segments of an analysed record, to store and highlight on its plot.
+
+        Taken from the prediction's ``attribution``: each segment is a run of
+        beats the model flagged, with their mean score as confidence. Results
+        without an attribution (placeholder model, TFLite backend, explanations
+        disabled) have no segments.
+
+        Args:
+            prediction_result (Dict[str, Any]): Result of ``predict``
+
+        Returns:
+            List[Dict[str, Any]]: Segments in time order
+        """
+        attribution = prediction_result.get("attribution")
+        abnormalities = []
+        for index, segment in enumerate(attribution["segments"] if attribution is not None else []):
+            beats = "beat" if segment["beat_count"] == 1 else "beats"
+            abnormalities.append({
+                "id": f"segment-{index + 1}",
+                "type": "Abnormal beats",
+                "start_time": segment["start_time"],
+                "end_time": segment["end_time"],
+                "confidence": segment["mean_score"],
+                "importance": segment["importance"],
+                "beat_count": segment["beat_count"],
+                "focus": segment["focus"],
+                "description": f"{segment['beat_count']} abnormal {beats}, model focus on the {segment['focus']}"
+            })
         logger.info("Abnormalities detected", count=len(abnormalities))
         return abnormalities
     
     @performance_monitor(logger)
     def explain_prediction(self, prediction_result: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate explanation for the ECG prediction"""
-        logger.info("Generating ECG prediction explanation", prediction_result=prediction_result)
+        """
+        Generate explanation for the ECG prediction.
+
+        Abnormal segments come from the prediction's ``attribution``: runs of
+        beats the model flagged, ranked by their summed abnormality score,
+        with the part of the beat (P wave, QRS, ST/T) the model's Grad-CAM
+        saliency concentrated on.
+        """
+        logger.info("Generating ECG prediction explanation", classification=prediction_result["classification"])
+        summary = f"ECG analysis shows {prediction_result['classification']} with {prediction_result['confidence']*100:.1f}% confidence."
+        attribution = prediction_result.get("attribution")
+        abnormal_segments = []
+        if attribution is not None:
+            for segment in attribution["segments"]:
+                beats = "beat" if segment["beat_count"] == 1 else "beats"
+                abnormal_segments.append({
+                    "start_time": segment["start_time"],
+                    "end_time": segment["end_time"],
+                    "importance": segment["importance"],
+                    "description": f"{segment['beat_count']} abnormal {beats} (mean score "
+                                   f"{segment['mean_score']:.2f}), model focus on the {segment['focus']}"
+                })
+            if attribution["beat_count"]:
+                regions = attribution["beat_regions"]
+                focus = max(regions, key=regions.get)
+                summary += (f" The model's attention on abnormal beats centres on the {focus} "
+                            f"({regions[focus]*100:.0f}% of saliency).")
+        elif "beat_count" in prediction_result:
+            summary += " Beat-level attributions are not available for this inference backend."
         result = {
-            "summary": f"ECG analysis shows {prediction_result['classification']} with {prediction_result['confidence']*100:.1f}% confidence.",
-            "abnormal_segments": [
-                {
-                    "start_time": 15.2,
-                    "end_time": 15.8,
-                    "description": "Premature Ventricular Contraction detected"
-                },
-                {
-                    "start_time": 120.5,
-                    "end_time": 135.7,
-                    "description": "Atrial Fibrillation episode"
-                }
-            ],
+            "summary": summary,
+            "abnormal_segments": abnormal_segments,
             "recommendations": [
                 "Follow up with cardiologist for detailed evaluation",
                 "Consider 24-hour Holter monitoring",
                 "Avoid excessive caffeine and alcohol"
             ]
         }
-        logger.info("ECG explanation generated", result=result)
+        logger.info("ECG explanation generated", segment_count=len(result["abnormal_segments"]))
         return result
 
 # Global instance
@@ -0,0 +1,152 @@
+import json
+import struct
+from typing import Any, Dict, List, NamedTuple
+
+import numpy as np
+
+# Processed-signal blob: magic, format version, header length, JSON header, then the arrays
+PROCESSED_MAGIC = b"ECGP"
+PROCESSED_FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<4sHI")
+# Arrays start on 8-byte boundaries so every view is aligned
+_ALIGNMENT = 8
+
+
+def trace_time_points(count: int, fs: float, bucket: int) -> np.ndarray:
+    """
+    Time axis of a display trace.
+
+    Args:
+        count (int): Points in the trace
+        fs (float): Sampling rate of the source record
+        bucket (int): 1 for every sample; otherwise the trace holds interleaved
+            (min, max) pairs of this many samples, drawn across their bucket
+
+    Returns:
+        np.ndarray: Time of each point in seconds
+    """
+    if bucket <= 1:
+        return np.arange(count) / fs
+    bucket_starts = np.arange(-(-count // 2)) * bucket
+    return np.stack((bucket_starts, bucket_starts + bucket / 2), axis=1).ravel()[:count] / fs
+
+
+class ProcessedECG(NamedTuple):
+    """
+    An analysed record as stored with its prediction: display trace and per-beat scores.
+
+    Arrays decoded from a blob are read-only views into it.
+    """
+    trace: np.ndarray  # int16 (n_points, n_leads), quantised display trace
+    scale: np.ndarray  # float32 (n_leads,), mV per trace unit
+    fs: float  # sampling rate of the source record
+    bucket: int  # 1: every sample; otherwise min/max envelope of buckets of this many samples
+    lead_names: List[str]
+    peaks: np.ndarray  # uint32 R-peak sample indices at beat_fs
+    scores: np.ndarray  # float16 abnormality probability per beat
+    beat_fs: float
+
+    @property
+    def signal(self) -> np.ndarray:
+        """Display trace in mV, float32 (n_points, n_leads)"""
+        return self.trace * self.scale
+
+    @property
+    def time_points(self) -> np.ndarray:
+        return trace_time_points(self.trace.shape[0], self.fs, self.bucket)
+
+    @property
+    def beat_times(self) -> np.ndarray:
+        """R-peak times in seconds"""
+        return self.peaks / self.beat_fs
+
+    def describe(self) -> Dict[str, Any]:
+        """Shape summary, without the arrays"""
+        return {
+            "fs": self.fs,
+            "leads": self.lead_names,
+            "points": int(self.trace.shape[0]),
+            "envelope": self.bucket > 1,
+            "beat_count": int(self.peaks.shape[0])
+        }
+
+
+def encode_processed(signal: np.ndarray, fs: float, bucket: int, lead_names: List[str],
+                     peaks: np.ndarray, scores: np.ndarray, beat_fs: float) -> bytes:
+    """
+    Pack a display trace and per-beat scores into a compact, self-describing blob.
+
+    The trace is quantised to int16 with one scale per lead (full scale is
+    the lead's largest magnitude, so the error is below 1/65534 of it, far
+    under a typical ADC step), peaks are uint32 and scores float16. A
+    20,000-point two-lead trace with 2,000 beats takes about 92 KB, against
+    megabytes as a JSON float array.
+
+    Args:
+        signal (np.ndarray): Display trace in mV, (n_points, n_leads)
+        fs (float): Sampling rate of the source record
+        bucket (int): See ``trace_time_points``
+        lead_names (List[str]): Lead names
+        peaks (np.ndarray): R-peak sample indices at ``beat_fs``
+        scores (np.ndarray): Abnormality probability per beat
+        beat_fs (float): Sampling rate the peaks are counted in
+
+    Returns:
+        bytes: The encoded blob
+    """
+    signal = np.asarray(signal, dtype=np.float32)
+    if signal.ndim == 1:
+        signal = signal[:, np.newaxis]
+    peak_scale = np.abs(signal).max(axis=0) if signal.size else np.zeros(signal.shape[1], dtype=np.float32)
+    scale = np.where(peak_scale > 0, peak_scale / 32767, 1.0).astype(np.float32)
+    arrays = {
+        "trace": np.round(signal / scale).astype("<i2"),
+        "scale": scale.astype("<f4"),
+        "peaks": np.asarray(peaks).astype("<u4"),
+        "scores": np.asarray(scores).astype("<f2")
+    }
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+    header = json.dumps({
+        "fs": float(fs), "bucket": int(bucket), "lead_names": list(lead_names),
+        "beat_fs": float(beat_fs), "arrays": layout
+    }, separators=(",", ":")).encode()
+    header += b" " * (-(_PREFIX.size + len(header)) % _ALIGNMENT)
+    body = bytearray(offset)
+    for name, array in arrays.items():
+        start = layout[name]["offset"]
+        body[start:start + array.nbytes] = array.tobytes()
+    return _PREFIX.pack(PROCESSED_MAGIC, PROCESSED_FORMAT_VERSION, len(header)) + header + bytes(body)
+
+
+def decode_processed(blob) -> ProcessedECG:
+    """
+    Read a blob written by ``encode_processed`` without copying its arrays.
+
+    Args:
+        blob: bytes or memoryview as returned by the database driver
+
+    Returns:
+        ProcessedECG: Read-only views into ``blob``
+
+    Raises:
+        ValueError: If the blob is not a processed signal of a known version
+    """
+    magic, version, header_length = _PREFIX.unpack_from(blob)
+    if magic != PROCESSED_MAGIC:
+        raise ValueError("Not a processed ECG signal")
+    if version != PROCESSED_FORMAT_VERSION:
+        raise ValueError(f"Unsupported processed ECG format version {version}")
+    header = json.loads(bytes(blob[_PREFIX.size:_PREFIX.size + header_length]))
+    base = _PREFIX.size + header_length
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        arrays[name] = np.frombuffer(blob, dtype=dtype, count=count, offset=base + spec["offset"]).reshape(spec["shape"])
+    return ProcessedECG(
+        trace=arrays["trace"], scale=arrays["scale"], fs=header["fs"], bucket=header["bucket"],
+        lead_names=header["lead_names"], peaks=arrays["peaks"], scores=arrays["scores"], beat_fs=header["beat_fs"]
+    )
@@ -0,0 +1,319 @@
+import math
+import os
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import wfdb
+
+from app.core.cache import file_fingerprint, record_cache
+from app.core.metrics import DECODED_BYTES
+from app.services.ecg_codec import ARCHIVE_EXTENSION, ArchivedRecord, archive_path
+from app.services.ecg_processing import (
+    REFRACTORY_SECONDS, THRESHOLD_BLOCK_SECONDS, SegmentedECG, beat_lead_mask, detect_r_peaks,
+    extract_beat_windows
+)
+
+
+class RunningStats:
+    """
+    Welford mean/variance accumulated chunk by chunk.
+
+    Each chunk is reduced on its own and merged with the parallel form of
+    Welford's update (Chan et al.), so long recordings never need the whole
+    signal in memory and the result does not drift like a naive sum of squares.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        chunk_mean = float(values.mean())
+        chunk_m2 = float(np.square(values - chunk_mean).sum())
+        total = self.count + values.size
+        delta = chunk_mean - self.mean
+        self.mean += delta * values.size / total
+        self.m2 += chunk_m2 + delta * delta * self.count * values.size / total
+        self.count = total
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class DecodedRecord(NamedTuple):
+    """A whole WFDB record decoded to physical units"""
+    signal: np.ndarray  # float32 (n_samples, n_leads), NaN replaced by 0, read-only (shared via the cache)
+    fs: float
+    sig_name: List[str]
+
+
+def record_data_path(base_path: str) -> Optional[str]:
+    """
+    File holding a record's samples: its .dat file, or the lossless archive it was compacted to.
+
+    Returns:
+        Optional[str]: The path, or None if the record has neither
+    """
+    for path in (base_path + ".dat", archive_path(base_path)):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _open_archive(base_path: str) -> Optional[ArchivedRecord]:
+    """The record's archive if its .dat file has been compacted, else None"""
+    path = record_data_path(base_path)
+    return ArchivedRecord(path) if path is not None and path.endswith(ARCHIVE_EXTENSION) else None
+
+
+def _compacted_archive(base_path: str, error: FileNotFoundError) -> ArchivedRecord:
+    """
+    Archive of a record whose .dat file disappeared while it was being read.
+
+    The compactor moves the archive into place before it removes the .dat
+    file, so a .dat file that vanished after the existence check has an
+    archive; if there is none the record was deleted and ``error`` is raised.
+    """
+    path = archive_path(base_path)
+    if not os.path.exists(path):
+        raise error
+    return ArchivedRecord(path)
+
+
+def record_fingerprint(base_path: str) -> str:
+    """Cache key component identifying the current .dat (or archive)/.hea pair of a record"""
+    try:
+        return file_fingerprint(record_data_path(base_path) or base_path + ".dat", base_path + ".hea")
+    except FileNotFoundError:
+        # The .dat file was compacted away after record_data_path found it; the archive is in place
+        return file_fingerprint(record_data_path(base_path) or base_path + ".dat", base_path + ".hea")
+
+
+def read_header(base_path: str, fingerprint: str = None) -> Any:
+    """
+    ``wfdb.rdheader`` through the shared record cache.
+
+    Args:
+        base_path (str): Record path without extension
+        fingerprint (str): ``record_fingerprint`` of the record, if already computed
+
+    Returns:
+        The wfdb header (do not modify; it is shared)
+    """
+    key = (fingerprint or record_fingerprint(base_path), "header")
+    header = record_cache.get(key)
+    if header is None:
+        header = wfdb.rdheader(base_path)
+        record_cache.put(key, header, size=1024)
+    return header
+
+
+def read_record(base_path: str, fingerprint: str = None) -> DecodedRecord:
+    """
+    Decode every lead of a record once and serve repeat reads from memory.
+
+    Decoded signals are kept in the shared, byte-bounded LRU record cache
+    keyed by the files' fingerprint, so the prediction, visualization and
+    re-render paths for the same upload decode it only once, and a changed
+    file is decoded again. A record compacted to an archive decodes to the
+    same signal.
+
+    Args:
+        base_path (str): Record path without extension
+        fingerprint (str): ``record_fingerprint`` of the record, if already computed
+
+    Returns:
+        DecodedRecord: float32 signal of all leads, sampling rate and lead names
+    """
+    key = (fingerprint or record_fingerprint(base_path), "record")
+    decoded = record_cache.get(key)
+    if decoded is None:
+        archive = _open_archive(base_path)
+        if archive is None:
+            try:
+                dat_bytes = os.path.getsize(base_path + ".dat")
+                record = wfdb.rdrecord(base_path)
+                physical, fs, sig_name = record.p_signal, record.fs, record.sig_name
+                DECODED_BYTES.inc(dat_bytes)
+            except FileNotFoundError as e:
+                # Compacted since the check above
+                archive = _compacted_archive(base_path, e)
+        if archive is not None:
+            physical, fs, sig_name = archive.read_physical(), archive.fs, archive.sig_name
+            DECODED_BYTES.inc(os.path.getsize(archive.path))
+        signal = np.nan_to_num(physical.astype(np.float32, copy=False))
+        signal.setflags(write=False)
+        sig_name = list(sig_name or [f"Lead {index}" for index in range(signal.shape[1])])
+        decoded = DecodedRecord(signal, float(fs), sig_name)
+        record_cache.put(key, decoded, size=signal.nbytes)
+    return decoded
+
+
+def fits_record_cache(header) -> bool:
+    """Whether a record's decoded float32 signal may be held whole in the record cache"""
+    # A quarter of the budget, so one record never flushes everything else
+    return int(header.sig_len) * int(header.n_sig) * 4 <= record_cache.max_bytes // 4
+
+
+def iter_record_chunks(base_path: str, chunk_samples: int, channel: int = 0,
+                       channels: Optional[List[int]] = None) -> Iterator[Tuple[int, np.ndarray, bool]]:
+    """
+    Read a WFDB record in consecutive chunks.
+
+    Records small enough for the record cache are decoded once through it
+    and sliced, so repeat passes over the same record never touch the disk.
+    Longer recordings only decode the requested sample range per call, so
+    memory is bounded by ``chunk_samples`` rather than the recording length;
+    an archived record decodes only the blocks each chunk covers. All
+    requested leads are decoded in the same pass.
+
+    Args:
+        base_path (str): Record path without extension
+        chunk_samples (int): Samples per chunk
+        channel (int): Lead to read when ``channels`` is not given
+        channels (Optional[List[int]]): Leads to read together
+
+    Yields:
+        Tuple[int, np.ndarray, bool]: (first sample index, float32 samples of shape (n,) for a single
+        ``channel`` or (n, n_leads) for ``channels``, whether this is the last chunk)
+    """
+    fingerprint = record_fingerprint(base_path)
+    header = read_header(base_path, fingerprint)
+    decoded = read_record(base_path, fingerprint) if fits_record_cache(header) else None
+    archive = _open_archive(base_path) if decoded is None else None
+    signal_length = int(header.sig_len)
+    bytes_per_sample = _stored_bytes_per_sample(header)
+    chunk_samples = max(1, int(chunk_samples))
+    selected = list(channels) if channels is not None else [channel]
+    for start in range(0, signal_length, chunk_samples):
+        stop = min(start + chunk_samples, signal_length)
+        if decoded is not None:
+            samples = decoded.signal[start:stop, selected]
+        else:
+            physical = None
+            if archive is None:
+                try:
+                    physical = wfdb.rdrecord(base_path, sampfrom=start, sampto=stop, channels=selected).p_signal
+                except FileNotFoundError as e:
+                    # Compacted between chunks; the rest of the record comes from the archive
+                    archive = _compacted_archive(base_path, e)
+            if physical is None:
+                physical = archive.read_physical(start, stop, selected)
+            DECODED_BYTES.inc((stop - start) * bytes_per_sample * len(selected))
+            samples = np.nan_to_num(physical.astype(np.float32))
+        yield start, samples if channels is not None else samples[:, 0], stop >= signal_length
+
+
+def _stored_bytes_per_sample(header) -> float:
+    """Bytes per sample of the selected lead in the .dat file (format 212 packs two samples in 3 bytes)"""
+    fmt = (header.fmt or ["16"])[0]
+    return {"212": 1.5, "310": 4 / 3, "311": 4 / 3, "8": 1, "80": 1, "16": 2, "160": 2, "24": 3, "32": 4}.get(str(fmt), 2)
+
+
+class StreamingBeatSegmenter:
+    """
+    Incremental R-peak detection and beat windowing over consecutive chunks.
+
+    Each push detects peaks on the carried-over tail of the previous chunk
+    plus the new samples. Only peaks at least half the overlap away from the
+    unseen future are accepted, so the detector always has context on both
+    sides and every window is complete. The carried tail always starts on the
+    detector's threshold block grid, so chunked detection matches detection
+    over the whole record. Accepted regions never overlap and a refractory
+    check drops a beat found again just across a boundary. ``preprocess``
+    (e.g. a zero-phase band-pass) is applied to the whole buffer before
+    detection, so its edge effects stay in the part that is not accepted.
+    ``quality`` maps the raw and preprocessed buffer to a per-sample usable
+    mask; unusable stretches are skipped by the detector, beats with no
+    usable lead are dropped and the skipped time is reported.
+    """
+
+    def __init__(self, fs: float, window: int, overlap_seconds: float = 20.0,
+                 preprocess: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                 quality: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None):
+        self.fs = float(fs)
+        self.window = int(window)
+        self.overlap = max(int(overlap_seconds * fs), 4 * self.window)
+        self.refractory = int(REFRACTORY_SECONDS * fs)
+        self.block = max(1, int(THRESHOLD_BLOCK_SECONDS * fs))
+        self.preprocess = preprocess
+        self.quality = quality
+        self._buffer = None
+        self._buffer_start = 0
+        self._accepted_upto = 0
+        self._last_peak = None
+
+    def push(self, samples: np.ndarray, final: bool = False) -> SegmentedECG:
+        """
+        Add the next samples and return the beats that are now complete.
+
+        Args:
+            samples (np.ndarray): Next consecutive samples, shape (n,) or (n, n_leads)
+            final (bool): No more samples will follow; flush everything
+
+        Returns:
+            SegmentedECG: Completed beats, with peaks as absolute sample indices
+        """
+        samples = np.asarray(samples, dtype=np.float32)
+        buffer = samples if self._buffer is None else np.concatenate((self._buffer, samples))
+        start = self._buffer_start
+        end = start + buffer.shape[0]
+        # A push shorter than half the overlap accepts nothing new (the mask slice below must not go negative)
+        limit = end if final else max(end - self.overlap // 2, self._accepted_upto)
+
+        signal = self.preprocess(buffer) if self.preprocess is not None else buffer
+        usable = self.quality(buffer, signal) if self.quality is not None else None
+        peaks = detect_r_peaks(signal, self.fs, usable=usable) + start
+        keep = (peaks >= self._accepted_upto) & (peaks < limit)
+        if self._last_peak is not None:
+            keep &= peaks - self._last_peak >= self.refractory
+        beats, local_peaks = extract_beat_windows(signal, peaks[keep] - start, self.window)
+        lead_mask, excluded_seconds = None, 0.0
+        if usable is not None:
+            usable = usable.reshape(buffer.shape[0], -1)
+            lead_mask = beat_lead_mask(usable, local_peaks, self.window)
+            # Beats with no usable lead at all are not analysed
+            keep = lead_mask.any(axis=1)
+            beats = beats.reshape(local_peaks.shape[0], usable.shape[1], self.window, 1)[keep].reshape(-1, self.window, 1)
+            local_peaks, lead_mask = local_peaks[keep], lead_mask[keep]
+            accepted = usable[max(0, self._accepted_upto - start):limit - start]
+            excluded_seconds = float((~accepted.any(axis=1)).sum()) / self.fs
+        peaks = local_peaks + start
+
+        self._accepted_upto = max(self._accepted_upto, limit)
+        if peaks.size:
+            self._last_peak = int(peaks[-1])
+        # Carry the tail forward as left context for the next chunk
+        new_start = max(start, (end - self.overlap) // self.block * self.block)
+        self._buffer = buffer[new_start - start:].copy()
+        self._buffer_start = new_start
+        return SegmentedECG(beats, peaks, self.fs, leads=buffer.shape[1] if buffer.ndim == 2 else 1,
+                            lead_mask=lead_mask, excluded_seconds=excluded_seconds)
+
+
+def min_max_envelope(samples: np.ndarray, bucket: int) -> np.ndarray:
+    """
+    Decimate a signal for display, keeping each bucket's minimum and maximum.
+
+    Args:
+        samples (np.ndarray): Signal of shape (n,) or (n, n_leads) whose length is a multiple of
+            ``bucket`` (except possibly the last chunk)
+        bucket (int): Samples per bucket
+
+    Returns:
+        np.ndarray: Interleaved (min, max) pairs, two rows per bucket, leads kept as columns
+    """
+    count = -(-samples.shape[0] // bucket)
+    pad = [(0, count * bucket - samples.shape[0])] + [(0, 0)] * (samples.ndim - 1)
+    padded = np.pad(samples, pad, mode="edge").reshape((count, bucket) + samples.shape[1:])
+    envelope = np.stack((padded.min(axis=1), padded.max(axis=1)), axis=1)
+    return envelope.reshape((2 * count,) + samples.shape[1:])
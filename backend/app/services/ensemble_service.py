@@ -0,0 +1,60 @@
+from typing import Any, Dict
+from app.core import get_logger
+from app.core.config import settings
+
+logger = get_logger(__name__)
+
+
+class EnsemblePredictionService:
+    """
+    Fuses a tabular risk prediction and an ECG analysis of the same patient.
+
+    Uses the notebook's weighted-average ensemble: each branch's probability
+    is weighted by its model's validation ROC-AUC
+    (``ENSEMBLE_TABULAR_WEIGHT``, ``ENSEMBLE_ECG_WEIGHT``).
+    """
+
+    def __init__(self):
+        self.tabular_weight = float(settings.ENSEMBLE_TABULAR_WEIGHT)
+        self.ecg_weight = float(settings.ENSEMBLE_ECG_WEIGHT)
+        if self.tabular_weight < 0 or self.ecg_weight < 0 or self.tabular_weight + self.ecg_weight <= 0:
+            raise ValueError("Ensemble weights must be non-negative and not both zero")
+
+    @staticmethod
+    def ecg_probability(ecg_result: Dict[str, Any]) -> float:
+        """Probability that the record is abnormal (its fraction of abnormal beats)"""
+        probabilities = ecg_result.get("probabilities", {})
+        if "abnormal" in probabilities:
+            return float(probabilities["abnormal"])
+        # The placeholder model only reports per-rhythm probabilities
+        return 1.0 - float(probabilities.get("normal", 0.0))
+
+    def combine(self, tabular_result: Dict[str, Any], ecg_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Weighted average of the two branches' probabilities.
+
+        Args:
+            tabular_result (Dict[str, Any]): ``TabularPredictionService.predict`` result
+            ecg_result (Dict[str, Any]): ``ECGPredictionService.predict`` result
+
+        Returns:
+            Dict[str, Any]: risk_level, probability and confidence of the ensemble, and the weights used
+        """
+        tabular_probability = float(tabular_result["probability"])
+        ecg_probability = self.ecg_probability(ecg_result)
+        total = self.tabular_weight + self.ecg_weight
+        probability = (tabular_probability * self.tabular_weight + ecg_probability * self.ecg_weight) / total
+        result = {
+            "risk_level": "High Risk" if probability > 0.5 else "Low Risk",
+            "probability": probability,
+            # Distance from the decision boundary, as for the tabular model
+            "confidence": abs(0.5 - probability) * 2,
+            "weights": {"tabular": self.tabular_weight / total, "ecg": self.ecg_weight / total}
+        }
+        logger.info("Ensemble prediction computed", tabular_probability=tabular_probability,
+                    ecg_probability=ecg_probability, probability=probability)
+        return result
+
+
+# Global instance
+ensemble_service = EnsemblePredictionService()
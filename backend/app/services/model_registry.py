@@ -0,0 +1,254 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core import get_logger
+from app.core.cache import file_fingerprint
+from app.core.config import settings
+from app.core.metrics import MODEL_IN_FLIGHT, MODEL_RELOADS
+
+logger = get_logger(__name__)
+
+
+class ModelVersion:
+    """
+    One loaded set of model artifacts and the requests currently using it.
+
+    ``artifacts`` is None for the placeholder version used when no model
+    files exist. A version is retired when a newer one is swapped in; once
+    its last in-flight request finishes it is drained and its artifacts are
+    released.
+    """
+
+    def __init__(self, name: str, fingerprint: Optional[str], artifacts: Any, details: Dict[str, Any] = None):
+        self.name = name
+        self.fingerprint = fingerprint
+        self.artifacts = artifacts
+        self.details = details or {}
+        self.version = f"{name}-{fingerprint[:12]}" if artifacts is not None and fingerprint else f"{name}-dummy"
+        self.loaded_at = time.time()
+        self.in_flight = 0
+        self.retired = False
+        self.drained = threading.Event()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "loaded": self.artifacts is not None,
+            "loaded_at": self.loaded_at,
+            "in_flight": self.in_flight,
+            **self.details
+        }
+
+
+class ModelRegistry:
+    """
+    Versioned, hot-swappable model artifacts of one service.
+
+    ``reload`` loads and warms new artifacts on the calling thread while
+    requests keep using the current version, then swaps the reference under
+    a lock, so every request sees either the old or the new version and
+    never a mix. Requests hold a version for their whole duration through
+    ``acquire``; the previous version is released once the last of them
+    finishes.
+
+    Args:
+        name (str): Model name used in versions, logs and metrics
+        load (Callable[[], Tuple[Any, Dict[str, Any]]]): Loads fresh artifacts (None when no model
+            files exist) and details to report with them; raises on a broken file
+        paths (Callable[[], List[str]]): Files the artifacts are loaded from, watched for changes
+        warm (Callable[[Any], None]): Runs a test batch through new artifacts before they serve traffic
+        on_swap (Callable[[ModelVersion], None]): Called after a new version is swapped in
+    """
+
+    def __init__(self, name: str, load: Callable[[], Tuple[Any, Dict[str, Any]]], paths: Callable[[], List[str]],
+                 warm: Callable[[Any], None] = None, on_swap: Callable[[ModelVersion], None] = None):
+        self.name = name
+        self._load = load
+        self._paths = paths
+        self._warm = warm
+        self._on_swap = on_swap
+        self._current: Optional[ModelVersion] = None
+        # Retired versions still serving requests
+        self._draining: List[ModelVersion] = []
+        self.failed_fingerprint: Optional[str] = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        MODEL_IN_FLIGHT.set_function(self._in_flight, model=name)
+        registries[name] = self
+
+    @property
+    def current(self) -> Optional[ModelVersion]:
+        return self._current
+
+    def _in_flight(self) -> int:
+        with self._lock:
+            versions = ([self._current] if self._current is not None else []) + self._draining
+            return sum(version.in_flight for version in versions)
+
+    def fingerprint(self) -> Optional[str]:
+        """Fingerprint of the model files that currently exist (a ``stat`` each), None if there are none"""
+        paths = [path for path in self._paths() if os.path.exists(path)]
+        return file_fingerprint(*paths) if paths else None
+
+    @contextmanager
+    def acquire(self) -> Iterator[ModelVersion]:
+        """Use the current version for the duration of a request; a swap meanwhile retires it only after this"""
+        with self._lock:
+            version = self._current
+            version.in_flight += 1
+        try:
+            yield version
+        finally:
+            with self._lock:
+                version.in_flight -= 1
+                drained = version.retired and version.in_flight == 0
+            if drained:
+                self._release(version)
+
+    def reload(self, force: bool = False) -> ModelVersion:
+        """
+        Load, warm and swap in the model files on disk.
+
+        Without ``force`` nothing is loaded when the files have not changed
+        since the current version was loaded. If loading or warming fails the
+        current version keeps serving; only the very first load falls back to
+        the placeholder version.
+
+        Args:
+            force (bool): Reload even if the files are unchanged
+
+        Returns:
+            ModelVersion: The version serving requests afterwards
+        """
+        with self._reload_lock:
+            fingerprint = self.fingerprint()
+            current = self._current
+            if not force and current is not None and fingerprint == current.fingerprint:
+                return current
+
+            logger.info("Loading model version", model=self.name, fingerprint=fingerprint)
+            started = time.perf_counter()
+            try:
+                artifacts, details = self._load()
+                if artifacts is None and current is not None and current.artifacts is not None:
+                    # Files removed or mid-replacement: never downgrade a loaded model to the placeholder
+                    raise FileNotFoundError(f"No {self.name} model files found")
+                if artifacts is not None and self._warm is not None:
+                    self._warm(artifacts)
+            except Exception as e:
+                MODEL_RELOADS.inc(model=self.name, result="failed")
+                self.failed_fingerprint = fingerprint
+                if current is not None:
+                    logger.error("Model reload failed, keeping current version", model=self.name,
+                                 version=current.version, error=str(e), exc_info=True)
+                    raise
+                logger.error("Error loading model, using dummy model", model=self.name, error=str(e), exc_info=True)
+                artifacts, details = None, {}
+            version = ModelVersion(self.name, fingerprint, artifacts, details)
+
+            with self._lock:
+                previous, self._current = self._current, version
+                if previous is not None:
+                    previous.retired = True
+                    drained = previous.in_flight == 0
+                    if not drained:
+                        self._draining.append(previous)
+            self.failed_fingerprint = None
+            MODEL_RELOADS.inc(model=self.name, result="swapped")
+            logger.info("Model version swapped in", model=self.name, version=version.version,
+                        previous_version=previous.version if previous is not None else None,
+                        load_seconds=round(time.perf_counter() - started, 3))
+            if previous is not None and drained:
+                self._release(previous)
+            if self._on_swap is not None:
+                self._on_swap(version)
+            return version
+
+    def _release(self, version: ModelVersion) -> None:
+        """Drop a retired version's artifacts once no request uses it"""
+        with self._lock:
+            if version in self._draining:
+                self._draining.remove(version)
+            version.artifacts = None
+        version.drained.set()
+        logger.info("Model version drained", model=self.name, version=version.version)
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            draining = [version.describe() for version in self._draining]
+        current = self._current
+        return {"current": current.describe() if current is not None else None, "draining": draining}
+
+
+class ModelWatcher:
+    """
+    Polls every registry's model files and hot-reloads changed ones.
+
+    A change is only loaded once the fingerprint has been the same for two
+    consecutive polls, so a file that is still being copied is not picked
+    up half written. A fingerprint that failed to load is not retried until
+    the files change again.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = float(interval)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: Dict[str, str] = {}
+
+    def start(self) -> None:
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+        logger.info("Model watcher started", interval=self.interval, models=list(registries))
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def poll(self) -> None:
+        """Check every registry once"""
+        for name, registry in list(registries.items()):
+            try:
+                fingerprint = registry.fingerprint()
+            except OSError:
+                # A file replaced between listing and stat; look again next poll
+                continue
+            current = registry.current
+            if fingerprint in (current.fingerprint if current is not None else None, registry.failed_fingerprint):
+                self._pending.pop(name, None)
+                continue
+            if self._pending.get(name) != fingerprint:
+                self._pending[name] = fingerprint
+                continue
+            self._pending.pop(name, None)
+            try:
+                registry.reload()
+            except Exception:
+                # Logged by the registry; the current version keeps serving
+                pass
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+
+def wait_drained(version: Optional[ModelVersion], timeout: float = None) -> bool:
+    """Wait until a retired version has no requests left; True if it drained within ``timeout``"""
+    if version is None:
+        return True
+    return version.drained.wait(settings.MODEL_DRAIN_TIMEOUT_SECONDS if timeout is None else timeout)
+
+
+# Every service's registry, by model name
+registries: Dict[str, ModelRegistry] = {}
+
+# Started with the application when MODEL_RELOAD_POLL_SECONDS > 0
+model_watcher = ModelWatcher(settings.MODEL_RELOAD_POLL_SECONDS)
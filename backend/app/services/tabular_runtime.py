@@ -0,0 +1,345 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core import get_logger
+
+logger = get_logger(__name__)
+
+ARTIFACT_FORMAT = "tabular-tree-ensemble"
+# Bumped whenever the array layout or the evaluation rules change
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+_NODE_ARRAYS = ("feature", "threshold", "children", "default_left", "value", "roots")
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArrayScaler:
+    """
+    ``StandardScaler.transform`` from the fitted mean and scale alone.
+
+    Exposes ``mean_``, ``scale_`` and ``transform`` like the scikit-learn
+    scaler it was exported from, without importing scikit-learn.
+    """
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class TreeEnsembleModel:
+    """
+    Library-free runtime for a binary tree ensemble.
+
+    Every tree's nodes live in one flat node table. A leaf's ``children``
+    both point back to the leaf itself (threshold +inf), so all samples
+    descend all trees together in exactly ``max_depth`` vectorised steps
+    with no branching. Leaf outputs are either summed and passed through a
+    sigmoid (LightGBM binary objective) or averaged as class-1
+    probabilities (scikit-learn random forest). Exposes ``predict_proba``
+    with the scikit-learn contract.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], aggregation: str, sigmoid: float = 1.0,
+                 max_depth: int = 0, input_dtype: str = "float64", n_features: int = None):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.children = arrays["children"]
+        self.default_left = arrays["default_left"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.aggregation = aggregation
+        self.sigmoid = float(sigmoid)
+        self.max_depth = int(max_depth)
+        self.input_dtype = np.dtype(input_dtype)
+        self.n_features_in_ = n_features
+        self.classes_ = np.array([0, 1])
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node reached in every tree, shape (n_samples, n_trees)"""
+        # Flat indices into X.ravel() avoid a 2-D fancy index per level
+        offsets = (np.arange(X.shape[0], dtype=np.intp) * X.shape[1])[:, np.newaxis]
+        flat = X.ravel()
+        children = self.children.reshape(-1)
+        nodes = np.broadcast_to(self.roots.astype(np.intp), (X.shape[0], self.roots.shape[0])).copy()
+        for _ in range(self.max_depth):
+            values = flat[offsets + self.feature[nodes]]
+            go_right = ~((values <= self.threshold[nodes]) | (np.isnan(values) & self.default_left[nodes]))
+            nodes = children[2 * nodes + go_right]
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Class probabilities for a batch of feature rows.
+
+        Args:
+            X: Array-like of shape (n_samples, n_features)
+
+        Returns:
+            np.ndarray: Shape (n_samples, 2) - P(class 0), P(class 1)
+        """
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X[np.newaxis]
+        # Compare exactly like the source library: scikit-learn casts inputs to float32 first
+        X = np.ascontiguousarray(X.astype(self.input_dtype, copy=False), dtype=np.float64)
+        outputs = self.value[self._leaves(X)]
+        if self.aggregation == "sigmoid_sum":
+            probability = 1.0 / (1.0 + np.exp(-self.sigmoid * outputs.sum(axis=1)))
+        else:
+            probability = outputs.mean(axis=1)
+        return np.column_stack((1.0 - probability, probability))
+
+    def predict(self, X) -> np.ndarray:
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(np.int64)
+
+
+class _NodeTable:
+    """Accumulates trees into the flat node arrays"""
+
+    def __init__(self):
+        self.feature: List[int] = []
+        self.threshold: List[float] = []
+        self.children: List[List[int]] = []
+        self.default_left: List[bool] = []
+        self.value: List[float] = []
+        self.roots: List[int] = []
+        self.max_depth = 0
+
+    def add_leaf(self, value: float) -> int:
+        index = len(self.feature)
+        self.feature.append(0)
+        self.threshold.append(np.inf)
+        self.children.append([index, index])
+        self.default_left.append(False)
+        self.value.append(value)
+        return index
+
+    def add_split(self, feature: int, threshold: float, default_left: bool) -> int:
+        self.feature.append(feature)
+        self.threshold.append(threshold)
+        self.children.append([-1, -1])
+        self.default_left.append(default_left)
+        self.value.append(0.0)
+        return len(self.feature) - 1
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "feature": np.asarray(self.feature, dtype=np.int32),
+            "threshold": np.asarray(self.threshold, dtype=np.float64),
+            "children": np.asarray(self.children, dtype=np.int32).reshape(-1, 2),
+            "default_left": np.asarray(self.default_left, dtype=bool),
+            "value": np.asarray(self.value, dtype=np.float64),
+            "roots": np.asarray(self.roots, dtype=np.int32),
+        }
+
+
+def _lightgbm_tables(booster) -> Tuple[_NodeTable, Dict[str, Any]]:
+    dump = booster.dump_model()
+    if not str(dump.get("objective", "")).startswith("binary") or dump.get("num_tree_per_iteration", 1) != 1:
+        raise ValueError(f"Only binary LightGBM models can be exported, got objective {dump.get('objective')}")
+    if dump.get("average_output"):
+        # boosting="rf" averages the trees' raw outputs; the runtime only sums them
+        raise ValueError("LightGBM random forest (boosting='rf') models cannot be exported")
+    sigmoid = 1.0
+    for part in str(dump["objective"]).split()[1:]:
+        key, _, value = part.partition(":")
+        if key == "sigmoid":
+            sigmoid = float(value)
+    table = _NodeTable()
+
+    def visit(node: Dict[str, Any], depth: int) -> int:
+        if "split_index" not in node:
+            table.max_depth = max(table.max_depth, depth)
+            return table.add_leaf(float(node["leaf_value"]))
+        if node["decision_type"] != "<=":
+            raise ValueError("Categorical splits are not supported")
+        threshold = float(node["threshold"])
+        if node["missing_type"] == "NaN":
+            default_left = bool(node["default_left"])
+        elif node["missing_type"] == "None":
+            # LightGBM treats a missing value as 0.0 in this case
+            default_left = 0.0 <= threshold
+        else:
+            raise ValueError(f"Missing value handling {node['missing_type']} is not supported")
+        index = table.add_split(int(node["split_feature"]), threshold, default_left)
+        table.children[index] = [visit(node["left_child"], depth + 1), visit(node["right_child"], depth + 1)]
+        return index
+
+    for tree in dump["tree_info"]:
+        table.roots.append(visit(tree["tree_structure"], 0))
+    return table, {"aggregation": "sigmoid_sum", "sigmoid": sigmoid, "input_dtype": "float64",
+                   "n_features": int(dump["max_feature_idx"]) + 1}
+
+
+def _forest_tables(forest) -> Tuple[_NodeTable, Dict[str, Any]]:
+    if list(forest.classes_) != [0, 1]:
+        raise ValueError(f"Only binary 0/1 forests can be exported, got classes {list(forest.classes_)}")
+    table = _NodeTable()
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        missing_left = getattr(tree, "missing_go_to_left", None)
+        offset = len(table.feature)
+        for node in range(tree.node_count):
+            counts = tree.value[node, 0]
+            if tree.children_left[node] < 0:
+                table.add_leaf(float(counts[1] / counts.sum()))
+            else:
+                index = table.add_split(int(tree.feature[node]), float(tree.threshold[node]),
+                                        bool(missing_left[node]) if missing_left is not None else False)
+                table.children[index] = [offset + int(tree.children_left[node]),
+                                         offset + int(tree.children_right[node])]
+        table.roots.append(offset)
+        table.max_depth = max(table.max_depth, int(tree.max_depth))
+    return table, {"aggregation": "mean", "sigmoid": 1.0, "input_dtype": "float32",
+                   "n_features": int(forest.n_features_in_)}
+
+
+def export_artifact(model, scaler, directory: str, feature_names: List[str] = None,
+                    source_paths: Dict[str, str] = None) -> Dict[str, Any]:
+    """
+    Write a trained model and scaler as raw ``.npy`` arrays plus a manifest.
+
+    Supports LightGBM binary models (``LGBMClassifier`` or ``Booster``) and
+    scikit-learn random forests. The manifest records the format version,
+    the library versions the model came from, a SHA-256 of every array file
+    and of the pickles it was exported from. The directory is staged next to
+    the target and renamed into place, so readers never see half an
+    artifact.
+
+    Args:
+        model: Fitted model
+        scaler: Fitted ``StandardScaler`` or None
+        directory (str): Artifact directory to create or replace
+        feature_names (List[str]): Feature order the model expects
+        source_paths (Dict[str, str]): Files the model and scaler were loaded from ("model", "scaler")
+
+    Returns:
+        Dict[str, Any]: The manifest
+    """
+    booster = getattr(model, "booster_", None) or (model if hasattr(model, "dump_model") else None)
+    if booster is not None:
+        import lightgbm
+        table, evaluation = _lightgbm_tables(booster)
+        library = {"lightgbm": lightgbm.__version__}
+    elif hasattr(model, "estimators_") and hasattr(model.estimators_[0], "tree_"):
+        import sklearn
+        table, evaluation = _forest_tables(model)
+        library = {"scikit-learn": sklearn.__version__}
+    else:
+        raise ValueError(f"Unsupported model type for export: {type(model).__name__}")
+
+    arrays = table.arrays()
+    if scaler is not None:
+        n_features = evaluation["n_features"]
+        mean = getattr(scaler, "mean_", None)
+        scale = getattr(scaler, "scale_", None)
+        arrays["scaler_mean"] = np.asarray(mean if mean is not None else np.zeros(n_features), dtype=np.float64)
+        arrays["scaler_scale"] = np.asarray(scale if scale is not None else np.ones(n_features), dtype=np.float64)
+
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".staging-")
+    try:
+        files = {}
+        for name, array in arrays.items():
+            path = os.path.join(staging, f"{name}.npy")
+            np.save(path, array)
+            files[name] = {"file": f"{name}.npy", "dtype": str(array.dtype), "shape": list(array.shape),
+                           "sha256": file_sha256(path)}
+        manifest = {
+            "format": ARTIFACT_FORMAT,
+            "format_version": ARTIFACT_FORMAT_VERSION,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "model_class": type(model).__name__,
+            "library_versions": library,
+            "feature_names": list(feature_names) if feature_names is not None else None,
+            "n_trees": len(table.roots),
+            "n_nodes": len(table.feature),
+            "max_depth": table.max_depth,
+            **evaluation,
+            "arrays": files,
+            "sources": {role: {"file": os.path.basename(path), "sha256": file_sha256(path)}
+                        for role, path in (source_paths or {}).items() if os.path.exists(path)}
+        }
+        with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+        previous = None
+        if os.path.exists(directory):
+            previous = tempfile.mkdtemp(dir=parent, prefix=".previous-")
+            os.rename(directory, os.path.join(previous, "artifact"))
+        os.rename(staging, directory)
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    logger.info("Tabular model artifact exported", directory=directory, n_trees=manifest["n_trees"],
+                n_nodes=manifest["n_nodes"])
+    return manifest
+
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    """Read and validate an artifact manifest; raises ValueError for an unknown format or version"""
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Not a {ARTIFACT_FORMAT} artifact: {manifest.get('format')}")
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version {manifest.get('format_version')}, "
+                         f"expected {ARTIFACT_FORMAT_VERSION}")
+    return manifest
+
+
+def load_artifact(directory: str, verify: bool = True) -> Tuple[TreeEnsembleModel, Optional[ArrayScaler], Dict[str, Any]]:
+    """
+    Memory-map an artifact written by ``export_artifact``.
+
+    The arrays are mapped read-only, so loading does no parsing or
+    unpickling and every process on the host shares the page cache copy.
+
+    Args:
+        directory (str): Artifact directory
+        verify (bool): Check every array file against its manifest checksum first
+
+    Returns:
+        Tuple[TreeEnsembleModel, Optional[ArrayScaler], Dict[str, Any]]: (model, scaler or None, manifest)
+
+    Raises:
+        ValueError: Unknown format, checksum mismatch or malformed arrays
+    """
+    manifest = read_manifest(directory)
+    arrays = {}
+    for name, entry in manifest["arrays"].items():
+        path = os.path.join(directory, entry["file"])
+        if verify and file_sha256(path) != entry["sha256"]:
+            raise ValueError(f"Checksum mismatch for {entry['file']} in {directory}")
+        array = np.load(path, mmap_mode="r", allow_pickle=False)
+        if str(array.dtype) != entry["dtype"] or list(array.shape) != entry["shape"]:
+            raise ValueError(f"{entry['file']} does not match the manifest (dtype {array.dtype}, shape {array.shape})")
+        arrays[name] = array
+    missing = [name for name in _NODE_ARRAYS if name not in arrays]
+    if missing:
+        raise ValueError(f"Artifact is missing arrays: {missing}")
+
+    model = TreeEnsembleModel(arrays, manifest["aggregation"], manifest.get("sigmoid", 1.0),
+                              manifest["max_depth"], manifest.get("input_dtype", "float64"),
+                              manifest.get("n_features"))
+    scaler = ArrayScaler(arrays["scaler_mean"], arrays["scaler_scale"]) if "scaler_mean" in arrays else None
+    return model, scaler, manifest
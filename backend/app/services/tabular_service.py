@@ -1,82 +1,215 @@
 import pickle
-import joblib
 import numpy as np
 import pandas as pd
 import os
-from typing import Dict, Any
-from sklearn.preprocessing import StandardScaler
-import shap
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 from app.core import get_logger
+from app.core.cache import LRUCache
+from app.core.config import settings
 from app.core.logging import performance_monitor
+from app.core.metrics import MODEL_BATCH_SIZE, stage_timer
+from app.services.model_registry import ModelRegistry, ModelVersion
+from app.services.tabular_runtime import MANIFEST_NAME, file_sha256, load_artifact
 
 logger = get_logger(__name__)
 
+class TabularModel(NamedTuple):
+    """Model and scaler loaded together, so a request never mixes versions"""
+    model: Any
+    scaler: Any
+
+
 class TabularPredictionService:
     def __init__(self):
-        self.model = None
-        self.scaler = None
+        # Prediction and explanation per (model version, feature vector); hot inputs skip the model
+        self.result_cache = LRUCache(
+            "tabular_results", max_bytes=settings.TABULAR_CACHE_SIZE * 4096,
+            max_entries=settings.TABULAR_CACHE_SIZE, ttl=settings.TABULAR_CACHE_TTL_SECONDS
+        )
         self.feature_names = [
             'age', 'gender', 'height', 'weight', 'ap_hi', 'ap_lo',
             'cholesterol', 'gluc', 'smoke', 'alco', 'active'
         ]
+        # Results computed with the previous model must never be served again
+        self.models = ModelRegistry(
+            "tabular", self._load_artifacts, self._model_paths,
+            warm=self._warm, on_swap=lambda version: self.result_cache.clear()
+        )
         self.load_model()
     
-    def load_model(self):
-        """Load the trained model and scaler"""
+    @property
+    def model(self):
+        artifacts = self.models.current.artifacts
+        return artifacts.model if artifacts is not None else None
+    
+    @property
+    def scaler(self):
+        artifacts = self.models.current.artifacts
+        return artifacts.scaler if artifacts is not None else None
+    
+    @property
+    def model_version(self) -> str:
+        return self.models.current.version
+    
+    def _model_paths(self) -> List[str]:
+        paths = [os.path.join("models", "best_tabular_model.pkl"), os.path.join("models", "tabular_scaler.pkl")]
+        if settings.TABULAR_ARTIFACT_DIR:
+            # The artifact is replaced by renaming its directory, so the manifest changes with every export
+            paths.append(os.path.join(settings.TABULAR_ARTIFACT_DIR, MANIFEST_NAME))
+        return paths
+    
+    def load_model(self) -> ModelVersion:
+        """Load the trained model and scaler and swap them in for new requests"""
+        return self.models.reload(force=True)
+    
+    def _load_artifacts(self) -> Tuple[Optional[TabularModel], Dict[str, Any]]:
+        """Read the model and scaler (None when there is no model file), preferring the exported artifact"""
         logger.info("Loading tabular prediction model and scaler")
+        model_path, scaler_path = self._model_paths()[:2]
+        exported = self._load_exported(model_path, scaler_path)
+        if exported is not None:
+            return exported
+        import joblib
+        model = scaler = None
+        # Load the model
+        if os.path.exists(model_path):
+            try:
+                model = joblib.load(model_path)
+                logger.info("Model loaded successfully with joblib", model_path=model_path)
+            except Exception as e:
+                logger.warning(f"Failed to load model with joblib: {e}, trying pickle", model_path=model_path)
+                with open(model_path, 'rb') as f:
+                    model = pickle.load(f)
+                logger.info("Model loaded successfully with pickle", model_path=model_path)
+        else:
+            logger.warning("Model file not found, using dummy model", model_path=model_path)
+            return None, {}
+        
+        # Load the scaler
+        if os.path.exists(scaler_path):
+            try:
+                scaler = joblib.load(scaler_path)
+                logger.info("Scaler loaded successfully with joblib", scaler_path=scaler_path)
+            except Exception as e:
+                logger.warning(f"Failed to load scaler with joblib: {e}, trying pickle", scaler_path=scaler_path)
+                with open(scaler_path, 'rb') as f:
+                    scaler = pickle.load(f)
+                logger.info("Scaler loaded successfully with pickle", scaler_path=scaler_path)
+        else:
+            logger.warning("Scaler file not found, using unscaled features", scaler_path=scaler_path)
+        return TabularModel(model, scaler), {"format": "pickle"}
+    
+    def _load_exported(self, model_path: str, scaler_path: str) -> Optional[Tuple[TabularModel, Dict[str, Any]]]:
+        """
+        Memory-map the artifact written by ``export_tabular_model.py``.
+
+        Returns None, so the pickles are loaded instead, when there is no
+        artifact, it fails validation, or it was exported from different
+        pickles than the ones now on disk (a retrained model that was not
+        exported again).
+        """
+        artifact_dir = settings.TABULAR_ARTIFACT_DIR
+        if not artifact_dir or not os.path.exists(os.path.join(artifact_dir, MANIFEST_NAME)):
+            return None
         try:
-            # Load the model
-            model_path = os.path.join("models", "best_tabular_model.pkl")
-            if os.path.exists(model_path):
-                try:
-                    self.model = joblib.load(model_path)
-                    logger.info("Model loaded successfully with joblib", model_path=model_path)
-                except Exception as e:
-                    logger.warning(f"Failed to load model with joblib: {e}, trying pickle", model_path=model_path)
-                    with open(model_path, 'rb') as f:
-                        self.model = pickle.load(f)
-                    logger.info("Model loaded successfully with pickle", model_path=model_path)
-            else:
-                logger.warning("Model file not found, using dummy model", model_path=model_path)
-            
-            # Load the scaler
-            scaler_path = os.path.join("models", "tabular_scaler.pkl")
-            if os.path.exists(scaler_path):
-                try:
-                    self.scaler = joblib.load(scaler_path)
-                    logger.info("Scaler loaded successfully with joblib", scaler_path=scaler_path)
-                except Exception as e:
-                    logger.warning(f"Failed to load scaler with joblib: {e}, trying pickle", scaler_path=scaler_path)
-                    with open(scaler_path, 'rb') as f:
-                        self.scaler = pickle.load(f)
-                    logger.info("Scaler loaded successfully with pickle", scaler_path=scaler_path)
-            else:
-                logger.warning("Scaler file not found, using default scaler", scaler_path=scaler_path)
-        except Exception as e:
-            logger.error("Error loading model or scaler", error=str(e), exc_info=True)
-            # Initialize with dummy values for testing
-            self.model = None
-            self.scaler = StandardScaler()
+            model, scaler, manifest = load_artifact(artifact_dir)
+            for role, path in (("model", model_path), ("scaler", scaler_path)):
+                source = manifest.get("sources", {}).get(role)
+                if source is not None and os.path.exists(path) and file_sha256(path) != source["sha256"]:
+                    logger.warning("Tabular model artifact is older than the pickle it was exported from, "
+                                   "loading the pickles", artifact_dir=artifact_dir, path=path)
+                    return None
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Failed to load tabular model artifact: {e}, loading the pickles", artifact_dir=artifact_dir)
+            return None
+        logger.info("Tabular model artifact memory-mapped", artifact_dir=artifact_dir,
+                    format_version=manifest["format_version"], model_class=manifest.get("model_class"),
+                    created_at=manifest.get("created_at"))
+        return TabularModel(model, scaler), {"format": "artifact", "exported_at": manifest.get("created_at")}
+    
+    def _warm(self, artifacts: TabularModel) -> None:
+        """Run a batch of average patients through a new model before it serves requests"""
+        if getattr(artifacts.scaler, "mean_", None) is not None:
+            row = np.rint(artifacts.scaler.mean_)
+        else:
+            row = np.array([19000, 1, 165, 72, 120, 80, 1, 1, 0, 0, 1], dtype=np.float64)
+        frame = pd.DataFrame(np.repeat(row[np.newaxis], max(1, settings.MODEL_WARMUP_BATCH), axis=0),
+                             columns=self.feature_names)
+        scaled = artifacts.scaler.transform(frame) if artifacts.scaler is not None else frame.values
+        if hasattr(artifacts.model, 'feature_names_in_'):
+            scaled = pd.DataFrame(scaled, columns=artifacts.model.feature_names_in_)
+        artifacts.model.predict_proba(scaled)
+    
+    def cache_key(self, input_data: Dict[str, Any], version: ModelVersion = None) -> Tuple:
+        """
+        Canonical result cache key for a request.
+
+        Every feature is a validated integer, so the key is the feature
+        vector in model order as plain ints (key order, extra fields and
+        int/float spelling of the payload do not matter) plus the model
+        version.
+
+        Args:
+            input_data (Dict[str, Any]): Request features
+            version (ModelVersion): Model version serving the request, the current one by default
+
+        Returns:
+            Tuple: (model version, feature values...)
+        """
+        version = version or self.models.current
+        return (version.version,) + tuple(int(input_data[name]) for name in self.feature_names)
+
+    def predict_with_explanation(self, input_data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Prediction and explanation for a request, served from the result cache.
+
+        A repeated feature vector costs one dictionary lookup; concurrent
+        identical requests run the model once and share the result.
+
+        Args:
+            input_data (Dict[str, Any]): Request features
+
+        Returns:
+            Tuple[Dict[str, Any], Dict[str, Any]]: (prediction, explanation); the prediction is a
+            fresh copy the caller may extend, the explanation is shared and must not be modified
+        """
+        with self.models.acquire() as version:
+            def compute():
+                prediction = self.predict(input_data, version=version)
+                with stage_timer("tabular", "explain"):
+                    explanation = self.explain_prediction(input_data, version=version)
+                return prediction, explanation
+
+            prediction, explanation = self.result_cache.get_or_compute(self.cache_key(input_data, version), compute)
+        return dict(prediction), explanation
     
     @performance_monitor(logger)
-    def preprocess_input(self, input_data: Dict[str, Any]) -> np.ndarray:
-        """Preprocess input data for prediction"""
+    def preprocess_input(self, input_data: Dict[str, Any], scaler=None) -> np.ndarray:
+        """Preprocess input data for prediction (with the current scaler unless one is given)"""
+        scaler = scaler if scaler is not None else self.scaler
         # Convert input data to DataFrame with proper feature names
         input_df = pd.DataFrame([input_data])[self.feature_names]
         
         # Scale the input data
-        if self.scaler is not None:
-            input_scaled = self.scaler.transform(input_df)
+        if scaler is not None:
+            input_scaled = scaler.transform(input_df)
         else:
             input_scaled = input_df.values
             
         return input_scaled
     
     @performance_monitor(logger)
-    def predict(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Make prediction using the loaded model"""
-        logger.info("Making tabular prediction", input_data=input_data)
-        if self.model is None:
+    def predict(self, input_data: Dict[str, Any], version: ModelVersion = None) -> Dict[str, Any]:
+        """Make prediction using the loaded model (the current version unless one is given)"""
+        if version is None:
+            with self.models.acquire() as version:
+                return self._predict(input_data, version)
+        return self._predict(input_data, version)
+    
+    def _predict(self, input_data: Dict[str, Any], version: ModelVersion) -> Dict[str, Any]:
+        logger.debug("Making tabular prediction", model_version=version.version)
+        artifacts = version.artifacts
+        if artifacts is None:
             # Return dummy prediction for testing
             logger.warning("Using dummy model for prediction")
             probability = 0.75
@@ -84,23 +217,27 @@ class TabularPredictionService:
             result = {
                 "risk_level": risk_level,
                 "probability": probability,
-                "confidence": 0.85
+                "confidence": 0.85,
+                "model_version": version.version
             }
-            logger.info("Dummy prediction completed", result=result)
+            logger.debug("Dummy prediction completed", risk_level=result["risk_level"])
             return result
         
         # Preprocess input
         logger.debug("Preprocessing input data")
-        input_processed = self.preprocess_input(input_data)
+        with stage_timer("tabular", "preprocess"):
+            input_processed = self.preprocess_input(input_data, scaler=artifacts.scaler)
         
         # Make prediction
         logger.debug("Making prediction with model")
         # Convert to DataFrame with feature names to avoid warnings
-        if hasattr(self.model, 'feature_names_in_'):
-            input_df = pd.DataFrame(input_processed, columns=self.model.feature_names_in_)
-            probability = self.model.predict_proba(input_df)[0][1]
-        else:
-            probability = self.model.predict_proba(input_processed)[0][1]
+        MODEL_BATCH_SIZE.observe(input_processed.shape[0], model="tabular")
+        with stage_timer("tabular", "infer"):
+            if hasattr(artifacts.model, 'feature_names_in_'):
+                input_df = pd.DataFrame(input_processed, columns=artifacts.model.feature_names_in_)
+                probability = artifacts.model.predict_proba(input_df)[0][1]
+            else:
+                probability = artifacts.model.predict_proba(input_processed)[0][1]
         risk_level = "High Risk" if probability > 0.5 else "Low Risk"
         
         # Calculate confidence (distance from 0.5)
@@ -109,16 +246,19 @@ class TabularPredictionService:
         result = {
             "risk_level": risk_level,
             "probability": float(probability),
-            "confidence": float(confidence)
+            "confidence": float(confidence),
+            "model_version": version.version
         }
-        logger.info("Prediction completed", result=result)
+        logger.debug("Prediction completed", risk_level=risk_level, probability=result["probability"],
+                     model_version=version.version)
         return result
     
     @performance_monitor(logger)
-    def explain_prediction(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate explanation for the prediction"""
-        logger.info("Generating prediction explanation", input_data=input_data)
-        if self.model is None:
+    def explain_prediction(self, input_data: Dict[str, Any], version: ModelVersion = None) -> Dict[str, Any]:
+        """Generate explanation for the prediction (with the current version unless one is given)"""
+        logger.debug("Generating prediction explanation")
+        version = version or self.models.current
+        if version.artifacts is None:
             logger.warning("Using static explanation for dummy model")
             result = {
                 "summary": "Based on the patient data, there is a high risk of cardiovascular disease.",
@@ -135,7 +275,7 @@ class TabularPredictionService:
                     "Maintain current physical activity level"
                 ]
             }
-            logger.info("Static explanation generated", result=result)
+            logger.debug("Static explanation generated")
             return result
         
         # For now, return static explanation
@@ -156,7 +296,7 @@ class TabularPredictionService:
                 "Maintain current physical activity level"
             ]
         }
-        logger.info("Explanation generated", result=result)
+        logger.debug("Explanation generated", feature_count=len(result["feature_importance"]))
         return result
 
 # Global instance
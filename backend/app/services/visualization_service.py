@@ -1,13 +1,20 @@
 import plotly.graph_objects as go
 import plotly.io as pio
 import numpy as np
-import wfdb
 import os
 from typing import Dict, Any, List
 import uuid
 from app.core import get_logger
+from app.core.cache import record_cache
+from app.core.config import settings
 from app.core.logging import performance_monitor
-from app.core.file_utils import get_visualization_directory
+from app.core.tracing import span
+from app.core.file_utils import fix_record_header, get_visualization_directory
+from app.services.ecg_processing import MODEL_SAMPLING_RATE, BeatLog
+from app.services.ecg_storage import ProcessedECG, encode_processed, trace_time_points
+from app.services.ecg_stream import (
+    iter_record_chunks, min_max_envelope, read_header, read_record, record_data_path, record_fingerprint
+)
 
 logger = get_logger(__name__)
 
@@ -15,113 +22,129 @@ class ECGVisualizationService:
     def __init__(self):
         pass
     
+    def load_display_trace(self, file_path: str) -> tuple:
+        """
+        Signal of a record as drawn: (signal of shape (n_points, n_leads), record fs, bucket, lead names).
+
+        Records within ``ECG_PLOT_MAX_POINTS`` are returned sample by sample
+        (bucket 1); longer ones as a min/max envelope of ``bucket``-sample
+        buckets, see ``trace_time_points``. Raises FileNotFoundError for an
+        incomplete record.
+        """
+        # Get the absolute base path (without extension)
+        abs_file_path = os.path.abspath(file_path)
+        base_path = os.path.splitext(abs_file_path)[0]
+        logger.debug("Base path for wfdb", base_path=base_path)
+        
+        # Safety check to ensure files exist before calling wfdb
+        dat_file = record_data_path(base_path)
+        hea_file = base_path + ".hea"
+        
+        if dat_file is None:
+            raise FileNotFoundError(f"ECG data file not found: {base_path}.dat")
+        if not os.path.exists(hea_file):
+            raise FileNotFoundError(f"ECG header file not found: {hea_file}")
+        
+        # Make sure the header's record name matches the uploaded file name
+        with span("header_fix"):
+            fix_record_header(base_path)
+            
+        # Header, decoded signal and envelope all come from the record cache the
+        # prediction just filled, so a render right after a prediction decodes nothing
+        fingerprint = record_fingerprint(base_path)
+        header = read_header(base_path, fingerprint)
+        lead_names = list(header.sig_name or [f"Lead {index}" for index in range(header.n_sig)])
+        # The point budget is shared by all leads
+        max_points = max(2, settings.ECG_PLOT_MAX_POINTS // max(1, header.n_sig))
+        if header.sig_len <= max_points:
+            # Read the ECG record using wfdb (with just the base path to avoid PhysioNet downloads);
+            # all leads in one pass
+            with span("rdrecord"):
+                record = read_record(base_path, fingerprint)
+            return record.signal, float(record.fs), 1, lead_names
+        
+        bucket = -(-int(header.sig_len) // (max_points // 2))
+        envelope_key = (fingerprint, "envelope", max_points)
+        signal = record_cache.get(envelope_key)
+        if signal is None:
+            # Long recordings: decode chunk by chunk and keep a min/max envelope,
+            # so neither the full signal nor a full time axis is ever materialised
+            chunk_samples = bucket * max(1, int(settings.ECG_CHUNK_SECONDS * header.fs) // bucket)
+            with span("rdrecord"):
+                signal = np.concatenate([
+                    min_max_envelope(samples, bucket)
+                    for _, samples, _ in iter_record_chunks(
+                        base_path, chunk_samples, channels=list(range(header.n_sig))
+                    )
+                ])
+            signal.setflags(write=False)
+            record_cache.put(envelope_key, signal)
+        return signal, float(header.fs), bucket, lead_names
+    
     @performance_monitor(logger)
     def load_ecg_signal(self, file_path: str) -> tuple:
-        """Load ECG signal data"""
+        """Load ECG signal data: (time points, signal of shape (n_points, n_leads), lead names)"""
         logger.info("Loading ECG signal", file_path=file_path)
         try:
-            # Get the absolute base path (without extension)
-            logger.info(f"🧩 DEBUG: file_path received -> {file_path}")
-            abs_file_path = os.path.abspath(file_path)
-            logger.info(f"🧩 DEBUG: absolute path -> {abs_file_path}")
-            base_path = os.path.splitext(abs_file_path)[0]
-            logger.debug("Base path for wfdb", base_path=base_path)
-            
-            # Safety check to ensure files exist before calling wfdb
-            dat_file = base_path + ".dat"
-            hea_file = base_path + ".hea"
-            
-            if not os.path.exists(dat_file):
-                raise FileNotFoundError(f"ECG data file not found: {dat_file}")
-            if not os.path.exists(hea_file):
-                raise FileNotFoundError(f"ECG header file not found: {hea_file}")
-            
-            # --- COMPREHENSIVE HEADER FIX ---
-            try:
-                expected_name = os.path.basename(base_path)
-                
-                # Read the entire header file
-                with open(hea_file, "r", encoding="utf-8") as f:
-                    header_lines = f.readlines()
-                
-                if not header_lines:
-                    raise ValueError("Header file is empty")
-                
-                logger.info(f"📄 Original header first line: {header_lines[0].strip()}")
-                
-                # Parse the first line
-                first_line_parts = header_lines[0].strip().split()
-                old_record_name = first_line_parts[0]
-                
-                # If the record name doesn't match, update the entire header
-                if old_record_name != expected_name:
-                    logger.info(f"🔧 Fixing header: '{old_record_name}' → '{expected_name}'")
-                    
-                    # Update first line
-                    first_line_parts[0] = expected_name
-                    header_lines[0] = " ".join(first_line_parts) + "\n"
-                    
-                    # Update any other lines that reference the old filename
-                    for i in range(1, len(header_lines)):
-                        if old_record_name in header_lines[i]:
-                            header_lines[i] = header_lines[i].replace(old_record_name, expected_name)
-                            logger.info(f"📝 Updated line {i+1}: {header_lines[i].strip()}")
-                    
-                    # Write the corrected header back
-                    with open(hea_file, "w", encoding="utf-8") as f:
-                        f.writelines(header_lines)
-                    
-                    logger.info(f"✅ Header file updated successfully")
-                    
-                    # Verify the fix
-                    with open(hea_file, "r", encoding="utf-8") as f:
-                        verify_line = f.readline().strip()
-                    logger.info(f"📄 Verified header first line: {verify_line}")
-                else:
-                    logger.info(f"✅ Header already correct: {expected_name}")
-                    
-            except Exception as e:
-                logger.error("Error fixing header file", error=str(e), exc_info=True)
-                raise
-            # --- END COMPREHENSIVE HEADER FIX ---
-                
-            # Read the ECG record using wfdb (with just the base path to avoid PhysioNet downloads)
-            record = wfdb.rdrecord(base_path)
-            
-            # Extract signal data (using first lead for simplicity)
-            signal = record.p_signal[:, 0] if len(record.p_signal.shape) > 1 else record.p_signal
-            time_points = np.arange(len(signal)) / record.fs
+            signal, fs, bucket, lead_names = self.load_display_trace(file_path)
+            time_points = trace_time_points(signal.shape[0], fs, bucket)
             logger.debug("ECG signal loaded", signal_shape=signal.shape, time_points_shape=time_points.shape)
             
-            return time_points, signal
+            return time_points, signal, lead_names
         except Exception as e:
             logger.error("Error loading ECG signal", error=str(e), exc_info=True)
             # Return dummy data for testing
             logger.warning("Using dummy ECG signal for testing")
             time_points = np.linspace(0, 10, 1000)
             signal = np.sin(2 * np.pi * 1 * time_points) + 0.5 * np.sin(2 * np.pi * 2 * time_points)
-            return time_points, signal
+            return time_points, signal[:, np.newaxis], ["Lead 0"]
+    
+    @performance_monitor(logger)
+    def encode_processed_signal(self, file_path: str, beats: BeatLog) -> bytes:
+        """
+        Display trace and per-beat scores of an analysed record as a compact blob (see ``encode_processed``).
+
+        Args:
+            file_path (str): Path to the .dat file of the record
+            beats (BeatLog): Beats scored by the prediction
+
+        Returns:
+            bytes: Blob for ``EcgData.processed_data``
+        """
+        signal, fs, bucket, lead_names = self.load_display_trace(file_path)
+        blob = encode_processed(signal, fs, bucket, lead_names, beats.peaks, beats.scores, MODEL_SAMPLING_RATE)
+        logger.debug("Processed ECG signal encoded", points=signal.shape[0], beat_count=beats.peaks.shape[0],
+                     size_bytes=len(blob))
+        return blob
     
     @performance_monitor(logger)
-    def create_ecg_plot(self, file_path: str, abnormalities: List[Dict[str, Any]] = None) -> go.Figure:
-        """Create ECG signal visualization"""
+    def create_ecg_plot(self, file_path: str, abnormalities: List[Dict[str, Any]] = None,
+                        processed: ProcessedECG = None) -> go.Figure:
+        """Create ECG signal visualization, from the stored processed signal when given instead of the record"""
         logger.info("Creating ECG plot", file_path=file_path, abnormalities_count=len(abnormalities) if abnormalities else 0)
         # Load ECG signal
-        time_points, signal = self.load_ecg_signal(file_path)
+        if processed is not None:
+            time_points, leads, lead_names = processed.time_points, processed.signal, processed.lead_names
+        else:
+            time_points, leads, lead_names = self.load_ecg_signal(file_path)
         
         # Create the figure
         fig = go.Figure()
         logger.debug("Plotly figure created")
         
-        # Add ECG signal trace
-        fig.add_trace(go.Scatter(
-            x=time_points,
-            y=signal,
-            mode='lines',
-            name='ECG Signal',
-            line=dict(color='blue', width=1)
-        ))
-        logger.debug("ECG signal trace added")
+        # Leads are stacked top to bottom like a paper ECG strip
+        spacing = float(np.ptp(leads)) if leads.shape[1] > 1 else 0.0
+        offsets = -spacing * np.arange(leads.shape[1])
+        signal = leads + offsets
+        for index, name in enumerate(lead_names):
+            fig.add_trace(go.Scatter(
+                x=time_points,
+                y=signal[:, index],
+                mode='lines',
+                name=name if leads.shape[1] > 1 else 'ECG Signal',
+                line=dict(color='blue', width=1)
+            ))
+        logger.debug("ECG signal traces added", lead_count=leads.shape[1])
         
         # Add abnormalities if provided
         if abnormalities:
@@ -162,7 +185,7 @@ class ECGVisualizationService:
             xaxis_title='Time (seconds)',
             yaxis_title='Amplitude (mV)',
             template='plotly_white',
-            height=400,
+            height=400 if leads.shape[1] == 1 else 200 + 100 * leads.shape[1],
             showlegend=True
         )
         logger.debug("Plot layout updated")
@@ -174,12 +197,13 @@ class ECGVisualizationService:
         """Save visualization to file"""
         logger.info("Saving visualization", output_path=output_path, format=format)
         try:
+            height = fig.layout.height or 400
             if format.lower() == 'png':
-                pio.write_image(fig, output_path, format='png', width=1200, height=400, scale=2)
+                pio.write_image(fig, output_path, format='png', width=1200, height=height, scale=2)
             elif format.lower() == 'pdf':
-                pio.write_image(fig, output_path, format='pdf', width=1200, height=400)
+                pio.write_image(fig, output_path, format='pdf', width=1200, height=height)
             elif format.lower() == 'svg':
-                pio.write_image(fig, output_path, format='svg', width=1200, height=400)
+                pio.write_image(fig, output_path, format='svg', width=1200, height=height)
             logger.info("Visualization saved successfully", output_path=output_path)
             return output_path
         except Exception as e:
@@ -187,20 +211,24 @@ class ECGVisualizationService:
             return None
     
     @performance_monitor(logger)
-    def generate_visualization(self, file_path: str, abnormalities: List[Dict[str, Any]] = None) -> str:
-        """Generate and save ECG visualization"""
+    def generate_visualization(self, file_path: str, abnormalities: List[Dict[str, Any]] = None,
+                               processed: ProcessedECG = None, output_path: str = None) -> str:
+        """Generate and save ECG visualization (to a new file under the visualization directory by default)"""
         logger.info("Generating ECG visualization", file_path=file_path, abnormalities_count=len(abnormalities) if abnormalities else 0)
         # Create visualization
-        fig = self.create_ecg_plot(file_path, abnormalities)
+        with span("plotly"):
+            fig = self.create_ecg_plot(file_path, abnormalities, processed=processed)
         
         # Generate unique filename
-        viz_id = str(uuid.uuid4())
-        output_dir = get_visualization_directory()
-        output_path = os.path.join(output_dir, f"ecg_viz_{viz_id}.png")
+        if output_path is None:
+            viz_id = str(uuid.uuid4())
+            output_dir = get_visualization_directory()
+            output_path = os.path.join(output_dir, f"ecg_viz_{viz_id}.png")
         logger.debug("Generated output path", output_path=output_path)
         
         # Save visualization
-        saved_path = self.save_visualization(fig, output_path, 'png')
+        with span("kaleido"):
+            saved_path = self.save_visualization(fig, output_path, 'png')
         logger.info("ECG visualization generated", saved_path=saved_path)
         return saved_path
 
@@ -0,0 +1,80 @@
+"""
+ECG pipeline benchmarks over the bundled MIT-BIH records.
+
+Records are copied to a scratch directory first because the services may
+rewrite WFDB headers in place.
+"""
+
+import glob
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List
+
+from benchmarks.common import DEFAULT_MITDB_DIR, summarize, time_calls
+
+
+def list_records(mitdb_dir: str = DEFAULT_MITDB_DIR) -> List[str]:
+    """Return the record names that have both a .hea and a .dat file"""
+    names = []
+    for hea_path in sorted(glob.glob(os.path.join(mitdb_dir, "*.hea"))):
+        name = os.path.splitext(os.path.basename(hea_path))[0]
+        if os.path.exists(os.path.join(mitdb_dir, name + ".dat")):
+            names.append(name)
+    return names
+
+
+def copy_records(names: List[str], mitdb_dir: str, work_dir: str) -> List[str]:
+    """Copy records into ``work_dir`` and return the .dat paths"""
+    paths = []
+    for name in names:
+        for ext in (".dat", ".hea", ".atr"):
+            src = os.path.join(mitdb_dir, name + ext)
+            if os.path.exists(src):
+                shutil.copy(src, work_dir)
+        paths.append(os.path.join(work_dir, name + ".dat"))
+    return paths
+
+
+def run(mitdb_dir: str = DEFAULT_MITDB_DIR, limit: int = None, repeat: int = 1, render: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Benchmark ECGPredictionService and ECGVisualizationService per record.
+
+    Args:
+        mitdb_dir (str): Directory containing the MIT-BIH records
+        limit (int): Only use the first ``limit`` records
+        repeat (int): Timed repetitions per record
+        render (bool): Also time PNG export through kaleido
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Summary statistics keyed by benchmark name
+    """
+    from app.services.ecg_service import ecg_service
+    from app.services.visualization_service import visualization_service
+
+    names = list_records(mitdb_dir)[:limit]
+    if not names:
+        raise FileNotFoundError(f"No MIT-BIH records found in {mitdb_dir}")
+
+    timings: Dict[str, List[float]] = {"ecg.preprocess": [], "ecg.predict": [], "ecg.detect_abnormalities": [], "ecg.visualization.plot": []}
+    if render:
+        timings["ecg.visualization.render"] = []
+
+    work_dir = tempfile.mkdtemp(prefix="ecg_bench_")
+    try:
+        for path in copy_records(names, mitdb_dir, work_dir):
+            print(f"  ECG record {os.path.basename(path)}")
+            timings["ecg.preprocess"] += time_calls(lambda: ecg_service.preprocess_ecg_file(path), repeat)
+            timings["ecg.predict"] += time_calls(lambda: ecg_service.predict(path), repeat)
+            result = ecg_service.predict(path)
+            timings["ecg.detect_abnormalities"] += time_calls(lambda: ecg_service.detect_abnormalities(result), repeat)
+            timings["ecg.visualization.plot"] += time_calls(lambda: visualization_service.create_ecg_plot(path, []), repeat)
+            if render:
+                timings["ecg.visualization.render"] += time_calls(lambda: visualization_service.generate_visualization(path, []), repeat, warmup=0)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {name: summarize(durations) for name, durations in timings.items()}
+    for summary in results.values():
+        summary["records"] = len(names)
+    return results
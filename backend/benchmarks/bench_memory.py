@@ -0,0 +1,226 @@
+"""
+Per-worker memory of multi-worker deployments.
+
+Starts the API as a real server with N workers, drives tabular and ECG
+predictions through it so every worker has touched the models, then reads
+each worker's unique (USS), proportional (PSS) and resident (RSS) set size
+from ``/proc/<pid>/smaps_rollup`` (Linux). USS is what one more worker
+costs; the PSS total is the deployment's real footprint.
+
+Modes:
+    prefork  - ``serve_prefork.py``: models loaded once in the master, workers forked after ``gc.freeze()``
+    uvicorn  - ``uvicorn main:app --workers N``: every worker imports and loads everything itself
+
+Usage (from the backend directory, with models/ in place):
+    python -m benchmarks.bench_memory --workers 4 --modes prefork,uvicorn
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List
+
+from benchmarks.common import DEFAULT_CARDIO_CSV, DEFAULT_MITDB_DIR, write_results
+
+MODES = ("prefork", "uvicorn")
+
+
+def memory_info(pid: int) -> Dict[str, float]:
+    """USS, PSS and RSS of a process in MiB, from ``/proc/<pid>/smaps_rollup``"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "uss_mb": (fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024,
+        "pss_mb": fields.get("Pss", 0) / 1024,
+        "rss_mb": fields.get("Rss", 0) / 1024
+    }
+
+
+def child_pids(parent: int) -> List[int]:
+    """Direct children of a process that are server workers (helper processes excluded)"""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields after it are space-separated
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            if ppid != parent:
+                continue
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode(errors="replace")
+        except (OSError, IndexError, ValueError):
+            continue
+        if "resource_tracker" not in cmdline:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _server_command(mode: str, workers: int, port: int) -> List[str]:
+    if mode == "prefork":
+        return [sys.executable, "-m", "serve_prefork", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)]
+    return [sys.executable, "-m", "uvicorn", "main:app", "--workers", str(workers),
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+
+
+async def _drive(base_url: str, requests: int, concurrency: int, csv_path: str, mitdb_dir: str, record: str) -> int:
+    """Send tabular and ECG predictions so every worker loads its code paths; returns the error count"""
+    import httpx
+    from benchmarks.bench_tabular import load_rows
+
+    rows = load_rows(csv_path)
+    with open(os.path.join(mitdb_dir, record + ".dat"), "rb") as f:
+        dat_content = f.read()
+    with open(os.path.join(mitdb_dir, record + ".hea"), "rb") as f:
+        hea_content = f.read()
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        username, password = f"bench_{uuid.uuid4().hex[:8]}", uuid.uuid4().hex
+        (await client.post("/api/v1/auth/register", json={
+            "username": username, "email": f"{username}@example.com", "password": password
+        })).raise_for_status()
+        response = await client.post("/api/v1/auth/login", data={"username": username, "password": password})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        errors = 0
+        remaining = iter(range(requests))
+
+        async def worker():
+            nonlocal errors
+            for index in remaining:
+                if index % 10 == 0:
+                    files = [
+                        ("files", (f"{record}.dat", dat_content, "application/octet-stream")),
+                        ("files", (f"{record}.hea", hea_content, "text/plain"))
+                    ]
+                    response = await client.post("/api/v1/predict/ecg", files=files, headers=headers)
+                else:
+                    response = await client.post("/api/v1/predict/tabular", json=rows[index % len(rows)], headers=headers)
+                errors += response.status_code >= 400
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return errors
+
+
+def measure(mode: str, workers: int, requests: int, csv_path: str = DEFAULT_CARDIO_CSV,
+            mitdb_dir: str = DEFAULT_MITDB_DIR, record: str = "100", startup_timeout: float = 300.0) -> Dict[str, Any]:
+    """
+    Start one deployment, load it and report the memory of its processes.
+
+    Args:
+        mode (str): "prefork" or "uvicorn"
+        workers (int): Worker processes
+        requests (int): Predictions sent before measuring (every tenth is an ECG upload)
+        csv_path (str): Path to cardio_train.csv
+        mitdb_dir (str): Directory containing the MIT-BIH records
+        record (str): MIT-BIH record uploaded for ECG requests
+        startup_timeout (float): Seconds to wait for the server to answer /health
+
+    Returns:
+        Dict[str, Any]: Per-worker and master memory, worker USS summary and total PSS
+    """
+    import httpx
+
+    port = _free_port()
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='mem_bench_'), 'bench.sqlite3')}")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    # Spawned uvicorn workers would each generate their own key and reject each other's tokens
+    env.setdefault("SECRET_KEY", uuid.uuid4().hex)
+    # The watcher would only add a thread per worker; keep the comparison about model memory
+    env.setdefault("MODEL_RELOAD_POLL_SECONDS", "0")
+    server = subprocess.Popen(_server_command(mode, workers, port), env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"{mode} server exited with status {server.returncode}")
+            try:
+                if httpx.get(base_url + "/health", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{mode} server did not start within {startup_timeout} s")
+            time.sleep(0.5)
+        # Every worker must be up, not just the first one to answer
+        while len(child_pids(server.pid)) < workers and time.monotonic() < deadline:
+            time.sleep(0.5)
+
+        errors = asyncio.run(_drive(base_url, requests, 2 * workers, csv_path, mitdb_dir, record))
+        pids = child_pids(server.pid)
+        per_worker = {pid: memory_info(pid) for pid in pids}
+        master = memory_info(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    uss = sorted(info["uss_mb"] for info in per_worker.values())
+    return {
+        "mode": mode,
+        "workers": len(per_worker),
+        "requests": requests,
+        "errors": errors,
+        "master": master,
+        "per_worker": {str(pid): info for pid, info in per_worker.items()},
+        "worker_uss_mb_mean": sum(uss) / len(uss) if uss else None,
+        "worker_uss_mb_max": uss[-1] if uss else None,
+        "total_pss_mb": master["pss_mb"] + sum(info["pss_mb"] for info in per_worker.values())
+    }
+
+
+def run(workers: int = 4, modes: List[str] = None, requests: int = 400, csv_path: str = DEFAULT_CARDIO_CSV,
+        mitdb_dir: str = DEFAULT_MITDB_DIR) -> Dict[str, Dict[str, Any]]:
+    """Measure each deployment mode; results are keyed ``memory.<mode>[workers=N]``"""
+    results = {}
+    for mode in modes or list(MODES):
+        print(f"  Memory {mode}: {workers} workers")
+        result = measure(mode, workers, requests, csv_path, mitdb_dir)
+        print(f"    worker USS mean {result['worker_uss_mb_mean']:.1f} MiB, total PSS {result['total_pss_mb']:.1f} MiB")
+        results[f"memory.{mode}[workers={workers}]"] = result
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Per-worker memory of prefork and uvicorn multi-worker serving")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated: prefork, uvicorn")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--cardio-csv", default=DEFAULT_CARDIO_CSV)
+    parser.add_argument("--mitdb-dir", default=DEFAULT_MITDB_DIR)
+    parser.add_argument("--output", default=os.path.join("benchmark_results", "memory.json"))
+    args = parser.parse_args(argv)
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip() in MODES]
+    results = run(args.workers, modes, args.requests, args.cardio_csv, args.mitdb_dir)
+    write_results(results, args.output)
+    print(json.dumps({name: {key: value for key, value in result.items() if key != "per_worker"}
+                      for name, result in results.items()}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Tabular pipeline benchmarks over cardio_train.csv at increasing batch sizes.
+"""
+
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from benchmarks.common import DEFAULT_CARDIO_CSV, summarize, time_calls
+
+DEFAULT_BATCH_SIZES = [2 ** i for i in range(13)]  # 1 .. 4096
+
+
+def load_rows(csv_path: str = DEFAULT_CARDIO_CSV) -> List[Dict[str, int]]:
+    """Load patient rows in the shape of TabularDataInput"""
+    from app.services.tabular_service import tabular_service
+
+    df = pd.read_csv(csv_path, sep=";")
+    df = df[tabular_service.feature_names].astype(int)
+    return df.to_dict(orient="records")
+
+
+def run(csv_path: str = DEFAULT_CARDIO_CSV, batch_sizes: List[int] = None, repeat: int = 5) -> Dict[str, Dict[str, Any]]:
+    """
+    Benchmark TabularPredictionService.
+
+    ``tabular.predict`` runs the request path (one ``predict`` plus one
+    ``explain_prediction`` per row) over a batch of rows; ``tabular.model``
+    runs the scaler and model once over the whole batch to show the
+    vectorised ceiling.
+
+    Args:
+        csv_path (str): Path to cardio_train.csv
+        batch_sizes (List[int]): Batch sizes to run
+        repeat (int): Timed repetitions per batch size
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Summary statistics keyed by benchmark name
+    """
+    from app.services.tabular_service import tabular_service
+
+    rows = load_rows(csv_path)
+    batch_sizes = batch_sizes or DEFAULT_BATCH_SIZES
+    results = {}
+    for batch_size in batch_sizes:
+        batch = rows[:batch_size]
+        print(f"  Tabular batch size {batch_size}")
+
+        def request_path():
+            for row in batch:
+                tabular_service.predict(row)
+                tabular_service.explain_prediction(row)
+
+        results[f"tabular.predict[batch={batch_size}]"] = summarize(
+            time_calls(request_path, repeat), items_per_call=len(batch)
+        )
+
+        if tabular_service.model is not None:
+            frame = pd.DataFrame(batch)[tabular_service.feature_names]
+
+            def model_path():
+                scaled = tabular_service.scaler.transform(frame) if tabular_service.scaler is not None else frame.values
+                tabular_service.model.predict_proba(scaled)
+
+            results[f"tabular.model[batch={batch_size}]"] = summarize(
+                time_calls(model_path, repeat), items_per_call=len(batch)
+            )
+    return results
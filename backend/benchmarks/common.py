@@ -0,0 +1,88 @@
+"""
+Shared helpers for the benchmark suite: timing, summary statistics and
+result files.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+# Repository layout relative to the backend directory
+DEFAULT_DATASETS_DIR = os.path.join("..", "datasets")
+DEFAULT_MITDB_DIR = os.path.join(DEFAULT_DATASETS_DIR, "physionet.org", "files", "mitdb", "1.0.0")
+DEFAULT_CARDIO_CSV = os.path.join(DEFAULT_DATASETS_DIR, "cardio_train.csv")
+
+
+def summarize(durations: List[float], items_per_call: int = 1) -> Dict[str, Any]:
+    """
+    Reduce a list of per-call wall times (seconds) to summary statistics.
+
+    Args:
+        durations (List[float]): Wall time of each call
+        items_per_call (int): Number of items (beats, rows, requests) processed per call
+
+    Returns:
+        Dict[str, Any]: Percentiles, mean and throughput
+    """
+    values = np.asarray(durations, dtype=np.float64)
+    if values.size == 0:
+        return {"samples": 0}
+    total = float(values.sum())
+    return {
+        "unit": "seconds",
+        "samples": int(values.size),
+        "items_per_call": items_per_call,
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p90": float(np.percentile(values, 90)),
+        "p99": float(np.percentile(values, 99)),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "throughput_per_s": (values.size * items_per_call) / total if total > 0 else None
+    }
+
+
+def time_calls(func: Callable[[], Any], repeat: int, warmup: int = 1) -> List[float]:
+    """Call ``func`` ``warmup`` times untimed, then ``repeat`` times timed"""
+    for _ in range(warmup):
+        func()
+    durations = []
+    for _ in range(repeat):
+        start_ns = time.perf_counter_ns()
+        func()
+        durations.append((time.perf_counter_ns() - start_ns) / 1e9)
+    return durations
+
+
+def environment_metadata() -> Dict[str, Any]:
+    """Describe the machine and code revision the benchmark ran on"""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        commit = None
+    return {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__
+    }
+
+
+def write_results(results: Dict[str, Dict[str, Any]], output_path: str) -> None:
+    """Write benchmark results together with environment metadata as JSON"""
+    payload = {"metadata": environment_metadata(), "benchmarks": results}
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    print(f"Results written to {output_path}")
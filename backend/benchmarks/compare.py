@@ -0,0 +1,71 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 0.10]
+
+Exits with status 1 if any benchmark's p50 or p99 latency grew, or its
+throughput dropped, by more than the threshold.
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+# metric name -> True if larger is better
+COMPARED_METRICS = {"p50": False, "p99": False, "throughput_per_s": True}
+
+
+def load(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["benchmarks"]
+
+
+def compare(baseline: Dict[str, Dict[str, Any]], candidate: Dict[str, Dict[str, Any]], threshold: float) -> Tuple[List[str], List[str]]:
+    """
+    Compare candidate results against the baseline.
+
+    Args:
+        baseline (Dict): Benchmarks from the baseline run
+        candidate (Dict): Benchmarks from the candidate run
+        threshold (float): Allowed relative change before a metric counts as a regression
+
+    Returns:
+        Tuple[List[str], List[str]]: Report lines and regression lines
+    """
+    report, regressions = [], []
+    for name in sorted(set(baseline) & set(candidate)):
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = baseline[name].get(metric), candidate[name].get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change < -threshold if higher_is_better else change > threshold
+            line = f"{name:45s} {metric:17s} {old:12.6f} -> {new:12.6f} ({change:+.1%})"
+            report.append(line + ("  REGRESSION" if regressed else ""))
+            if regressed:
+                regressions.append(line)
+    for name in sorted(set(baseline) - set(candidate)):
+        report.append(f"{name:45s} missing from candidate")
+    return report, regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change treated as a regression (default 0.10)")
+    args = parser.parse_args(argv)
+
+    report, regressions = compare(load(args.baseline), load(args.candidate), args.threshold)
+    print("\n".join(report))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+In-process HTTP load generator for end-to-end throughput.
+
+Requests are sent through httpx's ASGI transport straight into the FastAPI
+app, so the numbers include routing, validation, auth, the prediction
+services and the database, but no network stack.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import DEFAULT_CARDIO_CSV, DEFAULT_MITDB_DIR, summarize
+
+
+async def _authenticate(client) -> Dict[str, str]:
+    username = f"bench_{uuid.uuid4().hex[:8]}"
+    password = uuid.uuid4().hex
+    response = await client.post("/api/v1/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": password
+    })
+    response.raise_for_status()
+    response = await client.post("/api/v1/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _drive(client, headers: Dict[str, str], make_request, total: int, concurrency: int) -> Dict[str, Any]:
+    durations: List[float] = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for index in remaining:
+            start_ns = time.perf_counter_ns()
+            response = await make_request(client, headers, index)
+            durations.append((time.perf_counter_ns() - start_ns) / 1e9)
+            if response.status_code >= 400:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_time = time.perf_counter() - wall_start
+
+    summary = summarize(durations)
+    summary["concurrency"] = concurrency
+    summary["errors"] = errors
+    summary["wall_time"] = wall_time
+    # Throughput from wall time, since requests overlap
+    summary["throughput_per_s"] = len(durations) / wall_time if wall_time > 0 else None
+    return summary
+
+
+async def _run(requests: int, concurrency: int, csv_path: str, mitdb_dir: str, record: str) -> Dict[str, Dict[str, Any]]:
+    import httpx
+    from benchmarks.bench_tabular import load_rows
+    from main import app
+
+    rows = load_rows(csv_path)
+    with open(os.path.join(mitdb_dir, record + ".dat"), "rb") as f:
+        dat_content = f.read()
+    with open(os.path.join(mitdb_dir, record + ".hea"), "rb") as f:
+        hea_content = f.read()
+
+    async def tabular_request(client, headers, index):
+        return await client.post("/api/v1/predict/tabular", json=rows[index % len(rows)], headers=headers)
+
+    async def ecg_request(client, headers, index):
+        files = [
+            ("files", (f"{record}.dat", dat_content, "application/octet-stream")),
+            ("files", (f"{record}.hea", hea_content, "text/plain"))
+        ]
+        return await client.post("/api/v1/predict/ecg", files=files, headers=headers)
+
+    async def health_request(client, headers, index):
+        return await client.get("/health")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        headers = await _authenticate(client)
+        results = {}
+        for name, make_request, total in (
+            ("http.health", health_request, requests),
+            ("http.predict_tabular", tabular_request, requests),
+            ("http.predict_ecg", ecg_request, max(1, requests // 10)),
+        ):
+            print(f"  HTTP {name}: {total} requests, concurrency {concurrency}")
+            results[name] = await _drive(client, headers, make_request, total, concurrency)
+        return results
+
+
+def run(requests: int = 200, concurrency: int = 8, csv_path: str = DEFAULT_CARDIO_CSV,
+        mitdb_dir: str = DEFAULT_MITDB_DIR, record: str = "100", database_url: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the load generator against the FastAPI app.
+
+    A throwaway SQLite database is used unless ``database_url`` is given, so
+    benchmark users and predictions never land in the development database.
+
+    Args:
+        requests (int): Requests per endpoint (ECG uses a tenth of this)
+        concurrency (int): Number of concurrent clients
+        csv_path (str): Path to cardio_train.csv
+        mitdb_dir (str): Directory containing the MIT-BIH records
+        record (str): MIT-BIH record uploaded for ECG requests
+        database_url (Optional[str]): Database to run against
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Summary statistics keyed by benchmark name
+    """
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='http_bench_'), 'bench.sqlite3')}"
+    os.environ["DATABASE_URL"] = database_url
+    from app.core.config import settings
+    settings.DATABASE_URL = database_url
+    return asyncio.run(_run(requests, concurrency, csv_path, mitdb_dir, record))
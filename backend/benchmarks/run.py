@@ -0,0 +1,57 @@
+"""
+Run the benchmark suite and write the results as JSON.
+
+Usage (from the backend directory, with models/ in place):
+    python -m benchmarks.run --suite ecg,tabular,http --output benchmark_results/latest.json
+"""
+
+import argparse
+import os
+import sys
+
+# Match main.py: CPU only, quiet TensorFlow
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+from benchmarks.common import DEFAULT_CARDIO_CSV, DEFAULT_MITDB_DIR, write_results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the ECG and tabular inference pipelines")
+    parser.add_argument("--suite", default="ecg,tabular,http", help="Comma-separated suites: ecg, tabular, http")
+    parser.add_argument("--output", default=os.path.join("benchmark_results", "latest.json"))
+    parser.add_argument("--mitdb-dir", default=DEFAULT_MITDB_DIR)
+    parser.add_argument("--cardio-csv", default=DEFAULT_CARDIO_CSV)
+    parser.add_argument("--records", type=int, default=None, help="Limit the number of MIT-BIH records")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--render", action="store_true", help="Include PNG rendering in the ECG suite")
+    parser.add_argument("--max-batch", type=int, default=4096)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    suites = {name.strip() for name in args.suite.split(",") if name.strip()}
+    results = {}
+
+    if "tabular" in suites:
+        from benchmarks import bench_tabular
+        print("Running tabular benchmarks")
+        batch_sizes = [size for size in bench_tabular.DEFAULT_BATCH_SIZES if size <= args.max_batch]
+        results.update(bench_tabular.run(args.cardio_csv, batch_sizes, args.repeat))
+
+    if "ecg" in suites:
+        from benchmarks import bench_ecg
+        print("Running ECG benchmarks")
+        results.update(bench_ecg.run(args.mitdb_dir, args.records, args.repeat, args.render))
+
+    if "http" in suites:
+        from benchmarks import http_load
+        print("Running HTTP load benchmarks")
+        results.update(http_load.run(args.requests, args.concurrency, args.cardio_csv, args.mitdb_dir))
+
+    write_results(results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
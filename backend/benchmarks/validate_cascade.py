@@ -0,0 +1,193 @@
+"""
+Validate the ECG cascade screener against the MIT-BIH reference annotations.
+
+Every record is segmented with the production detector, detected beats are
+matched to the .atr annotations, and the CNN is run on all beats once. For
+each pass-through fraction the report shows how many CNN calls the screener
+saves and how much abnormal-beat sensitivity it gives up compared with
+running the CNN on everything. The morphology-cluster mode is evaluated the
+same way (medoid scores propagated to cluster members).
+
+Usage (from the backend directory, with models/ in place):
+    python -m benchmarks.validate_cascade --pass-fractions 0,0.05,0.1,0.2
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, List
+
+# Match main.py: CPU only, quiet TensorFlow
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+import wfdb
+
+from benchmarks.bench_ecg import list_records
+from benchmarks.common import DEFAULT_MITDB_DIR, write_results
+
+# Detected and annotated R peaks closer than this are the same beat
+MATCH_TOLERANCE_SECONDS = 0.075
+
+
+def match_annotations(peaks: np.ndarray, annotation, fs: float):
+    """
+    Label detected beats from the reference annotation.
+
+    Returns:
+        tuple: (mask of detected beats that matched an annotated beat, symbol per matched beat)
+    """
+    from app.services.ecg_processing import BEAT_SYMBOLS
+
+    symbols = np.asarray(annotation.symbol)
+    is_beat = np.isin(symbols, list(BEAT_SYMBOLS))
+    reference = np.asarray(annotation.sample)[is_beat]
+    reference_symbols = symbols[is_beat]
+    if reference.size == 0 or peaks.size == 0:
+        return np.zeros(peaks.size, dtype=bool), np.zeros(0, dtype=reference_symbols.dtype)
+
+    right = np.clip(np.searchsorted(reference, peaks), 0, reference.size - 1)
+    left = np.clip(right - 1, 0, reference.size - 1)
+    nearest = np.where(np.abs(reference[left] - peaks) <= np.abs(reference[right] - peaks), left, right)
+    matched = np.abs(reference[nearest] - peaks) <= MATCH_TOLERANCE_SECONDS * fs
+    return matched, reference_symbols[nearest[matched]]
+
+
+def evaluate(mitdb_dir: str, pass_fractions: List[float], limit: int = None) -> Dict[str, Dict[str, float]]:
+    """
+    Compare full CNN scoring with the cascade for each pass-through fraction.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Metrics keyed by "cascade.pass_<fraction>", plus "full"
+    """
+    from app.core.config import settings
+    from app.services.ecg_processing import (
+        BEAT_WINDOW_SECONDS, NORMAL_BEAT_SYMBOLS, detect_r_peaks, extract_beat_windows
+    )
+    from app.services.ecg_screening import cluster_representatives, screen_beats
+    from app.services.ecg_service import ecg_service
+
+    if ecg_service.model is None:
+        raise RuntimeError("ECG model is not loaded; the harness needs real CNN scores")
+
+    names = [name for name in list_records(mitdb_dir)[:limit] if os.path.exists(os.path.join(mitdb_dir, name + ".atr"))]
+    if not names:
+        raise FileNotFoundError(f"No annotated MIT-BIH records found in {mitdb_dir}")
+
+    symbols, full_scores, forwarded = [], [], {fraction: [] for fraction in pass_fractions}
+    cluster_scores, cluster_forwarded = [], []
+    for name in names:
+        record_path = os.path.join(mitdb_dir, name)
+        record = wfdb.rdrecord(record_path)
+        annotation = wfdb.rdann(record_path, "atr")
+        signal = np.nan_to_num(record.p_signal[:, 0].astype(np.float32))
+        peaks = detect_r_peaks(signal, record.fs)
+        beats, peaks = extract_beat_windows(signal, peaks, int(BEAT_WINDOW_SECONDS * record.fs))
+        matched, matched_symbols = match_annotations(peaks, annotation, record.fs)
+
+        scores = ecg_service.model.predict(beats, verbose=0).ravel()
+        symbols.append(matched_symbols)
+        full_scores.append(scores[matched])
+        for fraction in pass_fractions:
+            # Screen the whole record (context matters), evaluate on annotated beats only
+            mask = screen_beats(
+                beats, peaks, record.fs,
+                min_correlation=settings.ECG_CASCADE_MIN_CORRELATION,
+                rr_tolerance=settings.ECG_CASCADE_RR_TOLERANCE,
+                pass_fraction=fraction
+            )
+            forwarded[fraction].append(mask[matched])
+        cluster_mask, source = cluster_representatives(
+            beats,
+            min_correlation=settings.ECG_CLUSTER_MIN_CORRELATION,
+            downsample=settings.ECG_CLUSTER_DOWNSAMPLE,
+            min_cluster_size=settings.ECG_CLUSTER_MIN_SIZE
+        )
+        cluster_scores.append(scores[source][matched])
+        cluster_forwarded.append(cluster_mask[matched])
+        print(f"  {name}: {matched.sum()} annotated beats")
+
+    symbols = np.concatenate(symbols)
+    labels = ~np.isin(symbols, list(NORMAL_BEAT_SYMBOLS))
+    full_positive = np.concatenate(full_scores) > 0.5
+    abnormal_count = max(int(labels.sum()), 1)
+    full_sensitivity = float((full_positive & labels).sum() / abnormal_count)
+    full_specificity = float((~full_positive & ~labels).sum() / max(int((~labels).sum()), 1))
+
+    results = {"full": {
+        "beats": int(labels.size),
+        "abnormal_beats": int(labels.sum()),
+        "sensitivity": full_sensitivity,
+        "specificity": full_specificity,
+        "cnn_call_fraction": 1.0
+    }}
+    for fraction in pass_fractions:
+        mask = np.concatenate(forwarded[fraction])
+        # Screened-out beats are scored normal, so the cascade can only lose positives
+        cascade_positive = full_positive & mask
+        sensitivity = float((cascade_positive & labels).sum() / abnormal_count)
+        results[f"cascade.pass_{fraction:g}"] = {
+            "pass_fraction": fraction,
+            "sensitivity": sensitivity,
+            "sensitivity_loss": full_sensitivity - sensitivity,
+            "specificity": float((~cascade_positive & ~labels).sum() / max(int((~labels).sum()), 1)),
+            "screener_recall": float((mask & labels).sum() / abnormal_count),
+            "cnn_call_fraction": float(mask.mean()),
+            "cnn_call_reduction": float(1.0 - mask.mean()),
+            # Share of each abnormal beat type the screener forwards to the CNN
+            "screener_recall_by_symbol": {
+                str(symbol): float(mask[symbols == symbol].mean())
+                for symbol in sorted(set(symbols[labels]))
+            }
+        }
+
+    cluster_positive = np.concatenate(cluster_scores) > 0.5
+    cluster_mask = np.concatenate(cluster_forwarded)
+    cluster_sensitivity = float((cluster_positive & labels).sum() / abnormal_count)
+    results["cluster"] = {
+        "sensitivity": cluster_sensitivity,
+        "sensitivity_loss": full_sensitivity - cluster_sensitivity,
+        "specificity": float((~cluster_positive & ~labels).sum() / max(int((~labels).sum()), 1)),
+        "label_agreement_with_full": float((cluster_positive == full_positive).mean()),
+        "cnn_call_fraction": float(cluster_mask.mean()),
+        "cnn_call_reduction": float(1.0 - cluster_mask.mean())
+    }
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Validate the ECG cascade screener against MIT-BIH annotations")
+    parser.add_argument("--mitdb-dir", default=DEFAULT_MITDB_DIR)
+    parser.add_argument("--records", type=int, default=None, help="Limit the number of MIT-BIH records")
+    parser.add_argument("--pass-fractions", default="0,0.05,0.1,0.2")
+    parser.add_argument("--output", default=None, help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    pass_fractions = [float(value) for value in args.pass_fractions.split(",") if value.strip()]
+    results = evaluate(args.mitdb_dir, pass_fractions, args.records)
+
+    full = results["full"]
+    print(f"\n{full['beats']} annotated beats ({full['abnormal_beats']} abnormal); "
+          f"full CNN sensitivity {full['sensitivity']:.2%}, specificity {full['specificity']:.2%}")
+    print(f"{'pass fraction':>14} {'CNN calls':>10} {'reduction':>10} {'sensitivity':>12} {'loss':>8} {'screener recall':>16}")
+    for name, row in results.items():
+        if not name.startswith("cascade."):
+            continue
+        print(f"{row['pass_fraction']:>14.2f} {row['cnn_call_fraction']:>10.1%} {row['cnn_call_reduction']:>10.1%} "
+              f"{row['sensitivity']:>12.2%} {row['sensitivity_loss']:>8.2%} {row['screener_recall']:>16.2%}")
+        print(" " * 15 + "recall by beat type: " + ", ".join(
+            f"{symbol} {recall:.0%}" for symbol, recall in row["screener_recall_by_symbol"].items()))
+
+    cluster = results["cluster"]
+    print(f"\ncluster mode: {cluster['cnn_call_fraction']:.1%} CNN calls ({cluster['cnn_call_reduction']:.1%} reduction), "
+          f"sensitivity {cluster['sensitivity']:.2%} (loss {cluster['sensitivity_loss']:.2%}), "
+          f"label agreement with full {cluster['label_agreement_with_full']:.2%}")
+
+    if args.output:
+        write_results(results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Concurrent WebSocket streaming load test.
+
+Starts the API with uvicorn in this process and opens N streaming sessions
+that replay a MIT-BIH record at real-time rate (or faster with --speed).
+Reports per-beat latency (last sample of the beat window arriving at the
+server to its label being ready) and the beats classified per second.
+
+Usage (from the backend directory, with models/ in place):
+    python -m benchmarks.ws_load --sessions 300 --seconds 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+# Match main.py: CPU only, quiet TensorFlow
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+import wfdb
+
+from benchmarks.common import DEFAULT_MITDB_DIR, write_results
+
+# Length of each frame sent by a simulated device
+FRAME_SECONDS = 0.1
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _create_token() -> str:
+    from app.core.security import create_access_token
+    from app.db.base import SessionLocal
+    from app.models.user import User
+
+    db = SessionLocal()
+    try:
+        user = User(username="ws_bench", email="ws_bench@example.com", hashed_password="!", is_active=True)
+        db.add(user)
+        db.commit()
+        return create_access_token({"sub": str(user.id)})
+    finally:
+        db.close()
+
+
+async def _client(url: str, token: str, frames: List[bytes], interval: float, offset: float) -> Dict[str, Any]:
+    import websockets
+
+    latencies, abnormal, episodes = [], 0, 0
+    await asyncio.sleep(offset)
+    async with websockets.connect(url, subprotocols=["bearer", token], max_queue=None) as ws:
+        ready = json.loads(await ws.recv())
+        assert ready["type"] == "ready", ready
+
+        async def receive():
+            nonlocal abnormal, episodes
+            async for message in ws:
+                event = json.loads(message)
+                if event["type"] == "beats":
+                    latencies.extend(beat["latency_ms"] for beat in event["beats"])
+                    abnormal += sum(beat["label"] == "abnormal" for beat in event["beats"])
+                elif event["type"] == "episode":
+                    episodes += 1
+                elif event["type"] == "summary":
+                    return event
+
+        receiver = asyncio.create_task(receive())
+        start = time.perf_counter()
+        for index, frame in enumerate(frames):
+            # Pace against the wall clock so slow sends do not accumulate drift
+            delay = start + index * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await ws.send(frame)
+        await ws.send("end")
+        summary = await receiver
+    return {"latencies": latencies, "abnormal": abnormal, "episodes": episodes, "summary": summary}
+
+
+async def _run(sessions: int, seconds: float, speed: float, mitdb_dir: str, record: str) -> Dict[str, Any]:
+    import uvicorn
+    from main import app
+
+    header = wfdb.rdheader(os.path.join(mitdb_dir, record))
+    digital = wfdb.rdrecord(os.path.join(mitdb_dir, record), channels=[0], physical=False,
+                            sampto=min(header.sig_len, int(seconds * header.fs)))
+    samples = digital.d_signal[:, 0].astype("<i2")
+    gain, baseline = digital.adc_gain[0], digital.baseline[0]
+    frame_samples = max(1, int(FRAME_SECONDS * header.fs))
+    frames = [samples[i:i + frame_samples].tobytes() for i in range(0, samples.size, frame_samples)]
+    interval = frame_samples / header.fs / speed
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", ws_max_queue=1024))
+    serve = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    token = _create_token()
+    url = f"ws://127.0.0.1:{port}/api/v1/stream/ecg?fs={header.fs}&gain={gain}&baseline={baseline}"
+    wall_start = time.perf_counter()
+    # Stagger connections over one frame interval, like independent devices
+    results = await asyncio.gather(*(
+        _client(url, token, frames, interval, interval * i / sessions) for i in range(sessions)
+    ))
+    wall_time = time.perf_counter() - wall_start
+    server.should_exit = True
+    await serve
+
+    latencies = np.concatenate([np.asarray(r["latencies"], dtype=np.float64) for r in results])
+    beat_count = int(latencies.size)
+    return {
+        "sessions": sessions,
+        "record": record,
+        "stream_seconds": samples.size / header.fs,
+        "speed": speed,
+        "wall_time": wall_time,
+        "beats": beat_count,
+        "beats_per_s": beat_count / wall_time if wall_time > 0 else None,
+        "abnormal_beats": int(sum(r["abnormal"] for r in results)),
+        "episodes": int(sum(r["episodes"] for r in results)),
+        "latency_ms": {
+            "p50": float(np.percentile(latencies, 50)) if beat_count else None,
+            "p95": float(np.percentile(latencies, 95)) if beat_count else None,
+            "p99": float(np.percentile(latencies, 99)) if beat_count else None,
+            "max": float(latencies.max()) if beat_count else None
+        }
+    }
+
+
+def run(sessions: int = 100, seconds: float = 30.0, speed: float = 1.0, mitdb_dir: str = DEFAULT_MITDB_DIR,
+        record: str = "100") -> Dict[str, Any]:
+    """
+    Stream ``record`` over ``sessions`` concurrent WebSocket connections.
+
+    A throwaway SQLite database is used so the benchmark user never lands in
+    the development database.
+
+    Args:
+        sessions (int): Concurrent streams
+        seconds (float): Length of the recording replayed by each stream
+        speed (float): Replay speed relative to real time
+        mitdb_dir (str): Directory containing the MIT-BIH records
+        record (str): MIT-BIH record replayed by every stream
+
+    Returns:
+        Dict[str, Any]: Beat counts, throughput and latency percentiles
+    """
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='ws_bench_'), 'bench.sqlite3')}"
+    os.environ["DATABASE_URL"] = database_url
+    from app.core.config import settings
+    settings.DATABASE_URL = database_url
+    settings.ECG_STREAM_MAX_SESSIONS = max(settings.ECG_STREAM_MAX_SESSIONS, sessions)
+    return asyncio.run(_run(sessions, seconds, speed, mitdb_dir, record))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent WebSocket ECG streaming load test")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed relative to real time")
+    parser.add_argument("--mitdb-dir", default=DEFAULT_MITDB_DIR)
+    parser.add_argument("--record", default="100")
+    parser.add_argument("--output", default=None, help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.sessions, args.seconds, args.speed, args.mitdb_dir, args.record)
+    latency = results["latency_ms"]
+    print(f"{results['sessions']} sessions x {results['stream_seconds']:.0f} s at {results['speed']:g}x: "
+          f"{results['beats']} beats in {results['wall_time']:.1f} s ({results['beats_per_s']:.0f} beats/s)")
+    print(f"beat latency ms: p50 {latency['p50']:.1f}, p95 {latency['p95']:.1f}, "
+          f"p99 {latency['p99']:.1f}, max {latency['max']:.1f}")
+    if args.output:
+        write_results({"ws.stream": results}, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+Compact old uploaded ECG records to lossless archives.
+
+Runs one pass of the application's upload compactor: every record in
+uploads/ecg_files whose .dat file is older than the given age is replaced
+by a verified .ecgz archive (second-order prediction residuals, Rice coded
+in independently decodable blocks). The .hea file is kept and the record
+loaders read the archive transparently. The server does the same in the
+background every ECG_ARCHIVE_INTERVAL_SECONDS.
+
+Usage (from the backend directory):
+    python compact_uploads.py [--older-than-days 30] [--directory uploads/ecg_files] [--dry-run]
+"""
+
+import argparse
+import sys
+
+
+def main(argv=None) -> int:
+    from app.core.config import settings
+    from app.services.ecg_archive import upload_compactor
+
+    parser = argparse.ArgumentParser(description="Compact old uploaded ECG records to lossless archives")
+    parser.add_argument("--older-than-days", type=float, default=settings.ECG_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--directory", default=None, help="Defaults to the upload directory")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived")
+    args = parser.parse_args(argv)
+
+    stats = upload_compactor.compact(args.directory, after_days=args.older_than_days, dry_run=args.dry_run)
+    verb = "Would archive" if args.dry_run else "Archived"
+    print(f"{verb} {stats['archived']} records ({stats['skipped']} skipped, {stats['failed']} failed)")
+    if stats["archived_bytes"]:
+        print(f"Disk usage: {stats['original_bytes'] / 1e6:.1f} MB -> {stats['archived_bytes'] / 1e6:.1f} MB "
+              f"({stats['original_bytes'] / stats['archived_bytes']:.2f}x)")
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
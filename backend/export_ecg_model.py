@@ -0,0 +1,237 @@
+"""
+Export the trained ECG CNN to alternative inference runtimes.
+
+npz:    writes the inference weights to models/best_ecg_model.npz for the
+        TensorFlow-free NumPy runtime and checks output parity against Keras.
+tflite: converts models/best_ecg_model.h5 to a TFLite flatbuffer with
+        dynamic-range or full-integer quantisation (calibrated on MIT-BIH
+        beats) and reports the accuracy delta and throughput against the
+        float model.
+
+Usage (from the backend directory):
+    python export_ecg_model.py npz [--verify]
+    python export_ecg_model.py tflite --quantization int8
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+# Match main.py: CPU only, quiet TensorFlow
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+import wfdb
+
+from app.services.ecg_processing import BEAT_SYMBOLS, NORMAL_BEAT_SYMBOLS
+
+DEFAULT_KERAS_PATH = os.path.join("models", "best_ecg_model.h5")
+DEFAULT_NPZ_PATH = os.path.join("models", "best_ecg_model.npz")
+DEFAULT_TFLITE_PATHS = {
+    "float": os.path.join("models", "best_ecg_model.tflite"),
+    "dynamic": os.path.join("models", "best_ecg_model_dynamic.tflite"),
+    "int8": os.path.join("models", "best_ecg_model_int8.tflite"),
+}
+DEFAULT_MITDB_DIR = os.path.join("..", "datasets", "physionet.org", "files", "mitdb", "1.0.0")
+
+
+
+def load_annotated_beats(mitdb_dir: str = DEFAULT_MITDB_DIR, max_beats_per_record: int = None, seed: int = 42):
+    """
+    Cut annotated beats out of the MIT-BIH records exactly as the notebook did.
+
+    Each beat is a 0.6 s window centred on the annotated R peak of lead 0,
+    z-scored individually.
+
+    Args:
+        mitdb_dir (str): Directory containing the MIT-BIH records
+        max_beats_per_record (int): Randomly subsample each record to at most this many beats
+        seed (int): Seed for the subsampling
+
+    Returns:
+        tuple: (beats of shape (N, window, 1), binary labels of shape (N,))
+    """
+    rng = np.random.default_rng(seed)
+    segments, labels = [], []
+    for hea_path in sorted(glob.glob(os.path.join(mitdb_dir, "*.hea"))):
+        record_path = os.path.splitext(hea_path)[0]
+        if not os.path.exists(record_path + ".atr"):
+            continue
+        record = wfdb.rdrecord(record_path)
+        annotation = wfdb.rdann(record_path, "atr")
+        signal = record.p_signal[:, 0].astype(np.float32)
+        window = int(0.6 * record.fs)
+
+        peaks = np.asarray(annotation.sample)
+        symbols = np.asarray(annotation.symbol)
+        keep = np.isin(symbols, list(BEAT_SYMBOLS)) & (peaks - window // 2 >= 0) & (peaks + window // 2 <= len(signal))
+        peaks, symbols = peaks[keep], symbols[keep]
+        if max_beats_per_record is not None and len(peaks) > max_beats_per_record:
+            chosen = np.sort(rng.choice(len(peaks), max_beats_per_record, replace=False))
+            peaks, symbols = peaks[chosen], symbols[chosen]
+
+        starts = peaks - window // 2
+        beats = signal[starts[:, None] + np.arange(window)]
+        beats = (beats - beats.mean(axis=1, keepdims=True)) / (beats.std(axis=1, keepdims=True) + 1e-8)
+        segments.append(beats)
+        labels.append(np.array([0 if symbol in NORMAL_BEAT_SYMBOLS else 1 for symbol in symbols], dtype=np.int8))
+
+    if not segments:
+        raise FileNotFoundError(f"No annotated MIT-BIH records found in {mitdb_dir}")
+    return np.concatenate(segments)[..., np.newaxis], np.concatenate(labels)
+
+
+def load_keras_model(path: str):
+    import tensorflow as tf
+    return tf.keras.models.load_model(path, compile=False)
+
+
+def export_npz(args) -> int:
+    from app.services.ecg_runtime import NumpyECGModel, export_keras_model
+
+    keras_model = load_keras_model(args.keras_path)
+    export_keras_model(keras_model, args.output)
+    print(f"Exported {args.keras_path} -> {args.output} ({os.path.getsize(args.output)} bytes)")
+
+    if not args.verify:
+        return 0
+
+    beats, _ = load_annotated_beats(args.mitdb_dir, args.max_beats_per_record)
+    keras_out = keras_model.predict(beats, batch_size=1024, verbose=0)
+    numpy_out = NumpyECGModel.load(args.output).predict(beats)
+    max_error = float(np.max(np.abs(keras_out - numpy_out)))
+    label_agreement = float(np.mean((keras_out > 0.5) == (numpy_out > 0.5)))
+    print(f"Parity on {len(beats)} MIT-BIH beats: max |keras - numpy| = {max_error:.2e}, "
+          f"label agreement = {label_agreement:.4%}")
+    if max_error > args.tolerance:
+        print(f"Parity check FAILED (tolerance {args.tolerance:.1e})")
+        return 1
+    print("Parity check passed")
+    return 0
+
+
+def convert_tflite(keras_model, quantization: str, calibration_beats: np.ndarray = None) -> bytes:
+    """
+    Convert the Keras model to a TFLite flatbuffer.
+
+    Args:
+        keras_model: Loaded Keras model
+        quantization (str): "float", "dynamic" (int8 weights, float activations)
+            or "int8" (int8 weights and activations, calibrated)
+        calibration_beats (np.ndarray): Representative beats for "int8" calibration
+
+    Returns:
+        bytes: The serialised model
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if quantization in ("dynamic", "int8"):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "int8":
+        def representative_dataset():
+            for beat in calibration_beats:
+                yield [beat[np.newaxis].astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+        # Integer-only kernels; inputs/outputs stay float so callers need no scaling
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    return converter.convert()
+
+
+def _throughput(predict, beats: np.ndarray, batch_size: int, repeats: int = 3) -> float:
+    """Best-of-N beats per second for a predict callable"""
+    predict(beats[:batch_size])
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for offset in range(0, len(beats), batch_size):
+            predict(beats[offset:offset + batch_size])
+        best = min(best, time.perf_counter() - start)
+    return len(beats) / best
+
+
+def export_tflite(args) -> int:
+    import tensorflow as tf
+    from app.services.ecg_runtime import TFLiteECGModel
+
+    # Single-threaded kernels on both sides so the throughput ratio is per core
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    keras_model = load_keras_model(args.keras_path)
+    output = args.output or DEFAULT_TFLITE_PATHS[args.quantization]
+    beats, labels = load_annotated_beats(args.mitdb_dir, args.max_beats_per_record)
+
+    calibration = None
+    if args.quantization == "int8":
+        # Calibration beats are drawn independently of the evaluation order
+        rng = np.random.default_rng(args.seed)
+        calibration = beats[rng.choice(len(beats), min(args.calibration_beats, len(beats)), replace=False)]
+
+    model_content = convert_tflite(keras_model, args.quantization, calibration)
+    with open(output, "wb") as f:
+        f.write(model_content)
+    print(f"Exported {args.keras_path} -> {output} ({len(model_content)} bytes, {args.quantization})")
+
+    tflite_model = TFLiteECGModel(model_content, num_threads=1, model_path=output)
+    float_scores = keras_model.predict(beats, batch_size=args.batch_size, verbose=0).ravel()
+    tflite_scores = tflite_model.predict(beats, batch_size=args.batch_size).ravel()
+
+    float_accuracy = float(np.mean((float_scores > 0.5) == labels))
+    tflite_accuracy = float(np.mean((tflite_scores > 0.5) == labels))
+    agreement = float(np.mean((float_scores > 0.5) == (tflite_scores > 0.5)))
+    print(f"Evaluated on {len(beats)} MIT-BIH beats")
+    print(f"  accuracy: float {float_accuracy:.4%}, tflite {tflite_accuracy:.4%}, "
+          f"delta {tflite_accuracy - float_accuracy:+.4%}")
+    print(f"  label agreement with float model: {agreement:.4%}, "
+          f"max |score delta| = {np.max(np.abs(float_scores - tflite_scores)):.4f}")
+
+    if args.benchmark_beats:
+        sample = beats[:args.benchmark_beats]
+        keras_rate = _throughput(lambda batch: keras_model(batch, training=False), sample, args.batch_size)
+        tflite_rate = _throughput(tflite_model.predict, sample, args.batch_size)
+        print(f"  throughput (1 thread, batch {args.batch_size}): keras {keras_rate:,.0f} beats/s, "
+              f"tflite {tflite_rate:,.0f} beats/s ({tflite_rate / keras_rate:.1f}x)")
+
+    if float_accuracy - tflite_accuracy > args.max_accuracy_drop:
+        print(f"Accuracy drop exceeds {args.max_accuracy_drop:.2%}")
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export the ECG CNN to alternative inference runtimes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    npz_parser = subparsers.add_parser("npz", help="Export weights for the NumPy runtime")
+    npz_parser.add_argument("--keras-path", default=DEFAULT_KERAS_PATH)
+    npz_parser.add_argument("--output", default=DEFAULT_NPZ_PATH)
+    npz_parser.add_argument("--verify", action="store_true", help="Check output parity against Keras on MIT-BIH beats")
+    npz_parser.add_argument("--mitdb-dir", default=DEFAULT_MITDB_DIR)
+    npz_parser.add_argument("--max-beats-per-record", type=int, default=None)
+    npz_parser.add_argument("--tolerance", type=float, default=1e-4)
+    npz_parser.set_defaults(handler=export_npz)
+
+    tflite_parser = subparsers.add_parser("tflite", help="Convert to a (quantised) TFLite model")
+    tflite_parser.add_argument("--keras-path", default=DEFAULT_KERAS_PATH)
+    tflite_parser.add_argument("--output", default=None, help="Defaults to models/best_ecg_model[_<quantization>].tflite")
+    tflite_parser.add_argument("--quantization", choices=sorted(DEFAULT_TFLITE_PATHS), default="int8")
+    tflite_parser.add_argument("--mitdb-dir", default=DEFAULT_MITDB_DIR)
+    tflite_parser.add_argument("--max-beats-per-record", type=int, default=None)
+    tflite_parser.add_argument("--calibration-beats", type=int, default=500)
+    tflite_parser.add_argument("--seed", type=int, default=42)
+    tflite_parser.add_argument("--batch-size", type=int, default=256)
+    tflite_parser.add_argument("--benchmark-beats", type=int, default=4096, help="0 disables the throughput comparison")
+    tflite_parser.add_argument("--max-accuracy-drop", type=float, default=0.01)
+    tflite_parser.set_defaults(handler=export_tflite)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
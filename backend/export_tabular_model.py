@@ -0,0 +1,94 @@
+"""
+Export the trained tabular model and scaler to the memory-mapped artifact format.
+
+Writes models/tabular_artifact/: the tree ensemble and scaler parameters as
+raw .npy arrays plus a manifest with the format version, source library
+versions and SHA-256 checksums. TabularPredictionService maps it read-only
+instead of unpickling the model, so loading takes milliseconds, needs
+neither LightGBM nor scikit-learn, and the pages are shared by every
+process on the host. With --verify the artifact's probabilities are
+compared with the original model on cardio_train.csv.
+
+Usage (from the backend directory):
+    python export_tabular_model.py [--verify]
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+
+DEFAULT_MODEL_PATH = os.path.join("models", "best_tabular_model.pkl")
+DEFAULT_SCALER_PATH = os.path.join("models", "tabular_scaler.pkl")
+DEFAULT_ARTIFACT_DIR = os.path.join("models", "tabular_artifact")
+DEFAULT_CARDIO_CSV = os.path.join("..", "datasets", "cardio_train.csv")
+
+
+def load_pickle(path: str):
+    """Load a joblib or plain pickle file"""
+    import joblib
+    try:
+        return joblib.load(path)
+    except Exception:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def export(args) -> int:
+    from app.services.tabular_runtime import export_artifact, load_artifact
+
+    feature_names = ['age', 'gender', 'height', 'weight', 'ap_hi', 'ap_lo',
+                     'cholesterol', 'gluc', 'smoke', 'alco', 'active']
+    started = time.perf_counter()
+    model = load_pickle(args.model_path)
+    scaler = load_pickle(args.scaler_path) if os.path.exists(args.scaler_path) else None
+    pickle_ms = (time.perf_counter() - started) * 1000
+
+    manifest = export_artifact(model, scaler, args.output, feature_names=feature_names,
+                               source_paths={"model": args.model_path, "scaler": args.scaler_path})
+    started = time.perf_counter()
+    exported_model, exported_scaler, _ = load_artifact(args.output)
+    artifact_ms = (time.perf_counter() - started) * 1000
+    print(f"Exported {args.model_path} -> {args.output} ({manifest['n_trees']} trees, {manifest['n_nodes']} nodes)")
+    print(f"Load time: pickles {pickle_ms:.1f} ms, artifact {artifact_ms:.1f} ms (checksums verified)")
+
+    if not args.verify:
+        return 0
+
+    import pandas as pd
+    frame = pd.read_csv(args.cardio_csv, sep=";")[feature_names]
+    features = frame.values.astype(np.float64)
+    scaled = scaler.transform(frame) if scaler is not None else features
+    if hasattr(model, "feature_names_in_"):
+        scaled = pd.DataFrame(scaled, columns=model.feature_names_in_)
+    expected = model.predict_proba(scaled)[:, 1]
+    exported_scaled = exported_scaler.transform(features) if exported_scaler is not None else features
+    actual = exported_model.predict_proba(exported_scaled)[:, 1]
+    max_error = float(np.max(np.abs(expected - actual)))
+    label_agreement = float(np.mean((expected > 0.5) == (actual > 0.5)))
+    print(f"Parity on {len(features)} patients: max |model - artifact| = {max_error:.2e}, "
+          f"label agreement = {label_agreement:.4%}")
+    if max_error > args.tolerance:
+        print(f"Parity check FAILED (tolerance {args.tolerance:.1e})")
+        return 1
+    print("Parity check passed")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export the tabular model to the memory-mapped artifact format")
+    parser.add_argument("--model-path", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--scaler-path", default=DEFAULT_SCALER_PATH)
+    parser.add_argument("--output", default=DEFAULT_ARTIFACT_DIR)
+    parser.add_argument("--verify", action="store_true", help="Check probability parity on cardio_train.csv")
+    parser.add_argument("--cardio-csv", default=DEFAULT_CARDIO_CSV)
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    args = parser.parse_args(argv)
+    return export(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
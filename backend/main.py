@@ -1,10 +1,14 @@
 import os
+import secrets
+from typing import Optional
 # Set environment variables to suppress CUDA warnings
 os.environ['CUDA_VISIBLE_DEVICES'] = '-1'  # Force CPU only
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'   # Reduce TF logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header
+from fastapi.datastructures import Default
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import uvicorn
 
 from app.api.v1 import api_router
@@ -12,6 +16,11 @@ from app.core.config import settings
 from app.db.init_db import init_db
 from app.db.base import engine, Base
 from app.core import get_logger
+from app.core.metrics import registry as metrics_registry
+from app.core.middleware import CompressionMiddleware, RequestMetricsMiddleware, RequestTracingMiddleware
+from app.core.responses import ORJSONResponse
+from app.services.model_registry import model_watcher
+from app.services.ecg_archive import upload_compactor
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -26,7 +35,11 @@ except Exception as e:
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    # As a default placeholder, FastAPI versions that serialise response_model
+    # routes straight to JSON bytes with Pydantic keep doing so; everything
+    # else is rendered by orjson
+    default_response_class=Default(ORJSONResponse)
 )
 
 # Set all CORS enabled origins
@@ -39,6 +52,10 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RequestTracingMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 @app.get("/")
@@ -51,15 +68,29 @@ async def health_check():
     logger.info("Health check endpoint accessed")
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(authorization: Optional[str] = Header(None)):
+    # Route inventory and model versions are not public; scrapers send METRICS_TOKEN as a bearer token
+    if settings.METRICS_TOKEN and not secrets.compare_digest(
+            (authorization or "").encode(), f"Bearer {settings.METRICS_TOKEN}".encode()):
+        return PlainTextResponse("Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Application startup",
               app_name=settings.PROJECT_NAME,
               api_version=settings.API_V1_STR)
+    # Hot-reload changed model files
+    model_watcher.start()
+    # Compact old uploads to lossless archives in the background
+    upload_compactor.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Application shutdown")
+    model_watcher.stop()
+    upload_compactor.stop()
 
 if __name__ == "__main__":
     logger.info("Starting application server")
@@ -27,16 +27,23 @@ def create_sample_tabular_model():
     scaler = StandardScaler()
     scaler.fit(X)
     
-    # Save model with joblib (recommended for sklearn models)
+    # Save model with joblib (recommended for sklearn models); uncompressed, so loading skips zlib
     model_path = os.path.join("models", "best_tabular_model.pkl")
-    joblib.dump(model, model_path, compress=3)
+    joblib.dump(model, model_path)
     print(f"Model saved to {model_path}")
     
     # Save scaler with joblib
     scaler_path = os.path.join("models", "tabular_scaler.pkl")
-    joblib.dump(scaler, scaler_path, compress=3)
+    joblib.dump(scaler, scaler_path)
     print(f"Scaler saved to {scaler_path}")
     
+    # Memory-mapped artifact the prediction service loads in milliseconds
+    from app.services.tabular_runtime import export_artifact
+    artifact_dir = os.path.join("models", "tabular_artifact")
+    export_artifact(model, scaler, artifact_dir,
+                    source_paths={"model": model_path, "scaler": scaler_path})
+    print(f"Artifact exported to {artifact_dir}")
+    
     # Test loading
     try:
         loaded_model = joblib.load(model_path)
@@ -63,6 +70,7 @@ def verify_model_files():
     
     print(f"Model file exists: {os.path.exists(model_path)}")
     print(f"Scaler file exists: {os.path.exists(scaler_path)}")
+    print(f"Artifact exists: {os.path.exists(os.path.join('models', 'tabular_artifact', 'manifest.json'))}")
     
     if os.path.exists(model_path):
         print(f"Model file size: {os.path.getsize(model_path)} bytes")
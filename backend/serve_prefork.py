@@ -0,0 +1,148 @@
+"""
+Prefork server: load the application and its models once, then fork workers that share them.
+
+``uvicorn main:app --workers N`` starts every worker from scratch, so each
+one imports the ML stack and loads its own copy of every model. Here the
+master imports ``main`` (database, services, models, warm-up) before
+forking, so the workers inherit those pages copy-on-write. The garbage
+collector is disabled while loading and everything alive is moved to the
+permanent generation with ``gc.freeze()`` right before forking, so
+collections in the workers never write to (and un-share) the inherited
+objects. The NumPy ECG backend additionally memory-maps its weights
+(``ECG_NUMPY_MMAP_DIR``), which stay shared even after a hot reload.
+
+The master only supervises: it restarts workers that die and forwards
+SIGINT/SIGTERM for a graceful shutdown.
+
+Metrics are per process: ``/metrics`` reports the counters of the worker
+that accepted the scrape.
+
+Usage (from the backend directory):
+    python serve_prefork.py --workers 8 --port 8000
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# Match main.py: CPU only, quiet TensorFlow
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+# TensorFlow's runtime threads do not survive fork()
+FORK_SAFE_BACKENDS = ("numpy", "tflite")
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """Listening socket created in the master and inherited by every worker"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, log_level: str) -> None:
+    """Serve requests in a forked worker until it is told to stop"""
+    import uvicorn
+    from app.db.base import engine
+
+    for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGCHLD):
+        signal.signal(signum, signal.SIG_DFL)
+    gc.enable()
+    # Pooled connections belong to the master; open fresh ones in this process
+    engine.dispose(close=False)
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the API from forked workers that share loaded models")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--log-level", default="warning", help="uvicorn log level")
+    args = parser.parse_args(argv)
+
+    # Objects created while loading go straight to the permanent generation below
+    gc.disable()
+    from app.core import get_logger
+    from app.core.config import settings
+
+    logger = get_logger("serve_prefork")
+    backend = settings.ECG_INFERENCE_BACKEND.lower()
+    if backend not in FORK_SAFE_BACKENDS:
+        logger.error("ECG backend cannot be shared across forked workers; export the model and use numpy or tflite",
+                     backend=backend, supported=list(FORK_SAFE_BACKENDS))
+        return 2
+
+    from main import app  # database, services and models are loaded here, once
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    gc.collect()
+    gc.freeze()
+    logger.info("Prefork master ready", pid=os.getpid(), workers=args.workers, port=args.port,
+                frozen_objects=gc.get_freeze_count())
+
+    workers = {}
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(app, sock, args.log_level)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        workers[pid] = time.monotonic()
+        logger.info("Worker started", pid=pid)
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(max(1, args.workers)):
+        spawn()
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        logger.warning("Worker exited, restarting", pid=pid, exit_status=status,
+                       uptime_seconds=round(time.monotonic() - started, 1))
+        # Back off when workers die right after starting
+        if time.monotonic() - started < 1.0:
+            time.sleep(1.0)
+        spawn()
+
+    sock.close()
+    logger.info("Prefork master stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
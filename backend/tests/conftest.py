@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The application package lives next to this directory; logs and the database go to a scratch directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_SCRATCH = tempfile.mkdtemp(prefix="cardio-tests-")
+os.environ.setdefault("LOG_FILE", os.path.join(_SCRATCH, "application.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_SCRATCH, 'test.db')}")
+# Cheap hashes, and no background threads polling models or compacting uploads
+os.environ.setdefault("BCRYPT_ROUNDS", "5")
+os.environ.setdefault("MODEL_RELOAD_POLL_SECONDS", "0")
+os.environ.setdefault("ECG_ARCHIVE_INTERVAL_SECONDS", "0")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """TestClient of the application; uploads and visualizations are written under ``tmp_path``"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    monkeypatch.chdir(tmp_path)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def user(client):
+    """A registered, active user (unique per test)"""
+    import uuid
+
+    from app.db.base import SessionLocal
+    from app.core.security import get_password_hash
+    from app.models.user import User
+
+    db = SessionLocal()
+    try:
+        name = f"user-{uuid.uuid4().hex[:12]}"
+        user = User(username=name, email=f"{name}@example.com", hashed_password=get_password_hash("secret123"))
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def auth_headers(user):
+    from app.core.security import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+@pytest.fixture
+def beat_model(tmp_path_factory, monkeypatch):
+    """
+    Serve ECG predictions from a tiny NumPy-backend CNN that flags every beat.
+
+    Conv1D(1, relu) -> GlobalAveragePooling1D -> Dense(1, sigmoid): the mean
+    rectified z-score of a beat is positive, so every score is above 0.5,
+    and the head supports Grad-CAM.
+    """
+    import json
+
+    import numpy as np
+
+    from app.core.config import settings
+    from app.services.ecg_service import ecg_service
+
+    path = str(tmp_path_factory.mktemp("ecg-model") / "beats.npz")
+    layers = [
+        {"type": "Conv1D", "name": "conv", "activation": "relu", "strides": 1, "dilation_rate": 1,
+         "padding": "same", "weights": ["kernel", "bias"]},
+        {"type": "GlobalAveragePooling1D", "name": "pool", "weights": []},
+        {"type": "Dense", "name": "out", "activation": "sigmoid", "weights": ["kernel", "bias"]},
+    ]
+    np.savez(path, __layers__=np.array(json.dumps(layers)),
+             **{"0/kernel": np.ones((3, 1, 1), np.float32), "0/bias": np.zeros(1, np.float32),
+                "2/kernel": np.full((1, 1), 4.0, np.float32), "2/bias": np.zeros(1, np.float32)})
+    monkeypatch.setattr(settings, "ECG_NUMPY_MODEL_PATH", path)
+    monkeypatch.setattr(settings, "ECG_NUMPY_MMAP_DIR", "")
+    # The registry never swaps a loaded model back to the placeholder, so the previous version is restored directly
+    monkeypatch.setattr(ecg_service.models, "_current", ecg_service.models.current)
+    monkeypatch.setattr(ecg_service, "_requested_backend", ecg_service._requested_backend)
+    ecg_service.load_model("numpy")
+    return ecg_service.model
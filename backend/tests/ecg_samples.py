@@ -0,0 +1,46 @@
+"""Synthetic ECG records shared by the tests"""
+import os
+import uuid
+
+import numpy as np
+import wfdb
+
+
+def synthetic_ecg(fs: float, seconds: float, rr: float = 0.8):
+    """P-QRS-T complexes as Gaussians, in mV; returns the signal and the R-peak times in seconds"""
+    t = np.arange(int(seconds * fs)) / fs
+    r_times = np.arange(0.5, seconds - 0.5, rr)
+    ecg = np.zeros_like(t)
+    for r in r_times:
+        for offset, width, amplitude in ((-0.2, 0.025, 0.15), (-0.03, 0.01, -0.15), (0.0, 0.012, 1.2),
+                                         (0.03, 0.01, -0.25), (0.3, 0.06, 0.3)):
+            ecg += amplitude * np.exp(-0.5 * ((t - r - offset) / width) ** 2)
+    return ecg, r_times
+
+
+def write_record(directory, fs: float, signal: np.ndarray, name: str = "patient_recording") -> str:
+    """Write a one-lead 16-bit record and return its base path"""
+    wfdb.wrsamp(name, fs=fs, units=["mV"], sig_name=["MLII"],
+                d_signal=np.round(signal * 200).astype(np.int64)[:, np.newaxis],
+                fmt=["16"], adc_gain=[200], baseline=[0], write_dir=str(directory))
+    return os.path.join(str(directory), name)
+
+
+def write_upload(directory, fs: float, signal: np.ndarray) -> str:
+    """
+    Save a one-lead 16-bit record the way the upload endpoint does: under a
+    UUID-prefixed name while the header still names the original record
+    (the 250 Hz case of test_realistic_ecg_processing.py)
+    """
+    original = write_record(directory, fs, signal)
+    base_path = os.path.join(str(directory), f"{uuid.uuid4()}_patient_recording")
+    for extension in (".dat", ".hea"):
+        os.rename(original + extension, base_path + extension)
+    return base_path + ".dat"
+
+
+def upload_files(base_path: str) -> list:
+    """Multipart ``files`` of a record for the prediction endpoints"""
+    name = os.path.basename(base_path)
+    return [("files", (name + extension, open(base_path + extension, "rb").read(), "application/octet-stream"))
+            for extension in (".dat", ".hea")]
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+from passlib.context import CryptContext
+
+from app.api.v1.endpoints import auth
+from app.core import rate_limit
+from app.core.rate_limit import SlidingWindowRateLimiter
+from app.db.base import SessionLocal
+from app.models.user import User
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """A fresh 3-per-60 s login limiter in place of the application's"""
+    fresh = SlidingWindowRateLimiter(max_attempts=3, window_seconds=60, max_keys=1000)
+    monkeypatch.setattr(auth, "login_rate_limiter", fresh)
+    return fresh
+
+
+def test_window_and_retry_after(clock):
+    limiter = SlidingWindowRateLimiter(max_attempts=2, window_seconds=60)
+
+    assert limiter.acquire(["k"]) == 0.0
+    clock[0] += 10
+    assert limiter.acquire(["k"]) == 0.0
+    clock[0] += 5
+    # The oldest attempt leaves the window 60 s after it was made
+    assert limiter.acquire(["k"]) == pytest.approx(45.0)
+    clock[0] += 45
+    assert limiter.acquire(["k"]) == 0.0
+
+
+def test_refused_attempt_is_not_recorded(clock):
+    limiter = SlidingWindowRateLimiter(max_attempts=1, window_seconds=60)
+    limiter.acquire(["a"])
+
+    assert limiter.acquire(["a", "b"]) > 0
+    # "b" was not charged for the refused attempt
+    assert limiter.acquire(["b"]) == 0.0
+
+
+def test_refund_gives_back_one_attempt(clock):
+    limiter = SlidingWindowRateLimiter(max_attempts=2, window_seconds=60)
+    limiter.acquire(["k"])
+    limiter.acquire(["k"])
+
+    limiter.refund(["k"])
+
+    assert limiter.acquire(["k"]) == 0.0
+    assert limiter.acquire(["k"]) > 0
+
+
+def test_concurrent_attempts_cannot_exceed_the_limit():
+    limiter = SlidingWindowRateLimiter(max_attempts=5, window_seconds=60)
+    start = threading.Barrier(50)
+    allowed = []
+
+    def attempt():
+        start.wait()
+        allowed.append(limiter.acquire(["user:victim", "ip:1.2.3.4"]) == 0.0)
+
+    threads = [threading.Thread(target=attempt) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(allowed) == 5
+
+
+def test_idle_keys_are_swept_and_capped(clock):
+    limiter = SlidingWindowRateLimiter(max_attempts=3, window_seconds=60, max_keys=100)
+    for index in range(1000):
+        limiter.acquire([f"user:{index}"])
+    assert len(limiter._attempts) == 100
+
+    clock[0] += 61
+    limiter.acquire(["user:new"])
+    assert list(limiter._attempts) == ["user:new"]
+
+
+def login(client, username, password):
+    return client.post("/api/v1/auth/login", data={"username": username, "password": password})
+
+
+def test_parallel_guesses_are_limited(client, user, limiter):
+    async def burst():
+        from httpx import ASGITransport, AsyncClient
+        async with AsyncClient(transport=ASGITransport(app=client.app), base_url="http://test") as http:
+            return await asyncio.gather(*[
+                http.post("/api/v1/auth/login", data={"username": user.username, "password": f"guess{index}"})
+                for index in range(10)
+            ])
+
+    codes = sorted(response.status_code for response in asyncio.run(burst()))
+
+    assert codes == [401] * 3 + [429] * 7
+
+
+def test_success_resets_only_the_username(client, user, limiter):
+    other = "someone-else"
+    assert [login(client, other, "guess").status_code for _ in range(2)] == [401, 401]
+
+    # Logging into one's own account refunds that attempt but keeps the IP's failures
+    assert login(client, user.username, "secret123").status_code == 200
+    assert login(client, other, "guess").status_code == 401
+    assert login(client, other, "guess").status_code == 429
+    assert limiter.acquire([f"user:{user.username}"]) == 0.0
+
+
+def test_successful_logins_do_not_count(client, user, limiter):
+    codes = [login(client, user.username, "secret123").status_code for _ in range(5)]
+
+    assert codes == [200] * 5
+    assert not limiter._attempts
+
+
+def test_login_rehashes_outdated_hash(client, user, limiter):
+    weak = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret123")
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.id == user.id).update({"hashed_password": weak})
+        db.commit()
+    finally:
+        db.close()
+
+    assert login(client, user.username, "secret123").status_code == 200
+
+    db = SessionLocal()
+    try:
+        stored = db.query(User).filter(User.id == user.id).one().hashed_password
+    finally:
+        db.close()
+    assert stored != weak
+    assert stored.startswith("$2b$05$")
+    assert login(client, user.username, "secret123").status_code == 200
@@ -0,0 +1,170 @@
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import LRUCache
+
+
+def make_cache(max_bytes: int = 1000, **kwargs) -> LRUCache:
+    # Unique name: each cache registers its own bytes gauge
+    return LRUCache(f"test-{uuid.uuid4().hex}", max_bytes, **kwargs)
+
+
+class CountingEvent(threading.Event):
+    """Event that counts the threads blocked on it"""
+
+    def __init__(self):
+        super().__init__()
+        self.waiters = 0
+        self._count_lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        with self._count_lock:
+            self.waiters += 1
+        return super().wait(timeout)
+
+
+@pytest.fixture
+def flights(monkeypatch):
+    """Flights created by get_or_compute, with waiters countable"""
+    created = []
+
+    class CountingFlight(cache_module._Flight):
+        def __init__(self):
+            super().__init__()
+            self.done = CountingEvent()
+            created.append(self)
+
+    monkeypatch.setattr(cache_module, "_Flight", CountingFlight)
+    return created
+
+
+def run_concurrently(cache: LRUCache, key, compute, callers: int, flights) -> list:
+    """
+    Call ``get_or_compute`` from ``callers`` threads and return each one's
+    value or exception. ``compute`` must block on the event it is given,
+    which is only set once every other caller waits on the leader.
+    """
+    results = [None] * callers
+    release = threading.Event()
+
+    def call(index):
+        try:
+            results[index] = cache.get_or_compute(key, lambda: compute(release))
+        except Exception as error:
+            results[index] = error
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(callers)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while not (flights and flights[0].done.waiters == callers - 1) and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_concurrent_misses_compute_once(flights):
+    cache = make_cache()
+    calls = []
+
+    def compute(release):
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    results = run_concurrently(cache, "key", compute, 8, flights)
+
+    assert calls == [1]
+    assert flights[0].done.waiters == 7
+    assert results == ["value"] * 8
+    assert cache.get("key") == "value"
+    assert not cache._flights
+
+
+def test_exception_reaches_every_waiter_and_nothing_is_stored(flights):
+    cache = make_cache()
+    calls = []
+
+    def compute(release):
+        calls.append(1)
+        release.wait(5)
+        raise RuntimeError("decode failed")
+
+    results = run_concurrently(cache, "key", compute, 5, flights)
+
+    assert calls == [1]
+    assert flights[0].done.waiters == 4
+    assert all(isinstance(result, RuntimeError) and str(result) == "decode failed" for result in results)
+    assert "key" not in cache._entries
+    assert not cache._flights
+    # The next caller computes again
+    assert cache.get_or_compute("key", lambda: "recovered") == "recovered"
+
+
+def test_hit_does_not_recompute():
+    cache = make_cache()
+    assert cache.get_or_compute("key", lambda: 1) == 1
+    assert cache.get_or_compute("key", lambda: pytest.fail("computed on a hit")) == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    cache = make_cache(ttl=10)
+
+    cache.put("key", "old", size=10)
+    now[0] = 109.9
+    assert cache.get("key") == "old"
+    now[0] = 110.0
+    assert cache.get("key") is None
+    assert cache.current_bytes == 0
+    assert cache.get_or_compute("key", lambda: "new", size=10) == "new"
+    assert cache.get("key") == "new"
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = make_cache(max_bytes=100)
+    cache.put("a", "a", size=40)
+    cache.put("b", "b", size=40)
+    cache.get("a")
+    cache.put("c", "c", size=40)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" and cache.get("c") == "c"
+    assert cache.current_bytes == 80
+
+
+def test_value_larger_than_budget_is_returned_but_not_stored():
+    cache = make_cache(max_bytes=100)
+    cache.put("small", "small", size=50)
+
+    assert cache.get_or_compute("big", lambda: np.zeros(200, dtype=np.uint8)).shape == (200,)
+    assert cache.get("big") is None
+    assert cache.get("small") == "small"
+
+
+def test_entry_limit_evicts_oldest():
+    cache = make_cache(max_bytes=10 ** 6, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.get_or_compute(key, lambda: key, size=1)
+
+    assert len(cache) == 2
+    assert cache.get("a") is None
+    assert cache.current_bytes == 2
+
+
+def test_replacing_a_key_keeps_the_byte_count():
+    cache = make_cache(max_bytes=100)
+    cache.put("key", "one", size=30)
+    cache.put("key", "two", size=50)
+
+    assert len(cache) == 1
+    assert cache.current_bytes == 50
@@ -0,0 +1,26 @@
+import pytest
+
+from app.core.middleware import _accepted_encodings
+
+
+def accepted(value: str) -> set:
+    return _accepted_encodings([(b"accept-encoding", value.encode("latin-1"))])
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("gzip, br", {"gzip", "br"}),
+    ("gzip;q=0.5, br;q=1.0", {"gzip", "br"}),
+    ("gzip;q=0", set()),
+    ("gzip;q=0.0, br", {"br"}),
+    ("gzip; q=0.000", set()),
+    ("GZIP;Q=0.001", {"gzip"}),
+    ("gzip;q=abc", set()),
+    ("identity", {"identity"}),
+    ("", set()),
+])
+def test_q_values_are_parsed_numerically(value, expected):
+    assert accepted(value) == expected
+
+
+def test_missing_header_accepts_nothing():
+    assert _accepted_encodings([(b"accept", b"*/*")]) == set()
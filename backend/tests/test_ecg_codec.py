@@ -0,0 +1,162 @@
+import os
+
+import numpy as np
+import pytest
+import wfdb
+
+from app.core.cache import record_cache
+from app.services import ecg_stream
+from app.services.ecg_codec import ArchivedRecord, archive_path, archive_record, encode_record
+
+
+def write_record(directory, digital: np.ndarray, fmt: str = "16", name: str = "rec") -> str:
+    """Write a WFDB record of the given ADC values and return its base path"""
+    digital = np.asarray(digital, dtype=np.int64)
+    if digital.ndim == 1:
+        digital = digital[:, np.newaxis]
+    leads = digital.shape[1]
+    wfdb.wrsamp(name, fs=360, units=["mV"] * leads, sig_name=[f"L{lead}" for lead in range(leads)],
+                d_signal=digital, fmt=[fmt] * leads, adc_gain=[200.0] * leads, baseline=[0] * leads,
+                write_dir=str(directory))
+    return os.path.join(str(directory), name)
+
+
+def archive(base_path: str, block_samples: int) -> ArchivedRecord:
+    blob, _ = encode_record(base_path, block_samples)
+    with open(archive_path(base_path), "wb") as f:
+        f.write(blob)
+    return ArchivedRecord(archive_path(base_path))
+
+
+def random_walk(samples: int, leads: int, seed: int = 0, limit: int = 2000) -> np.ndarray:
+    steps = np.random.default_rng(seed).integers(-40, 41, size=(samples, leads))
+    return np.clip(np.cumsum(steps, axis=0), -limit, limit)
+
+
+@pytest.mark.parametrize("samples", [15, 16, 17, 32, 33])
+def test_round_trip_at_block_boundaries(tmp_path, samples):
+    digital = random_walk(samples, 2)
+    base_path = write_record(tmp_path, digital)
+
+    record = archive(base_path, block_samples=16)
+
+    assert record.sig_len == samples and record.n_sig == 2
+    np.testing.assert_array_equal(record.read_digital(), digital)
+
+
+def test_one_sample_record(tmp_path):
+    base_path = write_record(tmp_path, np.array([[123, -45]]))
+
+    record = archive(base_path, block_samples=4096)
+
+    np.testing.assert_array_equal(record.read_digital(), [[123, -45]])
+    assert record.read_digital(1, 1).shape == (0, 2)
+
+
+def test_single_lead_format_212(tmp_path):
+    # MIT-BIH's packed 12-bit format, including the largest steps it can hold
+    digital = np.concatenate((random_walk(1000, 1, seed=1), [[2047], [-2047], [2047]]))
+    base_path = write_record(tmp_path, digital, fmt="212")
+
+    record = archive(base_path, block_samples=64)
+
+    np.testing.assert_array_equal(record.read_digital(), digital)
+    np.testing.assert_allclose(record.read_physical(), wfdb.rdrecord(base_path).p_signal)
+
+
+def test_invalid_samples_decode_to_nan(tmp_path):
+    digital = random_walk(100, 2)
+    invalid = -32768  # WFDB's missing-sample value in format 16
+    digital[[0, 17, 99], 0] = invalid
+    base_path = write_record(tmp_path, digital)
+
+    record = archive(base_path, block_samples=16)
+    physical = record.read_physical()
+
+    np.testing.assert_array_equal(record.read_digital(), digital)
+    assert np.isnan(physical[[0, 17, 99], 0]).all()
+    assert np.isfinite(physical[:, 1]).all()
+    np.testing.assert_array_equal(np.isnan(physical), np.isnan(wfdb.rdrecord(base_path).p_signal))
+
+
+@pytest.mark.parametrize("start, stop", [(0, 1), (15, 17), (16, 32), (5, 70), (63, 64), (0, None), (40, 1000)])
+@pytest.mark.parametrize("channels", [None, [1], [2, 0]])
+def test_ranged_reads(tmp_path, start, stop, channels):
+    digital = random_walk(70, 3, seed=2)
+    record = archive(write_record(tmp_path, digital), block_samples=16)
+
+    expected = digital[start:stop]
+    if channels is not None:
+        expected = expected[:, channels]
+    np.testing.assert_array_equal(record.read_digital(start, stop, channels), expected)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.ecgz"
+    path.write_bytes(b"ECGP" + bytes(20))
+
+    with pytest.raises(ValueError, match="Not an ECG record archive"):
+        ArchivedRecord(str(path))
+
+
+def test_archive_record_replaces_dat(tmp_path):
+    digital = random_walk(500, 2, seed=3)
+    base_path = write_record(tmp_path, digital, fmt="212")
+    original = wfdb.rdrecord(base_path).p_signal
+
+    result = archive_record(base_path, block_samples=64)
+
+    assert not os.path.exists(base_path + ".dat")
+    assert os.path.exists(base_path + ".hea")
+    assert result["archived_bytes"] < result["original_bytes"]
+    record_cache.clear()
+    np.testing.assert_allclose(ecg_stream.read_record(base_path).signal, original.astype(np.float32))
+
+
+def compacting_rdrecord(monkeypatch, base_path: str):
+    """Make the next wfdb read find the .dat file compacted away, as if the compactor ran in between"""
+    rdrecord = wfdb.rdrecord
+
+    def compact_then_read(*args, **kwargs):
+        monkeypatch.setattr(ecg_stream.wfdb, "rdrecord", rdrecord)
+        if os.path.exists(base_path + ".dat"):
+            archive_record(base_path, block_samples=64)
+        return rdrecord(*args, **kwargs)
+
+    monkeypatch.setattr(ecg_stream.wfdb, "rdrecord", compact_then_read)
+
+
+def test_read_record_falls_back_to_archive_compacted_mid_read(tmp_path, monkeypatch):
+    digital = random_walk(300, 2, seed=4)
+    base_path = write_record(tmp_path, digital)
+    expected = wfdb.rdrecord(base_path).p_signal.astype(np.float32)
+    record_cache.clear()
+    compacting_rdrecord(monkeypatch, base_path)
+
+    decoded = ecg_stream.read_record(base_path)
+
+    assert not os.path.exists(base_path + ".dat")
+    np.testing.assert_allclose(decoded.signal, expected)
+
+
+def test_chunked_read_falls_back_to_archive_compacted_mid_read(tmp_path, monkeypatch):
+    digital = random_walk(300, 2, seed=5)
+    base_path = write_record(tmp_path, digital)
+    expected = wfdb.rdrecord(base_path).p_signal.astype(np.float32)
+    record_cache.clear()
+    # Too long for the record cache, so it is read from disk chunk by chunk
+    monkeypatch.setattr(ecg_stream, "fits_record_cache", lambda header: False)
+    compacting_rdrecord(monkeypatch, base_path)
+
+    chunks = [samples for _, samples, _ in ecg_stream.iter_record_chunks(base_path, 100, channels=[0, 1])]
+
+    np.testing.assert_allclose(np.concatenate(chunks), expected)
+
+
+def test_missing_record_still_raises(tmp_path):
+    base_path = write_record(tmp_path, random_walk(50, 1))
+    os.remove(base_path + ".dat")
+    record_cache.clear()
+
+    with pytest.raises(FileNotFoundError):
+        ecg_stream.read_record(base_path)
@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+
+from app.services.ecg_processing import (
+    BEAT_RESULT_VERSION, MODEL_SAMPLING_RATE, BeatScoreAccumulator, aggregate_beat_scores, combine_lead_scores,
+    detect_r_peaks, extract_beat_windows
+)
+from app.services.ecg_service import ecg_service
+from ecg_samples import synthetic_ecg
+
+FS = MODEL_SAMPLING_RATE
+
+
+def nearest_errors(peaks: np.ndarray, r_times: np.ndarray) -> np.ndarray:
+    """Distance in samples from each detected peak to the nearest true R peak"""
+    expected = np.round(r_times * FS)
+    return np.abs(peaks[:, np.newaxis] - expected[np.newaxis, :]).min(axis=1)
+
+
+@pytest.mark.parametrize("rr", [0.5, 0.8, 1.2])
+def test_detects_every_beat(rr):
+    ecg, r_times = synthetic_ecg(FS, 60.0, rr=rr)
+
+    peaks = detect_r_peaks(ecg, FS)
+
+    assert len(peaks) == len(r_times)
+    assert nearest_errors(peaks, r_times).max() <= 1
+
+
+def test_detects_beats_through_noise_and_baseline_wander():
+    ecg, r_times = synthetic_ecg(FS, 60.0)
+    t = np.arange(ecg.size) / FS
+    rng = np.random.default_rng(0)
+    noisy = ecg + 0.4 * np.sin(2 * np.pi * 0.3 * t) + rng.normal(0, 0.05, ecg.size)
+
+    # Band-passed first, as the service does before detection
+    peaks = detect_r_peaks(ecg_service.filter_signal(noisy[:, np.newaxis]), FS)
+
+    assert len(peaks) == len(r_times)
+    assert nearest_errors(peaks, r_times).max() <= 2
+
+
+def test_peaks_respect_the_refractory_period():
+    ecg, _ = synthetic_ecg(FS, 30.0, rr=0.5)
+    ecg += 0.6 * np.roll(ecg, int(0.1 * FS))  # an echo of every QRS 0.1 s later
+
+    peaks = detect_r_peaks(ecg, FS)
+
+    assert np.diff(peaks).min() >= int(0.2 * FS)
+
+
+def test_leads_share_one_set_of_peaks():
+    ecg, r_times = synthetic_ecg(FS, 30.0)
+    # The second lead is inverted and smaller; the fused detector still finds every beat once
+    two_leads = np.stack((ecg, -0.5 * ecg), axis=1)
+
+    peaks = detect_r_peaks(two_leads, FS)
+
+    assert len(peaks) == len(r_times)
+    assert nearest_errors(peaks, r_times).max() <= 1
+
+
+def test_no_peaks_in_unusable_signal():
+    ecg, r_times = synthetic_ecg(FS, 40.0)
+    usable = np.ones(ecg.size, dtype=bool)
+    # Whole 2 s threshold blocks, as the quality check produces them
+    usable[int(10 * FS):int(20 * FS)] = False
+
+    peaks = detect_r_peaks(ecg, FS, usable=usable)
+
+    assert not ((peaks >= 10 * FS) & (peaks < 20 * FS)).any()
+    outside = r_times[(r_times < 9.9) | (r_times > 20.1)]
+    assert len(peaks) >= len(outside) - 1
+    assert nearest_errors(peaks, r_times).max() <= 1
+
+
+def test_short_or_flat_signal_has_no_peaks():
+    assert detect_r_peaks(np.zeros(int(FS) - 1), FS).size == 0
+    assert detect_r_peaks(np.zeros(int(10 * FS)), FS).size == 0
+
+
+def test_beat_windows_are_centred_and_normalised():
+    signal = np.random.default_rng(1).normal(size=(1000, 2)).astype(np.float32)
+    peaks = np.array([5, 100, 500, 995])
+
+    beats, kept = extract_beat_windows(signal, peaks, 216)
+
+    # Windows that would run past either end are dropped
+    np.testing.assert_array_equal(kept, [500])
+    assert beats.shape == (2, 216, 1)
+    # Beat-major: lead 0 then lead 1 of the same beat
+    for lead in range(2):
+        window = signal[500 - 108:500 + 108, lead]
+        np.testing.assert_allclose(beats[lead, :, 0], (window - window.mean()) / window.std(), atol=1e-5)
+
+
+def test_combine_lead_scores_skips_unscored_leads():
+    scores = np.array([0.2, 0.8, np.nan, 0.6, 0.1, 0.3])
+
+    np.testing.assert_allclose(combine_lead_scores(scores, 2), [0.5, 0.6, 0.2])
+    np.testing.assert_allclose(combine_lead_scores(scores, 2, "max"), [0.8, 0.6, 0.3])
+    with pytest.raises(ValueError, match="Unknown lead aggregation"):
+        combine_lead_scores(scores, 2, "median")
+
+
+def test_record_is_abnormal_at_the_beat_fraction_threshold():
+    scores = np.array([0.9, 0.7, 0.1, 0.2, 0.3, 0.4, 0.2, 0.0])
+
+    result = aggregate_beat_scores(scores, 0.25)
+
+    assert result["result_version"] == BEAT_RESULT_VERSION
+    assert result["classification"] == "abnormal"
+    assert result["beat_count"] == 8 and result["abnormal_beat_count"] == 2
+    assert result["probabilities"] == pytest.approx({"normal": 0.75, "abnormal": 0.25})
+    # Mean score of the abnormal beats that decided it
+    assert result["confidence"] == pytest.approx(0.8)
+
+    normal = aggregate_beat_scores(scores, 0.3)
+    assert normal["classification"] == "normal"
+    # Mean of 1 - score over the normal beats
+    assert normal["confidence"] == pytest.approx(1 - np.mean([0.1, 0.2, 0.3, 0.4, 0.2, 0.0]))
+
+
+def test_a_score_of_one_half_is_normal():
+    assert aggregate_beat_scores(np.array([0.5, 0.5]), 0.5)["abnormal_beat_count"] == 0
+
+
+def test_chunked_aggregation_matches_whole_record():
+    scores = np.random.default_rng(2).uniform(size=1001).astype(np.float32)
+    accumulator = BeatScoreAccumulator()
+    for chunk in np.array_split(scores, 7):
+        accumulator.update(chunk)
+
+    chunked, whole = accumulator.result(0.25), aggregate_beat_scores(scores, 0.25)
+
+    assert chunked["beat_count"] == whole["beat_count"] == 1001
+    assert chunked["abnormal_beat_count"] == whole["abnormal_beat_count"]
+    assert chunked["confidence"] == pytest.approx(whole["confidence"])
+
+
+def test_no_beats_is_normal_with_no_confidence():
+    result = BeatScoreAccumulator().result(0.25)
+
+    assert result["classification"] == "normal"
+    assert result["beat_count"] == 0
+    assert result["confidence"] == 0.0
+    assert result["probabilities"] == {"normal": 1.0, "abnormal": 0.0}
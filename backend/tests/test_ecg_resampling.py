@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from scipy import signal as scipy_signal
+
+from app.services.ecg_filters import StreamingResampler, resample
+from app.services.ecg_processing import MODEL_SAMPLING_RATE
+from app.services.ecg_service import ecg_service
+from ecg_samples import synthetic_ecg, write_upload
+
+
+@pytest.mark.parametrize("fs", [250.0, 500.0, 1000.0])
+def test_upload_is_segmented_at_model_rate(tmp_path, fs):
+    ecg, r_times = synthetic_ecg(fs, 30.0)
+    segmented = ecg_service.preprocess_ecg_file(write_upload(tmp_path, fs, ecg))
+
+    assert segmented.fs == MODEL_SAMPLING_RATE
+    expected = np.round(r_times * MODEL_SAMPLING_RATE)
+    # Every detected beat sits on a true R peak on the 360 Hz time axis
+    errors = np.abs(segmented.peaks[:, np.newaxis] - expected[np.newaxis, :]).min(axis=1)
+    assert segmented.beat_count >= len(r_times) - 2
+    assert errors.max() <= 2
+    assert segmented.beats.shape[1] == int(0.6 * MODEL_SAMPLING_RATE)
+
+
+def test_resample_matches_resample_poly_for_all_leads():
+    rng = np.random.default_rng(0)
+    signal = rng.standard_normal((2500, 2))
+
+    resampled = resample(signal, 250.0, MODEL_SAMPLING_RATE)
+
+    assert resampled.shape == (3600, 2)
+    np.testing.assert_allclose(resampled, scipy_signal.resample_poly(signal, 36, 25, axis=0), atol=1e-5)
+
+
+def test_resample_at_model_rate_is_a_no_op():
+    signal = np.arange(10, dtype=np.float32)
+    np.testing.assert_array_equal(resample(signal, MODEL_SAMPLING_RATE, MODEL_SAMPLING_RATE), signal)
+
+
+@pytest.mark.parametrize("chunk", [1, 37, 1000])
+def test_streaming_resampler_equals_whole_signal(chunk):
+    signal = np.random.default_rng(1).standard_normal(5000).astype(np.float32)
+    resampler = StreamingResampler(250.0, MODEL_SAMPLING_RATE)
+
+    pieces = [resampler.push(signal[start:start + chunk], final=start + chunk >= signal.size)
+              for start in range(0, signal.size, chunk)]
+
+    np.testing.assert_allclose(np.concatenate(pieces), resample(signal, 250.0, MODEL_SAMPLING_RATE), atol=1e-6)
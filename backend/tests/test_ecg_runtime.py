@@ -0,0 +1,154 @@
+import numpy as np
+import pytest
+
+from app.services import ecg_runtime
+from app.services.ecg_runtime import NumpyECGModel, export_keras_model
+
+
+def conv_reference(x: np.ndarray, kernel: np.ndarray, bias: np.ndarray, stride: int, dilation: int) -> np.ndarray:
+    """Direct 'valid' Conv1D: one dot product per output step and tap"""
+    kernel_size = kernel.shape[0]
+    span = (kernel_size - 1) * dilation + 1
+    steps = (x.shape[1] - span) // stride + 1
+    out = np.zeros((x.shape[0], steps, kernel.shape[2]), dtype=np.float64)
+    for step in range(steps):
+        for tap in range(kernel_size):
+            out[:, step] += x[:, step * stride + tap * dilation] @ kernel[tap]
+    return out + bias
+
+
+def conv_layer(kernel: np.ndarray, bias: np.ndarray, stride: int = 1, dilation: int = 1,
+               padding: str = "valid", activation: str = "linear") -> dict:
+    return NumpyECGModel._prepare_layer({
+        "type": "Conv1D", "kernel": kernel, "bias": bias, "strides": stride, "dilation_rate": dilation,
+        "padding": padding, "activation": activation
+    })
+
+
+@pytest.mark.parametrize("stride, dilation", [(1, 1), (2, 1), (1, 3), (3, 2)])
+def test_conv_matches_direct_convolution(stride, dilation):
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(3, 50, 4)).astype(np.float32)
+    kernel = rng.normal(size=(5, 4, 6)).astype(np.float32)
+    bias = rng.normal(size=6).astype(np.float32)
+
+    out = ecg_runtime._conv1d(x, conv_layer(kernel, bias, stride, dilation))
+
+    np.testing.assert_allclose(out, conv_reference(x, kernel, bias, stride, dilation), rtol=1e-4, atol=1e-4)
+
+
+def test_conv_blocks_along_time(monkeypatch):
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=(2, 101, 3)).astype(np.float32)
+    layer = conv_layer(rng.normal(size=(7, 3, 5)).astype(np.float32), None, padding="same", activation="relu")
+    whole = ecg_runtime._conv1d(x, layer)
+
+    # Scratch for a few steps at a time: many im2col blocks, including a short last one
+    monkeypatch.setattr(ecg_runtime, "_IM2COL_BLOCK_ELEMENTS", 2 * 7 * 3 * 8)
+    blocked = ecg_runtime._conv1d(x, layer)
+
+    assert blocked.shape == (2, 101, 5)
+    np.testing.assert_allclose(blocked, whole, rtol=1e-6)
+
+
+def pool_reference(x: np.ndarray, pool: int, stride: int, padding: str, reducer) -> np.ndarray:
+    """Keras pooling: 'same' windows are clipped to the input, so padding is never pooled"""
+    length = x.shape[1]
+    if padding == "valid":
+        starts = range(0, length - pool + 1, stride)
+    else:
+        steps = -(-length // stride)
+        left = max((steps - 1) * stride + pool - length, 0) // 2
+        starts = [step * stride - left for step in range(steps)]
+    return np.stack([reducer(x[:, max(start, 0):start + pool], axis=1) for start in starts], axis=1)
+
+
+@pytest.mark.parametrize("padding", ["valid", "same"])
+@pytest.mark.parametrize("pool, stride", [(2, 2), (3, 2), (3, 3), (4, 3)])
+@pytest.mark.parametrize("reducer", [np.max, np.mean])
+def test_pooling(padding, pool, stride, reducer):
+    # All negative, so a padded zero would win a max
+    x = -np.random.default_rng(2).uniform(0.5, 1.0, size=(2, 11, 3)).astype(np.float32)
+
+    out = ecg_runtime._pool1d(x, {"pool_size": pool, "strides": stride, "padding": padding}, reducer)
+
+    np.testing.assert_allclose(out, pool_reference(x, pool, stride, padding, reducer), rtol=1e-6)
+
+
+def test_leading_activation_does_not_modify_the_input():
+    rng = np.random.default_rng(3)
+    model = NumpyECGModel([
+        {"type": "InputLayer"},
+        {"type": "Activation", "activation": "relu"},
+        {"type": "Flatten"},
+        {"type": "Dense", "kernel": rng.normal(size=(8, 1)).astype(np.float32), "bias": None, "activation": "linear"},
+    ])
+    x = rng.normal(size=(4, 8, 1)).astype(np.float32)
+    original = x.copy()
+
+    model.predict(x)
+
+    np.testing.assert_array_equal(x, original)
+
+
+def small_keras_model():
+    keras = pytest.importorskip("tensorflow").keras
+    layers = keras.layers
+    model = keras.Sequential([
+        keras.Input(shape=(64, 1)),
+        layers.Activation("tanh"),
+        layers.Conv1D(6, 5, padding="same", activation="relu"),
+        layers.BatchNormalization(),
+        layers.MaxPooling1D(2),
+        layers.Conv1D(8, 3, strides=2, dilation_rate=1, padding="valid", activation="relu"),
+        layers.AveragePooling1D(3, strides=2, padding="same"),
+        layers.Conv1D(4, 3, dilation_rate=2, padding="causal"),
+        layers.Dropout(0.5),
+        layers.GlobalAveragePooling1D(),
+        layers.Dense(5, activation="relu"),
+        layers.Dense(1, activation="sigmoid"),
+    ])
+    # Non-trivial normalisation statistics
+    rng = np.random.default_rng(4)
+    batch_norm = model.layers[2]
+    gamma, beta, _, _ = batch_norm.get_weights()
+    batch_norm.set_weights([gamma + rng.uniform(0, 1, 6), beta + rng.normal(size=6),
+                            rng.normal(size=6), rng.uniform(0.5, 2, 6)])
+    return model
+
+
+@pytest.fixture(scope="module")
+def keras_export(tmp_path_factory):
+    model = small_keras_model()
+    path = str(tmp_path_factory.mktemp("model") / "ecg.npz")
+    export_keras_model(model, path)
+    x = np.random.default_rng(5).normal(size=(10, 64, 1)).astype(np.float32)
+    return path, x, model.predict(x, verbose=0)
+
+
+def test_matches_keras(keras_export):
+    path, x, expected = keras_export
+
+    out = NumpyECGModel.load(path).predict(x, batch_size=4)
+
+    assert out.shape == expected.shape == (10, 1)
+    np.testing.assert_allclose(out, expected, rtol=1e-4, atol=1e-5)
+
+
+def test_memory_mapped_round_trip(keras_export, tmp_path):
+    path, x, expected = keras_export
+    heap = NumpyECGModel.load(path)
+
+    mapped = NumpyECGModel.load(path, mmap_dir=str(tmp_path))
+    directories = list(tmp_path.iterdir())
+
+    assert len(directories) == 1
+    arrays = [value for layer in mapped.layers for value in layer.values() if isinstance(value, np.ndarray)]
+    assert arrays and all(isinstance(value, np.memmap) and not value.flags.writeable for value in arrays)
+    for heap_layer, mapped_layer in zip(heap.layers, mapped.layers):
+        assert heap_layer.keys() == mapped_layer.keys()
+    np.testing.assert_array_equal(mapped.predict(x), heap.predict(x))
+    np.testing.assert_allclose(mapped.predict(x), expected, rtol=1e-4, atol=1e-5)
+    # A second load reuses the mapped copy
+    NumpyECGModel.load(path, mmap_dir=str(tmp_path))
+    assert list(tmp_path.iterdir()) == directories
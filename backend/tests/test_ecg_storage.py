@@ -0,0 +1,94 @@
+import struct
+
+import numpy as np
+import pytest
+
+from app.services.ecg_storage import (
+    PROCESSED_FORMAT_VERSION, PROCESSED_MAGIC, decode_processed, encode_processed, trace_time_points
+)
+
+
+def two_lead_trace(points: int = 1000) -> np.ndarray:
+    t = np.arange(points) / 360.0
+    return np.stack((np.sin(2 * np.pi * t), 0.2 * np.cos(2 * np.pi * 3 * t)), axis=1).astype(np.float32)
+
+
+def test_round_trip():
+    signal = two_lead_trace()
+    peaks = np.array([10, 370, 730], dtype=np.int64)
+    scores = np.array([0.1, 0.9, 0.5], dtype=np.float32)
+
+    processed = decode_processed(encode_processed(signal, 360.0, 1, ["MLII", "V5"], peaks, scores, 360.0))
+
+    assert processed.fs == 360.0 and processed.beat_fs == 360.0 and processed.bucket == 1
+    assert processed.lead_names == ["MLII", "V5"]
+    assert processed.trace.dtype == np.int16 and processed.trace.shape == (1000, 2)
+    # int16 quantisation: error below half a step of each lead's full scale
+    np.testing.assert_allclose(processed.signal, signal, atol=float(np.abs(signal).max()) / 32767)
+    np.testing.assert_array_equal(processed.peaks, peaks)
+    np.testing.assert_allclose(processed.scores, scores, atol=1e-3)
+    np.testing.assert_allclose(processed.beat_times, peaks / 360.0)
+
+
+def test_empty_peaks():
+    processed = decode_processed(encode_processed(two_lead_trace(), 360.0, 1, ["MLII", "V5"],
+                                                  np.array([], dtype=np.int64), np.array([], dtype=np.float32), 360.0))
+
+    assert processed.peaks.shape == (0,) and processed.scores.shape == (0,)
+    assert processed.beat_times.shape == (0,)
+    assert processed.describe()["beat_count"] == 0
+
+
+def test_single_lead_from_a_1d_signal():
+    signal = two_lead_trace()[:, 0]
+
+    processed = decode_processed(encode_processed(signal, 250.0, 1, ["ECG"], [5], [0.7], 360.0))
+
+    assert processed.trace.shape == (1000, 1)
+    assert processed.scale.shape == (1,)
+    np.testing.assert_allclose(processed.signal[:, 0], signal, atol=1.0 / 32767)
+
+
+def test_all_zero_lead_falls_back_to_unit_scale():
+    signal = two_lead_trace()
+    signal[:, 1] = 0.0
+
+    processed = decode_processed(encode_processed(signal, 360.0, 1, ["MLII", "V5"], [], [], 360.0))
+
+    assert processed.scale[1] == 1.0
+    assert not processed.trace[:, 1].any()
+    assert np.isfinite(processed.signal).all()
+    np.testing.assert_array_equal(processed.signal[:, 1], 0.0)
+
+
+def test_decodes_memoryview_without_copying():
+    blob = encode_processed(two_lead_trace(), 360.0, 4, ["MLII", "V5"], [1, 2], [0.2, 0.8], 360.0)
+
+    processed = decode_processed(memoryview(blob))
+
+    assert processed.bucket == 4
+    np.testing.assert_array_equal(processed.trace, decode_processed(blob).trace)
+    assert not processed.trace.flags.writeable
+    assert not processed.trace.flags.owndata
+
+
+def test_envelope_time_points():
+    # (min, max) pairs of 4-sample buckets, drawn at the start and middle of each bucket
+    np.testing.assert_allclose(trace_time_points(5, 4.0, 4), [0.0, 0.5, 1.0, 1.5, 2.0])
+    np.testing.assert_allclose(trace_time_points(3, 2.0, 1), [0.0, 0.5, 1.0])
+
+
+def test_rejects_bad_magic():
+    blob = encode_processed(two_lead_trace(), 360.0, 1, ["MLII", "V5"], [], [], 360.0)
+
+    with pytest.raises(ValueError, match="Not a processed ECG signal"):
+        decode_processed(b"XXXX" + blob[4:])
+
+
+def test_rejects_unknown_version():
+    blob = encode_processed(two_lead_trace(), 360.0, 1, ["MLII", "V5"], [], [], 360.0)
+    header_length = struct.unpack_from("<I", blob, 6)[0]
+    future = struct.pack("<4sHI", PROCESSED_MAGIC, PROCESSED_FORMAT_VERSION + 1, header_length) + blob[10:]
+
+    with pytest.raises(ValueError, match="Unsupported processed ECG format version"):
+        decode_processed(future)
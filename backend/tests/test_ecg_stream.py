@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from app.services.ecg_processing import MODEL_SAMPLING_RATE
+from app.services.ecg_service import ecg_service
+from ecg_samples import synthetic_ecg
+
+FS = MODEL_SAMPLING_RATE
+
+
+@pytest.fixture(scope="module")
+def ecg():
+    """90 s of synthetic ECG that starts with 6 s of flat line and has 10 s more in the middle"""
+    signal, _ = synthetic_ecg(FS, 90.0)
+    signal[:int(6 * FS)] = 0.0
+    signal[int(40 * FS):int(50 * FS)] = 0.0
+    return signal[:, np.newaxis].astype(np.float32)
+
+
+def segment(signal: np.ndarray, chunk: int):
+    """Push ``signal`` through the service's segmenter ``chunk`` samples at a time"""
+    segmenter = ecg_service._segmenter()
+    pushes = [segmenter.push(signal[start:start + chunk], final=start + chunk >= signal.shape[0])
+              for start in range(0, signal.shape[0], chunk)]
+    beats = np.concatenate([push.beats for push in pushes])
+    peaks = np.concatenate([push.peaks for push in pushes])
+    return beats, peaks, sum(push.excluded_seconds for push in pushes)
+
+
+# Pushes shorter than half the overlap (3600 samples), between half and the whole of it, and longer;
+# 2000 and 3000 samples are the lengths whose mask slice went negative but not empty
+@pytest.mark.parametrize("chunk", [100, 997, 2000, 3000, 5000, 12000])
+def test_chunked_windows_match_the_whole_record(ecg, chunk):
+    whole_beats, whole_peaks, whole_excluded = segment(ecg, ecg.shape[0])
+
+    beats, peaks, excluded = segment(ecg, chunk)
+
+    assert whole_excluded > 0
+    np.testing.assert_array_equal(peaks, whole_peaks)
+    # The band-pass runs over each push's buffer, so window values agree to its edge effects only
+    np.testing.assert_allclose(beats, whole_beats, atol=1e-3)
+    assert excluded == pytest.approx(whole_excluded)
+
+
+def test_short_pushes_accept_nothing_until_enough_follows(ecg):
+    whole = ecg_service._segmenter().push(ecg[:3300], final=True)
+    segmenter = ecg_service._segmenter()
+
+    first = segmenter.push(ecg[:3000])
+
+    # Less than half the overlap: no beats, and none of the flat start is reported yet
+    assert first.beats.shape[0] == 0 and first.excluded_seconds == 0.0
+    rest = segmenter.push(ecg[3000:3300], final=True)
+    np.testing.assert_array_equal(rest.peaks, whole.peaks)
+    assert rest.excluded_seconds == pytest.approx(whole.excluded_seconds)
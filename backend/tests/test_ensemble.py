@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.services.ensemble_service import EnsemblePredictionService
+from ecg_samples import synthetic_ecg, upload_files, write_record
+
+COMBINED_URL = f"{settings.API_V1_STR}/predict/combined"
+FEATURES = {"age": 18393, "gender": 2, "height": 168, "weight": 62, "ap_hi": 110, "ap_lo": 80,
+            "cholesterol": 1, "gluc": 1, "smoke": 0, "alco": 0, "active": 1}
+
+
+@pytest.fixture
+def weights(monkeypatch):
+    def service(tabular: float, ecg: float) -> EnsemblePredictionService:
+        monkeypatch.setattr(settings, "ENSEMBLE_TABULAR_WEIGHT", tabular)
+        monkeypatch.setattr(settings, "ENSEMBLE_ECG_WEIGHT", ecg)
+        return EnsemblePredictionService()
+    return service
+
+
+def test_branches_are_weighted_by_their_auc(weights):
+    result = weights(0.8, 0.6).combine({"probability": 0.2}, {"probabilities": {"normal": 0.1, "abnormal": 0.9}})
+
+    assert result["probability"] == pytest.approx((0.2 * 0.8 + 0.9 * 0.6) / 1.4)
+    assert result["risk_level"] == "High Risk"
+    assert result["confidence"] == pytest.approx(abs(0.5 - result["probability"]) * 2)
+    assert result["weights"] == pytest.approx({"tabular": 0.8 / 1.4, "ecg": 0.6 / 1.4})
+
+
+def test_equal_weights_are_a_plain_average(weights):
+    result = weights(1.0, 1.0).combine({"probability": 0.3}, {"probabilities": {"abnormal": 0.5}})
+
+    assert result["probability"] == pytest.approx(0.4)
+    assert result["risk_level"] == "Low Risk"
+
+
+def test_placeholder_ecg_result_counts_everything_but_normal(weights):
+    ecg_result = {"probabilities": {"normal": 0.7, "afib": 0.1, "pvc": 0.1, "other": 0.1}}
+
+    result = weights(0.0, 1.0).combine({"probability": 0.9}, ecg_result)
+
+    assert result["probability"] == pytest.approx(0.3)
+
+
+@pytest.mark.parametrize("tabular, ecg", [(-0.1, 1.0), (1.0, -0.1), (0.0, 0.0)])
+def test_invalid_weights_are_rejected(weights, tabular, ecg):
+    with pytest.raises(ValueError, match="Ensemble weights"):
+        weights(tabular, ecg)
+
+
+@pytest.fixture
+def record(tmp_path):
+    ecg, _ = synthetic_ecg(360.0, 30.0)
+    return write_record(tmp_path, 360.0, ecg, name="rec")
+
+
+def test_combined_prediction(client, auth_headers, beat_model, record):
+    response = client.post(COMBINED_URL, data={"features": json.dumps(FEATURES)}, files=upload_files(record),
+                           headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["ecg"]["beat_count"] == 37 and body["ecg"]["probabilities"]["abnormal"] == 1.0
+    weights = body["weights"]
+    assert body["probability"] == pytest.approx(weights["tabular"] * body["tabular"]["probability"] + weights["ecg"])
+    assert body["model_version"] == f"{body['tabular']['model_version']}+{body['ecg']['model_version']}"
+
+    stored = client.get(f"{settings.API_V1_STR}/history/{body['prediction_id']}", headers=auth_headers).json()
+    assert stored["type"] == "combined"
+    assert stored["input_data"]["features"] == FEATURES
+
+
+@pytest.mark.parametrize("features, location", [
+    ("[]", []),
+    ("1", []),
+    ("not json", []),
+    (json.dumps({**FEATURES, "age": "old"}), ["age"]),
+    (json.dumps({key: value for key, value in FEATURES.items() if key != "gluc"}), ["gluc"]),
+])
+def test_invalid_features_are_a_validation_error(client, auth_headers, record, features, location):
+    response = client.post(COMBINED_URL, data={"features": features}, files=upload_files(record),
+                           headers=auth_headers)
+
+    assert response.status_code == 422, response.text
+    assert response.json()["detail"][0]["loc"] == ["body", "features", *location]
+    history = client.get(f"{settings.API_V1_STR}/history/", headers=auth_headers).json()
+    assert history["total"] == 0
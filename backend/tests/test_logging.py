@@ -0,0 +1,40 @@
+import json
+import logging
+import os
+import time
+
+import pytest
+
+from app.core import get_logger
+from app.core import logging as app_logging
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_forked_child_writes_its_records(tmp_path):
+    logger = get_logger("tests.fork")
+    handler = logging.FileHandler(tmp_path / "child.log")
+    handler.setFormatter(app_logging.JSONFormatter())
+    app_logging._start_listener()
+    listener = app_logging._listener
+    listener.handlers = listener.handlers + (handler,)
+    try:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                logger.warning("from the child", child=True)
+                deadline = time.monotonic() + 5
+                while app_logging._log_queue.qsize() and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                time.sleep(0.1)
+                code = 0 if app_logging._listener._thread.is_alive() else 2
+            finally:
+                os._exit(code)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        listener.handlers = tuple(h for h in listener.handlers if h is not handler)
+        handler.close()
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    records = [json.loads(line) for line in (tmp_path / "child.log").read_text().splitlines()]
+    assert any(record["message"] == "from the child" and record["context"] == {"child": True} for record in records)
@@ -0,0 +1,198 @@
+import os
+import threading
+
+import pytest
+
+from app.services import model_registry
+from app.services.model_registry import ModelRegistry, ModelWatcher, wait_drained
+from app.services.tabular_service import tabular_service
+
+
+class Model:
+    """Artifacts loaded from one file; ``content`` identifies the file version"""
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+@pytest.fixture
+def model_file(tmp_path, monkeypatch):
+    # Registries created by a test register themselves here, not next to the application's
+    monkeypatch.setattr(model_registry, "registries", {})
+    path = tmp_path / "model.bin"
+    write(path, "v1")
+    return path
+
+
+def write(path, content: str) -> None:
+    """Rewrite the file with a new size and mtime, so its fingerprint changes"""
+    previous = os.stat(path).st_mtime_ns if path.exists() else 0
+    path.write_text(content)
+    os.utime(path, ns=(previous + 10 ** 9, previous + 10 ** 9))
+
+
+def make_registry(path, **kwargs) -> ModelRegistry:
+    def load():
+        if not path.exists():
+            return None, {}
+        content = path.read_text()
+        if content == "broken":
+            raise ValueError("corrupt model file")
+        return Model(content), {"content": content}
+
+    registry = ModelRegistry(f"test-{id(path)}", load, lambda: [str(path)], **kwargs)
+    registry.reload(force=True)
+    return registry
+
+
+def test_swap_while_in_flight_drains_the_old_version(model_file):
+    registry = make_registry(model_file)
+
+    with registry.acquire() as old:
+        write(model_file, "v2-new")
+        new = registry.reload()
+
+        # New requests get the new version; the running one keeps its artifacts
+        assert registry.current is new and new.artifacts.content == "v2-new"
+        assert old.retired and old.artifacts.content == "v1"
+        assert [entry["version"] for entry in registry.describe()["draining"]] == [old.version]
+        assert not wait_drained(old, timeout=0)
+        with registry.acquire() as concurrent:
+            assert concurrent is new
+
+    assert wait_drained(old, timeout=0)
+    assert old.artifacts is None
+    assert registry.describe()["draining"] == []
+    assert new.artifacts.content == "v2-new"
+
+
+def test_reload_does_not_wait_for_a_request_on_another_thread(model_file):
+    registry = make_registry(model_file)
+    acquired, release = threading.Event(), threading.Event()
+    seen = []
+
+    def request():
+        with registry.acquire() as version:
+            acquired.set()
+            release.wait(5)
+            # Still the version the request started with
+            seen.append(version.artifacts.content)
+
+    thread = threading.Thread(target=request)
+    thread.start()
+    acquired.wait(5)
+    write(model_file, "v2-new")
+    new = registry.reload()
+    previous = list(registry._draining)
+    release.set()
+    thread.join(5)
+
+    assert seen == ["v1"]
+    assert registry.current is new
+    assert len(previous) == 1 and wait_drained(previous[0], timeout=1)
+
+
+def test_unchanged_files_are_not_reloaded(model_file):
+    registry = make_registry(model_file)
+    current = registry.current
+
+    assert registry.reload() is current
+    assert registry.reload(force=True) is not current
+
+
+def test_failed_reload_keeps_serving_the_current_version(model_file):
+    registry = make_registry(model_file)
+    current = registry.current
+    write(model_file, "broken")
+
+    with pytest.raises(ValueError, match="corrupt model file"):
+        registry.reload()
+
+    assert registry.current is current and current.artifacts.content == "v1"
+    assert registry.failed_fingerprint == registry.fingerprint()
+
+
+def test_removed_files_never_downgrade_to_the_placeholder(model_file):
+    registry = make_registry(model_file)
+    current = registry.current
+    model_file.unlink()
+
+    with pytest.raises(FileNotFoundError):
+        registry.reload()
+
+    assert registry.current is current
+
+
+def test_first_load_failure_falls_back_to_the_placeholder(model_file):
+    write(model_file, "broken")
+
+    registry = make_registry(model_file)
+
+    assert registry.current.artifacts is None
+    assert registry.current.version.endswith("-dummy")
+
+
+def test_swap_calls_on_swap_with_the_new_version(model_file):
+    swapped = []
+    registry = make_registry(model_file, on_swap=swapped.append)
+    write(model_file, "v2-new")
+
+    version = registry.reload()
+
+    assert swapped[-1] is version
+    # Nothing is swapped, and on_swap is not called, when a reload fails
+    write(model_file, "broken")
+    with pytest.raises(ValueError):
+        registry.reload()
+    assert swapped[-1] is version
+
+
+def test_tabular_swap_clears_the_result_cache():
+    tabular_service.result_cache.put(("stale-version", 1, 2, 3), ({"risk_level": "High"}, {}), size=1)
+
+    tabular_service.load_model()
+
+    assert len(tabular_service.result_cache) == 0
+
+
+def test_watcher_loads_a_change_once_it_is_stable_for_two_polls(model_file):
+    registry = make_registry(model_file)
+    watcher = ModelWatcher(interval=0)
+    first = registry.current
+
+    write(model_file, "v2-partial")
+    watcher.poll()
+    # Seen once: the file may still be being copied
+    assert registry.current is first
+
+    write(model_file, "v2-complete")
+    watcher.poll()
+    # Changed again since the last poll
+    assert registry.current is first
+
+    watcher.poll()
+    assert registry.current.artifacts.content == "v2-complete"
+
+    watcher.poll()
+    assert registry.current.artifacts.content == "v2-complete"
+
+
+def test_watcher_does_not_retry_a_broken_file_until_it_changes(model_file):
+    loads = []
+    registry = make_registry(model_file)
+    load = registry._load
+    registry._load = lambda: loads.append(1) or load()
+    watcher = ModelWatcher(interval=0)
+    current = registry.current
+
+    write(model_file, "broken")
+    for _ in range(4):
+        watcher.poll()
+
+    assert loads == [1]
+    assert registry.current is current
+
+    write(model_file, "v3-fixed")
+    watcher.poll()
+    watcher.poll()
+    assert registry.current.artifacts.content == "v3-fixed"
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from ecg_samples import synthetic_ecg, upload_files, write_record
+
+ECG_URL = f"{settings.API_V1_STR}/predict/ecg"
+HISTORY_URL = f"{settings.API_V1_STR}/history"
+
+
+@pytest.fixture
+def record(tmp_path):
+    """30 s of synthetic one-lead ECG at 360 Hz: 37 beats, all inside the record"""
+    ecg, _ = synthetic_ecg(360.0, 30.0)
+    return write_record(tmp_path, 360.0, ecg, name="rec")
+
+
+def test_ecg_response_carries_the_beat_result(client, auth_headers, beat_model, record):
+    response = client.post(ECG_URL, files=upload_files(record), headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["result_version"] == 2
+    assert body["classification"] == body["result"] == "abnormal"
+    assert body["beat_count"] == 37
+    assert body["abnormal_beat_count"] == 37
+    assert body["probabilities"] == {"normal": 0.0, "abnormal": 1.0}
+    assert body["model_version"]
+    assert body["signal_quality"] == {"excluded_seconds": 0.0, "excluded_fraction": 0.0}
+
+
+def test_ecg_response_reports_excluded_signal(client, auth_headers, beat_model, tmp_path):
+    ecg, _ = synthetic_ecg(360.0, 60.0)
+    # 20 s of electrode noise: whole 2 s quality windows from 20 to 40 s fail
+    ecg[int(20 * 360):int(40 * 360)] = np.random.default_rng(0).normal(0, 0.5, 20 * 360)
+    record = write_record(tmp_path, 360.0, ecg, name="noisy")
+
+    response = client.post(ECG_URL, files=upload_files(record), headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    quality = response.json()["signal_quality"]
+    assert quality["excluded_seconds"] == pytest.approx(20.0, abs=2.0)
+    assert quality["excluded_fraction"] == pytest.approx(quality["excluded_seconds"] / 60.0, abs=1e-3)
+    assert response.json()["beat_count"] < 50
+
+
+def test_abnormalities_come_from_the_attribution(client, auth_headers, beat_model, record):
+    response = client.post(ECG_URL, files=upload_files(record), headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    attribution = body["attribution"]
+    assert attribution["method"] == "grad-cam" and attribution["beat_count"] == 37
+    # Every beat is flagged, so the whole record is one run
+    segments = attribution["segments"]
+    assert len(segments) == 1 and segments[0]["beat_count"] == 37
+    stored = client.get(f"{HISTORY_URL}/{body['prediction_id']}", headers=auth_headers).json()
+    abnormalities = stored["result_data"]["abnormalities"]
+    assert [(item["start_time"], item["end_time"], item["confidence"]) for item in abnormalities] == \
+        [(segment["start_time"], segment["end_time"], segment["mean_score"]) for segment in segments]
+    assert [(item["start_time"], item["end_time"]) for item in body["explanation"]["abnormal_segments"]] == \
+        [(segment["start_time"], segment["end_time"]) for segment in segments]
+
+
+def test_placeholder_result_is_version_1(client, auth_headers, record):
+    response = client.post(ECG_URL, files=upload_files(record), headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["result_version"] == 1
+    assert set(body["probabilities"]) == {"normal", "afib", "pvc", "other"}
+    assert body["beat_count"] is None and body["abnormal_beat_count"] is None
+    assert body["signal_quality"] is None
+    # No attribution, so no made-up abnormal segments
+    assert body["attribution"] is None
+    assert body["explanation"]["abnormal_segments"] == []
+    stored = client.get(f"{HISTORY_URL}/{body['prediction_id']}", headers=auth_headers).json()
+    assert stored["result_data"]["abnormalities"] == []
@@ -0,0 +1,148 @@
+import asyncio
+
+import numpy as np
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.services.ecg_processing import MODEL_SAMPLING_RATE
+from app.services.ecg_realtime import MicroBatcher, StreamSession
+from ecg_samples import synthetic_ecg
+
+STREAM_URL = f"{settings.API_V1_STR}/stream/ecg"
+FS = 250.0
+
+
+def int16_frames(signal: np.ndarray, fs: float, seconds: float = 0.5, gain: float = 200.0):
+    samples = np.round(signal * gain).astype("<i2")
+    step = int(seconds * fs)
+    return [samples[start:start + step].tobytes() for start in range(0, samples.size, step)]
+
+
+def stream(session: StreamSession, frames):
+    """Feed frames and poll the way the endpoint does; returns every emitted R peak"""
+    peaks = []
+    for frame in frames:
+        session.append(frame)
+        if session.due:
+            peaks.append(session.poll_beats()[1])
+    return np.concatenate(peaks)
+
+
+def test_session_emits_every_beat_once():
+    ecg, r_times = synthetic_ecg(FS, 30.0)
+
+    peaks = stream(StreamSession(FS), int16_frames(ecg, FS))
+
+    expected = np.round(r_times * MODEL_SAMPLING_RATE)
+    # All but the beats still waiting for their window and look-ahead at the end
+    assert len(peaks) >= len(r_times) - 1
+    assert np.all(np.diff(peaks) > 0)
+    assert np.abs(peaks[:, np.newaxis] - expected[np.newaxis, :]).min(axis=1).max() <= 2
+
+
+def noisy_stretch() -> np.ndarray:
+    """40 s of ECG buried in electrode noise from 10 to 22 s"""
+    ecg, _ = synthetic_ecg(FS, 40.0)
+    ecg[int(10 * FS):int(22 * FS)] = np.random.default_rng(0).normal(0, 0.5, int(12 * FS))
+    return ecg
+
+
+def test_unusable_signal_yields_no_beats():
+    session = StreamSession(FS)
+
+    peaks = stream(session, int16_frames(noisy_stretch(), FS))
+
+    times = peaks / MODEL_SAMPLING_RATE
+    assert not ((times > 10.5) & (times < 21.5)).any()
+    assert session.summary()["excluded_seconds"] >= 8.0
+    assert ((times > 23) & (times < 38)).sum() >= 17
+
+
+def test_without_quality_gating_noise_becomes_beats(monkeypatch):
+    monkeypatch.setattr(settings, "ECG_SQI_ENABLED", False)
+    session = StreamSession(FS)
+
+    times = stream(session, int16_frames(noisy_stretch(), FS)) / MODEL_SAMPLING_RATE
+
+    assert ((times > 10.5) & (times < 21.5)).sum() > 5
+    assert session.summary()["excluded_seconds"] == 0.0
+
+
+def test_sustained_abnormal_beats_open_and_close_an_episode(monkeypatch):
+    monkeypatch.setattr(settings, "ECG_STREAM_EPISODE_BEATS", 4)
+    session = StreamSession(MODEL_SAMPLING_RATE)
+    peaks = np.arange(1, 21) * int(MODEL_SAMPLING_RATE)
+    scores = np.array([0.1] * 4 + [0.9] * 6 + [0.1] * 10)
+
+    events = session.record_scores(peaks, scores)
+
+    assert [beat["label"] for beat in events[0]["beats"]] == ["normal"] * 4 + ["abnormal"] * 6 + ["normal"] * 10
+    episodes = [event for event in events if event["type"] == "episode"]
+    assert [event["state"] for event in episodes] == ["start", "end"]
+    # Opens at half of the last 4 beats, closes once at most a quarter are abnormal
+    assert episodes[0]["start_time"] == 6.0
+    assert episodes[1]["end_time"] == 13.0
+    assert session.summary()["abnormal_beat_count"] == 6
+
+
+def test_micro_batcher_coalesces_concurrent_sessions():
+    batches = []
+
+    def predict(batch):
+        batches.append(batch.shape[0])
+        return batch[:, 0, 0]
+
+    batcher = MicroBatcher(predict, max_batch=64, max_delay=0.05, name="test")
+
+    async def score_all():
+        inputs = [np.full((count, 216, 1), index, dtype=np.float32) for index, count in enumerate((3, 5, 2), 1)]
+        return await asyncio.gather(*(batcher.score(beats) for beats in inputs))
+
+    results = asyncio.run(score_all())
+
+    assert batches == [10]
+    for index, (count, scores) in enumerate(zip((3, 5, 2), results), 1):
+        np.testing.assert_array_equal(scores, [index] * count)
+
+
+def test_websocket_authenticates_through_the_subprotocol(client, user, beat_model):
+    token = create_access_token({"sub": str(user.id)})
+    ecg, _ = synthetic_ecg(FS, 12.0)
+
+    with client.websocket_connect(f"{STREAM_URL}?fs={FS}", subprotocols=["bearer", token]) as websocket:
+        assert websocket.accepted_subprotocol == "bearer"
+        assert websocket.receive_json()["type"] == "ready"
+        for frame in int16_frames(ecg, FS):
+            websocket.send_bytes(frame)
+        websocket.send_text("end")
+        events = []
+        while not events or events[-1]["type"] != "summary":
+            events.append(websocket.receive_json())
+
+    beats = [beat for event in events if event["type"] == "beats" for beat in event["beats"]]
+    assert len(beats) >= 12
+    # The tiny model flags every beat
+    assert {beat["label"] for beat in beats} == {"abnormal"}
+    assert events[-1]["beat_count"] == len(beats)
+    assert events[-1]["excluded_seconds"] == 0.0
+
+
+@pytest.mark.parametrize("url, subprotocols", [
+    # Query tokens are no longer read
+    ("{url}?token={token}", None),
+    ("{url}", ["bearer"]),
+    ("{url}", ["{token}"]),
+    ("{url}", ["bearer", "not-a-token"]),
+])
+def test_websocket_rejects_missing_or_invalid_tokens(client, user, beat_model, url, subprotocols):
+    token = create_access_token({"sub": str(user.id)})
+    url = url.format(url=STREAM_URL, token=token)
+    subprotocols = [protocol.format(token=token) for protocol in subprotocols or []]
+
+    with pytest.raises(WebSocketDisconnect) as rejected:
+        with client.websocket_connect(url, subprotocols=subprotocols):
+            pass
+
+    assert rejected.value.code == 1008
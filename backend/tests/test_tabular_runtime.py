@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from app.services.tabular_runtime import export_artifact, load_artifact
+
+lightgbm = pytest.importorskip("lightgbm")
+ensemble = pytest.importorskip("sklearn.ensemble")
+preprocessing = pytest.importorskip("sklearn.preprocessing")
+
+
+def training_data(seed: int = 0):
+    """Four features; the first two have missing values, the others never do"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(600, 4))
+    y = ((X[:, 0] + 0.5 * X[:, 1] - X[:, 2] * X[:, 3]) > 0).astype(int)
+    X[rng.uniform(size=600) < 0.15, 0] = np.nan
+    X[rng.uniform(size=600) < 0.15, 1] = np.nan
+    # Missing values of feature 1 are mostly positives, so they don't follow the zero side
+    y[np.isnan(X[:, 1])] = 1
+    return X, y
+
+
+def scoring_rows(seed: int = 1) -> np.ndarray:
+    """Rows with a missing value in every feature, including those that had none in training"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(400, 4))
+    X[rng.uniform(size=X.shape) < 0.2] = np.nan
+    return X
+
+
+def round_trip(model, directory, scaler=None):
+    export_artifact(model, scaler, str(directory))
+    return load_artifact(str(directory))
+
+
+def threshold_edges(runtime, base: np.ndarray) -> np.ndarray:
+    """Rows that put one split feature exactly on, and one float64/float32 step either side of, its threshold"""
+    splits = np.flatnonzero(np.isfinite(runtime.threshold))
+    rows = []
+    for node in splits[:200]:
+        threshold = float(runtime.threshold[node])
+        as_float32 = float(np.float32(threshold))
+        for value in (threshold, np.nextafter(threshold, -np.inf), np.nextafter(threshold, np.inf),
+                      as_float32, float(np.nextafter(np.float32(threshold), np.float32(np.inf)))):
+            row = base[node % base.shape[0]].copy()
+            row[runtime.feature[node]] = value
+            rows.append(row)
+    return np.array(rows)
+
+
+@pytest.fixture(scope="module")
+def lightgbm_model():
+    X, y = training_data()
+    return lightgbm.LGBMClassifier(n_estimators=30, num_leaves=12, min_child_samples=5, verbose=-1).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def forest_model():
+    X, y = training_data()
+    return ensemble.RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0).fit(X, y)
+
+
+def test_lightgbm_matches_predict_proba(lightgbm_model, tmp_path):
+    runtime, _, manifest = round_trip(lightgbm_model, tmp_path / "artifact")
+    X = scoring_rows()
+
+    assert manifest["aggregation"] == "sigmoid_sum" and manifest["n_trees"] == 30
+    np.testing.assert_allclose(runtime.predict_proba(X), lightgbm_model.predict_proba(X), rtol=0, atol=1e-12)
+
+
+def test_lightgbm_missing_values_follow_the_trained_direction(lightgbm_model, tmp_path):
+    runtime, _, _ = round_trip(lightgbm_model, tmp_path / "artifact")
+    X = scoring_rows()
+    # Features 2 and 3 never had missing values: LightGBM reads NaN as 0.0 there
+    zeroed = X.copy()
+    zeroed[:, 2:] = np.nan_to_num(zeroed[:, 2:])
+
+    np.testing.assert_allclose(runtime.predict_proba(X), runtime.predict_proba(zeroed), rtol=0, atol=0)
+    missing = np.full((1, 4), np.nan)
+    np.testing.assert_allclose(runtime.predict_proba(missing), lightgbm_model.predict_proba(missing),
+                               rtol=0, atol=1e-12)
+
+
+def test_lightgbm_threshold_edges(lightgbm_model, tmp_path):
+    runtime, _, _ = round_trip(lightgbm_model, tmp_path / "artifact")
+    X = threshold_edges(runtime, np.nan_to_num(scoring_rows()))
+
+    np.testing.assert_allclose(runtime.predict_proba(X), lightgbm_model.predict_proba(X), rtol=0, atol=1e-12)
+
+
+def test_forest_matches_predict_proba(forest_model, tmp_path):
+    runtime, _, manifest = round_trip(forest_model, tmp_path / "artifact")
+    X = scoring_rows()
+
+    assert manifest["aggregation"] == "mean" and manifest["input_dtype"] == "float32"
+    np.testing.assert_allclose(runtime.predict_proba(X), forest_model.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(runtime.predict(X), forest_model.predict(X))
+
+
+def test_forest_threshold_edges(forest_model, tmp_path):
+    runtime, _, _ = round_trip(forest_model, tmp_path / "artifact")
+    # scikit-learn compares float32 inputs to float64 thresholds; these rows sit on either side of both
+    X = threshold_edges(runtime, np.nan_to_num(scoring_rows()))
+
+    np.testing.assert_allclose(runtime.predict_proba(X), forest_model.predict_proba(X), rtol=0, atol=1e-12)
+
+
+def test_scaler_round_trip(lightgbm_model, tmp_path):
+    X, _ = training_data()
+    scaler = preprocessing.StandardScaler().fit(np.nan_to_num(X))
+
+    _, runtime_scaler, _ = round_trip(lightgbm_model, tmp_path / "artifact", scaler)
+
+    rows = np.nan_to_num(scoring_rows())
+    np.testing.assert_allclose(runtime_scaler.transform(rows), scaler.transform(rows), rtol=0, atol=1e-12)
+
+
+def test_lightgbm_random_forest_is_rejected(tmp_path):
+    X, y = training_data()
+    model = lightgbm.LGBMClassifier(boosting_type="rf", bagging_freq=1, bagging_fraction=0.8, n_estimators=5,
+                                    verbose=-1).fit(X, y)
+
+    with pytest.raises(ValueError, match="boosting='rf'"):
+        export_artifact(model, None, str(tmp_path / "artifact"))
+
+    assert not (tmp_path / "artifact").exists()
+
+
+def test_multiclass_models_are_rejected(tmp_path):
+    X, _ = training_data()
+    y = np.arange(X.shape[0]) % 3
+    model = ensemble.RandomForestClassifier(n_estimators=2, random_state=0).fit(X, y)
+
+    with pytest.raises(ValueError, match="Only binary"):
+        export_artifact(model, None, str(tmp_path / "artifact"))
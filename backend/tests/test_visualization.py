@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.core.file_utils import get_visualization_directory
+from app.db.base import SessionLocal
+from app.models.ecg_data import EcgData
+from ecg_samples import synthetic_ecg, upload_files, write_record
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.fixture
+def prediction_id(client, auth_headers, tmp_path):
+    """An analysed ECG record, with another prediction's plot already on disk"""
+    ecg, _ = synthetic_ecg(360.0, 20.0)
+    record = write_record(tmp_path, 360.0, ecg, name="rec")
+    response = client.post(f"{settings.API_V1_STR}/predict/ecg", files=upload_files(record), headers=auth_headers)
+    assert response.status_code == 200, response.text
+    with open(os.path.join(get_visualization_directory(), "ecg_viz_another-patient.png"), "wb") as f:
+        f.write(PNG + b"another patient")
+    return response.json()["prediction_id"]
+
+
+def visualization_url(prediction_id: str) -> str:
+    return f"{settings.API_V1_STR}/ecg/{prediction_id}/visualization"
+
+
+def test_serves_the_predictions_own_plot(client, auth_headers, prediction_id):
+    with open(os.path.join(get_visualization_directory(), f"ecg_viz_{prediction_id}.png"), "wb") as f:
+        f.write(PNG + b"this patient")
+
+    response = client.get(visualization_url(prediction_id), headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.content == PNG + b"this patient"
+
+
+def test_no_processed_signal_is_not_found(client, auth_headers, prediction_id):
+    with SessionLocal() as db:
+        db.query(EcgData).filter(EcgData.prediction_id == prediction_id).update({"processed_data": None})
+        db.commit()
+
+    response = client.get(visualization_url(prediction_id), headers=auth_headers)
+
+    # Not another prediction's plot
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Visualization not found"